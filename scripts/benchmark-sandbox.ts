@@ -0,0 +1,90 @@
+import { ChildProcessWithoutNullStreams, spawn } from 'child_process';
+import { Readable } from 'stream';
+import { getSandboxPool, getSandboxPoolStatus, isSandboxSupported, sandboxCommandLine } from '../src/lib/runner/sandbox-pool';
+
+// Compares time-to-exit of a trivial script run as a fresh child process,
+// in a sandbox started for the run (what a run gets when the pool is empty)
+// and handed to a warm sandbox from the pool.
+//
+// Usage: tsx scripts/benchmark-sandbox.ts [iterations]
+
+const iterations = parseInt(process.argv[2] || '20', 10);
+const script = "import os\nprint('ok', os.getpid())\n";
+const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
+
+function waitForExit(child: ChildProcessWithoutNullStreams): Promise<number | null> {
+    return new Promise((resolve) => {
+        child.stdout.resume();
+        child.stderr.resume();
+        child.on('close', (code) => resolve(code));
+    });
+}
+
+function percentile(samples: number[], p: number): number {
+    const sorted = [...samples].sort((a, b) => a - b);
+    return sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * p))];
+}
+
+function report(label: string, samples: number[]) {
+    console.log(`${label.padEnd(14)} p50=${percentile(samples, 0.5).toFixed(1)}ms  p95=${percentile(samples, 0.95).toFixed(1)}ms`);
+}
+
+async function waitForIdleSandbox() {
+    while (getSandboxPoolStatus().idle === 0) {
+        await new Promise((resolve) => setTimeout(resolve, 10));
+    }
+}
+
+async function main() {
+    const cold: number[] = [];
+    for (let i = 0; i < iterations; i++) {
+        const started = process.hrtime.bigint();
+        await waitForExit(spawn(pythonCommand, ['-u', '-c', script], { cwd: process.cwd() }));
+        cold.push(Number(process.hrtime.bigint() - started) / 1e6);
+    }
+    report('plain spawn', cold);
+
+    const commandLine = sandboxCommandLine();
+    if (!commandLine || !isSandboxSupported()) {
+        console.log('Sandbox pool unavailable on this host (namespaces disabled or PYCODE_SANDBOX=off)');
+        return;
+    }
+
+    // Before the pool exists, so no warm sandboxes are starting alongside
+    const coldSandbox: number[] = [];
+    const job = JSON.stringify({ script, cwd: process.cwd(), env: { PATH: process.env.PATH } }) + '\n';
+    for (let i = 0; i < iterations; i++) {
+        const started = process.hrtime.bigint();
+        const child = spawn(commandLine[0], commandLine.slice(1), {
+            cwd: process.cwd(),
+            stdio: ['pipe', 'pipe', 'pipe', 'pipe'],
+        }) as unknown as ChildProcessWithoutNullStreams;
+        ((child as any).stdio[3] as Readable).resume();
+        child.stdin.end(job);
+        await waitForExit(child);
+        coldSandbox.push(Number(process.hrtime.bigint() - started) / 1e6);
+    }
+    report('cold sandbox', coldSandbox);
+
+    const pool = getSandboxPool()!;
+
+    const warm: number[] = [];
+    for (let i = 0; i < iterations; i++) {
+        // Measure the steady state: a sandbox is ready before each run
+        await waitForIdleSandbox();
+        const started = process.hrtime.bigint();
+        const { process: child } = pool.run({ script, cwd: process.cwd(), env: { PATH: process.env.PATH } });
+        await waitForExit(child);
+        warm.push(Number(process.hrtime.bigint() - started) / 1e6);
+    }
+    report('warm sandbox', warm);
+
+    console.log(getSandboxPoolStatus());
+    pool.shutdown();
+    process.exit(0);
+}
+
+main().catch((error) => {
+    console.error('Benchmark failed:', error);
+    process.exit(1);
+});
@@ -0,0 +1,30 @@
+import dotenv from 'dotenv';
+import path from 'path';
+import { ExecutionDaemon } from '../src/lib/runner/daemon';
+
+// Load environment variables from .env file
+dotenv.config({ path: path.resolve(process.cwd(), '.env') });
+
+// Standalone execution service. Point the web tier at the same socket with
+// PYCODE_RUNNER_SOCKET to move all process management out of Next.js.
+//
+// Usage: PYCODE_RUNNER_SOCKET=/tmp/pycode-runner.sock npm run runner:daemon
+
+const socketPath = process.env.PYCODE_RUNNER_SOCKET || path.join(process.cwd(), '.cache', 'pycode', 'runner.sock');
+const maxWorkers = parseInt(process.env.PYCODE_DAEMON_MAX_WORKERS || '', 10) || undefined;
+
+const daemon = new ExecutionDaemon({ socketPath, maxWorkers });
+
+const shutdown = async () => {
+    console.log('[ExecutionDaemon] Shutting down...');
+    await daemon.close();
+    process.exit(0);
+};
+
+process.on('SIGINT', shutdown);
+process.on('SIGTERM', shutdown);
+
+daemon.listen().catch((error) => {
+    console.error('Failed to start execution daemon:', error);
+    process.exit(1);
+});
@@ -0,0 +1,40 @@
+import dotenv from 'dotenv';
+import os from 'os';
+import path from 'path';
+import { RunnerAgent } from '../src/lib/runner/runner-agent';
+
+// Load environment variables from .env file
+dotenv.config({ path: path.resolve(process.cwd(), '.env') });
+
+// Runner node: pulls Python runs from the web tier's job broker.
+//
+// Usage: PYCODE_BROKER_URL=https://app.example.com PYCODE_RUNNER_TOKEN=... npm run runner:agent
+
+const brokerUrl = process.env.PYCODE_BROKER_URL;
+const token = process.env.PYCODE_RUNNER_TOKEN;
+
+if (!brokerUrl || !token) {
+    console.error('Error: PYCODE_BROKER_URL and PYCODE_RUNNER_TOKEN must be set');
+    process.exit(1);
+}
+
+const agent = new RunnerAgent({
+    brokerUrl,
+    token,
+    capacity: parseInt(process.env.PYCODE_RUNNER_CAPACITY || '', 10) || os.cpus().length,
+    name: process.env.PYCODE_RUNNER_NAME,
+});
+
+const shutdown = async () => {
+    console.log('[RunnerAgent] Shutting down...');
+    await agent.stop();
+    process.exit(0);
+};
+
+process.on('SIGINT', shutdown);
+process.on('SIGTERM', shutdown);
+
+agent.start().catch((error) => {
+    console.error('Runner agent failed:', error);
+    process.exit(1);
+});
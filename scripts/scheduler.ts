@@ -0,0 +1,32 @@
+import dotenv from 'dotenv';
+import path from 'path';
+import { getUsageMeter } from '../src/lib/runner/metering';
+import { getProjectActivity } from '../src/lib/runner/project-activity';
+import { startScheduler } from '../src/lib/runner/scheduler';
+
+// Load environment variables from .env file
+dotenv.config({ path: path.resolve(process.cwd(), '.env') });
+
+// Standalone scheduler for project schedules. Set PYCODE_SCHEDULER=off on the
+// web tier when schedules should only run here. Several schedulers may share
+// the schedules directory; each run is still started once.
+//
+// Usage: PYCODE_SCHEDULER_CONCURRENCY=4 npm run runner:scheduler
+
+const scheduler = startScheduler();
+
+const shutdown = () => {
+    console.log('[Scheduler] Shutting down...');
+    // Background runs already started keep going and are recorded by the
+    // next scheduler tick, here or elsewhere
+    scheduler.stop();
+    // Write the usage and run times recorded since the last flush
+    Promise.allSettled([getUsageMeter().stop(), getProjectActivity().stop()])
+        .finally(() => process.exit(0));
+};
+
+process.on('SIGINT', shutdown);
+process.on('SIGTERM', shutdown);
+
+// The scheduler's timer is unref'd; keep this process alive
+setInterval(() => undefined, 1 << 30);
@@ -10,6 +10,7 @@
 import { getAiForUser, type AiProvider } from '@/ai/genkit';
 import { getUserApiKeys } from '@/lib/api-keys';
 import { createClient } from '@/lib/supabase/server';
+import { startDependencyPrefetch } from '@/lib/runner/prefetch';
 import { z } from 'genkit';
 import OpenAI from 'openai';
 
@@ -47,7 +48,23 @@ export type AiCodeAssistanceOutput = z.infer<typeof AiCodeAssistanceOutputSchema
 
 
 export async function aiCodeAssistance(input: AiCodeAssistanceInput): Promise<AiCodeAssistanceOutput> {
-  return aiCodeAssistanceFlow(input);
+  const result = await aiCodeAssistanceFlow(input);
+
+  // The user usually runs generated code right away: start installing its
+  // imports in the background while the response travels to the editor
+  if (result?.code) {
+    const localModules = new Set(
+      (input.uploadedFiles || [])
+        .filter(file => file.name.endsWith('.py'))
+        .map(file => file.name.split('/').pop()!.replace(/\.py$/, ''))
+    );
+    if (result.fileName?.endsWith('.py')) {
+      localModules.add(result.fileName.replace(/\.py$/, ''));
+    }
+    startDependencyPrefetch(result.code, localModules);
+  }
+
+  return result;
 }
 
 
@@ -32,10 +32,17 @@ export default function AdminDashboard() {
     isAdmin, 
     adminLogout, 
     getAllUsers, 
+    loadMoreUsers,
+    setUsersQuery,
+    refreshChangedUsers,
     updateUserCredits, 
     updateUserSubscription,
     getUserStats,
+    connectAdminUsageStream,
+    disconnectAdminUsageStream,
     users,
+    usersQuery,
+    usersNextCursor,
     adminStats
   } = useEditorStore()
   
@@ -97,7 +104,7 @@ export default function AdminDashboard() {
       await updateUserCredits(selectedUser.id, newCredits)
       await updateUserSubscription(selectedUser.id, newSubscription)
       setIsEditDialogOpen(false)
-      await loadUsersAndStats()
+      await Promise.all([refreshChangedUsers(), getUserStats()])
     }
   }
 
@@ -105,16 +112,30 @@ export default function AdminDashboard() {
     await loadUsersAndStats()
   }
 
-  // Auto-refresh users every 30 seconds
+  // Search on the server once typing pauses
   useEffect(() => {
-    const interval = setInterval(() => {
-      if (!isLoading) {
-        loadUsersAndStats()
-      }
-    }, 30000) // 30 seconds
+    if (searchQuery === usersQuery.search) return
+    const timer = setTimeout(() => setUsersQuery({ search: searchQuery }), 300)
+    return () => clearTimeout(timer)
+  }, [searchQuery, usersQuery.search, setUsersQuery])
 
+  // Auto-refresh every 30 seconds: only rows changed since the last sync,
+  // plus the cached totals
+  useEffect(() => {
+    if (!isAdmin) return
+    const interval = setInterval(() => {
+      refreshChangedUsers()
+      getUserStats()
+    }, 30000)
     return () => clearInterval(interval)
-  }, [isLoading])
+  }, [isAdmin, refreshChangedUsers, getUserStats])
+
+  // Credit and usage changes are pushed by the server instead of polled
+  useEffect(() => {
+    if (!isAdmin) return
+    connectAdminUsageStream()
+    return () => disconnectAdminUsageStream()
+  }, [isAdmin, connectAdminUsageStream, disconnectAdminUsageStream])
 
   const handleAddUser = async () => {
     if (!newUserName || !newUserEmail) return
@@ -135,18 +156,13 @@ export default function AdminDashboard() {
         setNewUserName('')
         setNewUserEmail('')
         setNewUserSubscription('free')
-        await loadUsersAndStats()
+        await Promise.all([refreshChangedUsers(), getUserStats()])
       }
     } catch (error) {
       console.error('Error creating user:', error)
     }
   }
 
-  const filteredUsers = users.filter(user =>
-    user.email.toLowerCase().includes(searchQuery.toLowerCase()) ||
-    user.name.toLowerCase().includes(searchQuery.toLowerCase())
-  )
-
 
   const stats = adminStats
 
@@ -268,6 +284,39 @@ export default function AdminDashboard() {
                   onChange={(e) => setSearchQuery(e.target.value)}
                   className="w-64"
                 />
+                <Select
+                  value={usersQuery.subscription || 'all'}
+                  onValueChange={(value) => setUsersQuery({ subscription: value === 'all' ? '' : value as 'free' | 'pro' | 'team' })}
+                >
+                  <SelectTrigger className="w-32">
+                    <SelectValue />
+                  </SelectTrigger>
+                  <SelectContent>
+                    <SelectItem value="all">All plans</SelectItem>
+                    <SelectItem value="free">Free</SelectItem>
+                    <SelectItem value="pro">Pro</SelectItem>
+                    <SelectItem value="team">Team</SelectItem>
+                  </SelectContent>
+                </Select>
+                <Select
+                  value={`${usersQuery.sort}:${usersQuery.order}`}
+                  onValueChange={(value) => {
+                    const [sort, order] = value.split(':')
+                    setUsersQuery({ sort: sort as typeof usersQuery.sort, order: order as 'asc' | 'desc' })
+                  }}
+                >
+                  <SelectTrigger className="w-40">
+                    <SelectValue />
+                  </SelectTrigger>
+                  <SelectContent>
+                    <SelectItem value="created_at:desc">Newest</SelectItem>
+                    <SelectItem value="last_active:desc">Recently active</SelectItem>
+                    <SelectItem value="credits:asc">Fewest credits</SelectItem>
+                    <SelectItem value="code_runs:desc">Most code runs</SelectItem>
+                    <SelectItem value="ai_queries:desc">Most AI queries</SelectItem>
+                    <SelectItem value="name:asc">Name</SelectItem>
+                  </SelectContent>
+                </Select>
                 <Button onClick={() => setIsAddUserDialogOpen(true)}>
                   <Plus className="h-4 w-4 mr-2" />
                   Add User
@@ -281,7 +330,7 @@ export default function AdminDashboard() {
                 <RefreshCw className="h-6 w-6 animate-spin mr-2" />
                 <span>Loading users...</span>
               </div>
-            ) : filteredUsers.length === 0 ? (
+            ) : users.length === 0 ? (
               <div className="flex items-center justify-center py-8">
                 <div className="text-center">
                   <Users className="h-12 w-12 text-muted-foreground mx-auto mb-4" />
@@ -309,7 +358,7 @@ export default function AdminDashboard() {
                   </TableRow>
                 </TableHeader>
                 <TableBody>
-                  {filteredUsers.map((user) => (
+                  {users.map((user) => (
                   <TableRow key={user.id}>
                     <TableCell>
                       <div>
@@ -332,7 +381,7 @@ export default function AdminDashboard() {
                       <div className="flex items-center gap-2">
                         <CreditCard className="h-4 w-4 text-muted-foreground" />
                         <span className={user.credits <= 10 ? 'text-red-600 font-medium' : ''}>
-                          {user.credits}
+                          {Math.ceil(user.credits)}
                         </span>
                         <span className="text-sm text-muted-foreground">
                           / {user.creditLimit}
@@ -359,6 +408,13 @@ export default function AdminDashboard() {
               </TableBody>
             </Table>
             )}
+            {!isLoading && usersNextCursor && (
+              <div className="flex justify-center pt-4">
+                <Button variant="outline" onClick={() => loadMoreUsers()}>
+                  Load more
+                </Button>
+              </div>
+            )}
           </CardContent>
         </Card>
 
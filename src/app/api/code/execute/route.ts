@@ -29,7 +29,7 @@ export async function POST(request: NextRequest) {
     }
 
     const body = await request.json();
-    const { code, projectId } = body;
+    const { code, projectId, files } = body;
 
     if (!code) {
       return NextResponse.json(
@@ -43,14 +43,16 @@ export async function POST(request: NextRequest) {
     try {
       const result = await runPythonCode({
         code,
-        projectId: projectId || undefined
+        projectId: projectId || undefined,
+        files: Array.isArray(files) ? files : undefined
       });
 
       return NextResponse.json({
         success: true,
         output: result.output,
         error: result.error,
-        workingDir: result.workingDir
+        workingDir: result.workingDir,
+        metrics: result.metrics
       });
     } catch (execError: any) {
       console.error('[API] Code execution error:', execError);
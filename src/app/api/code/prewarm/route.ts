@@ -0,0 +1,128 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { verifyToken } from '@/lib/auth';
+import { createClient } from '@/lib/supabase/server';
+import { createAdminClient } from '@/lib/supabase/admin';
+import { fetchFileContents, fetchOwnedFileContents } from '@/lib/file-contents';
+import { ProjectFileInput } from '@/lib/runner/project-files';
+import { cancelPrewarm, startPrewarm } from '@/lib/runner/prewarm';
+
+// A file the editor has the body of, or one it has only the content hash of
+type PrewarmFileInput = ProjectFileInput | { path: string; contentHash: string };
+
+const hasContent = (file: PrewarmFileInput): file is ProjectFileInput =>
+  typeof (file as ProjectFileInput).content === 'string';
+
+/**
+ * Project Prewarm API endpoint
+ * POST /api/code/prewarm - start preparing a project in the background
+ *   (write files, install imported packages, precompile bytecode). Files the
+ *   editor has not loaded yet come as { path, contentHash } and are looked up
+ *   here.
+ * DELETE /api/code/prewarm?projectId= - cancel it, e.g. when the editor closes
+ */
+export async function POST(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const { projectId, files } = await request.json() as {
+      projectId?: string;
+      files?: PrewarmFileInput[];
+    };
+
+    if (!projectId) {
+      return NextResponse.json(
+        { error: 'Project ID is required' },
+        { status: 400 }
+      );
+    }
+
+    let projectFiles: ProjectFileInput[] | undefined;
+    if (Array.isArray(files)) {
+      const hashes = files.flatMap(file => hasContent(file) ? [] : [file.contentHash]);
+      // Only bodies of the user's own projects (see GET /api/projects/contents)
+      const admin = createAdminClient();
+      const contents = hashes.length === 0
+        ? new Map<string, string>()
+        : admin
+          ? await fetchOwnedFileContents(admin, user.id, hashes)
+          : await fetchFileContents(await createClient(), hashes);
+
+      projectFiles = [];
+      for (const file of files) {
+        if (hasContent(file)) {
+          projectFiles.push(file);
+        } else if (contents.has(file.contentHash)) {
+          projectFiles.push({ path: file.path, content: contents.get(file.contentHash)! });
+        }
+      }
+    }
+
+    // Fire and forget: the response does not wait for the prewarm
+    startPrewarm({ projectId, files: projectFiles });
+
+    return NextResponse.json({ success: true, started: true }, { status: 202 });
+  } catch (error: any) {
+    console.error('[API] Prewarm endpoint error:', error);
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error?.message || String(error)
+      },
+      { status: 500 }
+    );
+  }
+}
+
+export async function DELETE(request: NextRequest) {
+  try {
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const projectId = request.nextUrl.searchParams.get('projectId');
+    if (!projectId) {
+      return NextResponse.json(
+        { error: 'Project ID is required' },
+        { status: 400 }
+      );
+    }
+
+    return NextResponse.json({ success: true, cancelled: cancelPrewarm(projectId) });
+  } catch (error: any) {
+    console.error('[API] Prewarm cancel error:', error);
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error?.message || String(error)
+      },
+      { status: 500 }
+    );
+  }
+}
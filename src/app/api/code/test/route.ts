@@ -0,0 +1,108 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { verifyToken } from '@/lib/auth';
+import { getUsageMeter } from '@/lib/runner/metering';
+import { getProjectActivity } from '@/lib/runner/project-activity';
+import { getProjectDir, materializeProjectFiles, ProjectFileInput } from '@/lib/runner/project-files';
+import { runTests, TestRunEvent } from '@/lib/runner/pytest-runner';
+
+/**
+ * Test Runner API endpoint
+ * POST /api/code/test
+ * Writes the project files, runs pytest across worker processes and streams
+ * one JSON event per line (start, test, output, summary)
+ */
+export async function POST(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const body = await request.json();
+    const { projectId, files, workers } = body as {
+      projectId?: string;
+      files?: ProjectFileInput[];
+      workers?: number;
+    };
+
+    console.log('[API] Test run request from user:', user.id, 'project:', projectId || 'none');
+
+    const projectDir = getProjectDir(projectId);
+    if (Array.isArray(files)) {
+      await materializeProjectFiles(projectDir, files);
+    }
+
+    const encoder = new TextEncoder();
+    const abortController = new AbortController();
+    request.signal.addEventListener('abort', () => abortController.abort());
+
+    const stream = new ReadableStream({
+      async start(controller) {
+        // Test workers run outside a cgroup, so wall time is what gets billed
+        const startedAt = Date.now();
+        let billed = false;
+        const bill = (durationMs: number) => {
+          billed = true;
+          getProjectActivity().recordRun(projectId);
+          return getUsageMeter().recordRun(user.id, user.subscription, { durationMs });
+        };
+
+        const send = (event: TestRunEvent) => {
+          if (event.type === 'summary') {
+            event.creditsCharged = bill(event.durationMs);
+          }
+          if (abortController.signal.aborted) return;
+          controller.enqueue(encoder.encode(JSON.stringify(event) + '\n'));
+        };
+
+        try {
+          await runTests({
+            projectId,
+            projectDir,
+            workers: typeof workers === 'number' ? workers : undefined,
+            signal: abortController.signal,
+            onEvent: send,
+          });
+        } catch (error: any) {
+          console.error('[API] Test run error:', error);
+          send({ type: 'output', worker: -1, text: `Test run failed: ${error?.message || String(error)}` });
+        } finally {
+          // Cancelled runs never reach the summary but still used the workers
+          if (!billed) bill(Date.now() - startedAt);
+          controller.close();
+        }
+      },
+      cancel() {
+        abortController.abort();
+      },
+    });
+
+    return new Response(stream, {
+      headers: {
+        'Content-Type': 'application/x-ndjson; charset=utf-8',
+        'Cache-Control': 'no-cache',
+      },
+    });
+  } catch (error: any) {
+    console.error('[API] Code test endpoint error:', error);
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error?.message || String(error)
+      },
+      { status: 500 }
+    );
+  }
+}
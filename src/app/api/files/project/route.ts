@@ -1,14 +1,20 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { createClient } from '@/lib/supabase/server';
-import { readFile } from 'fs/promises';
+import { readFile, stat } from 'fs/promises';
 import { join } from 'path';
-import { existsSync } from 'fs';
 
-// Get all uploaded files for a project
+/**
+ * Uploaded files of a project
+ * GET /api/files/project?projectId= - metadata of every uploaded file; the
+ *   bodies (datasets can be large) are fetched one by one when needed
+ * GET /api/files/project?projectId=&path=<filePath> - body of one uploaded
+ *   file, with an ETag so an unchanged file is answered with 304
+ */
 export async function GET(request: NextRequest) {
   try {
     const { searchParams } = new URL(request.url);
     const projectId = searchParams.get('projectId');
+    const filePath = searchParams.get('path');
 
     if (!projectId) {
       return NextResponse.json(
@@ -19,6 +25,46 @@ export async function GET(request: NextRequest) {
 
     const supabase = await createClient();
 
+    if (filePath) {
+      // Only paths recorded for this project are read, never arbitrary ones
+      const { data: file, error } = await supabase
+        .from('files')
+        .select('file_path')
+        .eq('project_id', projectId)
+        .eq('file_path', filePath)
+        .maybeSingle();
+
+      if (error) {
+        console.error('Error fetching project file:', error);
+        return NextResponse.json(
+          { error: 'Failed to fetch project file' },
+          { status: 500 }
+        );
+      }
+      if (!file) {
+        return NextResponse.json(
+          { error: 'File not found' },
+          { status: 404 }
+        );
+      }
+
+      const fullPath = join(process.cwd(), file.file_path);
+      const info = await stat(fullPath).catch(() => null);
+      if (!info) {
+        console.warn(`File not found: ${fullPath}`);
+        return NextResponse.json({ content: '' }, { headers: { 'Cache-Control': 'no-store' } });
+      }
+
+      const etag = `W/"${info.size}-${Math.floor(info.mtimeMs)}"`;
+      const headers = { 'ETag': etag, 'Cache-Control': 'private, no-cache' };
+      if (request.headers.get('if-none-match') === etag) {
+        return new NextResponse(null, { status: 304, headers });
+      }
+
+      const content = await readFile(fullPath, 'utf-8');
+      return NextResponse.json({ content }, { headers });
+    }
+
     // Get file metadata from database
     const { data: files, error } = await supabase
       .from('files')
@@ -34,57 +80,16 @@ export async function GET(request: NextRequest) {
       );
     }
 
-    const fileList = files || [];
-
-    // Read file contents from filesystem
-    const filesWithContent = await Promise.all(
-      fileList.map(async (file: any) => {
-        try {
-          // Construct full path to the uploaded file
-          const fullPath = join(process.cwd(), file.file_path);
-
-          // Check if file exists
-          if (existsSync(fullPath)) {
-            const content = await readFile(fullPath, 'utf-8');
-            return {
-              id: file.id,
-              filename: file.filename,
-              originalName: file.original_name,
-              filePath: file.file_path,
-              fileSize: file.file_size,
-              mimeType: file.mime_type,
-              content
-            };
-          } else {
-            console.warn(`File not found: ${fullPath}`);
-            return {
-              id: file.id,
-              filename: file.filename,
-              originalName: file.original_name,
-              filePath: file.file_path,
-              fileSize: file.file_size,
-              mimeType: file.mime_type,
-              content: '' // File doesn't exist, return empty content
-            };
-          }
-        } catch (error) {
-          console.error(`Error reading file ${file.file_path}:`, error);
-          return {
-            id: file.id,
-            filename: file.filename,
-            originalName: file.original_name,
-            filePath: file.file_path,
-            fileSize: file.file_size,
-            mimeType: file.mime_type,
-            content: '' // Return empty content on error
-          };
-        }
-      })
-    );
-
     return NextResponse.json({
       success: true,
-      files: filesWithContent
+      files: (files || []).map((file: any) => ({
+        id: file.id,
+        filename: file.filename,
+        originalName: file.original_name,
+        filePath: file.file_path,
+        fileSize: file.file_size,
+        mimeType: file.mime_type,
+      }))
     });
   } catch (error) {
     console.error('Error fetching project files:', error);
@@ -94,4 +99,3 @@ export async function GET(request: NextRequest) {
     );
   }
 }
-
@@ -0,0 +1,139 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { verifyToken } from '@/lib/auth';
+import { createClient } from '@/lib/supabase/server';
+import { createAdminClient } from '@/lib/supabase/admin';
+import { fetchFileContents, hashContent, ManifestNode } from '@/lib/file-contents';
+import { listManifestFiles } from '@/lib/project-search';
+import { getCodeSearchIndex } from '@/lib/code-search';
+
+/**
+ * Find in Files API endpoint
+ * GET /api/files/search?projectId=&q=&regex=&caseSensitive=&limit=
+ * Matches of q (literal text, or a JavaScript regular expression with
+ * regex=true) in the files of one of the signed-in user's projects, grouped by
+ * file, with 1-based line and column of each match. Regular expressions are
+ * limited to MAX_REGEX_LENGTH characters and to a few seconds of matching.
+ */
+
+const DEFAULT_LIMIT = 500;
+const MAX_LIMIT = 2000;
+const MAX_QUERY_LENGTH = 200;
+const MAX_REGEX_LENGTH = 100;
+
+// Files of trees saved before content-addressed storage still have their body inline
+function collectInlineFiles(tree: ManifestNode, prefix = '', inline = new Map<string, string>()) {
+  const files: { path: string; hash: string }[] = [];
+  for (const item of tree.children || []) {
+    if (item.type === 'folder') {
+      files.push(...collectInlineFiles(item, `${prefix}${item.name}/`, inline).files);
+    } else if (typeof item.content === 'string' && !item.contentHash) {
+      const hash = hashContent(item.content);
+      inline.set(hash, item.content);
+      files.push({ path: prefix + item.name, hash });
+    }
+  }
+  return { files, inline };
+}
+
+export async function GET(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const { searchParams } = request.nextUrl;
+    const projectId = searchParams.get('projectId');
+    const regex = searchParams.get('regex') === 'true';
+    const query = regex ? searchParams.get('q') || '' : (searchParams.get('q') || '').slice(0, MAX_QUERY_LENGTH);
+    const caseSensitive = searchParams.get('caseSensitive') === 'true';
+    const limit = Math.min(Math.max(parseInt(searchParams.get('limit') || '', 10) || DEFAULT_LIMIT, 1), MAX_LIMIT);
+
+    if (!projectId) {
+      return NextResponse.json(
+        { error: 'Project ID is required' },
+        { status: 400 }
+      );
+    }
+    if (!query) {
+      return NextResponse.json({ files: [], totalMatches: 0, truncated: false });
+    }
+    if (regex && query.length > MAX_REGEX_LENGTH) {
+      return NextResponse.json(
+        { error: `Regular expressions are limited to ${MAX_REGEX_LENGTH} characters` },
+        { status: 400 }
+      );
+    }
+    if (regex) {
+      try {
+        new RegExp(query);
+      } catch (error: any) {
+        return NextResponse.json(
+          { error: 'Invalid regular expression', details: error?.message || String(error) },
+          { status: 400 }
+        );
+      }
+    }
+
+    const supabase = createAdminClient() || await createClient();
+    const { data: project, error } = await supabase
+      .from('projects')
+      .select('file_tree')
+      .eq('id', projectId)
+      .eq('user_id', user.id)
+      .maybeSingle();
+
+    if (error) throw error;
+    if (!project) {
+      return NextResponse.json(
+        { error: 'Project not found' },
+        { status: 404 }
+      );
+    }
+
+    const started = Date.now();
+    // Brings the index up to the saved tree; unchanged files cost nothing
+    const tree: ManifestNode = project.file_tree || { name: 'root', type: 'folder', children: [] };
+    const { files: inlineFiles, inline } = collectInlineFiles(tree);
+    const codeSearch = getCodeSearchIndex();
+    await codeSearch.syncProject(
+      projectId,
+      [...listManifestFiles(tree), ...inlineFiles],
+      async (hashes) => {
+        const stored = await fetchFileContents(supabase, hashes.filter(hash => !inline.has(hash)));
+        hashes.forEach(hash => {
+          if (inline.has(hash)) stored.set(hash, inline.get(hash)!);
+        });
+        return stored;
+      },
+    );
+
+    const result = await codeSearch.search(projectId, { query, regex, caseSensitive, maxMatches: limit });
+    if (result.timedOut) {
+      return NextResponse.json(
+        { error: 'Regular expression took too long to run. Try a more specific pattern.' },
+        { status: 400 }
+      );
+    }
+
+    return NextResponse.json({ ...result, durationMs: Date.now() - started });
+  } catch (error: any) {
+    console.error('[API] File search error:', error);
+    return NextResponse.json(
+      { error: 'Failed to search files', details: error?.message || String(error) },
+      { status: 500 }
+    );
+  }
+}
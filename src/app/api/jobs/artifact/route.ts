@@ -0,0 +1,67 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { readFile } from 'fs/promises';
+import path from 'path';
+import { verifyToken } from '@/lib/auth';
+import { getBackgroundJob, resolveJobArtifact } from '@/lib/runner/background-jobs';
+
+/**
+ * Background Job Artifact API endpoint
+ * GET /api/jobs/artifact?jobId=&path=
+ * Downloads a file written by a finished background run
+ */
+export async function GET(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const { searchParams } = request.nextUrl;
+    const jobId = searchParams.get('jobId');
+    const artifactPath = searchParams.get('path');
+    if (!jobId || !artifactPath) {
+      return NextResponse.json(
+        { error: 'Job ID and path are required' },
+        { status: 400 }
+      );
+    }
+
+    const job = await getBackgroundJob(jobId);
+    const filePath = job && job.userId === user.id ? resolveJobArtifact(job, artifactPath) : null;
+    if (!filePath) {
+      return NextResponse.json(
+        { error: 'Artifact not found' },
+        { status: 404 }
+      );
+    }
+
+    const content = await readFile(filePath);
+    return new Response(content, {
+      headers: {
+        'Content-Type': 'application/octet-stream',
+        'Content-Disposition': `attachment; filename="${path.basename(filePath).replace(/"/g, '')}"`,
+      },
+    });
+  } catch (error: any) {
+    console.error('[API] Job artifact error:', error);
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error?.message || String(error)
+      },
+      { status: 500 }
+    );
+  }
+}
@@ -0,0 +1,154 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { verifyToken } from '@/lib/auth';
+import {
+  cancelBackgroundJob,
+  getBackgroundJob,
+  listBackgroundJobs,
+  startBackgroundJob,
+} from '@/lib/runner/background-jobs';
+
+/**
+ * Background Jobs API endpoint
+ * GET /api/jobs?projectId= - list the user's background runs
+ * POST /api/jobs - start a detached run that outlives the request
+ * DELETE /api/jobs?jobId= - cancel a running job
+ *
+ * Live output of a job is streamed by GET /api/jobs/stream.
+ */
+export async function GET(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const projectId = request.nextUrl.searchParams.get('projectId') || undefined;
+    const jobs = await listBackgroundJobs(user.id, projectId);
+
+    return NextResponse.json({ success: true, jobs });
+  } catch (error: any) {
+    console.error('[API] Jobs list error:', error);
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error?.message || String(error)
+      },
+      { status: 500 }
+    );
+  }
+}
+
+export async function POST(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const body = await request.json();
+    const { code, projectId, files, fileName } = body;
+
+    if (!code) {
+      return NextResponse.json(
+        { error: 'Code is required' },
+        { status: 400 }
+      );
+    }
+
+    console.log('[API] Background run request from user:', user.id, 'project:', projectId || 'none');
+
+    const job = await startBackgroundJob({
+      code,
+      projectId: projectId || undefined,
+      files: Array.isArray(files) ? files : undefined
+    }, {
+      userId: user.id,
+      plan: user.subscription,
+      fileName: typeof fileName === 'string' ? fileName : undefined
+    });
+
+    return NextResponse.json({ success: true, job }, { status: 202 });
+  } catch (error: any) {
+    console.error('[API] Background run error:', error);
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error?.message || String(error)
+      },
+      { status: 500 }
+    );
+  }
+}
+
+export async function DELETE(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const jobId = request.nextUrl.searchParams.get('jobId');
+    if (!jobId) {
+      return NextResponse.json(
+        { error: 'Job ID is required' },
+        { status: 400 }
+      );
+    }
+
+    const existing = await getBackgroundJob(jobId);
+    if (!existing || existing.userId !== user.id) {
+      return NextResponse.json(
+        { error: 'Job not found' },
+        { status: 404 }
+      );
+    }
+
+    const job = await cancelBackgroundJob(jobId);
+    return NextResponse.json({ success: true, job });
+  } catch (error: any) {
+    console.error('[API] Job cancel error:', error);
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error?.message || String(error)
+      },
+      { status: 500 }
+    );
+  }
+}
@@ -0,0 +1,150 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { verifyToken } from '@/lib/auth';
+import { getBackgroundJob, getJobOutputSize, readJobOutput } from '@/lib/runner/background-jobs';
+import { stripMetricsLines } from '@/lib/runner/run-metrics';
+
+/**
+ * Background Job Stream API endpoint
+ * GET /api/jobs/stream?jobId=
+ * Server-sent events for one job: `output` events ({ stream, text }) replay
+ * the log and then follow it live, `done` carries the finished job. Closing
+ * the connection only detaches; the job keeps running.
+ */
+
+const POLL_INTERVAL_MS = 500;
+const KEEPALIVE_INTERVAL_MS = 15000;
+// On attach, replay at most the tail of each log
+const REPLAY_LIMIT_BYTES = 1024 * 1024;
+
+export async function GET(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const jobId = request.nextUrl.searchParams.get('jobId');
+    const job = jobId ? await getBackgroundJob(jobId) : null;
+    if (!jobId || !job || job.userId !== user.id) {
+      return NextResponse.json(
+        { error: 'Job not found' },
+        { status: 404 }
+      );
+    }
+
+    const sizes = await getJobOutputSize(jobId);
+    let offsets = {
+      stdout: Math.max(sizes.stdout - REPLAY_LIMIT_BYTES, 0),
+      stderr: Math.max(sizes.stderr - REPLAY_LIMIT_BYTES, 0),
+    };
+    const truncated = offsets.stdout > 0 || offsets.stderr > 0;
+
+    const encoder = new TextEncoder();
+    let closed = false;
+    request.signal.addEventListener('abort', () => { closed = true; });
+
+    const stream = new ReadableStream({
+      async start(controller) {
+        const send = (event: string, data: unknown) => {
+          if (closed) return;
+          controller.enqueue(encoder.encode(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`));
+        };
+
+        const stdoutDecoder = new TextDecoder();
+        const stderrDecoder = new TextDecoder();
+        // stderr is forwarded line by line so metrics lines can be dropped
+        let stderrPending = '';
+        let lastSentAt = Date.now();
+
+        send('job', job);
+        if (truncated) {
+          send('output', { stream: 'stdout', text: '[INFO] Showing the most recent output only.\n' });
+        }
+
+        try {
+          while (!closed) {
+            // Read the status before the logs: once a job is finished, the
+            // logs read afterwards are complete
+            const current = await getBackgroundJob(jobId);
+            const chunk = await readJobOutput(jobId, offsets);
+            offsets = chunk.offsets;
+
+            if (chunk.stdout.length > 0) {
+              send('output', { stream: 'stdout', text: stdoutDecoder.decode(chunk.stdout, { stream: true }) });
+              lastSentAt = Date.now();
+            }
+            if (chunk.stderr.length > 0) {
+              stderrPending += stderrDecoder.decode(chunk.stderr, { stream: true });
+              const lineEnd = stderrPending.lastIndexOf('\n');
+              if (lineEnd !== -1) {
+                const text = stripMetricsLines(stderrPending.slice(0, lineEnd + 1));
+                stderrPending = stderrPending.slice(lineEnd + 1);
+                if (text) {
+                  send('output', { stream: 'stderr', text });
+                  lastSentAt = Date.now();
+                }
+              }
+            }
+
+            const drained = chunk.stdout.length === 0 && chunk.stderr.length === 0;
+            if (!current || (current.status !== 'running' && drained)) {
+              const rest = stripMetricsLines(stderrPending);
+              if (rest) {
+                send('output', { stream: 'stderr', text: rest });
+              }
+              send('done', current);
+              break;
+            }
+
+            if (Date.now() - lastSentAt >= KEEPALIVE_INTERVAL_MS) {
+              // Comment line: keeps proxies from timing out idle streams
+              if (!closed) controller.enqueue(encoder.encode(': keepalive\n\n'));
+              lastSentAt = Date.now();
+            }
+            if (drained) {
+              await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+            }
+          }
+        } catch (error: any) {
+          console.error('[API] Job stream error:', error);
+          send('error', { error: error?.message || String(error) });
+        } finally {
+          if (!closed) controller.close();
+        }
+      },
+      cancel() {
+        closed = true;
+      },
+    });
+
+    return new Response(stream, {
+      headers: {
+        'Content-Type': 'text/event-stream; charset=utf-8',
+        'Cache-Control': 'no-cache, no-transform',
+        'Connection': 'keep-alive',
+        'X-Accel-Buffering': 'no',
+      },
+    });
+  } catch (error: any) {
+    console.error('[API] Job stream endpoint error:', error);
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error?.message || String(error)
+      },
+      { status: 500 }
+    );
+  }
+}
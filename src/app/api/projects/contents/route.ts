@@ -0,0 +1,75 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { createClient } from '@/lib/supabase/server';
+import { createAdminClient } from '@/lib/supabase/admin';
+import { verifyToken } from '@/lib/auth';
+import { fetchFileContents, fetchOwnedFileContents } from '@/lib/file-contents';
+
+/**
+ * File Contents API endpoint
+ * GET /api/projects/contents?hashes=<sha256>,<sha256>,...
+ * Bodies of project files by content hash (the contentHash of a file in a
+ * project's file_tree). Only hashes that one of the signed-in user's projects
+ * refers to are answered. A hash always names the same text, so responses
+ * can be cached indefinitely.
+ */
+
+const MAX_HASHES = 100;
+const HASH_PATTERN = /^[0-9a-f]{64}$/;
+
+export async function GET(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const hashes = (request.nextUrl.searchParams.get('hashes') || '')
+      .split(',')
+      .map(hash => hash.trim())
+      .filter(Boolean);
+
+    if (hashes.length === 0 || hashes.length > MAX_HASHES || !hashes.every(hash => HASH_PATTERN.test(hash))) {
+      return NextResponse.json(
+        { error: `Between 1 and ${MAX_HASHES} content hashes are required` },
+        { status: 400 }
+      );
+    }
+
+    // Without a service-role key the row level security policy of
+    // file_contents applies the same restriction
+    const admin = createAdminClient();
+    const contents = admin
+      ? await fetchOwnedFileContents(admin, user.id, hashes)
+      : await fetchFileContents(await createClient(), hashes);
+
+    return NextResponse.json(
+      { contents: Object.fromEntries(contents) },
+      {
+        headers: {
+          // Only complete answers are cached; a missing hash may still be written
+          'Cache-Control': contents.size === new Set(hashes).size
+            ? 'private, max-age=31536000, immutable'
+            : 'no-store',
+        },
+      }
+    );
+  } catch (error: any) {
+    console.error('[API] Error fetching file contents:', error);
+    return NextResponse.json(
+      { error: 'Failed to fetch file contents', details: error?.message || String(error) },
+      { status: 500 }
+    );
+  }
+}
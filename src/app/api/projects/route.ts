@@ -1,5 +1,58 @@
+import { createHash } from 'crypto';
 import { NextRequest, NextResponse } from 'next/server';
+import type { SupabaseClient } from '@supabase/supabase-js';
 import { createClient } from '@/lib/supabase/server';
+import { createAdminClient } from '@/lib/supabase/admin';
+import { decodeCursor, encodeCursor, quoteFilterValue } from '@/lib/pagination';
+import { applyProjectPatch, FilePatch, resolveFile } from '@/lib/project-patch';
+import { fetchFileContents, hydrateFiles, ManifestNode, storeFileContents, summarizeManifest } from '@/lib/file-contents';
+import { getProjectSearch, IndexedProject, listManifestFiles } from '@/lib/project-search';
+import { getCodeSearchIndex } from '@/lib/code-search';
+
+// file_tree holds the manifest (structure plus content hashes); file bodies
+// are in file_contents and served by GET /api/projects/contents
+
+// Project list entries: metadata plus stats derived when the tree is saved
+const SUMMARY_COLUMNS = 'id, name, description, created_at, updated_at, last_run_at, file_count, total_size, main_language';
+const DEFAULT_PAGE_SIZE = 50;
+const MAX_PAGE_SIZE = 200;
+
+// Search index updates never fail a save; the next save catches up
+const updateSearchIndex = async (supabase: SupabaseClient, project: IndexedProject) => {
+  const client = createAdminClient() || supabase;
+  try {
+    await getProjectSearch().indexProject(client, project);
+  } catch (error: any) {
+    console.error(`[API] Failed to update search index for project ${project.id}:`, error?.message || error);
+  }
+
+  // The find-in-files index follows saves of projects it already holds;
+  // others are indexed on their first search
+  const codeSearch = getCodeSearchIndex();
+  if (project.fileTree && codeSearch.hasProject(project.id)) {
+    try {
+      await codeSearch.syncProject(
+        project.id,
+        listManifestFiles(project.fileTree),
+        hashes => fetchFileContents(client, hashes),
+      );
+    } catch (error: any) {
+      console.error(`[API] Failed to update code search index for project ${project.id}:`, error?.message || error);
+      codeSearch.dropProject(project.id);
+    }
+  }
+};
+
+// Columns written together with a manifest
+const treeColumns = (manifest: ManifestNode) => {
+  const summary = summarizeManifest(manifest);
+  return {
+    file_tree: manifest,
+    file_count: summary.fileCount,
+    total_size: summary.totalSize,
+    main_language: summary.mainLanguage,
+  };
+};
 
 // Get projects for a user or a single project by ID
 export async function GET(request: NextRequest) {
@@ -25,21 +78,9 @@ export async function GET(request: NextRequest) {
         );
       }
 
-      return NextResponse.json({
-        project: {
-          ...project,
-          // Supabase returns JSONB as object, but frontend might expect string or object depending on implementation.
-          // Existing code stringified it. Let's keep it as object if frontend handles it, 
-          // or stringify if frontend expects string.
-          // Looking at previous code: `file_tree: typeof project.file_tree === 'string' ? project.file_tree : JSON.stringify(project.file_tree)`
-          // It seems it wanted a string. Let's return string to be safe for now, or check frontend.
-          // Actually, let's return it as is (object) and see if frontend breaks, usually Next.js handles JSON response.
-          // Wait, the previous code was: `file_tree: ... ? ... : JSON.stringify(...)`. 
-          // If the frontend parses it again, it might be double parsing.
-          // Let's assume the frontend expects a JSON string for file_tree based on the old code.
-          file_tree: JSON.stringify(project.file_tree)
-        }
-      });
+      // file_tree is JSONB and goes out as JSON as it is; it used to be sent as
+      // a string inside the JSON, which clients then had to parse again
+      return NextResponse.json({ project });
     }
 
     // Otherwise, fetch all projects for user
@@ -50,6 +91,56 @@ export async function GET(request: NextRequest) {
       );
     }
 
+    // GET /api/projects?userId=&view=summary&limit=&cursor=
+    //   List entries only, most recently updated first; pass nextCursor back
+    //   as cursor for the next page. Answers 304 to a matching If-None-Match.
+    if (searchParams.get('view') === 'summary') {
+      const limit = Math.min(Math.max(parseInt(searchParams.get('limit') || '', 10) || DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE);
+
+      // Served by projects_user_updated_idx
+      let query = supabase
+        .from('projects')
+        .select(SUMMARY_COLUMNS)
+        .eq('user_id', userId)
+        .order('updated_at', { ascending: false })
+        .order('id', { ascending: false })
+        .limit(limit + 1);
+
+      const cursorParam = searchParams.get('cursor');
+      if (cursorParam) {
+        const cursor = decodeCursor(cursorParam);
+        if (!cursor) {
+          return NextResponse.json(
+            { error: 'Invalid cursor' },
+            { status: 400 }
+          );
+        }
+        const [value, id] = cursor;
+        query = query.or(`updated_at.lt.${quoteFilterValue(value)},and(updated_at.eq.${quoteFilterValue(value)},id.lt.${quoteFilterValue(id)})`);
+      }
+
+      const { data: rows, error } = await query;
+      if (error) {
+        console.error('[API] Failed to fetch project list:', error);
+        return NextResponse.json(
+          { error: 'Failed to fetch projects' },
+          { status: 500 }
+        );
+      }
+
+      const projects = rows.slice(0, limit);
+      const last = projects[projects.length - 1];
+      const nextCursor = rows.length > limit && last ? encodeCursor(last.updated_at, last.id) : null;
+      const body = JSON.stringify({ projects, nextCursor });
+
+      const etag = `W/"${createHash('sha1').update(body).digest('base64url')}"`;
+      const headers = { 'ETag': etag, 'Cache-Control': 'private, no-cache' };
+      if (request.headers.get('if-none-match') === etag) {
+        return new NextResponse(null, { status: 304, headers });
+      }
+      return new NextResponse(body, { headers: { ...headers, 'Content-Type': 'application/json' } });
+    }
+
     console.log('[API] Fetching projects for user:', userId);
 
     const { data: projects, error } = await supabase
@@ -68,13 +159,7 @@ export async function GET(request: NextRequest) {
 
     console.log('[API] Processed projects:', projects?.length || 0, 'projects');
 
-    // Map projects to match expected format
-    const formattedProjects = projects?.map(p => ({
-      ...p,
-      file_tree: JSON.stringify(p.file_tree)
-    })) || [];
-
-    return NextResponse.json({ projects: formattedProjects });
+    return NextResponse.json({ projects: projects || [] });
 
   } catch (error: any) {
     console.error('[API] Outer catch - Error fetching projects:', error);
@@ -101,6 +186,9 @@ export async function POST(request: NextRequest) {
     }
 
     const supabase = await createClient();
+    const manifest = fileTree
+      ? await storeFileContents(createAdminClient() || supabase, fileTree)
+      : null;
 
     // Supabase generates UUIDs by default if we configured it, but let's see if we need to pass ID.
     // The schema uses `default uuid_generate_v4()`.
@@ -120,7 +208,7 @@ export async function POST(request: NextRequest) {
         user_id: userId,
         name,
         description,
-        file_tree: fileTree // Pass object directly for JSONB
+        ...(manifest ? treeColumns(manifest) : { file_tree: fileTree })
       })
       .select()
       .single();
@@ -134,6 +222,7 @@ export async function POST(request: NextRequest) {
     }
 
     console.log('[API] Project created successfully:', data.id);
+    await updateSearchIndex(supabase, { id: data.id, userId, name, description, fileTree: manifest || undefined });
 
     return NextResponse.json({
       success: true,
@@ -169,12 +258,13 @@ export async function PUT(request: NextRequest) {
 
     if (name) updates.name = name;
     if (description !== undefined) updates.description = description;
-    if (fileTree) updates.file_tree = fileTree;
+    if (fileTree) Object.assign(updates, treeColumns(await storeFileContents(createAdminClient() || supabase, fileTree)));
 
-    const { error } = await supabase
+    const { data: updated, error } = await supabase
       .from('projects')
       .update(updates)
-      .eq('id', projectId);
+      .eq('id', projectId)
+      .select('id, user_id');
 
     if (error) {
       console.error('Error updating project:', error);
@@ -184,6 +274,22 @@ export async function PUT(request: NextRequest) {
       );
     }
 
+    // No row means the project does not exist or is not the caller's
+    if (!updated || updated.length === 0) {
+      return NextResponse.json(
+        { error: 'Project not found' },
+        { status: 404 }
+      );
+    }
+
+    await updateSearchIndex(supabase, {
+      id: projectId,
+      userId: updated[0].user_id,
+      name: updates.name,
+      description: updates.description,
+      fileTree: updates.file_tree,
+    });
+
     return NextResponse.json({
       success: true,
       message: 'Project updated successfully'
@@ -197,6 +303,112 @@ export async function PUT(request: NextRequest) {
   }
 }
 
+// Autosave: apply only the files that changed (src/lib/project-patch.ts)
+export async function PATCH(request: NextRequest) {
+  try {
+    const body = await request.json();
+    const { projectId, files } = body as { projectId?: string; files?: FilePatch[] };
+
+    if (!projectId || !Array.isArray(files) || files.length === 0) {
+      return NextResponse.json(
+        { error: 'Project ID and changed files are required' },
+        { status: 400 }
+      );
+    }
+
+    const isValid = files.every((file: any) =>
+      typeof file?.path === 'string' && file.path !== '' &&
+      (typeof file.content === 'string' ||
+        (typeof file.baseHash === 'string' && typeof file.delta?.text === 'string' &&
+          Number.isInteger(file.delta.start) && Number.isInteger(file.delta.end) &&
+          file.delta.start >= 0 && file.delta.end >= file.delta.start))
+    );
+    if (!isValid) {
+      return NextResponse.json(
+        { error: 'Invalid file changes' },
+        { status: 400 }
+      );
+    }
+
+    const supabase = await createClient();
+    const contentsClient = createAdminClient() || supabase;
+
+    // Read-modify-write guarded by updated_at, so a save that lands in
+    // between is applied on top of instead of being overwritten
+    for (let attempt = 0; attempt < 3; attempt++) {
+      const { data: project, error: fetchError } = await supabase
+        .from('projects')
+        .select('file_tree, updated_at, user_id')
+        .eq('id', projectId)
+        .single();
+
+      if (fetchError || !project) {
+        return NextResponse.json(
+          { error: 'Project not found' },
+          { status: 404 }
+        );
+      }
+
+      const fileTree: ManifestNode = typeof project.file_tree === 'string'
+        ? JSON.parse(project.file_tree)
+        : project.file_tree;
+      if (!fileTree || typeof fileTree !== 'object') {
+        return NextResponse.json(
+          { error: 'Project has no file tree', conflicts: files.map(file => file.path) },
+          { status: 409 }
+        );
+      }
+
+      // Deltas apply to the stored bodies, so fetch just those
+      const deltaTargets = new Set(files
+        .filter(file => 'delta' in file)
+        .map(file => resolveFile(fileTree, file.path)));
+      await hydrateFiles(contentsClient, fileTree, file => deltaTargets.has(file));
+
+      const { conflicts } = await applyProjectPatch(fileTree, files);
+      if (conflicts.length > 0) {
+        return NextResponse.json(
+          { error: 'Stored content differs from the patch base', conflicts },
+          { status: 409 }
+        );
+      }
+
+      const manifest = await storeFileContents(contentsClient, fileTree);
+      const updatedAt = new Date().toISOString();
+      const { data: updated, error } = await supabase
+        .from('projects')
+        .update({ ...treeColumns(manifest), updated_at: updatedAt })
+        .eq('id', projectId)
+        .eq('updated_at', project.updated_at)
+        .select('id');
+
+      if (error) {
+        console.error('Error patching project:', error);
+        return NextResponse.json(
+          { error: 'Failed to update project' },
+          { status: 500 }
+        );
+      }
+
+      if (updated && updated.length > 0) {
+        await updateSearchIndex(supabase, { id: projectId, userId: project.user_id, fileTree: manifest });
+        return NextResponse.json({ success: true, updatedAt });
+      }
+    }
+
+    return NextResponse.json(
+      { error: 'Project is being modified concurrently', conflicts: files.map(file => file.path) },
+      { status: 409 }
+    );
+  } catch (error) {
+    console.error('Error patching project:', error);
+    return NextResponse.json(
+      { error: 'Failed to update project' },
+      { status: 500 }
+    );
+  }
+}
+
 // Delete project
 export async function DELETE(request: NextRequest) {
   try {
@@ -225,6 +437,9 @@ export async function DELETE(request: NextRequest) {
       );
     }
 
+    await getProjectSearch().removeProject(supabase, projectId).catch(() => undefined);
+    getCodeSearchIndex().dropProject(projectId);
+
     return NextResponse.json({
       success: true,
       message: 'Project deleted successfully'
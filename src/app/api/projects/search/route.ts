@@ -0,0 +1,56 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { verifyToken } from '@/lib/auth';
+import { createClient } from '@/lib/supabase/server';
+import { createAdminClient } from '@/lib/supabase/admin';
+import { getProjectSearch } from '@/lib/project-search';
+
+/**
+ * Project Search API endpoint
+ * GET /api/projects/search?q=&limit=
+ * The signed-in user's projects matching q in their name, description or
+ * files, best first. Each result has a snippet split into parts, with
+ * `match: true` on the highlighted words.
+ */
+
+const DEFAULT_LIMIT = 20;
+const MAX_LIMIT = 100;
+const MAX_QUERY_LENGTH = 200;
+
+export async function GET(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const { searchParams } = request.nextUrl;
+    const query = (searchParams.get('q') || '').trim().slice(0, MAX_QUERY_LENGTH);
+    if (!query) {
+      return NextResponse.json({ results: [] });
+    }
+    const limit = Math.min(Math.max(parseInt(searchParams.get('limit') || '', 10) || DEFAULT_LIMIT, 1), MAX_LIMIT);
+
+    const supabase = createAdminClient() || await createClient();
+    const results = await getProjectSearch().search(supabase, user.id, query, limit);
+
+    return NextResponse.json({ results });
+  } catch (error: any) {
+    console.error('[API] Project search error:', error);
+    return NextResponse.json(
+      { error: 'Failed to search projects', details: error?.message || String(error) },
+      { status: 500 }
+    );
+  }
+}
@@ -0,0 +1,29 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { createErrorResponse } from '@/lib/api-helpers';
+import { getJobBroker, isAuthorizedRunner } from '@/lib/runner/job-broker';
+
+/**
+ * Runner Job Completion API endpoint
+ * POST /api/runner/complete
+ * Reports the final result of a job
+ */
+export async function POST(request: NextRequest) {
+  if (!isAuthorizedRunner(request.headers.get('authorization'))) {
+    return createErrorResponse('Invalid runner token', 401);
+  }
+
+  try {
+    const { nodeId, jobId, result } = await request.json();
+    if (!result || typeof result.output !== 'string') {
+      return createErrorResponse('A result with output is required', 400);
+    }
+
+    const accepted = await getJobBroker().complete(jobId, nodeId, result);
+    return accepted
+      ? NextResponse.json({ success: true })
+      : createErrorResponse('Job is no longer assigned to this runner', 410);
+  } catch (error: any) {
+    console.error('[API] Runner completion error:', error);
+    return createErrorResponse('Failed to complete job', 500, error?.message);
+  }
+}
@@ -0,0 +1,35 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { createErrorResponse } from '@/lib/api-helpers';
+import { getJobBroker, isAuthorizedRunner, JobEvent } from '@/lib/runner/job-broker';
+
+/**
+ * Runner Job Events API endpoint
+ * POST /api/runner/events
+ * Streams a batch of stdout/stderr events for a running job
+ */
+export async function POST(request: NextRequest) {
+  if (!isAuthorizedRunner(request.headers.get('authorization'))) {
+    return createErrorResponse('Invalid runner token', 401);
+  }
+
+  try {
+    const { nodeId, jobId, events } = await request.json() as {
+      nodeId: string;
+      jobId: string;
+      events: JobEvent[];
+    };
+
+    if (!Array.isArray(events)) {
+      return createErrorResponse('Events must be an array', 400);
+    }
+
+    const accepted = await getJobBroker().publish(jobId, nodeId, events);
+    // 410 tells the runner the job was cancelled or reassigned
+    return accepted
+      ? NextResponse.json({ success: true })
+      : createErrorResponse('Job is no longer assigned to this runner', 410);
+  } catch (error: any) {
+    console.error('[API] Runner events error:', error);
+    return createErrorResponse('Failed to publish events', 500, error?.message);
+  }
+}
@@ -0,0 +1,44 @@
+import { NextResponse } from 'next/server';
+import { getDaemonClient } from '@/lib/runner/daemon-client';
+import { getSandboxPoolStatus } from '@/lib/runner/sandbox-pool';
+import { getJobBroker, isBrokerMode } from '@/lib/runner/job-broker';
+
+/**
+ * Execution Service Health endpoint
+ * GET /api/runner/health
+ * Reports where runs execute: runner nodes of the broker, the execution
+ * daemon (with its health and metrics) or the in-process sandbox pool
+ */
+export async function GET() {
+  if (isBrokerMode()) {
+    const nodes = await getJobBroker().listNodes();
+    return NextResponse.json({
+      mode: 'broker',
+      status: nodes.length > 0 ? 'ok' : 'no-runners',
+      capacity: nodes.reduce((sum, node) => sum + node.capacity, 0),
+      running: nodes.reduce((sum, node) => sum + node.running, 0),
+      nodes,
+    }, { status: nodes.length > 0 ? 200 : 503 });
+  }
+
+  const client = getDaemonClient();
+
+  if (!client) {
+    return NextResponse.json({
+      mode: 'in-process',
+      status: 'ok',
+      sandbox: getSandboxPoolStatus(),
+    });
+  }
+
+  try {
+    const [health, metrics] = await Promise.all([client.health(), client.metrics()]);
+    return NextResponse.json({ mode: 'daemon', ...health, metrics });
+  } catch (error: any) {
+    console.error('[API] Execution daemon health check failed:', error);
+    return NextResponse.json(
+      { mode: 'daemon', status: 'unavailable', error: error?.message || String(error) },
+      { status: 503 }
+    );
+  }
+}
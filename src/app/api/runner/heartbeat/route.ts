@@ -0,0 +1,22 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { createErrorResponse } from '@/lib/api-helpers';
+import { getJobBroker, isAuthorizedRunner } from '@/lib/runner/job-broker';
+
+/**
+ * Runner Heartbeat API endpoint
+ * POST /api/runner/heartbeat
+ * Keeps a node registered and returns jobs it should cancel
+ */
+export async function POST(request: NextRequest) {
+  if (!isAuthorizedRunner(request.headers.get('authorization'))) {
+    return createErrorResponse('Invalid runner token', 401);
+  }
+
+  try {
+    const { nodeId, running } = await request.json();
+    return NextResponse.json(await getJobBroker().heartbeat(nodeId, Number(running) || 0));
+  } catch (error: any) {
+    console.error('[API] Runner heartbeat error:', error);
+    return createErrorResponse('Heartbeat failed', 500, error?.message);
+  }
+}
@@ -0,0 +1,33 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { createErrorResponse } from '@/lib/api-helpers';
+import { getJobBroker, isAuthorizedRunner } from '@/lib/runner/job-broker';
+
+// Long polls must not outlive typical proxy timeouts
+const MAX_WAIT_MS = 25000;
+
+/**
+ * Runner Job Pull API endpoint
+ * POST /api/runner/pull
+ * Long-polls for up to maxJobs jobs for the calling node
+ */
+export async function POST(request: NextRequest) {
+  if (!isAuthorizedRunner(request.headers.get('authorization'))) {
+    return createErrorResponse('Invalid runner token', 401);
+  }
+
+  try {
+    const { nodeId, maxJobs, waitMs } = await request.json();
+    const jobs = await getJobBroker().pull(
+      nodeId,
+      Math.max(1, Number(maxJobs) || 1),
+      Math.min(MAX_WAIT_MS, Math.max(0, Number(waitMs) || 0))
+    );
+    return NextResponse.json({ jobs });
+  } catch (error: any) {
+    if (error?.message === 'Unknown runner node') {
+      return createErrorResponse(error.message, 404);
+    }
+    console.error('[API] Runner pull error:', error);
+    return createErrorResponse('Failed to pull jobs', 500, error?.message);
+  }
+}
@@ -0,0 +1,42 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { createErrorResponse } from '@/lib/api-helpers';
+import { getJobBroker, isAuthorizedRunner } from '@/lib/runner/job-broker';
+
+/**
+ * Runner Registration API endpoint
+ * POST /api/runner/register - register a runner node and its capacity
+ * DELETE /api/runner/register - deregister on shutdown
+ */
+export async function POST(request: NextRequest) {
+  if (!isAuthorizedRunner(request.headers.get('authorization'))) {
+    return createErrorResponse('Invalid runner token', 401);
+  }
+
+  try {
+    const { name, capacity, labels } = await request.json();
+    if (typeof capacity !== 'number' || capacity < 1) {
+      return createErrorResponse('Capacity must be a positive number', 400);
+    }
+
+    const node = await getJobBroker().registerNode({ name, capacity, labels });
+    return NextResponse.json({ node });
+  } catch (error: any) {
+    console.error('[API] Runner registration error:', error);
+    return createErrorResponse('Failed to register runner', 500, error?.message);
+  }
+}
+
+export async function DELETE(request: NextRequest) {
+  if (!isAuthorizedRunner(request.headers.get('authorization'))) {
+    return createErrorResponse('Invalid runner token', 401);
+  }
+
+  try {
+    const { nodeId } = await request.json();
+    await getJobBroker().deregisterNode(nodeId);
+    return NextResponse.json({ success: true });
+  } catch (error: any) {
+    console.error('[API] Runner deregistration error:', error);
+    return createErrorResponse('Failed to deregister runner', 500, error?.message);
+  }
+}
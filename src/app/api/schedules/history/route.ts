@@ -0,0 +1,54 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { verifyToken } from '@/lib/auth';
+import { getSchedule, getScheduleHistory } from '@/lib/runner/schedules';
+
+/**
+ * Schedule History API endpoint
+ * GET /api/schedules/history?scheduleId=&limit=
+ * Recent runs of a schedule, newest first, including skipped runs and
+ * output diffs against the previous successful run
+ */
+export async function GET(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const { searchParams } = request.nextUrl;
+    const scheduleId = searchParams.get('scheduleId');
+    const schedule = scheduleId ? await getSchedule(scheduleId) : null;
+    if (!scheduleId || !schedule || schedule.userId !== user.id) {
+      return NextResponse.json(
+        { error: 'Schedule not found' },
+        { status: 404 }
+      );
+    }
+
+    const limit = Math.min(parseInt(searchParams.get('limit') || '20', 10) || 20, 200);
+    const history = await getScheduleHistory(scheduleId, limit);
+
+    return NextResponse.json({ success: true, schedule, history });
+  } catch (error: any) {
+    console.error('[API] Schedule history error:', error);
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error?.message || String(error)
+      },
+      { status: 500 }
+    );
+  }
+}
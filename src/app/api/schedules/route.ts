@@ -0,0 +1,214 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { verifyToken } from '@/lib/auth';
+import { isValidCron } from '@/lib/runner/cron';
+import { getProjectDir, materializeProjectFiles, resolveProjectPath } from '@/lib/runner/project-files';
+import { createSchedule, deleteSchedule, getSchedule, listSchedules, updateSchedule } from '@/lib/runner/schedules';
+
+/**
+ * Project Schedules API endpoint
+ * GET /api/schedules?projectId= - list the user's schedules
+ * POST /api/schedules - attach a cron schedule to a project file
+ * PUT /api/schedules - change the cron line or pause/resume
+ * DELETE /api/schedules?scheduleId= - remove a schedule
+ *
+ * Run history is served by GET /api/schedules/history.
+ */
+export async function GET(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const projectId = request.nextUrl.searchParams.get('projectId') || undefined;
+    const schedules = await listSchedules({ userId: user.id, projectId });
+
+    return NextResponse.json({ success: true, schedules });
+  } catch (error: any) {
+    console.error('[API] Schedules list error:', error);
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error?.message || String(error)
+      },
+      { status: 500 }
+    );
+  }
+}
+
+export async function POST(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const { projectId, fileName, cron, files } = await request.json();
+
+    if (!projectId || !fileName || !cron) {
+      return NextResponse.json(
+        { error: 'Project ID, file name and cron expression are required' },
+        { status: 400 }
+      );
+    }
+
+    if (!isValidCron(cron)) {
+      return NextResponse.json(
+        { error: 'Invalid cron expression. Use five fields (minute hour day month weekday) or @hourly, @daily, @weekly, @monthly.' },
+        { status: 400 }
+      );
+    }
+
+    const projectDir = getProjectDir(projectId);
+    if (!resolveProjectPath(projectDir, fileName)) {
+      return NextResponse.json(
+        { error: 'Invalid file name' },
+        { status: 400 }
+      );
+    }
+
+    // Scheduled runs read the project from the server, so sync it now
+    if (Array.isArray(files)) {
+      await materializeProjectFiles(projectDir, files);
+    }
+
+    const schedule = await createSchedule({
+      userId: user.id,
+      plan: user.subscription,
+      projectId,
+      fileName,
+      cron
+    });
+
+    return NextResponse.json({ success: true, schedule }, { status: 201 });
+  } catch (error: any) {
+    console.error('[API] Schedule create error:', error);
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error?.message || String(error)
+      },
+      { status: 500 }
+    );
+  }
+}
+
+export async function PUT(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const { scheduleId, cron, enabled } = await request.json();
+
+    const existing = scheduleId ? await getSchedule(scheduleId) : null;
+    if (!existing || existing.userId !== user.id) {
+      return NextResponse.json(
+        { error: 'Schedule not found' },
+        { status: 404 }
+      );
+    }
+
+    if (cron !== undefined && !isValidCron(cron)) {
+      return NextResponse.json(
+        { error: 'Invalid cron expression' },
+        { status: 400 }
+      );
+    }
+
+    const schedule = await updateSchedule(scheduleId, {
+      cron,
+      enabled: typeof enabled === 'boolean' ? enabled : undefined
+    });
+
+    return NextResponse.json({ success: true, schedule });
+  } catch (error: any) {
+    console.error('[API] Schedule update error:', error);
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error?.message || String(error)
+      },
+      { status: 500 }
+    );
+  }
+}
+
+export async function DELETE(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
+      return NextResponse.json(
+        { error: 'Invalid or expired token' },
+        { status: 401 }
+      );
+    }
+
+    const scheduleId = request.nextUrl.searchParams.get('scheduleId');
+    const existing = scheduleId ? await getSchedule(scheduleId) : null;
+    if (!scheduleId || !existing || existing.userId !== user.id) {
+      return NextResponse.json(
+        { error: 'Schedule not found' },
+        { status: 404 }
+      );
+    }
+
+    await deleteSchedule(scheduleId);
+    return NextResponse.json({ success: true });
+  } catch (error: any) {
+    console.error('[API] Schedule delete error:', error);
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error?.message || String(error)
+      },
+      { status: 500 }
+    );
+  }
+}
@@ -1,5 +1,10 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { createClient } from '@/lib/supabase/server';
+import { verifyToken } from '@/lib/auth';
+import { getUsageMeter } from '@/lib/runner/metering';
+
+// Most credits a single AI query may be charged
+const MAX_AI_QUERY_CREDITS = 10;
 
 // Get user stats
 export async function GET(request: NextRequest) {
@@ -54,127 +59,76 @@ export async function GET(request: NextRequest) {
   }
 }
 
-// Update user stats (increment code runs or AI queries)
+// Record an AI query of the signed-in user. The usage meter coalesces bursts
+// per user and writes them with one atomic RPC per flush
+// (src/lib/runner/metering.ts). Code runs are not recorded here: the runner
+// meters their CPU time and memory.
 export async function POST(request: NextRequest) {
   try {
-    const body = await request.json();
-    const { userId, type, amount = 1 } = body; // type: 'code_run' or 'ai_query'
-
-    if (!userId || !type) {
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
       return NextResponse.json(
-        { error: 'User ID and type are required' },
-        { status: 400 }
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
       );
     }
 
-    if (!['code_run', 'ai_query'].includes(type)) {
+    const user = await verifyToken(authHeader.substring(7));
+    if (!user) {
       return NextResponse.json(
-        { error: 'Type must be code_run or ai_query' },
-        { status: 400 }
+        { error: 'Invalid or expired token' },
+        { status: 401 }
       );
     }
 
-    const supabase = await createClient();
-    const today = new Date().toISOString().split('T')[0];
+    const body = await request.json();
+    const { userId, type, amount = 1 } = body; // type: 'ai_query'
 
-    // Check if user has enough credits
-    const { data: user, error: userError } = await supabase
-      .from('users')
-      .select('credits, credit_limit, code_runs, ai_queries')
-      .eq('id', userId)
-      .single();
+    if (!type) {
+      return NextResponse.json(
+        { error: 'Type is required' },
+        { status: 400 }
+      );
+    }
 
-    if (userError || !user) {
+    if (userId && userId !== user.id) {
       return NextResponse.json(
-        { error: 'User not found' },
-        { status: 404 }
+        { error: 'Usage can only be recorded for yourself' },
+        { status: 403 }
       );
     }
 
-    if (user.credits < amount) {
+    if (type === 'code_run') {
       return NextResponse.json(
-        { error: 'Insufficient credits' },
+        { error: 'Code runs are metered by the runner and cannot be recorded directly' },
         { status: 400 }
       );
     }
 
-    // Update user credits and stats
-    // Note: Supabase doesn't support atomic increment via simple update unless using RPC.
-    // We will read and write back. This has a race condition but acceptable for this scale.
-    // Alternatively, we could create an RPC function `increment_stats`.
-    // For now, read-modify-write.
-
-    const updateField = type === 'code_run' ? 'code_runs' : 'ai_queries';
-    const newCredits = user.credits - amount;
-    const newValue = (user[updateField as keyof typeof user] as number) + amount;
-
-    const { error: updateError } = await supabase
-      .from('users')
-      .update({
-        credits: newCredits,
-        [updateField]: newValue,
-        last_active: new Date().toISOString()
-      })
-      .eq('id', userId);
-
-    if (updateError) {
-      throw updateError;
+    if (type !== 'ai_query') {
+      return NextResponse.json(
+        { error: 'Type must be ai_query' },
+        { status: 400 }
+      );
     }
 
-    // Update or insert daily stats
-    // We need to check if it exists first or use upsert.
-    // Upsert needs the current value to increment.
-    // Let's try to fetch first.
-
-    const { data: existingDaily } = await supabase
-      .from('daily_stats')
-      .select(updateField)
-      .eq('user_id', userId)
-      .eq('date', today)
-      .single();
-
-    const currentDailyValue = existingDaily ? (existingDaily[updateField as keyof typeof existingDaily] as number) : 0;
+    if (typeof amount !== 'number' || !Number.isFinite(amount) || amount < 0 || amount > MAX_AI_QUERY_CREDITS) {
+      return NextResponse.json(
+        { error: `Amount must be a number between 0 and ${MAX_AI_QUERY_CREDITS}` },
+        { status: 400 }
+      );
+    }
 
-    const { error: dailyError } = await supabase
-      .from('daily_stats')
-      .upsert({
-        user_id: userId,
-        date: today,
-        [updateField]: currentDailyValue + amount,
-        // Preserve the other field if it exists? 
-        // Upsert replaces the row. We need to be careful.
-        // If we upsert, we need to provide all fields or it might nullify others if not careful.
-        // Actually, `upsert` in Supabase merges if we don't specify otherwise? 
-        // No, it's an INSERT ON CONFLICT DO UPDATE.
-        // If we only provide one field, the other might be reset if we don't include it.
-        // So we should fetch the whole row first.
-      }, { onConflict: 'user_id,date' });
-
-    // Wait, if we use upsert with just one field, the other field (e.g. ai_queries when updating code_runs)
-    // might become null if it's not in the payload?
-    // Postgres ON CONFLICT UPDATE SET ... usually updates only specified columns.
-    // But Supabase `upsert` takes a record.
-    // Let's fetch the full daily stats first to be safe.
-
-    if (existingDaily) {
-      await supabase
-        .from('daily_stats')
-        .update({
-          [updateField]: currentDailyValue + amount
-        })
-        .eq('user_id', userId)
-        .eq('date', today);
-    } else {
-      await supabase
-        .from('daily_stats')
-        .insert({
-          user_id: userId,
-          date: today,
-          [updateField]: amount,
-          [type === 'code_run' ? 'ai_queries' : 'code_runs']: 0 // Initialize the other one to 0
-        });
+    const meter = getUsageMeter();
+    if (await meter.availableCredits(user.id) < amount) {
+      return NextResponse.json(
+        { error: 'Insufficient credits' },
+        { status: 402 }
+      );
     }
 
+    meter.recordAiQuery(user.id, amount);
+
     return NextResponse.json({
       success: true,
       message: `${type} recorded successfully`
@@ -188,48 +142,3 @@ export async function POST(request: NextRequest) {
     );
   }
 }
-
-// Get admin stats
-export async function PUT(request: NextRequest) {
-  try {
-    const supabase = await createClient();
-
-    // Get total stats
-    // We'll fetch all users to aggregate. Not efficient for millions, but fine for thousands.
-    const { data: users, error } = await supabase
-      .from('users')
-      .select('subscription, code_runs, ai_queries, last_active');
-
-    if (error) throw error;
-
-    const total_users = users.length;
-    const total_code_runs = users.reduce((sum, u) => sum + (u.code_runs || 0), 0);
-    const total_ai_queries = users.reduce((sum, u) => sum + (u.ai_queries || 0), 0);
-    const premium_users = users.filter(u => u.subscription !== 'free').length;
-
-    const sevenDaysAgo = new Date();
-    sevenDaysAgo.setDate(sevenDaysAgo.getDate() - 7);
-    const active_users = users.filter(u => new Date(u.last_active) >= sevenDaysAgo).length;
-
-    const { count: total_projects } = await supabase
-      .from('projects')
-      .select('*', { count: 'exact', head: true });
-
-    const stats = {
-      total_users,
-      total_code_runs,
-      total_ai_queries,
-      premium_users,
-      active_users,
-      total_projects: total_projects || 0
-    };
-
-    return NextResponse.json({ stats });
-  } catch (error) {
-    console.error('Error fetching admin stats:', error);
-    return NextResponse.json(
-      { error: 'Failed to fetch admin stats' },
-      { status: 500 }
-    );
-  }
-}
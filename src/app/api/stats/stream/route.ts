@@ -0,0 +1,152 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { verifyToken } from '@/lib/auth';
+import { createClient } from '@/lib/supabase/server';
+import { getUsageMeter } from '@/lib/runner/metering';
+import { subscribeUsageEvents, UsageEvent } from '@/lib/runner/usage-events';
+
+/**
+ * Usage Stream API endpoint
+ * GET /api/stats/stream
+ *   Server-sent events with the signed-in user's credits and usage: one
+ *   `snapshot` on connect, then `delta` (usage just recorded) and `balance`
+ *   (totals after each metering flush) whenever metering changes them, on
+ *   any instance of the server. The snapshot is sent again every minute in
+ *   case an event from another instance was missed.
+ * GET /api/stats/stream?scope=admin
+ *   The same `delta` and `balance` events for every user; the bearer token
+ *   is an admin session token.
+ */
+
+const KEEPALIVE_INTERVAL_MS = 15000;
+const SNAPSHOT_INTERVAL_MS = 60000;
+
+type SupabaseServerClient = Awaited<ReturnType<typeof createClient>>;
+
+async function loadSnapshot(supabase: SupabaseServerClient, userId: string): Promise<Record<string, unknown>> {
+  const today = new Date().toISOString().split('T')[0];
+  const [{ data: profile }, { data: daily }] = await Promise.all([
+    supabase.from('users').select('credits, code_runs, ai_queries').eq('id', userId).single(),
+    supabase.from('daily_stats').select('code_runs, ai_queries').eq('user_id', userId).eq('date', today).single(),
+  ]);
+  // Usage recorded but not yet written is part of the current numbers
+  const owed = getUsageMeter().pendingUsage(userId);
+  return {
+    userId,
+    credits: Math.max(0, (profile?.credits ?? 0) - owed.credits),
+    codeRuns: (profile?.code_runs ?? 0) + owed.codeRuns,
+    aiQueries: (profile?.ai_queries ?? 0) + owed.aiQueries,
+    dailyCodeRuns: (daily?.code_runs ?? 0) + owed.codeRuns,
+    dailyAiQueries: (daily?.ai_queries ?? 0) + owed.aiQueries,
+  };
+}
+
+export async function GET(request: NextRequest) {
+  try {
+    // Check authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Authentication required. Please provide a valid token.' },
+        { status: 401 }
+      );
+    }
+
+    const token = authHeader.substring(7);
+    const isAdminScope = request.nextUrl.searchParams.get('scope') === 'admin';
+    const supabase = await createClient();
+    let snapshot: Record<string, unknown> | null = null;
+    let userId: string | null = null;
+
+    if (isAdminScope) {
+      const { data: session } = await supabase
+        .from('admin_sessions')
+        .select('expires_at')
+        .eq('session_token', token)
+        .gt('expires_at', new Date().toISOString())
+        .single();
+      if (!session) {
+        return NextResponse.json(
+          { error: 'Invalid or expired session' },
+          { status: 401 }
+        );
+      }
+    } else {
+      const user = await verifyToken(token);
+      if (!user) {
+        return NextResponse.json(
+          { error: 'Invalid or expired token' },
+          { status: 401 }
+        );
+      }
+      userId = user.id;
+      snapshot = await loadSnapshot(supabase, user.id);
+    }
+
+    const encoder = new TextEncoder();
+    let closed = false;
+    let cleanup: () => void = () => {};
+
+    const stream = new ReadableStream({
+      start(controller) {
+        const write = (text: string) => {
+          if (closed) return;
+          try {
+            controller.enqueue(encoder.encode(text));
+          } catch {
+            cleanup();
+          }
+        };
+        const send = (event: string, data: unknown) => write(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`);
+
+        if (snapshot) {
+          send('snapshot', snapshot);
+        }
+        const unsubscribe = subscribeUsageEvents(userId, (event: UsageEvent) => send(event.type, event));
+        // Comment line: keeps proxies from timing out idle streams
+        const keepalive = setInterval(() => write(': keepalive\n\n'), KEEPALIVE_INTERVAL_MS);
+        const refresh = userId
+          ? setInterval(() => {
+            loadSnapshot(supabase, userId!)
+              .then(fresh => send('snapshot', fresh))
+              .catch(error => console.error('[API] Usage stream snapshot failed:', error?.message || error));
+          }, SNAPSHOT_INTERVAL_MS)
+          : null;
+
+        cleanup = () => {
+          if (closed) return;
+          closed = true;
+          unsubscribe();
+          clearInterval(keepalive);
+          if (refresh) clearInterval(refresh);
+          try {
+            controller.close();
+          } catch {
+            // Already closed by the client
+          }
+        };
+        request.signal.addEventListener('abort', () => cleanup());
+      },
+      cancel() {
+        cleanup();
+      },
+    });
+
+    return new Response(stream, {
+      headers: {
+        'Content-Type': 'text/event-stream; charset=utf-8',
+        'Cache-Control': 'no-cache, no-transform',
+        'Connection': 'keep-alive',
+        'X-Accel-Buffering': 'no',
+      },
+    });
+  } catch (error: any) {
+    console.error('[API] Usage stream endpoint error:', error);
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error?.message || String(error)
+      },
+      { status: 500 }
+    );
+  }
+}
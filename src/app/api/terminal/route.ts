@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server';
-import { spawn } from 'child_process';
 import { createClient } from '@/lib/supabase/server';
+import { runProcess } from '@/lib/runner/process-exec';
+import { runEnvironment } from '@/lib/runner/run-env';
 
 export async function POST(request: NextRequest) {
   try {
@@ -86,64 +87,61 @@ export async function POST(request: NextRequest) {
     }
 
     // Execute the command
-    return new Promise((resolve) => {
-      let output = '';
-      let errorOutput = '';
-
-      // Parse command and arguments
-      const parts = trimmedCommand.split(/\s+/);
-      const cmd = parts[0];
-      const args = parts.slice(1);
-
-      // Check if this is a pip install command (for timeout and stderr handling)
-      const isPipInstall = cmd === 'pip' && args[0] === 'install';
-
-      // Use python3 -m pip instead of pip directly for better compatibility
-      let actualCmd = cmd;
-      let actualArgs = args;
-      let useShell = false;
-
-      // Handle Windows built-in commands (echo, dir, etc.)
-      if (process.platform === 'win32') {
-        const windowsBuiltIns = ['echo', 'dir', 'type', 'cd', 'cls'];
-        if (windowsBuiltIns.includes(cmd.toLowerCase())) {
-          actualCmd = 'cmd';
-          actualArgs = ['/c', trimmedCommand];
-          useShell = false;
-        }
+    let output = '';
+    let errorOutput = '';
+
+    // Parse command and arguments
+    const parts = trimmedCommand.split(/\s+/);
+    const cmd = parts[0];
+    const args = parts.slice(1);
+
+    // Check if this is a pip install command (for timeout and stderr handling)
+    const isPipInstall = cmd === 'pip' && args[0] === 'install';
+
+    // Use python3 -m pip instead of pip directly for better compatibility
+    let actualCmd = cmd;
+    let actualArgs = args;
+
+    // Handle Windows built-in commands (echo, dir, etc.)
+    if (process.platform === 'win32') {
+      const windowsBuiltIns = ['echo', 'dir', 'type', 'cd', 'cls'];
+      if (windowsBuiltIns.includes(cmd.toLowerCase())) {
+        actualCmd = 'cmd';
+        actualArgs = ['/c', trimmedCommand];
       }
+    }
 
-      if (cmd === 'pip') {
-        actualCmd = 'python3';
-        // Use --user flag to install packages in user directory (safer)
-        if (args[0] === 'install' && !args.includes('--user') && !args.includes('--system')) {
-          actualArgs = ['-m', 'pip', 'install', '--user', ...args.slice(1)];
-        } else {
-          actualArgs = ['-m', 'pip', ...args];
-        }
+    if (cmd === 'pip') {
+      actualCmd = 'python3';
+      // Use --user flag to install packages in user directory (safer)
+      if (args[0] === 'install' && !args.includes('--user') && !args.includes('--system')) {
+        actualArgs = ['-m', 'pip', 'install', '--user', ...args.slice(1)];
+      } else {
+        actualArgs = ['-m', 'pip', ...args];
       }
+    }
 
-      // Set PYTHONUSERBASE for package installation location
-      const userBase = process.env.HOME || process.env.USERPROFILE || (process.platform === 'win32' ? process.env.APPDATA : '/tmp');
+    // Set PYTHONUSERBASE for package installation location
+    const userBase = process.env.HOME || process.env.USERPROFILE || (process.platform === 'win32' ? process.env.APPDATA : '/tmp');
 
-      const child = spawn(actualCmd, actualArgs, {
-        env: {
-          ...process.env,
-          PYTHONUSERBASE: userBase,
-          PATH: process.env.PATH || '',
-        },
-        shell: useShell,
-      });
+    // Set a longer timeout for pip install commands (they can take a while)
+    const timeoutDuration = isPipInstall ? 600000 : 60000; // 10 minutes for pip install, 1 minute for others
 
-      child.stdout.on('data', (data) => {
+    const result = await runProcess({
+      kind: 'command',
+      command: actualCmd,
+      args: actualArgs,
+      env: runEnvironment({ PYTHONUSERBASE: userBase }),
+      timeoutMs: timeoutDuration,
+    }, {
+      onStdout: (data) => {
         output += data.toString();
         // For pip install, show progress in real-time
         if (isPipInstall) {
           console.log('pip install progress:', data.toString().slice(0, 100));
         }
-      });
-
-      child.stderr.on('data', (data) => {
+      },
+      onStderr: (data) => {
         const dataStr = data.toString();
         // pip often sends progress and notices to stderr
         // For pip commands (install, list, show, freeze), treat stderr as output unless it's a real error
@@ -156,42 +154,32 @@ export async function POST(request: NextRequest) {
         } else {
           errorOutput += dataStr;
         }
-      });
-
-      // Set a longer timeout for pip install commands (they can take a while)
-      const timeoutDuration = isPipInstall ? 600000 : 60000; // 10 minutes for pip install, 1 minute for others
-
-      const timeout = setTimeout(() => {
-        child.kill();
-        if (!child.killed) {
-          resolve(NextResponse.json({
-            success: false,
-            output: '',
-            error: `Command timed out after ${timeoutDuration / 1000} seconds`,
-            exitCode: -1,
-          }, { status: 408 }));
-        }
-      }, timeoutDuration);
-
-      child.on('close', (code) => {
-        clearTimeout(timeout);
-        resolve(NextResponse.json({
-          success: code === 0,
-          output: output || errorOutput,
-          error: code !== 0 ? errorOutput : undefined,
-          exitCode: code,
-        }));
-      });
-
-      child.on('error', (err) => {
-        clearTimeout(timeout);
-        resolve(NextResponse.json({
-          success: false,
-          output: '',
-          error: `Failed to execute command: ${err.message}`,
-          exitCode: -1,
-        }, { status: 500 }));
-      });
+      },
+    });
+
+    if (result.error) {
+      return NextResponse.json({
+        success: false,
+        output: '',
+        error: `Failed to execute command: ${result.error}`,
+        exitCode: -1,
+      }, { status: 500 });
+    }
+
+    if (result.timedOut) {
+      return NextResponse.json({
+        success: false,
+        output: '',
+        error: `Command timed out after ${timeoutDuration / 1000} seconds`,
+        exitCode: -1,
+      }, { status: 408 });
+    }
+
+    return NextResponse.json({
+      success: result.exitCode === 0,
+      output: output || errorOutput,
+      error: result.exitCode !== 0 ? errorOutput : undefined,
+      exitCode: result.exitCode,
     });
   } catch (error) {
     console.error('Terminal command error:', error);
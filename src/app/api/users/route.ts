@@ -1,17 +1,151 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { createClient } from '@/lib/supabase/server';
-
-// Get all users (admin only)
-export async function GET() {
+import { createAdminClient } from '@/lib/supabase/admin';
+import { decodeCursor, encodeCursor, quoteFilterValue } from '@/lib/pagination';
+
+const USER_COLUMNS = 'id, email, name, subscription, credits, credit_limit, code_runs, ai_queries, created_at, last_active, is_active, updated_at';
+const SORTABLE_COLUMNS = ['created_at', 'last_active', 'credits', 'code_runs', 'ai_queries', 'name', 'email'];
+const DEFAULT_PAGE_SIZE = 50;
+const MAX_PAGE_SIZE = 200;
+const MAX_CHANGED_ROWS = 500;
+// Sync cursors start slightly in the past to absorb clock skew between the
+// app and the database; rows seen twice are simply merged again
+const SYNC_SKEW_MS = 5000;
+// Sorts before every id, for cursors that start at a point in time
+const MIN_UUID = '00000000-0000-0000-0000-000000000000';
+
+/**
+ * Users list (admin only)
+ * GET /api/users?limit=&cursor=&search=&sort=&order=&subscription=&active=
+ *   One page, newest first by default; pass nextCursor back as cursor for
+ *   the next page. syncCursor is for the changedSince form below.
+ * GET /api/users?changedSince=<syncCursor>
+ *   Only the rows changed since a previous response, oldest change first.
+ *   The cursor is the (updated_at, id) of the last row returned, so batches
+ *   continue exactly where the previous one stopped.
+ *
+ * Rows whose sort column is null come last in either order.
+ */
+export async function GET(request: NextRequest) {
   try {
-    const supabase = await createClient();
+    // Check admin authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Admin session required' },
+        { status: 401 }
+      );
+    }
+
+    const supabase = createAdminClient() || await createClient();
+    const { data: session } = await supabase
+      .from('admin_sessions')
+      .select('expires_at')
+      .eq('session_token', authHeader.substring(7))
+      .gt('expires_at', new Date().toISOString())
+      .single();
+    if (!session) {
+      return NextResponse.json(
+        { error: 'Invalid or expired session' },
+        { status: 401 }
+      );
+    }
 
-    // Check if admin (optional: add admin check logic here)
+    const { searchParams } = new URL(request.url);
+    const syncCursor = encodeCursor(new Date(Date.now() - SYNC_SKEW_MS).toISOString(), MIN_UUID);
+
+    const changedSince = searchParams.get('changedSince');
+    if (changedSince) {
+      // A plain timestamp starts before every row changed at that time
+      const cursor = isNaN(Date.parse(changedSince)) ? decodeCursor(changedSince) : [changedSince, MIN_UUID];
+      if (!cursor || typeof cursor[0] !== 'string' || isNaN(Date.parse(cursor[0]))) {
+        return NextResponse.json(
+          { error: 'changedSince must be a sync cursor' },
+          { status: 400 }
+        );
+      }
+      const since = quoteFilterValue(cursor[0]);
+
+      const { data: users, error } = await supabase
+        .from('users')
+        .select(USER_COLUMNS)
+        .or(`updated_at.gt.${since},and(updated_at.eq.${since},id.gt.${quoteFilterValue(cursor[1])})`)
+        .order('updated_at', { ascending: true })
+        .order('id', { ascending: true })
+        .limit(MAX_CHANGED_ROWS);
+
+      if (error) {
+        console.error('Error fetching changed users:', error);
+        return NextResponse.json(
+          { error: 'Failed to fetch users' },
+          { status: 500 }
+        );
+      }
+
+      const hasMore = users.length === MAX_CHANGED_ROWS;
+      return NextResponse.json({
+        users,
+        hasMore,
+        // A full batch continues after its last row; otherwise from now
+        syncCursor: hasMore ? encodeCursor(users[users.length - 1].updated_at, users[users.length - 1].id) : syncCursor
+      });
+    }
+
+    const sort = searchParams.get('sort') || 'created_at';
+    if (!SORTABLE_COLUMNS.includes(sort)) {
+      return NextResponse.json(
+        { error: `sort must be one of: ${SORTABLE_COLUMNS.join(', ')}` },
+        { status: 400 }
+      );
+    }
+    const ascending = searchParams.get('order') === 'asc';
+    const limit = Math.min(Math.max(parseInt(searchParams.get('limit') || '', 10) || DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE);
 
-    const { data: users, error } = await supabase
+    let query = supabase
       .from('users')
-      .select('id, email, name, subscription, credits, credit_limit, code_runs, ai_queries, created_at, last_active, is_active')
-      .order('created_at', { ascending: false });
+      .select(USER_COLUMNS)
+      .order(sort, { ascending, nullsFirst: false })
+      .order('id', { ascending })
+      .limit(limit + 1);
+
+    const subscription = searchParams.get('subscription');
+    if (subscription) {
+      query = query.eq('subscription', subscription);
+    }
+    const active = searchParams.get('active');
+    if (active === 'true' || active === 'false') {
+      query = query.eq('is_active', active === 'true');
+    }
+
+    const filters: string[] = [];
+    // Wildcards are the only characters quoting does not neutralize
+    const search = (searchParams.get('search') || '').replace(/[*%]/g, ' ').trim();
+    if (search) {
+      filters.push(`or(email.ilike.${quoteFilterValue(`*${search}*`)},name.ilike.${quoteFilterValue(`*${search}*`)})`);
+    }
+
+    const cursorParam = searchParams.get('cursor');
+    if (cursorParam) {
+      const cursor = decodeCursor(cursorParam);
+      if (!cursor) {
+        return NextResponse.json(
+          { error: 'Invalid cursor' },
+          { status: 400 }
+        );
+      }
+      // Rows after (value, id) in sort order, with nulls last
+      const [value, id] = cursor;
+      const op = ascending ? 'gt' : 'lt';
+      const sameValueAfter = `and(${sort}.${value === null ? 'is.null' : `eq.${quoteFilterValue(value)}`},id.${op}.${quoteFilterValue(id)})`;
+      filters.push(value === null
+        ? sameValueAfter
+        : `or(${sort}.${op}.${quoteFilterValue(value)},${sameValueAfter},${sort}.is.null)`);
+    }
+    if (filters.length > 0) {
+      query = query.or(`and(${filters.join(',')})`);
+    }
+
+    const { data: rows, error } = await query;
 
     if (error) {
       console.error('Error fetching users:', error);
@@ -21,7 +155,11 @@ export async function GET() {
       );
     }
 
-    return NextResponse.json({ users });
+    const users = rows.slice(0, limit);
+    const last = users[users.length - 1] as Record<string, any> | undefined;
+    const nextCursor = rows.length > limit && last ? encodeCursor(last[sort], last.id) : null;
+
+    return NextResponse.json({ users, nextCursor, syncCursor });
   } catch (error) {
     console.error('Error fetching users:', error);
     return NextResponse.json(
@@ -0,0 +1,94 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { createClient } from '@/lib/supabase/server';
+import { createAdminClient } from '@/lib/supabase/admin';
+
+/**
+ * Admin Stats API endpoint
+ * GET /api/users/stats
+ * Totals for the admin dashboard, summed over the admin_counters shard rows
+ * that triggers keep current (supabase_schema.sql) and cached for a short while
+ */
+
+const CACHE_TTL_MS = 15000;
+const ACTIVE_WINDOW_MS = 7 * 24 * 60 * 60 * 1000;
+
+type AdminStats = {
+  totalUsers: number;
+  totalProjects: number;
+  totalCodeRuns: number;
+  totalAiQueries: number;
+  activeUsers: number;
+  premiumUsers: number;
+};
+
+let cachedStats: { stats: AdminStats; expiresAt: number } | null = null;
+
+export async function GET(request: NextRequest) {
+  try {
+    // Check admin authentication
+    const authHeader = request.headers.get('authorization');
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return NextResponse.json(
+        { error: 'Admin session required' },
+        { status: 401 }
+      );
+    }
+
+    const supabase = createAdminClient() || await createClient();
+    const { data: session } = await supabase
+      .from('admin_sessions')
+      .select('expires_at')
+      .eq('session_token', authHeader.substring(7))
+      .gt('expires_at', new Date().toISOString())
+      .single();
+    if (!session) {
+      return NextResponse.json(
+        { error: 'Invalid or expired session' },
+        { status: 401 }
+      );
+    }
+
+    if (cachedStats && cachedStats.expiresAt > Date.now()) {
+      return NextResponse.json({ stats: cachedStats.stats, cached: true });
+    }
+
+    const [{ data: counters, error }, { count: activeUsers }] = await Promise.all([
+      supabase
+        .from('admin_counters')
+        .select('total_users, premium_users, total_code_runs, total_ai_queries, total_projects'),
+      // Index range count on last_active
+      supabase
+        .from('users')
+        .select('id', { count: 'exact', head: true })
+        .gte('last_active', new Date(Date.now() - ACTIVE_WINDOW_MS).toISOString()),
+    ]);
+
+    if (error || !counters || counters.length === 0) {
+      console.error('Error fetching admin counters:', error);
+      return NextResponse.json(
+        { error: 'Failed to fetch admin stats' },
+        { status: 500 }
+      );
+    }
+
+    const sum = (column: string) =>
+      counters.reduce((total, shard) => total + Number(shard[column]), 0);
+    const stats: AdminStats = {
+      totalUsers: sum('total_users'),
+      totalProjects: sum('total_projects'),
+      totalCodeRuns: sum('total_code_runs'),
+      totalAiQueries: sum('total_ai_queries'),
+      activeUsers: activeUsers || 0,
+      premiumUsers: sum('premium_users'),
+    };
+    cachedStats = { stats, expiresAt: Date.now() + CACHE_TTL_MS };
+
+    return NextResponse.json({ stats, cached: false });
+  } catch (error) {
+    console.error('Error fetching admin stats:', error);
+    return NextResponse.json(
+      { error: 'Failed to fetch admin stats' },
+      { status: 500 }
+    );
+  }
+}
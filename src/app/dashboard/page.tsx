@@ -13,7 +13,7 @@ import Link from 'next/link'
 
 export default function DashboardPage() {
   const router = useRouter()
-  const { projects, createProject, loadUserProjects, getUserStats, dailyCodeRuns, dailyAiQueries, currentUser } = useEditorStore()
+  const { projects, createProject, loadUserProjects, dailyCodeRuns, dailyAiQueries, currentUser } = useEditorStore()
 
   // Check profile completion on mount
   // Check profile completion on mount
@@ -37,7 +37,7 @@ export default function DashboardPage() {
         // Only load if user is logged in (not demo user)
         if (currentUser && currentUser.id && currentUser.id !== 'demo_1') {
           console.log('[Dashboard] Loading data for user:', currentUser.id);
-          await getUserStats();
+          // Credits and today's usage arrive over the usage stream
           await loadUserProjects(); // Load projects from database
           console.log('[Dashboard] Data loaded. Projects count:', projects.length);
         } else {
@@ -49,7 +49,7 @@ export default function DashboardPage() {
     }
 
     loadData()
-  }, [currentUser?.id, loadUserProjects, getUserStats]) // Reload when user changes
+  }, [currentUser?.id, loadUserProjects]) // Reload when user changes
 
   const dashboardStats = [
     { title: 'Total Projects', value: projects.length.toString(), icon: Folder },
@@ -62,7 +62,7 @@ interface ProfileData {
 export default function ProfilePage() {
   const { toast } = useToast()
   const router = useRouter()
-  const { currentUser, projects, getUserStats, dailyCodeRuns, dailyAiQueries } = useEditorStore()
+  const { currentUser, projects, dailyCodeRuns, dailyAiQueries } = useEditorStore()
   const [loading, setLoading] = useState(true)
   const [saving, setSaving] = useState(false)
   const [profile, setProfile] = useState<ProfileData | null>(null)
@@ -107,8 +107,7 @@ export default function ProfilePage() {
               geminiMasked: data.profile.geminiApiKey
             })
 
-            // Load stats
-            await getUserStats()
+            // Daily counters are kept current by the usage stream
             setStats({
               projects: projects.length,
               codeRuns: dailyCodeRuns || 0,
@@ -132,7 +131,7 @@ export default function ProfilePage() {
     }
 
     loadProfile()
-  }, [currentUser, router, getUserStats, projects.length, dailyCodeRuns, dailyAiQueries])
+  }, [currentUser, router, projects.length, dailyCodeRuns, dailyAiQueries])
 
   const handleSave = async () => {
     if (!profile || !currentUser) return
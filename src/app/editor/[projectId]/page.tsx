@@ -4,39 +4,52 @@ import { useEffect, use } from 'react'
 import { AppLayout } from '@/components/layout/AppLayout'
 import { EditorLayout } from '@/components/editor/EditorLayout'
 import { useEditorStore } from '@/lib/store'
+import { listCachedProjects } from '@/lib/project-cache'
 
 export default function EditorPage({ params }: { params: Promise<{ projectId: string }> }) {
-  const { loadProject, loadUserProjects, currentUser } = useEditorStore()
+  // The page wraps the whole editor, so it must not re-render on every store change
+  const { loadProject, loadUserProjects, cancelPrewarm, detachBackgroundJob } = useEditorStore.getState()
+  const currentUserId = useEditorStore(state => state.currentUser?.id)
   const resolvedParams = use(params)
 
   useEffect(() => {
     // Load projects from database if user is logged in
-    if (currentUser && currentUser.id && currentUser.id !== 'demo_1') {
-      loadUserProjects().then(async () => {
-        // After loading from database, load the specific project (with uploaded files)
-        await loadProject(resolvedParams.projectId)
-      })
+    if (currentUserId && currentUserId !== 'demo_1') {
+      // The list and the project load side by side, so the project can show
+      // its cached copy right away; list entries keep a loaded project's tree
+      loadUserProjects()
+      loadProject(resolvedParams.projectId)
     } else {
-      // Fallback to localStorage for demo/offline mode
-      const savedProjects = localStorage.getItem('pycode-projects')
-      if (savedProjects) {
-        try {
-          const parsedProjects = JSON.parse(savedProjects)
-          const projectsWithDates = parsedProjects.map((project: any) => ({
-            ...project,
-            createdAt: new Date(project.createdAt),
-            updatedAt: new Date(project.updatedAt)
-          }))
-          useEditorStore.setState({ projects: projectsWithDates })
-        } catch (error) {
+      // Fallback to the offline cache for demo/offline mode
+      listCachedProjects()
+        .then((cachedProjects) => {
+          // Projects already in memory are newer than their cached copy
+          const { projects } = useEditorStore.getState()
+          useEditorStore.setState({
+            projects: [...projects, ...cachedProjects.filter(cached => !projects.some(p => p.id === cached.id))]
+          })
+        })
+        .catch((error) => {
           console.error('Error loading projects:', error)
-        }
-      }
-      
+        })
+
       // Load the specific project
       loadProject(resolvedParams.projectId)
     }
-  }, [resolvedParams.projectId, loadProject, loadUserProjects, currentUser?.id]) // Reload when user ID changes
+  }, [resolvedParams.projectId, loadProject, loadUserProjects, currentUserId]) // Reload when user ID changes
+
+  // Stop background preparation when leaving the project. Background runs
+  // keep going; only the live output stream is closed.
+  useEffect(() => {
+    const projectId = resolvedParams.projectId
+    const handleUnload = () => cancelPrewarm(projectId)
+    window.addEventListener('beforeunload', handleUnload)
+    return () => {
+      window.removeEventListener('beforeunload', handleUnload)
+      cancelPrewarm(projectId)
+      detachBackgroundJob()
+    }
+  }, [resolvedParams.projectId, cancelPrewarm, detachBackgroundJob])
 
   return (
     <AppLayout>
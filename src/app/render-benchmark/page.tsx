@@ -0,0 +1,9 @@
+import { notFound } from 'next/navigation'
+import RenderBenchmark from './render-benchmark'
+
+// A development tool: it rewrites the editor store, so production builds
+// answer 404
+export default function RenderBenchmarkPage() {
+  if (process.env.NODE_ENV !== 'development') notFound()
+  return <RenderBenchmark />
+}
@@ -0,0 +1,214 @@
+'use client'
+
+import { Profiler, ProfilerOnRenderCallback, useState } from 'react'
+import { useShallow } from 'zustand/react/shallow'
+import { Button } from '@/components/ui/button'
+import {
+  appendOutput,
+  FileOrFolder,
+  flushOutput,
+  selectActiveFile,
+  selectChatSlice,
+  useEditorStore,
+} from '@/lib/store'
+import { indexFileTree } from '@/lib/file-index'
+
+// Render counts of the editor's panels while output streams in, the user
+// types and chat messages arrive. "Before" subscribes to the whole store and
+// appends every chunk on its own, as the panels used to; "after" uses the
+// slice selectors and the frame-batched output buffer the panels use now.
+//
+// Open /render-benchmark under `next dev`; other builds answer 404 (see
+// page.tsx). The store is restored when a run finishes.
+
+const OUTPUT_CHUNKS = 2000
+const KEYSTROKES = 200
+const CHAT_MESSAGES = 20
+const FOLDERS = 10
+const FILES_PER_FOLDER = 20
+
+type Counts = Record<string, number>
+type Mode = 'before' | 'after'
+
+const PANELS = ['editor', 'explorer', 'chat', 'output'] as const
+
+// A task per chunk, like reads from a streaming response
+const nextTask = () => new Promise(resolve => setTimeout(resolve, 0))
+const nextFrame = () => new Promise(resolve => requestAnimationFrame(() => resolve(undefined)))
+
+function benchmarkTree() {
+  const children: FileOrFolder[] = []
+  for (let folder = 0; folder < FOLDERS; folder++) {
+    const files: FileOrFolder[] = []
+    for (let file = 0; file < FILES_PER_FOLDER; file++) {
+      files.push({ name: `module_${file}.py`, type: 'file', content: `# module ${folder}/${file}\n` })
+    }
+    children.push({ name: `package_${folder}`, type: 'folder', children: files })
+  }
+  children.unshift({ name: 'main.py', type: 'file', content: '' })
+  return indexFileTree({ name: 'Benchmark', type: 'folder', children })
+}
+
+// Panels as they subscribed before: the whole store
+function WholeStoreEditor() {
+  const { fileIndex, activeFilePath } = useEditorStore()
+  return <pre className="truncate">{activeFilePath ? fileIndex.files[activeFilePath]?.content.length : 0} chars</pre>
+}
+
+function WholeStoreExplorer() {
+  const { fileIndex } = useEditorStore()
+  return <p>{Object.keys(fileIndex.files).length} files</p>
+}
+
+function WholeStoreChat() {
+  const { chatHistory } = useEditorStore()
+  return <p>{chatHistory.length} messages</p>
+}
+
+function WholeStoreOutput() {
+  const { output } = useEditorStore()
+  return <p>{output.length} chars of output</p>
+}
+
+// Panels as they subscribe now
+function SliceEditor() {
+  const activeFile = useEditorStore(selectActiveFile)
+  return <pre className="truncate">{activeFile?.content.length ?? 0} chars</pre>
+}
+
+function SliceExplorer() {
+  const fileCount = useEditorStore(state => Object.keys(state.fileIndex.files).length)
+  return <p>{fileCount} files</p>
+}
+
+function SliceChat() {
+  const { chatHistory } = useEditorStore(useShallow(selectChatSlice))
+  return <p>{chatHistory.length} messages</p>
+}
+
+function SliceOutput() {
+  const outputLength = useEditorStore(state => state.output.length)
+  return <p>{outputLength} chars of output</p>
+}
+
+const panelsFor = {
+  before: { editor: WholeStoreEditor, explorer: WholeStoreExplorer, chat: WholeStoreChat, output: WholeStoreOutput },
+  after: { editor: SliceEditor, explorer: SliceExplorer, chat: SliceChat, output: SliceOutput },
+}
+
+async function runWorkload(mode: Mode) {
+  const store = useEditorStore
+  const activeFilePath = store.getState().activeFilePath!
+
+  const output = async () => {
+    for (let i = 0; i < OUTPUT_CHUNKS; i++) {
+      const chunk = `line ${i}: ${'x'.repeat(40)}\n`
+      if (mode === 'before') store.setState(state => ({ output: state.output + chunk }))
+      else appendOutput(chunk)
+      await nextTask()
+    }
+    flushOutput()
+  }
+
+  const typing = async () => {
+    let content = ''
+    for (let i = 0; i < KEYSTROKES; i++) {
+      content += 'a'
+      store.getState().updateFileContent(activeFilePath, content)
+      await nextFrame()
+    }
+  }
+
+  const chat = async () => {
+    for (let i = 0; i < CHAT_MESSAGES; i++) {
+      store.setState(state => ({
+        chatHistory: [...state.chatHistory, { role: 'assistant' as const, message: `Reply ${i}` }],
+      }))
+      await new Promise(resolve => setTimeout(resolve, 50))
+    }
+  }
+
+  await Promise.all([output(), typing(), chat()])
+  await nextFrame()
+}
+
+export default function RenderBenchmark() {
+  const [mode, setMode] = useState<Mode | null>(null)
+  const [results, setResults] = useState<Partial<Record<Mode, Counts>>>({})
+  const [counts] = useState<Counts>({})
+
+  const onRender: ProfilerOnRenderCallback = (id, phase) => {
+    if (phase !== 'mount') counts[id] = (counts[id] || 0) + 1
+  }
+
+  const run = async (next: Mode) => {
+    const saved = useEditorStore.getState()
+    const fileIndex = benchmarkTree()
+    useEditorStore.setState({
+      currentProject: null,
+      fileIndex,
+      openFilePaths: ['main.py'],
+      activeFilePath: 'main.py',
+      output: '',
+      chatHistory: [],
+    })
+    PANELS.forEach(panel => { counts[panel] = 0 })
+    setMode(next)
+    await nextFrame()
+
+    try {
+      await runWorkload(next)
+      setResults(previous => ({ ...previous, [next]: { ...counts } }))
+    } finally {
+      setMode(null)
+      useEditorStore.setState(saved, true)
+    }
+  }
+
+  const Panels = mode ? panelsFor[mode] : null
+
+  return (
+    <div className="p-8 space-y-6 max-w-2xl">
+      <div>
+        <h1 className="text-2xl font-bold">Editor render benchmark</h1>
+        <p className="text-sm text-muted-foreground">
+          {OUTPUT_CHUNKS} output chunks, {KEYSTROKES} keystrokes and {CHAT_MESSAGES} chat messages
+          in a project of {FOLDERS * FILES_PER_FOLDER + 1} files. Counts are re-renders after mount.
+        </p>
+      </div>
+
+      <div className="flex gap-2">
+        <Button onClick={() => run('before')} disabled={!!mode}>Run whole-store subscriptions</Button>
+        <Button onClick={() => run('after')} disabled={!!mode}>Run slice subscriptions</Button>
+      </div>
+
+      {Panels && (
+        <div className="grid grid-cols-2 gap-2 text-xs text-muted-foreground">
+          <Profiler id="editor" onRender={onRender}><Panels.editor /></Profiler>
+          <Profiler id="explorer" onRender={onRender}><Panels.explorer /></Profiler>
+          <Profiler id="chat" onRender={onRender}><Panels.chat /></Profiler>
+          <Profiler id="output" onRender={onRender}><Panels.output /></Profiler>
+        </div>
+      )}
+
+      <table className="w-full text-sm">
+        <thead>
+          <tr className="text-left border-b">
+            <th className="py-1">Panel</th>
+            <th className="py-1">Before</th>
+            <th className="py-1">After</th>
+          </tr>
+        </thead>
+        <tbody>
+          {PANELS.map(panel => (
+            <tr key={panel} className="border-b">
+              <td className="py-1">{panel}</td>
+              <td className="py-1">{results.before?.[panel] ?? '-'}</td>
+              <td className="py-1">{results.after?.[panel] ?? '-'}</td>
+            </tr>
+          ))}
+        </tbody>
+      </table>
+    </div>
+  )
+}
@@ -9,11 +9,13 @@ import { Avatar, AvatarFallback, AvatarImage } from '@/components/ui/avatar'
 import { Checkbox } from '../ui/checkbox'
 import { Label } from '../ui/label'
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select'
-import { useEditorStore } from '@/lib/store'
+import { useShallow } from 'zustand/react/shallow'
+import { selectChatSlice, selectUploadedFiles, useEditorStore } from '@/lib/store'
 import { FormEvent, useRef, useState, useEffect } from 'react'
 
 export function ChatPanel() {
-  const { fileTree, chatHistory, isAiLoading, quickActions, sendMessage, runQuickAction, codeContext, currentUser } = useEditorStore();
+  const { chatHistory, isAiLoading, quickActions, sendMessage, runQuickAction, codeContext, currentUser } = useEditorStore(useShallow(selectChatSlice));
+  const uploadedFiles = useEditorStore(useShallow(selectUploadedFiles));
   const [message, setMessage] = useState('');
   const [attachCode, setAttachCode] = useState(true);
   const [selectedProvider, setSelectedProvider] = useState<'gemini' | 'openai'>('gemini');
@@ -94,15 +96,13 @@ export function ChatPanel() {
       )}
 
       {/* Uploaded Files Section */}
-      {fileTree.children.some(item => item.type === 'file' && item.uploadPath) && (
+      {uploadedFiles.length > 0 && (
         <div className="p-2 border-b">
           <p className="text-xs text-muted-foreground mb-2 flex items-center">
             <Upload className="h-3 w-3 mr-1" /> Uploaded Files:
           </p>
           <div className="space-y-1">
-            {fileTree.children
-              .filter(item => item.type === 'file' && item.uploadPath)
-              .map((file, index) => (
+            {uploadedFiles.map((file, index) => (
                 <div key={index} className="flex items-center gap-2 p-1 bg-muted/50 rounded text-xs">
                   <File className="h-3 w-3 text-blue-500" />
                   <span className="truncate">{file.name}</span>
@@ -35,7 +35,8 @@ export function CreditDisplay() {
           </div>
           <div className="text-right">
             <div className={`text-lg font-bold ${isOutOfCredits ? 'text-red-600' : isLowCredits ? 'text-yellow-600' : ''}`}>
-              {currentUser.credits}
+              {/* Runs cost fractions of a credit; the balance drops per whole credit used */}
+              {Math.ceil(currentUser.credits)}
             </div>
             <div className="text-xs text-muted-foreground">
               / {currentUser.creditLimit}
@@ -24,6 +24,7 @@ export type Project = {
   language: string;
   lastModified: string;
   isFavorite: boolean;
+  details?: string;
 };
 
 export function ProjectCard({ project }: { project: Project }) {
@@ -42,6 +43,9 @@ export function ProjectCard({ project }: { project: Project }) {
             </Link>
           </CardTitle>
           <CardDescription className="mt-1 line-clamp-2">{project.description}</CardDescription>
+          {project.details && (
+            <p className="mt-2 text-xs text-muted-foreground">{project.details}</p>
+          )}
         </div>
         <div className="flex items-center gap-1">
            <Button variant="ghost" size="icon" className="h-8 w-8">
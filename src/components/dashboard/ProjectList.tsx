@@ -1,11 +1,13 @@
 "use client"
 
-import { useEffect } from 'react'
+import { useState } from 'react'
 import { ProjectCard, type Project } from './ProjectCard'
-import { useEditorStore } from '@/lib/store'
+import { Button } from '@/components/ui/button'
+import { useEditorStore, type ProjectStats } from '@/lib/store'
 
 export function ProjectList() {
-  const { projects } = useEditorStore()
+  const { projects, projectsNextCursor, loadMoreProjects } = useEditorStore()
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
 
   // Projects are now loaded from database via the store
   // No need to load from localStorage anymore
@@ -15,11 +17,18 @@ export function ProjectList() {
     id: project.id,
     name: project.name,
     description: project.description || 'No description provided',
-    language: 'Python',
+    language: project.stats?.mainLanguage || 'Python',
     lastModified: getTimeAgo(project.updatedAt),
     isFavorite: false, // We can add this feature later
+    details: project.stats ? describeStats(project.stats) : undefined,
   }))
 
+  const handleLoadMore = async () => {
+    setIsLoadingMore(true)
+    await loadMoreProjects()
+    setIsLoadingMore(false)
+  }
+
   if (displayProjects.length === 0) {
     return (
       <div className="text-center py-16 border-2 border-dashed rounded-lg">
@@ -30,14 +39,40 @@ export function ProjectList() {
   }
 
   return (
-    <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">
-      {displayProjects.map((project) => (
-        <ProjectCard key={project.id} project={project} />
-      ))}
+    <div className="space-y-6">
+      <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">
+        {displayProjects.map((project) => (
+          <ProjectCard key={project.id} project={project} />
+        ))}
+      </div>
+      {projectsNextCursor && (
+        <div className="flex justify-center">
+          <Button variant="outline" onClick={handleLoadMore} disabled={isLoadingMore}>
+            {isLoadingMore ? 'Loading...' : 'Load more projects'}
+          </Button>
+        </div>
+      )}
     </div>
   )
 }
 
+function describeStats(stats: ProjectStats): string {
+  const parts = [
+    `${stats.fileCount} file${stats.fileCount === 1 ? '' : 's'}`,
+    formatSize(stats.totalSize),
+  ]
+  if (stats.lastRunAt) {
+    parts.push(`last run ${getTimeAgo(stats.lastRunAt).toLowerCase()}`)
+  }
+  return parts.join(' · ')
+}
+
+function formatSize(bytes: number): string {
+  if (bytes < 1024) return `${bytes} B`
+  if (bytes < 1024 * 1024) return `${(bytes / 1024).toFixed(1)} KB`
+  return `${(bytes / (1024 * 1024)).toFixed(1)} MB`
+}
+
 function getTimeAgo(date: Date): string {
   const now = new Date()
   const diffInMs = now.getTime() - date.getTime()
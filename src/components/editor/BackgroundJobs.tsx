@@ -0,0 +1,122 @@
+"use client"
+
+import { useEffect } from 'react'
+import { Loader2, Radio, Square, RefreshCw, FileDown } from 'lucide-react'
+import { Button } from '@/components/ui/button'
+import { Badge } from '@/components/ui/badge'
+import { useShallow } from 'zustand/react/shallow'
+import { selectJobsSlice, useEditorStore } from '@/lib/store'
+import { ProjectSchedules } from './ProjectSchedules'
+
+const statusVariant = {
+  running: 'default',
+  succeeded: 'secondary',
+  failed: 'destructive',
+  cancelled: 'outline',
+} as const
+
+function formatDuration(ms: number) {
+  const seconds = Math.round(ms / 1000)
+  if (seconds < 60) return `${seconds}s`
+  const minutes = Math.floor(seconds / 60)
+  return minutes < 60 ? `${minutes}m ${seconds % 60}s` : `${Math.floor(minutes / 60)}h ${minutes % 60}m`
+}
+
+export function BackgroundJobs() {
+  const {
+    backgroundJobs,
+    attachedJobId,
+    loadBackgroundJobs,
+    attachBackgroundJob,
+    cancelBackgroundJob,
+    downloadJobArtifact,
+  } = useEditorStore(useShallow(selectJobsSlice))
+
+  // Refresh while any job is still running
+  const hasRunning = backgroundJobs.some(job => job.status === 'running')
+  useEffect(() => {
+    if (!hasRunning) return
+    const timer = setInterval(() => loadBackgroundJobs(), 10000)
+    return () => clearInterval(timer)
+  }, [hasRunning, loadBackgroundJobs])
+
+  return (
+    <div className="flex flex-col h-full min-h-0">
+      <div className="flex items-center justify-between px-4 py-2 border-b text-xs text-muted-foreground">
+        <span>Background runs keep going when you close the page.</span>
+        <Button variant="ghost" size="icon" className="h-6 w-6" onClick={() => loadBackgroundJobs()} title="Refresh">
+          <RefreshCw className="h-3 w-3" />
+        </Button>
+      </div>
+      <div className="flex-1 min-h-0 overflow-y-auto p-2 text-sm output-scrollbar">
+        {backgroundJobs.length === 0 ? (
+          <p className="p-2 text-muted-foreground">No background runs yet.</p>
+        ) : (
+          backgroundJobs.map(job => {
+            const elapsed = (job.finishedAt || Date.now()) - (job.startedAt || job.createdAt)
+            return (
+              <div key={job.id} className="flex flex-col gap-1 rounded border p-2 mb-2">
+                <div className="flex items-center justify-between gap-2">
+                  <div className="flex items-center gap-2 min-w-0">
+                    <Badge variant={statusVariant[job.status]}>
+                      {job.status === 'running' && <Loader2 className="h-3 w-3 mr-1 animate-spin" />}
+                      {job.status}
+                    </Badge>
+                    <span className="font-code truncate">{job.fileName || job.id}</span>
+                    <span className="text-xs text-muted-foreground whitespace-nowrap">
+                      {new Date(job.createdAt).toLocaleString()} · {formatDuration(elapsed)}
+                    </span>
+                  </div>
+                  <div className="flex items-center gap-1">
+                    <Button
+                      variant="ghost"
+                      size="icon"
+                      className="h-6 w-6"
+                      onClick={() => attachBackgroundJob(job.id)}
+                      disabled={attachedJobId === job.id}
+                      title={job.status === 'running' ? 'Attach to live output' : 'Show output'}
+                    >
+                      <Radio className="h-3 w-3" />
+                    </Button>
+                    {job.status === 'running' && (
+                      <Button
+                        variant="ghost"
+                        size="icon"
+                        className="h-6 w-6"
+                        onClick={() => cancelBackgroundJob(job.id)}
+                        disabled={job.cancelRequested}
+                        title="Cancel"
+                      >
+                        <Square className="h-3 w-3" />
+                      </Button>
+                    )}
+                  </div>
+                </div>
+                {job.error && job.status !== 'succeeded' && (
+                  <div className="text-xs text-red-600 dark:text-red-400 whitespace-pre-wrap">{job.error}</div>
+                )}
+                {job.artifacts && job.artifacts.length > 0 && (
+                  <div className="flex flex-wrap gap-1">
+                    {job.artifacts.map(artifact => (
+                      <Button
+                        key={artifact.path}
+                        variant="outline"
+                        size="sm"
+                        className="h-6 px-2 text-xs"
+                        onClick={() => downloadJobArtifact(job.id, artifact.path)}
+                      >
+                        <FileDown className="h-3 w-3 mr-1" />
+                        {artifact.path}
+                      </Button>
+                    ))}
+                  </div>
+                )}
+              </div>
+            )
+          })
+        )}
+        <ProjectSchedules />
+      </div>
+    </div>
+  )
+}
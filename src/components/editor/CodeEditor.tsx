@@ -7,26 +7,50 @@ import { Tabs, TabsList, TabsTrigger, TabsContent } from "@/components/ui/tabs";
 import { Button } from "../ui/button";
 import { Plus, X } from "lucide-react";
 import { ScrollArea, ScrollBar } from "../ui/scroll-area";
-import { useEditorStore } from "@/lib/store";
+import { selectActiveFile, useEditorStore } from "@/lib/store";
+import { baseName } from "@/lib/file-index";
 import { Skeleton } from "../ui/skeleton";
 import { cn } from "@/lib/utils";
 
 export function CodeEditor() {
     const { theme } = useTheme();
-    const { openFiles, activeFile, setActiveFile, closeFile, updateFileContent, addNewFile } = useEditorStore();
+    // Only the open tabs and the active file; edits to other files do not re-render the editor
+    const openFilePaths = useEditorStore(state => state.openFilePaths);
+    const activeFilePath = useEditorStore(state => state.activeFilePath);
+    const activeFile = useEditorStore(selectActiveFile);
+    const revealPosition = useEditorStore(state => state.revealPosition);
+    const { setActiveFile, closeFile, updateFileContent, addNewFile, clearRevealPosition } = useEditorStore.getState();
     const editorRef = React.useRef<any>(null);
 
+    // Move to a position asked for by find in files, once its file is shown
+    const revealPending = React.useCallback(() => {
+      const editor = editorRef.current;
+      // The editor of the previous file has no model once it is disposed
+      if (!editor?.getModel() || !revealPosition || !activeFile || activeFile.lazy) return;
+      if (revealPosition.path !== activeFilePath) return;
+      const position = { lineNumber: revealPosition.line, column: revealPosition.column };
+      editor.setPosition(position);
+      editor.revealPositionInCenter(position);
+      editor.focus();
+      clearRevealPosition();
+    }, [revealPosition, activeFile, activeFilePath, clearRevealPosition]);
+
+    React.useEffect(() => {
+      revealPending();
+    }, [revealPending]);
+
     const handleEditorDidMount = (editor: any, monaco: any) => {
       editorRef.current = editor;
+      revealPending();
     };
 
     const handleTabChange = (value: string) => {
         setActiveFile(value);
     };
 
-    const handleCloseTab = (e: React.MouseEvent, fileName: string) => {
+    const handleCloseTab = (e: React.MouseEvent, path: string) => {
         e.stopPropagation();
-        closeFile(fileName);
+        closeFile(path);
     }
 
     const handleAddFile = () => {
@@ -37,13 +61,13 @@ export function CodeEditor() {
     }
 
     const handleContentChange = (value: string | undefined) => {
-        if (activeFile && value !== undefined) {
-            updateFileContent(activeFile.name, value);
+        if (activeFilePath && value !== undefined) {
+            updateFileContent(activeFilePath, value);
         }
     }
     
-    if (!activeFile && openFiles.length > 0) {
-      setActiveFile(openFiles[0].name);
+    if (!activeFile && openFilePaths.length > 0) {
+      setActiveFile(openFilePaths[0]);
       return <Skeleton className="w-full h-full" />;
     }
 
@@ -52,24 +76,25 @@ export function CodeEditor() {
             <div className="flex-shrink-0 border-b">
                 <ScrollArea className="w-full whitespace-nowrap">
                   <div className="flex items-center px-2">
-                    <Tabs value={activeFile?.name} onValueChange={handleTabChange} className="relative">
+                    <Tabs value={activeFilePath ?? undefined} onValueChange={handleTabChange} className="relative">
                         <TabsList className="bg-transparent p-0 border-none gap-0">
-                            {openFiles.map(file => (
-                                <div key={file.name} className="relative group flex items-center">
+                            {openFilePaths.map(path => (
+                                <div key={path} className="relative group flex items-center">
                                     <TabsTrigger 
-                                        value={file.name} 
+                                        value={path} 
+                                        title={path}
                                         className="h-10 border-b-2 border-transparent data-[state=active]:border-primary data-[state=active]:bg-secondary/50 rounded-none px-4 pr-10"
                                     >
-                                        {file.name}
+                                        {baseName(path)}
                                     </TabsTrigger>
                                     <button
-                                        aria-label={`Close ${file.name}`}
-                                        onClick={(e) => handleCloseTab(e, file.name)}
+                                        aria-label={`Close ${baseName(path)}`}
+                                        onClick={(e) => handleCloseTab(e, path)}
                                         className={cn(
                                             "absolute right-2 top-1/2 -translate-y-1/2 h-5 w-5 rounded-md flex items-center justify-center transition-colors",
                                             "opacity-0 group-hover:opacity-100 group-focus-within:opacity-100",
                                             "hover:bg-muted-foreground/20",
-                                            activeFile?.name === file.name && "opacity-100"
+                                            activeFilePath === path && "opacity-100"
                                         )}
                                     >
                                         <X className="h-3 w-3" />
@@ -86,10 +111,10 @@ export function CodeEditor() {
                 </ScrollArea>
             </div>
             <div className="flex-grow relative">
-                {activeFile ? (
+                {activeFile && activeFilePath ? (
                     <Editor
-                        key={activeFile.name}
-                        path={activeFile.name}
+                        key={activeFilePath}
+                        path={activeFilePath}
                         height="100%"
                         defaultLanguage="python"
                         value={activeFile.content}
@@ -102,6 +127,8 @@ export function CodeEditor() {
                             wordWrap: "on",
                             scrollBeyondLastLine: false,
                             automaticLayout: true,
+                            // Body still loading
+                            readOnly: !!activeFile.lazy,
                         }}
                     />
                 ) : (
@@ -21,13 +21,14 @@ const CodeEditor = dynamic(() => import('@/components/editor/CodeEditor').then(m
 
 
 export function EditorLayout() {
-  const { activeFile, fetchQuickActions } = useEditorStore();
+  const activeFilePath = useEditorStore(state => state.activeFilePath);
+  const fetchQuickActions = useEditorStore(state => state.fetchQuickActions);
 
   useEffect(() => {
-    if (activeFile) {
+    if (activeFilePath) {
       fetchQuickActions();
     }
-  }, [activeFile, fetchQuickActions]);
+  }, [activeFilePath, fetchQuickActions]);
 
   return (
     <div className="h-[calc(100vh-4rem)] bg-background dark:bg-card">
@@ -9,13 +9,16 @@ import {
   Download,
   Trash2,
   Upload,
+  Search,
 } from 'lucide-react'
 import { Button } from '@/components/ui/button'
 import { ScrollArea } from '@/components/ui/scroll-area'
 import { useState } from 'react'
 import { cn } from '@/lib/utils'
-import { useEditorStore, FileOrFolder } from '@/lib/store'
+import { useEditorStore } from '@/lib/store'
+import { baseName } from '@/lib/file-index'
 import { FileUpload } from './FileUpload'
+import { FindInFiles } from './FindInFiles'
 import {
   Dialog,
   DialogContent,
@@ -36,22 +39,31 @@ import {
   AlertDialogTrigger,
 } from "@/components/ui/alert-dialog"
 
-const FileTreeItem = ({ item, path = [] }: { item: FileOrFolder, path?: string[] }) => {
-  const [isOpen, setIsOpen] = useState(item.type === 'folder');
-  const { activeFile, openFile, deleteFile } = useEditorStore();
+// Folders first, then by name
+const sortPaths = (paths: string[], folders: Record<string, string[]>) =>
+  [...paths].sort((a, b) => {
+    const aIsFolder = a in folders;
+    if (aIsFolder === b in folders) return baseName(a).localeCompare(baseName(b));
+    return aIsFolder ? -1 : 1;
+  });
 
-  const currentPath = [...path, item.name];
+// Each item subscribes to its own entry of the index, so typing in one file
+// re-renders neither the other items nor the explorer
+const FileTreeItem = ({ path }: { path: string }) => {
+  const file = useEditorStore(state => state.fileIndex.files[path]);
+  const children = useEditorStore(state => state.fileIndex.children[path]);
+  // Folder structure only; it does not change while typing
+  const folders = useEditorStore(state => state.fileIndex.children);
+  const isActive = useEditorStore(state => !!file && state.activeFilePath === path);
+  const [isOpen, setIsOpen] = useState(true);
+  const { openFile, deleteFile } = useEditorStore.getState();
 
-  const handleToggle = (e: React.MouseEvent) => {
-    e.stopPropagation();
-    if (item.type === 'folder') {
-      setIsOpen(!isOpen);
-    }
-  }
+  const name = baseName(path);
+  if (!file && !children) return null;
 
   const handleSelect = () => {
-    if (item.type === 'file') {
-      openFile(item);
+    if (file) {
+      openFile(path);
     } else {
       setIsOpen(!isOpen);
     }
@@ -59,11 +71,9 @@ const FileTreeItem = ({ item, path = [] }: { item: FileOrFolder, path?: string[]
 
   const handleDelete = (e: React.MouseEvent) => {
       e.stopPropagation();
-      deleteFile(currentPath);
+      deleteFile(path.split('/'));
   }
 
-  const isActive = item.type === 'file' && activeFile?.name === item.name;
-
   return (
     <div className="group/item">
       <div 
@@ -74,7 +84,7 @@ const FileTreeItem = ({ item, path = [] }: { item: FileOrFolder, path?: string[]
         )}
       >
         <div className="flex items-center flex-1 truncate">
-            {item.type === 'folder' ? (
+            {!file ? (
                 <>
                     {isOpen ? <ChevronDown className="h-4 w-4 mr-1 flex-shrink-0" /> : <ChevronRight className="h-4 w-4 mr-1 flex-shrink-0" />}
                     <Folder className="h-4 w-4 mr-2 text-yellow-500 flex-shrink-0" />
@@ -85,9 +95,9 @@ const FileTreeItem = ({ item, path = [] }: { item: FileOrFolder, path?: string[]
                    <FileIcon className="h-4 w-4 mr-2 text-blue-500 flex-shrink-0" />
                 </>
             )}
-            <span className="truncate">{item.name}</span>
+            <span className="truncate">{name}</span>
         </div>
-        {item.type === 'file' && (
+        {file && (
           <AlertDialog>
               <AlertDialogTrigger asChild>
                 <button
@@ -101,7 +111,7 @@ const FileTreeItem = ({ item, path = [] }: { item: FileOrFolder, path?: string[]
                 <AlertDialogHeader>
                   <AlertDialogTitle>Are you sure?</AlertDialogTitle>
                   <AlertDialogDescription>
-                    This action cannot be undone. This will permanently delete the file "{item.name}".
+                    This action cannot be undone. This will permanently delete the file "{name}".
                   </AlertDialogDescription>
                 </AlertDialogHeader>
                 <AlertDialogFooter>
@@ -112,15 +122,10 @@ const FileTreeItem = ({ item, path = [] }: { item: FileOrFolder, path?: string[]
           </AlertDialog>
         )}
       </div>
-      {isOpen && item.type === 'folder' && item.children && (
+      {isOpen && children && (
         <div>
-          {[...item.children]
-            .sort((a,b) => {
-              if (a.type === b.type) return a.name.localeCompare(b.name);
-              return a.type === 'folder' ? -1 : 1;
-            })
-            .map((child) => (
-              <FileTreeItem key={child.name} item={child} path={currentPath} />
+          {sortPaths(children, folders).map((child) => (
+              <FileTreeItem key={child} path={child} />
           ))}
         </div>
       )}
@@ -130,8 +135,12 @@ const FileTreeItem = ({ item, path = [] }: { item: FileOrFolder, path?: string[]
 
 
 export function FileExplorer() {
-  const { fileTree, addNewFile, downloadProjectAsZip, addNewFileFromUpload } = useEditorStore();
+  const folders = useEditorStore(state => state.fileIndex.children);
+  const fileCount = useEditorStore(state => Object.keys(state.fileIndex.files).length);
+  const rootPaths = folders[''] || [];
+  const { addNewFile, downloadProjectAsZip, addNewFileFromUpload } = useEditorStore.getState();
   const [isUploadDialogOpen, setIsUploadDialogOpen] = useState(false);
+  const [isSearchOpen, setIsSearchOpen] = useState(false);
 
   const handleAddNewFile = () => {
     const newFileName = prompt("Enter file name (e.g., script.py):");
@@ -145,19 +154,21 @@ export function FileExplorer() {
     addNewFileFromUpload(file.originalName, file.path, file.content || '');
     setIsUploadDialogOpen(false);
   };
-  
-  const countFiles = (item: FileOrFolder): number => {
-    if (item.type === 'file') {
-      return 1;
-    }
-    return item.children.reduce((acc, child) => acc + countFiles(child), 0);
-  }
 
   return (
     <div className="flex flex-col h-full bg-secondary/30 dark:bg-card text-sm">
       <div className="flex items-center justify-between p-2 border-b">
-        <h2 className="font-semibold text-base">Files</h2>
+        <h2 className="font-semibold text-base">{isSearchOpen ? 'Search' : 'Files'}</h2>
         <div className="flex items-center">
+            <Button
+              variant="ghost"
+              size="icon"
+              className={cn("h-7 w-7", isSearchOpen && "bg-primary/10 text-primary")}
+              onClick={() => setIsSearchOpen(!isSearchOpen)}
+              title="Find in Files"
+            >
+              <Search className="h-4 w-4" />
+            </Button>
             <Button variant="ghost" size="icon" className="h-7 w-7" onClick={handleAddNewFile} title="New File">
               <Plus className="h-4 w-4" />
             </Button>
@@ -182,15 +193,16 @@ export function FileExplorer() {
             </Button>
         </div>
       </div>
+      {isSearchOpen ? (
+        <div className="flex-1 min-h-0">
+          <FindInFiles />
+        </div>
+      ) : (
       <ScrollArea className="flex-1 p-2">
-        {fileTree.children.length > 0 ? (
-          [...fileTree.children]
-            .sort((a,b) => {
-                if (a.type === b.type) return a.name.localeCompare(b.name);
-                return a.type === 'folder' ? -1 : 1;
-            })
-            .map(item => (
-                <FileTreeItem key={item.name} item={item} path={[]} />
+        {rootPaths.length > 0 ? (
+          sortPaths(rootPaths, folders)
+            .map(path => (
+                <FileTreeItem key={path} path={path} />
             ))
         ) : (
           <div className="text-center text-xs text-muted-foreground p-4">
@@ -199,8 +211,9 @@ export function FileExplorer() {
           </div>
         )}
       </ScrollArea>
+      )}
       <div className="p-2 border-t text-xs text-muted-foreground">
-        {countFiles(fileTree)} files
+        {fileCount} files
       </div>
     </div>
   )
@@ -5,6 +5,7 @@ import { Upload, File, X, CheckCircle, AlertCircle } from 'lucide-react'
 import { Button } from '@/components/ui/button'
 import { Progress } from '@/components/ui/progress'
 import { useToast } from '@/hooks/use-toast'
+import { useShallow } from 'zustand/react/shallow'
 import { useEditorStore } from '@/lib/store'
 
 interface UploadedFile {
@@ -29,7 +30,7 @@ export function FileUpload({ onFileUploaded }: FileUploadProps) {
   const [dragActive, setDragActive] = useState(false)
   const fileInputRef = useRef<HTMLInputElement>(null)
   const { toast } = useToast()
-  const { currentProject, addNewFileFromUpload } = useEditorStore()
+  const { currentProject, addNewFileFromUpload } = useEditorStore(useShallow(state => ({ currentProject: state.currentProject, addNewFileFromUpload: state.addNewFileFromUpload })))
 
   const handleFileSelect = async (files: FileList | null) => {
     if (!files || files.length === 0) return
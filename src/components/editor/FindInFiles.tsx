@@ -0,0 +1,109 @@
+"use client"
+
+import { useEffect, useState } from 'react'
+import { CaseSensitive, Regex, File as FileIcon } from 'lucide-react'
+import { Input } from '@/components/ui/input'
+import { ScrollArea } from '@/components/ui/scroll-area'
+import { cn } from '@/lib/utils'
+import { useShallow } from 'zustand/react/shallow'
+import { useEditorStore } from '@/lib/store'
+import type { CodeSearchResult } from '@/lib/code-search'
+
+// Wait for a pause in typing before searching
+const SEARCH_DEBOUNCE_MS = 300
+
+export function FindInFiles() {
+  const { searchFiles, openFileAt } = useEditorStore(useShallow(state => ({ searchFiles: state.searchFiles, openFileAt: state.openFileAt })))
+  const [query, setQuery] = useState('')
+  const [regex, setRegex] = useState(false)
+  const [caseSensitive, setCaseSensitive] = useState(false)
+  const [result, setResult] = useState<CodeSearchResult | null>(null)
+  const [error, setError] = useState<string | null>(null)
+
+  useEffect(() => {
+    if (!query) {
+      setResult(null)
+      setError(null)
+      return
+    }
+    const controller = new AbortController()
+    const timer = setTimeout(() => {
+      searchFiles(query, { regex, caseSensitive, signal: controller.signal })
+        .then((data) => {
+          setResult(data)
+          setError(null)
+        })
+        .catch((error) => {
+          if (error?.name === 'AbortError') return
+          console.error('File search failed:', error)
+          setError(error?.message || 'Search failed')
+        })
+    }, SEARCH_DEBOUNCE_MS)
+    return () => {
+      clearTimeout(timer)
+      controller.abort()
+    }
+  }, [query, regex, caseSensitive, searchFiles])
+
+  const toggleClass = (active: boolean) => cn(
+    "h-6 w-6 rounded-md flex items-center justify-center text-muted-foreground hover:bg-muted",
+    active && "bg-primary/10 text-primary"
+  )
+
+  return (
+    <div className="flex flex-col h-full min-h-0">
+      <div className="p-2 border-b space-y-1">
+        <div className="relative">
+          <Input
+            autoFocus
+            placeholder="Find in files"
+            className="h-8 pr-16 text-sm"
+            value={query}
+            onChange={(e) => setQuery(e.target.value)}
+          />
+          <div className="absolute right-1 top-1 flex items-center gap-0.5">
+            <button type="button" className={toggleClass(caseSensitive)} onClick={() => setCaseSensitive(!caseSensitive)} title="Match Case">
+              <CaseSensitive className="h-4 w-4" />
+            </button>
+            <button type="button" className={toggleClass(regex)} onClick={() => setRegex(!regex)} title="Use Regular Expression">
+              <Regex className="h-4 w-4" />
+            </button>
+          </div>
+        </div>
+        {error ? (
+          <p className="text-xs text-destructive">{error}</p>
+        ) : result && (
+          <p className="text-xs text-muted-foreground">
+            {result.totalMatches}{result.truncated ? '+' : ''} results in {result.files.length} files
+          </p>
+        )}
+      </div>
+      <ScrollArea className="flex-1 p-1">
+        {result?.files.map((file) => (
+          <div key={file.path} className="mb-1">
+            <div className="flex items-center px-1.5 py-1 font-medium truncate" title={file.path}>
+              <FileIcon className="h-4 w-4 mr-2 text-blue-500 flex-shrink-0" />
+              <span className="truncate">{file.path}</span>
+              <span className="ml-auto pl-2 text-xs text-muted-foreground">{file.matches.length}</span>
+            </div>
+            {file.matches.map((match) => (
+              <button
+                key={`${match.line}:${match.column}`}
+                type="button"
+                className="block w-full truncate rounded-md py-0.5 pl-7 pr-1.5 text-left font-mono text-xs hover:bg-muted"
+                onClick={() => openFileAt(file.path, match.line, match.column)}
+              >
+                <span className="mr-2 text-muted-foreground">{match.line}</span>
+                {match.preview.slice(0, match.previewOffset).trimStart()}
+                <mark className="rounded-sm bg-yellow-200 text-foreground dark:bg-yellow-500/40">
+                  {match.preview.slice(match.previewOffset, match.previewOffset + match.length)}
+                </mark>
+                {match.preview.slice(match.previewOffset + match.length)}
+              </button>
+            ))}
+          </div>
+        ))}
+      </ScrollArea>
+    </div>
+  )
+}
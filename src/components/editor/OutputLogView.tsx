@@ -0,0 +1,203 @@
+"use client"
+
+import { useCallback, useEffect, useLayoutEffect, useRef, useState } from "react"
+import { ChevronDown, ChevronUp, Code, Image, Search, X } from "lucide-react"
+import { Input } from "@/components/ui/input"
+import { cn } from "@/lib/utils"
+import { appendedOutput, useEditorStore } from "@/lib/store"
+import { OutputLine, OutputLog } from "@/lib/output-log"
+
+// Every line is one row of this height, so the rows in view follow from the scroll position
+const LINE_HEIGHT = 20
+// Rows rendered above and below the viewport
+const OVERSCAN = 20
+
+const kindClass: Record<OutputLine['kind'], string> = {
+  plain: '',
+  error: 'text-red-600 dark:text-red-400',
+  info: 'text-blue-600 dark:text-blue-400',
+  image: 'text-blue-700 dark:text-blue-300 bg-blue-50 dark:bg-blue-900/20',
+  success: 'text-green-700 dark:text-green-300 bg-green-50 dark:bg-green-900/20',
+}
+
+/**
+ * The store's output as an OutputLog, kept up to date chunk by chunk.
+ * `version` changes whenever the log does.
+ */
+function useOutputLog() {
+  const [log] = useState(() => new OutputLog())
+  const [version, setVersion] = useState(0)
+
+  useEffect(() => {
+    log.reset(useEditorStore.getState().output)
+    setVersion(v => v + 1)
+    return useEditorStore.subscribe((state, previous) => {
+      if (state.output === previous.output) return
+      const appended = appendedOutput(previous.output, state.output)
+      if (appended !== null) log.append(appended)
+      else log.reset(state.output)
+      setVersion(v => v + 1)
+    })
+  }, [log])
+
+  return { log, version }
+}
+
+function OutputRow({ line, highlight }: { line: OutputLine, highlight?: 'match' | 'current' }) {
+  return (
+    <div
+      className={cn(
+        "whitespace-pre px-4",
+        kindClass[line.kind],
+        highlight === 'match' && "bg-yellow-100 dark:bg-yellow-500/20",
+        highlight === 'current' && "bg-yellow-200 dark:bg-yellow-500/40"
+      )}
+      style={{ height: LINE_HEIGHT, lineHeight: `${LINE_HEIGHT}px` }}
+    >
+      {line.kind === 'image' && <Image className="inline h-3.5 w-3.5 mr-1 -mt-0.5" />}
+      {line.kind === 'success' && <Code className="inline h-3.5 w-3.5 mr-1 -mt-0.5" />}
+      {line.segments.map((segment, index) => (
+        segment.style ? <span key={index} style={segment.style}>{segment.text}</span> : segment.text
+      ))}
+    </div>
+  )
+}
+
+/**
+ * Virtualized view of the output: only the rows in view are rendered, so
+ * its cost does not grow with the length of the output. Owns the subscription
+ * to the output, so streaming re-renders this view and nothing around it.
+ */
+export function OutputLogView({ onImagesChange }: { onImagesChange?: (hasImages: boolean) => void }) {
+  const { log, version } = useOutputLog()
+  const scrollRef = useRef<HTMLDivElement>(null)
+  const autoScrollRef = useRef(true)
+  const [scrollTop, setScrollTop] = useState(0)
+  const [viewportHeight, setViewportHeight] = useState(0)
+  const [query, setQuery] = useState('')
+  const [currentMatch, setCurrentMatch] = useState(0)
+
+  const lineCount = log.lineCount
+  const isEmpty = lineCount === 1 && log.line(0).text === ''
+  const matches = query ? log.search(query) : []
+  const hasImages = log.hasImages
+
+  useEffect(() => {
+    onImagesChange?.(hasImages)
+  }, [hasImages, onImagesChange])
+
+  useEffect(() => {
+    const container = scrollRef.current
+    if (!container) return
+    const observer = new ResizeObserver(() => setViewportHeight(container.clientHeight))
+    observer.observe(container)
+    setViewportHeight(container.clientHeight)
+    return () => observer.disconnect()
+  }, [])
+
+  // Follow new output while scrolled to the bottom
+  useLayoutEffect(() => {
+    const container = scrollRef.current
+    if (container && autoScrollRef.current) {
+      container.scrollTop = container.scrollHeight
+      setScrollTop(container.scrollTop)
+    }
+  }, [version])
+
+  const scrollToLine = useCallback((index: number) => {
+    const container = scrollRef.current
+    if (!container) return
+    autoScrollRef.current = false
+    container.scrollTop = Math.max(0, index * LINE_HEIGHT - container.clientHeight / 2)
+    setScrollTop(container.scrollTop)
+  }, [])
+
+  const handleScroll = useCallback((e: React.UIEvent<HTMLDivElement>) => {
+    const container = e.currentTarget
+    autoScrollRef.current = container.scrollHeight - container.scrollTop - container.clientHeight < 50
+    setScrollTop(container.scrollTop)
+  }, [])
+
+  const goToMatch = (step: number) => {
+    if (matches.length === 0) return
+    const next = (currentMatch + step + matches.length) % matches.length
+    setCurrentMatch(next)
+    scrollToLine(matches[next])
+  }
+
+  const handleSearchKeyDown = (e: React.KeyboardEvent<HTMLInputElement>) => {
+    if (e.key === 'Enter') {
+      e.preventDefault()
+      goToMatch(e.shiftKey ? -1 : 1)
+    } else if (e.key === 'Escape') {
+      setQuery('')
+    }
+  }
+
+  const first = Math.max(0, Math.floor(scrollTop / LINE_HEIGHT) - OVERSCAN)
+  const last = Math.min(lineCount, Math.ceil((scrollTop + viewportHeight) / LINE_HEIGHT) + OVERSCAN)
+  const matchSet = new Set<number>()
+  for (const index of matches) {
+    if (index >= first && index < last) matchSet.add(index)
+  }
+  const currentLine = matches.length > 0 ? matches[Math.min(currentMatch, matches.length - 1)] : -1
+
+  const rows = []
+  for (let index = first; index < last; index++) {
+    const highlight = index === currentLine ? 'current' : matchSet.has(index) ? 'match' : undefined
+    rows.push(<OutputRow key={index} line={log.line(index)} highlight={highlight} />)
+  }
+
+  return (
+    <div className="flex flex-col flex-1 min-h-0">
+      <div className="flex items-center gap-1 px-2 py-1 border-b">
+        <Search className="h-3.5 w-3.5 text-muted-foreground flex-shrink-0" />
+        <Input
+          placeholder="Search output"
+          className="h-7 text-xs border-none shadow-none focus-visible:ring-0"
+          value={query}
+          onChange={(e) => {
+            setQuery(e.target.value)
+            setCurrentMatch(0)
+          }}
+          onKeyDown={handleSearchKeyDown}
+        />
+        {query && (
+          <>
+            <span className="text-xs text-muted-foreground whitespace-nowrap">
+              {matches.length > 0 ? `${Math.min(currentMatch, matches.length - 1) + 1}/${matches.length}` : 'No results'}
+            </span>
+            <button type="button" className="h-6 w-6 rounded-md flex items-center justify-center hover:bg-muted" onClick={() => goToMatch(-1)} title="Previous Match">
+              <ChevronUp className="h-3.5 w-3.5" />
+            </button>
+            <button type="button" className="h-6 w-6 rounded-md flex items-center justify-center hover:bg-muted" onClick={() => goToMatch(1)} title="Next Match">
+              <ChevronDown className="h-3.5 w-3.5" />
+            </button>
+            <button type="button" className="h-6 w-6 rounded-md flex items-center justify-center hover:bg-muted" onClick={() => setQuery('')} title="Clear Search">
+              <X className="h-3.5 w-3.5" />
+            </button>
+          </>
+        )}
+      </div>
+      <div
+        ref={scrollRef}
+        onScroll={handleScroll}
+        className="flex-1 min-h-0 overflow-auto py-2 text-sm font-code output-scrollbar"
+        style={{
+          scrollbarWidth: 'auto',
+          scrollbarColor: '#9CA3AF #374151',
+          overscrollBehavior: 'contain', // Prevent scroll chaining to parent
+        }}
+      >
+        {isEmpty ? (
+          <span className="px-4 text-muted-foreground">Click the run button to see output.</span>
+        ) : (
+          // Only the rows in view are rendered; the padding stands in for the rest
+          <div style={{ height: lineCount * LINE_HEIGHT, paddingTop: first * LINE_HEIGHT, minWidth: 'max-content' }}>
+            {rows}
+          </div>
+        )}
+      </div>
+    </div>
+  )
+}
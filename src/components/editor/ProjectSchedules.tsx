@@ -0,0 +1,120 @@
+"use client"
+
+import { useState } from 'react'
+import { CalendarClock, ChevronDown, ChevronRight, Pause, Play, Trash2 } from 'lucide-react'
+import { Button } from '@/components/ui/button'
+import { Badge } from '@/components/ui/badge'
+import { Input } from '@/components/ui/input'
+import { useShallow } from 'zustand/react/shallow'
+import { selectScheduleSlice, useEditorStore } from '@/lib/store'
+import type { ScheduleRunRecord } from '@/lib/runner/schedules'
+
+const runVariant = {
+  succeeded: 'secondary',
+  failed: 'destructive',
+  cancelled: 'outline',
+  skipped: 'outline',
+} as const
+
+export function ProjectSchedules() {
+  const { schedules, activeFilePath, addSchedule, toggleSchedule, removeSchedule, fetchScheduleHistory } = useEditorStore(useShallow(selectScheduleSlice))
+  const [cron, setCron] = useState('0 2 * * *')
+  const [error, setError] = useState<string | null>(null)
+  const [expanded, setExpanded] = useState<string | null>(null)
+  const [history, setHistory] = useState<ScheduleRunRecord[]>([])
+
+  const handleAdd = async () => {
+    setError(null)
+    const result = await addSchedule(cron.trim())
+    if (!result.success) {
+      setError(result.error || 'Could not create schedule')
+    }
+  }
+
+  const toggleHistory = async (scheduleId: string) => {
+    if (expanded === scheduleId) {
+      setExpanded(null)
+      return
+    }
+    setExpanded(scheduleId)
+    setHistory(await fetchScheduleHistory(scheduleId))
+  }
+
+  return (
+    <div className="border-t p-2 text-sm">
+      <div className="flex items-center gap-2 mb-2">
+        <CalendarClock className="h-4 w-4 text-muted-foreground" />
+        <span className="font-medium">Schedules</span>
+        <span className="text-xs text-muted-foreground">(cron, UTC; skipped when inputs are unchanged)</span>
+      </div>
+      <div className="flex items-center gap-2 mb-2">
+        <span className="text-xs text-muted-foreground whitespace-nowrap">Run {activeFilePath || 'the active file'} at</span>
+        <Input value={cron} onChange={(e) => setCron(e.target.value)} className="h-7 font-code text-xs" placeholder="0 2 * * *" />
+        <Button size="sm" className="h-7" onClick={handleAdd} disabled={!activeFilePath || !cron.trim()}>Add</Button>
+      </div>
+      {error && <p className="text-xs text-red-600 dark:text-red-400 mb-2">{error}</p>}
+
+      {schedules.map(schedule => (
+        <div key={schedule.id} className="rounded border p-2 mb-2">
+          <div className="flex items-center justify-between gap-2">
+            <button className="flex items-center gap-2 min-w-0 text-left" onClick={() => toggleHistory(schedule.id)}>
+              {expanded === schedule.id ? <ChevronDown className="h-3 w-3" /> : <ChevronRight className="h-3 w-3" />}
+              <span className="font-code truncate">{schedule.fileName}</span>
+              <Badge variant="outline" className="font-code">{schedule.cron}</Badge>
+              {schedule.activeJobId && <Badge>running</Badge>}
+              <span className="text-xs text-muted-foreground whitespace-nowrap">
+                {schedule.enabled && schedule.nextRunAt ? `next ${new Date(schedule.nextRunAt).toLocaleString()}` : 'paused'}
+              </span>
+            </button>
+            <div className="flex items-center gap-1">
+              <Button
+                variant="ghost"
+                size="icon"
+                className="h-6 w-6"
+                onClick={() => toggleSchedule(schedule.id, !schedule.enabled)}
+                title={schedule.enabled ? 'Pause' : 'Resume'}
+              >
+                {schedule.enabled ? <Pause className="h-3 w-3" /> : <Play className="h-3 w-3" />}
+              </Button>
+              <Button variant="ghost" size="icon" className="h-6 w-6" onClick={() => removeSchedule(schedule.id)} title="Delete">
+                <Trash2 className="h-3 w-3" />
+              </Button>
+            </div>
+          </div>
+
+          {expanded === schedule.id && (
+            <div className="mt-2 space-y-1">
+              {history.length === 0 && <p className="text-xs text-muted-foreground">No runs yet.</p>}
+              {history.map(run => (
+                <div key={run.id} className="text-xs">
+                  <div className="flex items-center gap-2">
+                    <Badge variant={runVariant[run.status]}>{run.status}</Badge>
+                    <span className="text-muted-foreground">{new Date(run.startedAt).toLocaleString()}</span>
+                    {run.changedLines !== undefined && (
+                      <span className="text-muted-foreground">
+                        {run.changedLines === 0 ? 'output unchanged' : `${run.changedLines} output line(s) changed`}
+                      </span>
+                    )}
+                    {run.reason && run.status !== 'succeeded' && <span className="text-muted-foreground truncate">{run.reason}</span>}
+                  </div>
+                  {run.outputDiff && (
+                    <pre className="mt-1 p-2 bg-secondary/50 rounded font-code whitespace-pre-wrap max-h-40 overflow-y-auto">
+                      {run.outputDiff.split('\n').map((line, index) => (
+                        <div
+                          key={index}
+                          className={line.startsWith('+') ? 'text-green-600 dark:text-green-400' : line.startsWith('-') ? 'text-red-600 dark:text-red-400' : ''}
+                        >
+                          {line}
+                        </div>
+                      ))}
+                    </pre>
+                  )}
+                </div>
+              ))}
+            </div>
+          )}
+        </div>
+      ))}
+    </div>
+  )
+}
@@ -2,6 +2,7 @@
 
 import { useState, useRef, useEffect, useCallback } from 'react'
 import { Terminal as TerminalIcon, Loader2 } from 'lucide-react'
+import { useShallow } from 'zustand/react/shallow'
 import { useEditorStore } from '@/lib/store'
 
 interface TerminalHistory {
@@ -12,7 +13,7 @@ interface TerminalHistory {
 }
 
 export function Terminal() {
-  const { currentProject, currentUser } = useEditorStore()
+  const { currentProject, currentUser } = useEditorStore(useShallow(state => ({ currentProject: state.currentProject, currentUser: state.currentUser })))
   const [history, setHistory] = useState<TerminalHistory[]>([])
   const [currentCommand, setCurrentCommand] = useState('')
   const [isExecuting, setIsExecuting] = useState(false)
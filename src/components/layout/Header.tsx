@@ -1,6 +1,7 @@
 "use client"
 
 import Link from 'next/link'
+import { useEffect, useState } from 'react'
 import { Search, Bell, User, Settings, LogOut } from 'lucide-react'
 import { Button } from '@/components/ui/button'
 import { Input } from '@/components/ui/input'
@@ -15,13 +16,50 @@ import {
 import { Avatar, AvatarFallback, AvatarImage } from '@/components/ui/avatar'
 import { SidebarTrigger } from '@/components/ui/sidebar'
 import { useSidebar } from '@/components/ui/sidebar'
+import { useShallow } from 'zustand/react/shallow'
 import { useEditorStore } from '@/lib/store'
 import { useRouter } from 'next/navigation'
+import type { ProjectSearchResult } from '@/lib/project-search'
+
+// Wait for a pause in typing before searching
+const SEARCH_DEBOUNCE_MS = 250
 
 export function Header() {
   const { isMobile } = useSidebar()
-  const { logoutUser, currentUser } = useEditorStore()
+  const { logoutUser, currentUser, searchProjects } = useEditorStore(useShallow(state => ({
+    logoutUser: state.logoutUser,
+    currentUser: state.currentUser,
+    searchProjects: state.searchProjects,
+  })))
   const router = useRouter()
+  const [query, setQuery] = useState('')
+  const [results, setResults] = useState<ProjectSearchResult[]>([])
+  const [isResultsOpen, setIsResultsOpen] = useState(false)
+
+  useEffect(() => {
+    if (!query.trim()) {
+      setResults([])
+      return
+    }
+    const controller = new AbortController()
+    const timer = setTimeout(() => {
+      searchProjects(query, controller.signal)
+        .then(setResults)
+        .catch((error) => {
+          if (error?.name !== 'AbortError') console.error('Project search failed:', error)
+        })
+    }, SEARCH_DEBOUNCE_MS)
+    return () => {
+      clearTimeout(timer)
+      controller.abort()
+    }
+  }, [query, searchProjects])
+
+  const openResult = (result: ProjectSearchResult) => {
+    setIsResultsOpen(false)
+    setQuery('')
+    router.push(`/editor/${result.projectId}`)
+  }
 
   const handleLogout = async () => {
     await logoutUser()
@@ -32,14 +70,53 @@ export function Header() {
     <header className="sticky top-0 z-30 flex h-16 items-center gap-4 border-b bg-background/80 backdrop-blur-lg px-4 sm:px-6 lg:px-8">
       {(isMobile) && <SidebarTrigger />}
       <div className="flex-1">
-        <form>
-          <div className="relative">
+        <form
+          onSubmit={(e) => {
+            e.preventDefault()
+            if (results[0]) openResult(results[0])
+          }}
+        >
+          <div className="relative sm:w-[300px] md:w-[200px] lg:w-[300px]">
             <Search className="absolute left-2.5 top-2.5 h-4 w-4 text-muted-foreground" />
             <Input
               type="search"
               placeholder="Search projects..."
-              className="pl-8 sm:w-[300px] md:w-[200px] lg:w-[300px]"
+              className="pl-8"
+              value={query}
+              onChange={(e) => {
+                setQuery(e.target.value)
+                setIsResultsOpen(true)
+              }}
+              onFocus={() => setIsResultsOpen(true)}
+              onBlur={() => setIsResultsOpen(false)}
             />
+            {isResultsOpen && query.trim() && (
+              <div className="absolute left-0 right-0 top-11 z-40 max-h-96 overflow-y-auto rounded-md border bg-popover p-1 shadow-md">
+                {results.length === 0 ? (
+                  <p className="px-3 py-2 text-sm text-muted-foreground">No matching projects</p>
+                ) : results.map((result) => (
+                  <button
+                    key={result.projectId}
+                    type="button"
+                    className="block w-full rounded-sm px-3 py-2 text-left hover:bg-accent"
+                    // Keep the input focused until the click lands
+                    onMouseDown={(e) => e.preventDefault()}
+                    onClick={() => openResult(result)}
+                  >
+                    <div className="text-sm font-medium">{result.name}</div>
+                    {result.path && <div className="text-xs text-muted-foreground">{result.path}</div>}
+                    {result.snippet.length > 0 && (
+                      <div className="mt-1 line-clamp-2 text-xs text-muted-foreground">
+                        {result.snippet.map((part, index) => part.match
+                          ? <mark key={index} className="rounded-sm bg-yellow-200 px-0.5 text-foreground dark:bg-yellow-500/40">{part.text}</mark>
+                          : <span key={index}>{part.text}</span>
+                        )}
+                      </div>
+                    )}
+                  </button>
+                ))}
+              </div>
+            )}
           </div>
         </form>
       </div>
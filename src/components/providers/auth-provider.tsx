@@ -6,7 +6,6 @@ import { useEditorStore } from "@/lib/store";
 import { useRouter } from "next/navigation";
 
 export function AuthProvider({ children }: { children: React.ReactNode }) {
-    const { currentUser, projects } = useEditorStore();
     const router = useRouter();
     const supabase = createClient();
 
@@ -92,5 +91,14 @@ export function AuthProvider({ children }: { children: React.ReactNode }) {
         };
     }, [supabase, router]);
 
+    // Credits and usage are pushed by the server while signed in
+    const userId = useEditorStore(state => state.currentUser?.id);
+    useEffect(() => {
+        if (!userId || userId === 'demo_1') return;
+        const { connectUsageStream, disconnectUsageStream } = useEditorStore.getState();
+        connectUsageStream();
+        return () => disconnectUsageStream();
+    }, [userId]);
+
     return <>{children}</>;
 }
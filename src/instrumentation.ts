@@ -0,0 +1,15 @@
+/**
+ * Next.js startup hook: finalize and clean up background jobs, and run
+ * project schedules in the web server unless they are handled by a separate
+ * `npm run runner:scheduler` process
+ */
+export async function register() {
+  if (process.env.NEXT_RUNTIME === 'nodejs') {
+    const { startJobMaintenance } = await import('./lib/runner/background-jobs');
+    startJobMaintenance();
+  }
+  if (process.env.NEXT_RUNTIME === 'nodejs' && process.env.PYCODE_SCHEDULER !== 'off') {
+    const { startScheduler } = await import('./lib/runner/scheduler');
+    startScheduler();
+  }
+}
@@ -0,0 +1,412 @@
+/**
+ * Find-in-files for the editor (GET /api/files/search).
+ *
+ * An in-process trigram index over project files: every file body is split
+ * into its (lowercased) three-character substrings, and a query only looks at
+ * the files that contain all trigrams of the literal text it requires, then
+ * confirms the matches in those files. Bodies are keyed by content hash, like
+ * file_contents, so identical files are indexed once however many projects
+ * share them, and keeping a project current only touches the files whose
+ * hash changed since the last sync.
+ *
+ * Regular expressions come from the user and can backtrack for a very long
+ * time, so regex matches are confirmed in a worker thread that is terminated
+ * when it runs past REGEX_SEARCH_TIMEOUT_MS; literal queries stay in-process.
+ */
+
+import { Worker } from 'worker_threads';
+
+export interface CodeSearchOptions {
+  query: string;
+  regex?: boolean;
+  caseSensitive?: boolean;
+  /** Matches to return at most, over all files */
+  maxMatches?: number;
+}
+
+export interface CodeSearchMatch {
+  /** 1-based, like Monaco */
+  line: number;
+  column: number;
+  length: number;
+  /** The line, cut around the match when it is long */
+  preview: string;
+  /** Where the match starts in preview, 0-based */
+  previewOffset: number;
+}
+
+export interface CodeSearchFileResult {
+  path: string;
+  matches: CodeSearchMatch[];
+}
+
+export interface CodeSearchResult {
+  files: CodeSearchFileResult[];
+  totalMatches: number;
+  truncated: boolean;
+  /** Files the trigram filter left to be scanned */
+  scannedFiles: number;
+  /** The regex ran past the time limit; no matches are reported */
+  timedOut?: boolean;
+}
+
+export type ContentLoader = (hashes: string[]) => Promise<Map<string, string>>;
+
+interface IndexedDocument {
+  content: string;
+  trigrams: string[];
+  projects: number;
+}
+
+const DEFAULT_MAX_MATCHES = 500;
+const MAX_PREVIEW_LENGTH = 200;
+// Regex matching works line by line on at most this much of each line
+const MAX_REGEX_LINE_LENGTH = 4000;
+// A regex search is abandoned after this long
+const REGEX_SEARCH_TIMEOUT_MS = Number(process.env.PYCODE_REGEX_SEARCH_TIMEOUT_MS) || 2000;
+// Indexes kept in memory; the least recently searched project goes first
+const MAX_PROJECTS = Number(process.env.PYCODE_CODE_SEARCH_PROJECTS) || 100;
+
+// Runs in a worker thread: matches workerData.pattern in each document, line
+// by line, and posts back a CodeSearchResult
+const REGEX_WORKER_SOURCE = `
+const { parentPort, workerData } = require('worker_threads');
+const { documents, source, flags, maxMatches, maxLineLength, maxPreviewLength } = workerData;
+const pattern = new RegExp(source, flags);
+const result = { files: [], totalMatches: 0, truncated: false, scannedFiles: 0 };
+for (const document of documents) {
+  result.scannedFiles++;
+  const matches = [];
+  const lines = document.content.split('\\n');
+  for (let index = 0; index < lines.length && result.totalMatches + matches.length < maxMatches; index++) {
+    const line = lines[index].slice(0, maxLineLength);
+    pattern.lastIndex = 0;
+    let match;
+    while ((match = pattern.exec(line)) && result.totalMatches + matches.length < maxMatches) {
+      if (match[0].length === 0) {
+        pattern.lastIndex++;
+        continue;
+      }
+      const previewStart = line.length > maxPreviewLength ? Math.max(0, match.index - 60) : 0;
+      matches.push({
+        line: index + 1,
+        column: match.index + 1,
+        length: match[0].length,
+        preview: line.slice(previewStart, previewStart + maxPreviewLength),
+        previewOffset: match.index - previewStart,
+      });
+    }
+  }
+  if (matches.length > 0) {
+    result.files.push({ path: document.path, matches });
+    result.totalMatches += matches.length;
+  }
+  if (result.totalMatches >= maxMatches) {
+    result.truncated = true;
+    break;
+  }
+}
+parentPort.postMessage(result);
+`;
+
+function runRegexSearch(documents: { path: string; content: string }[], source: string, flags: string, maxMatches: number): Promise<CodeSearchResult> {
+  return new Promise((resolve, reject) => {
+    const worker = new Worker(REGEX_WORKER_SOURCE, {
+      eval: true,
+      workerData: {
+        documents,
+        source,
+        flags,
+        maxMatches,
+        maxLineLength: MAX_REGEX_LINE_LENGTH,
+        maxPreviewLength: MAX_PREVIEW_LENGTH,
+      },
+      resourceLimits: { maxOldGenerationSizeMb: 256 },
+    });
+    const timer = setTimeout(() => {
+      worker.terminate();
+      resolve({ files: [], totalMatches: 0, truncated: false, scannedFiles: 0, timedOut: true });
+    }, REGEX_SEARCH_TIMEOUT_MS);
+    worker.once('message', (result: CodeSearchResult) => {
+      clearTimeout(timer);
+      resolve(result);
+    });
+    worker.once('error', (error) => {
+      clearTimeout(timer);
+      reject(error);
+    });
+    worker.once('exit', (code) => {
+      clearTimeout(timer);
+      if (code !== 0) reject(new Error(`Regex search worker exited with code ${code}`));
+    });
+  });
+}
+
+function trigramsOf(text: string): Set<string> {
+  const grams = new Set<string>();
+  const lower = text.toLowerCase();
+  for (let i = 0; i + 3 <= lower.length; i++) {
+    grams.add(lower.slice(i, i + 3));
+  }
+  return grams;
+}
+
+/**
+ * Literal runs every match of a regex must contain. Conservative: top-level
+ * alternation or anything unusual yields no runs, which means "scan all".
+ */
+export function requiredLiterals(source: string): string[] {
+  const runs: string[] = [];
+  let current = '';
+  let depth = 0;
+  let inClass = false;
+  const flush = () => {
+    if (current.length >= 3) runs.push(current);
+    current = '';
+  };
+
+  for (let i = 0; i < source.length; i++) {
+    const char = source[i];
+    if (inClass) {
+      if (char === '\\') i++;
+      else if (char === ']') inClass = false;
+      continue;
+    }
+    switch (char) {
+      case '\\': {
+        const next = source[i + 1];
+        i++;
+        if (next !== undefined && /[^A-Za-z0-9]/.test(next)) {
+          if (depth === 0) current += next;
+        } else {
+          // \d, \w, \b, \1 ... are not literal text
+          flush();
+          // and \x41, \u0041, \u{41}, \cA, \k<name> have arguments to skip
+          if (next === 'x') i += 2;
+          else if (next === 'c') i += 1;
+          else if (next === 'u' && source[i + 1] !== '{') i += 4;
+          else if (next === 'u' || next === 'k') {
+            const close = source.indexOf(next === 'u' ? '}' : '>', i);
+            if (close !== -1) i = close;
+          }
+        }
+        break;
+      }
+      case '|':
+        if (depth === 0) return [];
+        break;
+      case '(':
+        flush();
+        depth++;
+        break;
+      case ')':
+        depth = Math.max(0, depth - 1);
+        break;
+      case '[':
+        flush();
+        inClass = true;
+        break;
+      case '?':
+      case '*':
+      case '{':
+        // The preceding character may be absent
+        if (depth === 0) current = current.slice(0, -1);
+        flush();
+        if (char === '{') {
+          const close = source.indexOf('}', i);
+          if (close !== -1) i = close;
+        }
+        break;
+      case '+':
+      case '.':
+      case '^':
+      case '$':
+        flush();
+        break;
+      default:
+        if (depth === 0) current += char;
+    }
+  }
+  flush();
+  return runs;
+}
+
+function escapeRegExp(text: string): string {
+  return text.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+}
+
+export class CodeSearchIndex {
+  private documents = new Map<string, IndexedDocument>();
+  private postings = new Map<string, Set<string>>();
+  // projectId -> path -> content hash; Map order is least recently used first
+  private projects = new Map<string, Map<string, string>>();
+  // Syncs run one at a time so reference counts stay consistent
+  private syncQueue: Promise<void> = Promise.resolve();
+
+  /**
+   * Bring a project to the given set of files. Only bodies of hashes not
+   * indexed yet are loaded; files that are gone are dropped.
+   */
+  syncProject(projectId: string, files: { path: string; hash: string }[], load: ContentLoader): Promise<void> {
+    const sync = this.syncQueue.then(() => this.applySync(projectId, files, load));
+    this.syncQueue = sync.catch(() => undefined);
+    return sync;
+  }
+
+  private async applySync(projectId: string, files: { path: string; hash: string }[], load: ContentLoader): Promise<void> {
+    const previous = this.projects.get(projectId) || new Map<string, string>();
+    const next = new Map(files.map(file => [file.path, file.hash]));
+
+    const missing = Array.from(new Set(files.map(file => file.hash))).filter(hash => !this.documents.has(hash));
+    const contents = missing.length > 0 ? await load(missing) : new Map<string, string>();
+    for (const hash of missing) {
+      this.addDocument(hash, contents.get(hash) ?? '');
+    }
+
+    const before = new Set(previous.values());
+    const after = new Set(next.values());
+    after.forEach(hash => {
+      if (!before.has(hash)) this.documents.get(hash)!.projects++;
+    });
+    before.forEach(hash => {
+      if (!after.has(hash)) this.release(hash);
+    });
+
+    this.projects.delete(projectId);
+    this.projects.set(projectId, next);
+    this.evict();
+  }
+
+  dropProject(projectId: string): void {
+    const files = this.projects.get(projectId);
+    if (!files) return;
+    this.projects.delete(projectId);
+    new Set(files.values()).forEach(hash => this.release(hash));
+  }
+
+  hasProject(projectId: string): boolean {
+    return this.projects.has(projectId);
+  }
+
+  async search(projectId: string, options: CodeSearchOptions): Promise<CodeSearchResult> {
+    const files = this.projects.get(projectId) || new Map<string, string>();
+    if (this.projects.has(projectId)) {
+      // Most recently used last
+      this.projects.delete(projectId);
+      this.projects.set(projectId, files);
+    }
+    const maxMatches = options.maxMatches ?? DEFAULT_MAX_MATCHES;
+    const flags = options.caseSensitive ? 'g' : 'gi';
+
+    // Files whose body has every required trigram
+    const literals = options.regex ? requiredLiterals(options.query) : [options.query];
+    const required = new Set<string>();
+    literals.forEach(literal => trigramsOf(literal).forEach(gram => required.add(gram)));
+    // Rarest trigrams first, so the candidate set shrinks fastest
+    const grams = Array.from(required).sort((a, b) => (this.postings.get(a)?.size || 0) - (this.postings.get(b)?.size || 0));
+    let candidates = new Set(files.values());
+    for (const gram of grams) {
+      const posting = this.postings.get(gram);
+      candidates = new Set(posting ? Array.from(candidates).filter(hash => posting.has(hash)) : []);
+      if (candidates.size === 0) break;
+    }
+
+    const paths = Array.from(files.keys()).sort();
+    if (options.regex) {
+      const documents = paths
+        .filter(path => candidates.has(files.get(path)!) && this.documents.has(files.get(path)!))
+        .map(path => ({ path, content: this.documents.get(files.get(path)!)!.content }));
+      return runRegexSearch(documents, options.query, flags, maxMatches);
+    }
+
+    const pattern = new RegExp(escapeRegExp(options.query), flags);
+    const result: CodeSearchResult = { files: [], totalMatches: 0, truncated: false, scannedFiles: 0 };
+    for (const path of paths) {
+      const hash = files.get(path)!;
+      if (!candidates.has(hash)) continue;
+      const document = this.documents.get(hash);
+      if (!document) continue;
+      result.scannedFiles++;
+
+      const matches = this.matchDocument(document.content, pattern, maxMatches - result.totalMatches);
+      if (matches.length > 0) {
+        result.files.push({ path, matches });
+        result.totalMatches += matches.length;
+      }
+      if (result.totalMatches >= maxMatches) {
+        result.truncated = true;
+        break;
+      }
+    }
+    return result;
+  }
+
+  private matchDocument(content: string, pattern: RegExp, limit: number): CodeSearchMatch[] {
+    const matches: CodeSearchMatch[] = [];
+    const lines = content.split('\n');
+    for (let index = 0; index < lines.length && matches.length < limit; index++) {
+      const line = lines[index];
+      pattern.lastIndex = 0;
+      let match: RegExpExecArray | null;
+      while ((match = pattern.exec(line)) && matches.length < limit) {
+        if (match[0].length === 0) {
+          // Empty matches (e.g. ^) would never advance
+          pattern.lastIndex++;
+          continue;
+        }
+        const previewStart = line.length > MAX_PREVIEW_LENGTH ? Math.max(0, match.index - 60) : 0;
+        matches.push({
+          line: index + 1,
+          column: match.index + 1,
+          length: match[0].length,
+          preview: line.slice(previewStart, previewStart + MAX_PREVIEW_LENGTH),
+          previewOffset: match.index - previewStart,
+        });
+      }
+    }
+    return matches;
+  }
+
+  private addDocument(hash: string, content: string) {
+    const trigrams = Array.from(trigramsOf(content));
+    for (const gram of trigrams) {
+      let posting = this.postings.get(gram);
+      if (!posting) {
+        posting = new Set();
+        this.postings.set(gram, posting);
+      }
+      posting.add(hash);
+    }
+    this.documents.set(hash, { content, trigrams, projects: 0 });
+  }
+
+  private release(hash: string) {
+    const document = this.documents.get(hash);
+    if (!document) return;
+    document.projects--;
+    if (document.projects > 0) return;
+
+    for (const gram of document.trigrams) {
+      const posting = this.postings.get(gram);
+      posting?.delete(hash);
+      if (posting && posting.size === 0) this.postings.delete(gram);
+    }
+    this.documents.delete(hash);
+  }
+
+  private evict() {
+    while (this.projects.size > MAX_PROJECTS) {
+      const oldest = this.projects.keys().next().value as string;
+      this.dropProject(oldest);
+    }
+  }
+}
+
+const globalForCodeSearch = globalThis as unknown as { pycodeCodeSearch?: CodeSearchIndex };
+
+export function getCodeSearchIndex(): CodeSearchIndex {
+  if (!globalForCodeSearch.pycodeCodeSearch) {
+    globalForCodeSearch.pycodeCodeSearch = new CodeSearchIndex();
+  }
+  return globalForCodeSearch.pycodeCodeSearch;
+}
@@ -0,0 +1,220 @@
+import { createHash } from 'crypto';
+import type { SupabaseClient } from '@supabase/supabase-js';
+
+/**
+ * Content-addressed storage for project files.
+ *
+ * File bodies live in the file_contents table keyed by the SHA-256 of their
+ * text, so a body shared by many projects (the template main.py, copies of a
+ * dataset) is stored once. projects.file_tree is only the manifest: the
+ * folder structure with each file's contentHash and size. Trees written
+ * before this still have inline `content`; they are read as they are and
+ * converted on their next save.
+ */
+
+export interface ManifestNode {
+  name: string;
+  type: 'file' | 'folder';
+  children?: ManifestNode[];
+  /** Body of a file that still has to be (or never was) moved to file_contents */
+  content?: string;
+  contentHash?: string;
+  size?: number;
+  uploadPath?: string;
+}
+
+// Keeps `in (...)` filters well under URL length limits
+const HASH_BATCH_SIZE = 100;
+
+export function hashContent(content: string): string {
+  return createHash('sha256').update(content, 'utf8').digest('hex');
+}
+
+function walkFiles(node: ManifestNode, visit: (file: ManifestNode) => void) {
+  for (const child of node.children || []) {
+    if (child.type === 'file') {
+      visit(child);
+    } else {
+      walkFiles(child, visit);
+    }
+  }
+}
+
+/**
+ * Move every inline body of the tree into file_contents (only bodies that are
+ * not stored yet are sent) and return the manifest to save in its place.
+ * Files without content keep their contentHash. Bodies already stored are
+ * touched (touch_file_contents), so collect_file_contents cannot remove them
+ * before the manifest that refers to them is saved.
+ */
+export async function storeFileContents(supabase: SupabaseClient, tree: ManifestNode): Promise<ManifestNode> {
+  const manifest: ManifestNode = JSON.parse(JSON.stringify(tree));
+  const bodies = new Map<string, string>();
+
+  walkFiles(manifest, (file) => {
+    if (typeof file.content !== 'string' && file.contentHash) return;
+    const content = typeof file.content === 'string' ? file.content : '';
+    const hash = hashContent(content);
+    bodies.set(hash, content);
+    file.contentHash = hash;
+    file.size = Buffer.byteLength(content, 'utf8');
+    delete file.content;
+  });
+
+  const hashes = Array.from(bodies.keys());
+  for (let i = 0; i < hashes.length; i += HASH_BATCH_SIZE) {
+    const batch = hashes.slice(i, i + HASH_BATCH_SIZE);
+    const { data: existing, error: touchError } = await supabase
+      .rpc('touch_file_contents', { p_hashes: batch });
+    if (touchError) throw touchError;
+
+    const stored = new Set((existing || []).map((row: { hash: string }) => row.hash));
+    const missing = batch
+      .filter(hash => !stored.has(hash))
+      .map(hash => ({ hash, content: bodies.get(hash)!, size: Buffer.byteLength(bodies.get(hash)!, 'utf8') }));
+    if (missing.length === 0) continue;
+
+    const { error } = await supabase
+      .from('file_contents')
+      .upsert(missing, { onConflict: 'hash', ignoreDuplicates: true });
+    if (error) throw error;
+  }
+
+  return manifest;
+}
+
+/**
+ * Bodies for a set of content hashes; unknown hashes are left out
+ */
+export async function fetchFileContents(supabase: SupabaseClient, hashes: string[]): Promise<Map<string, string>> {
+  const contents = new Map<string, string>();
+  const unique = Array.from(new Set(hashes));
+  for (let i = 0; i < unique.length; i += HASH_BATCH_SIZE) {
+    const { data, error } = await supabase
+      .from('file_contents')
+      .select('hash, content')
+      .in('hash', unique.slice(i, i + HASH_BATCH_SIZE));
+    if (error) throw error;
+    for (const row of data || []) {
+      contents.set(row.hash, row.content);
+    }
+  }
+  return contents;
+}
+
+/**
+ * Bodies for a set of content hashes, limited to those a project of the user
+ * refers to (owned_file_contents RPC, service-role client only)
+ */
+export async function fetchOwnedFileContents(
+  supabase: SupabaseClient,
+  userId: string,
+  hashes: string[],
+): Promise<Map<string, string>> {
+  const contents = new Map<string, string>();
+  const unique = Array.from(new Set(hashes));
+  for (let i = 0; i < unique.length; i += HASH_BATCH_SIZE) {
+    const { data, error } = await supabase.rpc('owned_file_contents', {
+      p_user_id: userId,
+      p_hashes: unique.slice(i, i + HASH_BATCH_SIZE),
+    });
+    if (error) throw error;
+    for (const row of data || []) {
+      contents.set(row.hash, row.content);
+    }
+  }
+  return contents;
+}
+
+/**
+ * Put the bodies back into the given files of a manifest (all files when no
+ * filter is given), in place. Throws when a body is missing from
+ * file_contents rather than reading it as an empty file.
+ */
+export async function hydrateFiles(
+  supabase: SupabaseClient,
+  tree: ManifestNode,
+  filter: (file: ManifestNode) => boolean = () => true,
+): Promise<ManifestNode> {
+  const files: ManifestNode[] = [];
+  walkFiles(tree, (file) => {
+    if (typeof file.content !== 'string' && file.contentHash && filter(file)) {
+      files.push(file);
+    }
+  });
+  if (files.length === 0) return tree;
+
+  const contents = await fetchFileContents(supabase, files.map(file => file.contentHash!));
+  const missing = files.filter(file => !contents.has(file.contentHash!));
+  if (missing.length > 0) {
+    throw new Error(`Stored contents missing for ${missing.map(file => file.name).join(', ')}`);
+  }
+  for (const file of files) {
+    file.content = contents.get(file.contentHash!)!;
+  }
+  return tree;
+}
+
+export interface ManifestSummary {
+  fileCount: number;
+  /** Bytes of all file bodies */
+  totalSize: number;
+  mainLanguage: string | null;
+}
+
+const LANGUAGES_BY_EXTENSION: Record<string, string> = {
+  py: 'Python',
+  ipynb: 'Jupyter Notebook',
+  js: 'JavaScript',
+  ts: 'TypeScript',
+  html: 'HTML',
+  css: 'CSS',
+  sql: 'SQL',
+  sh: 'Shell',
+  md: 'Markdown',
+  json: 'JSON',
+  yaml: 'YAML',
+  yml: 'YAML',
+  toml: 'TOML',
+  csv: 'CSV',
+  txt: 'Text',
+};
+
+// Data and prose only decide the main language of projects without code
+const NON_CODE_LANGUAGES = new Set(['Markdown', 'JSON', 'YAML', 'TOML', 'CSV', 'Text']);
+
+/**
+ * Derived stats stored with a project for its list entry (file_count,
+ * total_size, main_language): the main language is the one with the most
+ * bytes, by file extension
+ */
+export function summarizeManifest(manifest: ManifestNode): ManifestSummary {
+  let fileCount = 0;
+  let totalSize = 0;
+  const bytesByLanguage = new Map<string, number>();
+
+  walkFiles(manifest, (file) => {
+    const size = file.size ?? (typeof file.content === 'string' ? Buffer.byteLength(file.content, 'utf8') : 0);
+    fileCount++;
+    totalSize += size;
+    const extension = file.name.includes('.') ? file.name.split('.').pop()!.toLowerCase() : '';
+    const language = LANGUAGES_BY_EXTENSION[extension];
+    if (language) {
+      // Empty files still count, just below any file with content
+      bytesByLanguage.set(language, (bytesByLanguage.get(language) || 0) + size + 1);
+    }
+  });
+
+  let mainLanguage: string | null = null;
+  let best = { isCode: false, bytes: -1 };
+  for (const [language, bytes] of bytesByLanguage) {
+    // Any code language outranks every non-code one
+    const isCode = !NON_CODE_LANGUAGES.has(language);
+    if ((isCode && !best.isCode) || (isCode === best.isCode && bytes > best.bytes)) {
+      best = { isCode, bytes };
+      mainLanguage = language;
+    }
+  }
+
+  return { fileCount, totalSize, mainLanguage };
+}
@@ -0,0 +1,145 @@
+import type { FileOrFolder } from './store';
+
+/**
+ * Normalized file tree of the open project, as kept in the editor store.
+ *
+ * Files are looked up by their project-relative path (snake_game/game.py), so
+ * an edit touches one entry instead of walking the tree, and two files with
+ * the same name in different folders stay apart. Folders exist only as keys
+ * of `children` ('' is the project root); the nested tree that saves, runs
+ * and downloads need is rebuilt from the index by buildFileTree.
+ *
+ * The helpers that change an index mutate it in place and are meant to be
+ * called on an immer draft. The maps have no prototype, so paths such as
+ * `constructor` or `__proto__` are ordinary keys.
+ */
+
+type File = Extract<FileOrFolder, { type: 'file' }>;
+type Folder = Extract<FileOrFolder, { type: 'folder' }>;
+
+export type FileIndex = {
+  /** Name of the root folder (the project) */
+  rootName: string;
+  /** path -> file */
+  files: Record<string, File>;
+  /** folder path -> paths of its files and folders, in order */
+  children: Record<string, string[]>;
+  /** file or folder path -> path of the folder it is in */
+  parents: Record<string, string>;
+};
+
+export const joinPath = (folder: string, name: string) => (folder ? `${folder}/${name}` : name);
+
+export const baseName = (path: string) => path.slice(path.lastIndexOf('/') + 1);
+
+const emptyRecord = <T>(): Record<string, T> => Object.create(null);
+
+export function emptyFileIndex(rootName: string): FileIndex {
+  const children = emptyRecord<string[]>();
+  children[''] = [];
+  return { rootName, files: emptyRecord(), children, parents: emptyRecord() };
+}
+
+/**
+ * A name for a new item in a folder that nothing there has yet: the name
+ * itself, or data (1).csv, data (2).csv, ...
+ */
+function freeName(index: FileIndex, folder: string, name: string): string {
+  if (!(joinPath(folder, name) in index.parents)) return name;
+  const dot = name.lastIndexOf('.');
+  const stem = dot > 0 ? name.slice(0, dot) : name;
+  const extension = dot > 0 ? name.slice(dot) : '';
+  let copy = 1;
+  while (joinPath(folder, `${stem} (${copy})${extension}`) in index.parents) copy++;
+  return `${stem} (${copy})${extension}`;
+}
+
+/**
+ * Add a file or a whole folder under a folder of the index; returns its
+ * path. Nothing already there is replaced: an item whose name is taken is
+ * added under a free one (see freeName).
+ */
+export function addIndexedItem(index: FileIndex, folder: string, item: FileOrFolder): string {
+  const name = freeName(index, folder, item.name);
+  if (name !== item.name) item = { ...item, name };
+  const path = joinPath(folder, name);
+
+  const siblings = index.children[folder] || (index.children[folder] = []);
+  siblings.push(path);
+  index.parents[path] = folder;
+  if (item.type === 'file') {
+    index.files[path] = item;
+  } else {
+    index.children[path] = [];
+    for (const child of item.children || []) {
+      addIndexedItem(index, path, child);
+    }
+  }
+  return path;
+}
+
+/**
+ * Remove a file, or a folder with everything in it
+ */
+export function removeIndexedItem(index: FileIndex, path: string): void {
+  if (!(path in index.parents)) return;
+  for (const child of [...(index.children[path] || [])]) {
+    removeIndexedItem(index, child);
+  }
+  delete index.children[path];
+  delete index.files[path];
+
+  const siblings = index.children[index.parents[path]];
+  const position = siblings ? siblings.indexOf(path) : -1;
+  if (position !== -1) siblings.splice(position, 1);
+  delete index.parents[path];
+}
+
+/**
+ * Create the folders of a path that do not exist yet; returns the path, or
+ * null (creating nothing) when a file is in the way
+ */
+export function ensureIndexedFolder(index: FileIndex, folder: string): string | null {
+  if (!folder || folder in index.children) return folder;
+  if (folder in index.files) return null;
+  const parent = folder.includes('/') ? folder.slice(0, folder.lastIndexOf('/')) : '';
+  if (ensureIndexedFolder(index, parent) === null) return null;
+  addIndexedItem(index, parent, { name: baseName(folder), type: 'folder', children: [] });
+  return folder;
+}
+
+export function indexFileTree(tree: Folder): FileIndex {
+  const index = emptyFileIndex(tree.name);
+  for (const item of tree.children || []) {
+    addIndexedItem(index, '', item);
+  }
+  return index;
+}
+
+export function buildFileTree(index: FileIndex, folder = ''): Folder {
+  const children: FileOrFolder[] = (index.children[folder] || []).map(path =>
+    path in index.files ? index.files[path] : buildFileTree(index, path)
+  );
+  return { name: folder ? baseName(folder) : index.rootName, type: 'folder', children };
+}
+
+/**
+ * Paths of every file, folder by folder in tree order
+ */
+export function listFilePaths(index: FileIndex, folder = ''): string[] {
+  const paths: string[] = [];
+  for (const path of index.children[folder] || []) {
+    if (path in index.files) paths.push(path);
+    else paths.push(...listFilePaths(index, path));
+  }
+  return paths;
+}
+
+/**
+ * A file given by path, or by bare name for callers that only know the name
+ * (the first such file in tree order)
+ */
+export function resolveFilePath(index: FileIndex, pathOrName: string): string | null {
+  if (pathOrName in index.files) return pathOrName;
+  return listFilePaths(index).find(path => baseName(path) === pathOrName) ?? null;
+}
@@ -0,0 +1,205 @@
+/**
+ * Line index of the output console, built as output arrives.
+ *
+ * Appended text is split into lines once; earlier lines are never looked at
+ * again, so a run printing 100k lines costs the same per chunk at the end as
+ * at the start. The console renders only the lines in view, and their ANSI
+ * colours and kind (error, info, image...) are parsed when a line is first
+ * shown and then cached.
+ */
+
+export type OutputLineKind = 'plain' | 'error' | 'info' | 'image' | 'success';
+
+export interface AnsiSegment {
+  text: string;
+  /** Inline style for the SGR attributes in effect, if any */
+  style?: {
+    color?: string;
+    backgroundColor?: string;
+    fontWeight?: number;
+    fontStyle?: 'italic';
+    textDecoration?: 'underline';
+    opacity?: number;
+  };
+}
+
+export interface OutputLine {
+  kind: OutputLineKind;
+  /** The line without escape sequences */
+  text: string;
+  segments: AnsiSegment[];
+}
+
+const IMAGE_PATTERN = /\.(png|jpg|jpeg|gif|bmp|svg|webp)/i;
+// CSI sequences: colours (...m) and cursor/erase commands, which are dropped
+const ESCAPE_PATTERN = /\x1b\[([0-9;?]*)([A-Za-z])/g;
+// Parsed lines kept; only lines that have been on screen are ever parsed
+const MAX_PARSED_LINES = 5000;
+
+const ANSI_COLORS = ['#000000', '#cd3131', '#0dbc79', '#e5e510', '#2472c8', '#bc3fbc', '#11a8cd', '#e5e5e5'];
+const ANSI_BRIGHT_COLORS = ['#666666', '#f14c4c', '#23d18b', '#f5f543', '#3b8eea', '#d670d6', '#29b8db', '#ffffff'];
+
+function color256(n: number): string {
+  if (n < 8) return ANSI_COLORS[n];
+  if (n < 16) return ANSI_BRIGHT_COLORS[n - 8];
+  if (n >= 232) {
+    const level = 8 + (n - 232) * 10;
+    return `rgb(${level}, ${level}, ${level})`;
+  }
+  const cube = n - 16;
+  const level = (value: number) => (value === 0 ? 0 : 55 + value * 40);
+  return `rgb(${level(Math.floor(cube / 36))}, ${level(Math.floor(cube / 6) % 6)}, ${level(cube % 6)})`;
+}
+
+function applySgr(style: NonNullable<AnsiSegment['style']>, params: string): NonNullable<AnsiSegment['style']> {
+  const codes = params ? params.split(';').map(Number) : [0];
+  let next = { ...style };
+  for (let i = 0; i < codes.length; i++) {
+    const code = codes[i];
+    if (code === 0) next = {};
+    else if (code === 1) next.fontWeight = 700;
+    else if (code === 2) next.opacity = 0.7;
+    else if (code === 3) next.fontStyle = 'italic';
+    else if (code === 4) next.textDecoration = 'underline';
+    else if (code === 22) { delete next.fontWeight; delete next.opacity; }
+    else if (code === 23) delete next.fontStyle;
+    else if (code === 24) delete next.textDecoration;
+    else if (code >= 30 && code <= 37) next.color = ANSI_COLORS[code - 30];
+    else if (code >= 90 && code <= 97) next.color = ANSI_BRIGHT_COLORS[code - 90];
+    else if (code === 39) delete next.color;
+    else if (code >= 40 && code <= 47) next.backgroundColor = ANSI_COLORS[code - 40];
+    else if (code >= 100 && code <= 107) next.backgroundColor = ANSI_BRIGHT_COLORS[code - 100];
+    else if (code === 49) delete next.backgroundColor;
+    else if (code === 38 || code === 48) {
+      // 38;5;n and 38;2;r;g;b (48 for the background)
+      let value: string | undefined;
+      if (codes[i + 1] === 5) {
+        value = color256(codes[i + 2] || 0);
+        i += 2;
+      } else if (codes[i + 1] === 2) {
+        value = `rgb(${codes[i + 2] || 0}, ${codes[i + 3] || 0}, ${codes[i + 4] || 0})`;
+        i += 4;
+      }
+      if (value) {
+        if (code === 38) next.color = value;
+        else next.backgroundColor = value;
+      }
+    }
+  }
+  return next;
+}
+
+/**
+ * Split a line into runs of text with the colours in effect. Colours do not
+ * carry over from one line to the next.
+ */
+export function parseAnsiLine(line: string): AnsiSegment[] {
+  if (!line.includes('\x1b')) return [{ text: line }];
+
+  const segments: AnsiSegment[] = [];
+  let style: NonNullable<AnsiSegment['style']> = {};
+  let position = 0;
+  const push = (text: string) => {
+    if (!text) return;
+    segments.push(Object.keys(style).length > 0 ? { text, style } : { text });
+  };
+
+  ESCAPE_PATTERN.lastIndex = 0;
+  let match: RegExpExecArray | null;
+  while ((match = ESCAPE_PATTERN.exec(line))) {
+    push(line.slice(position, match.index));
+    if (match[2] === 'm') style = applySgr(style, match[1]);
+    position = match.index + match[0].length;
+  }
+  push(line.slice(position));
+  return segments;
+}
+
+function classify(text: string): OutputLineKind {
+  if (IMAGE_PATTERN.test(text)) return 'image';
+  if (text.includes('[SUCCESS] Graphical application executed successfully')) return 'success';
+  if (text.includes('Error:') || text.includes('Traceback')) return 'error';
+  if (text.includes('[INFO]') || text.includes('[AI NOTE]')) return 'info';
+  return 'plain';
+}
+
+export class OutputLog {
+  private lines: string[] = [''];
+  private parsed = new Map<number, { source: string; line: OutputLine }>();
+  private imageLines = 0;
+
+  // Search state: matches among lines[0 .. searchedLines)
+  private query = '';
+  private matches: number[] = [];
+  private searchedLines = 0;
+
+  get lineCount(): number {
+    return this.lines.length;
+  }
+
+  get hasImages(): boolean {
+    return this.imageLines > 0;
+  }
+
+  /** Add text to the end; only the last line and the new ones are touched */
+  append(text: string): void {
+    if (!text) return;
+    const pieces = text.split('\n');
+    const last = this.lines.length - 1;
+    const wasImage = IMAGE_PATTERN.test(this.lines[last]);
+    this.lines[last] += pieces[0];
+    if (!wasImage && IMAGE_PATTERN.test(this.lines[last])) this.imageLines++;
+    for (let i = 1; i < pieces.length; i++) {
+      this.lines.push(pieces[i]);
+      if (IMAGE_PATTERN.test(pieces[i])) this.imageLines++;
+    }
+    // The last line may have grown: search it again
+    this.searchedLines = Math.min(this.searchedLines, last);
+    while (this.matches.length > 0 && this.matches[this.matches.length - 1] >= this.searchedLines) {
+      this.matches.pop();
+    }
+  }
+
+  /** Start over with the given text */
+  reset(text: string): void {
+    this.lines = [''];
+    this.parsed.clear();
+    this.imageLines = 0;
+    this.matches = [];
+    this.searchedLines = 0;
+    this.append(text);
+  }
+
+  line(index: number): OutputLine {
+    const source = this.lines[index] ?? '';
+    const cached = this.parsed.get(index);
+    if (cached && cached.source === source) return cached.line;
+
+    const segments = parseAnsiLine(source);
+    const text = segments.length === 1 ? segments[0].text : segments.map(segment => segment.text).join('');
+    const line: OutputLine = { kind: classify(text), text, segments };
+    if (this.parsed.size >= MAX_PARSED_LINES) this.parsed.clear();
+    this.parsed.set(index, { source, line });
+    return line;
+  }
+
+  /**
+   * Lines containing the query (case-insensitive), in order. Asking again for
+   * the same query only searches lines added since.
+   */
+  search(query: string): number[] {
+    if (query !== this.query) {
+      this.query = query;
+      this.matches = [];
+      this.searchedLines = 0;
+    }
+    if (!query) return this.matches;
+
+    const needle = query.toLowerCase();
+    for (let i = this.searchedLines; i < this.lines.length; i++) {
+      if (this.lines[i].toLowerCase().includes(needle)) this.matches.push(i);
+    }
+    this.searchedLines = this.lines.length;
+    return this.matches;
+  }
+}
@@ -0,0 +1,25 @@
+/**
+ * Keyset pagination for the list APIs (/api/users, /api/projects).
+ *
+ * A cursor is the sort value and id of the last row of a page, JSON-encoded
+ * as base64url, so the next page starts right after that row even when rows
+ * share a sort value or new rows arrive in between.
+ */
+
+export const encodeCursor = (value: unknown, id: string) =>
+  Buffer.from(JSON.stringify([value, id])).toString('base64url');
+
+export const decodeCursor = (cursor: string): [unknown, string] | null => {
+  try {
+    const decoded = JSON.parse(Buffer.from(cursor, 'base64url').toString('utf8'));
+    return Array.isArray(decoded) && decoded.length === 2 && typeof decoded[1] === 'string'
+      ? [decoded[0], decoded[1]]
+      : null;
+  } catch {
+    return null;
+  }
+};
+
+// Values inside PostgREST or() filters are double-quoted, with quotes and
+// backslashes escaped by a backslash
+export const quoteFilterValue = (value: unknown) => `"${String(value).replace(/["\\]/g, '\\$&')}"`;
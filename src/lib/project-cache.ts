@@ -0,0 +1,275 @@
+import type { FileOrFolder, Project } from './store';
+
+/**
+ * Offline cache of opened projects in IndexedDB (database pycode-cache).
+ *
+ * Each project is one record holding its folder structure, and each file body
+ * is a record of its own keyed by [projectId, path], so typing in a file only
+ * rewrites that file. Writes are collected for WRITE_DELAY_MS and handed to a
+ * worker (project-cache.worker.ts) in one batch; the editor never waits for
+ * them. Only the MAX_CACHED_PROJECTS most recently used projects are kept.
+ *
+ * Where there is no IndexedDB or Worker (server rendering, old browsers) the
+ * cache does nothing and reads find nothing.
+ */
+
+type CachedFile = Extract<FileOrFolder, { type: 'file' }>;
+
+interface TreeNode {
+  name: string;
+  type: 'file' | 'folder';
+  children?: TreeNode[];
+  contentHash?: string;
+  uploadPath?: string;
+}
+
+export interface CachedProjectRecord {
+  id: string;
+  name: string;
+  description: string;
+  createdAt: string;
+  updatedAt: string;
+  /** For LRU eviction: last time the project was read or written */
+  accessedAt: number;
+  /** Folder structure; file bodies are records of their own */
+  tree: TreeNode;
+}
+
+export interface CachedFileRecord {
+  projectId: string;
+  path: string;
+  content: string;
+}
+
+export interface CacheWriteBatch {
+  projects: {
+    record: Omit<CachedProjectRecord, 'accessedAt'>;
+    files: { path: string; content: string }[];
+    /** Every file of the tree, loaded or not; other cached files are deleted */
+    paths: string[];
+  }[];
+  files: CachedFileRecord[];
+}
+
+export type CacheRequest =
+  | { id: number; type: 'write'; batch: CacheWriteBatch }
+  | { id: number; type: 'read'; projectId: string }
+  | { id: number; type: 'list' }
+  | { id: number; type: 'clear' };
+
+export interface CacheResponse {
+  id: number;
+  result?: any;
+  error?: string;
+}
+
+type WithoutId<T> = T extends unknown ? Omit<T, 'id'> : never;
+type RequestBody = WithoutId<CacheRequest>;
+
+const WRITE_DELAY_MS = 500;
+// The old localStorage mirror of all projects, moved into the cache once
+const LEGACY_MIRROR_KEY = 'pycode-projects';
+
+let worker: Worker | null = null;
+let workerFailed = false;
+let nextRequestId = 1;
+const pendingRequests = new Map<number, { resolve: (value: any) => void; reject: (error: Error) => void }>();
+
+// Writes waiting for the next batch: snapshots of whole projects, single files
+const pendingProjects = new Map<string, () => Project | null>();
+const pendingFiles = new Map<string, CachedFileRecord>();
+let flushTimer: ReturnType<typeof setTimeout> | null = null;
+
+function getWorker(): Worker | null {
+  if (worker || workerFailed) return worker;
+  if (typeof window === 'undefined' || typeof Worker === 'undefined' || typeof indexedDB === 'undefined') {
+    workerFailed = true;
+    return null;
+  }
+
+  try {
+    worker = new Worker(new URL('./project-cache.worker.ts', import.meta.url));
+  } catch (error) {
+    console.error('[projectCache] Could not start the cache worker:', error);
+    workerFailed = true;
+    return null;
+  }
+
+  worker.addEventListener('message', (event: MessageEvent<CacheResponse>) => {
+    const { id, result, error } = event.data;
+    const pending = pendingRequests.get(id);
+    if (!pending) return;
+    pendingRequests.delete(id);
+    if (error) pending.reject(new Error(error));
+    else pending.resolve(result);
+  });
+  worker.addEventListener('error', (event) => {
+    console.error('[projectCache] Cache worker failed:', event.message);
+  });
+  window.addEventListener('pagehide', flushProjectCache);
+
+  migrateLegacyMirror();
+  return worker;
+}
+
+function call<T>(body: RequestBody): Promise<T> {
+  const target = getWorker();
+  if (!target) return Promise.reject(new Error('Project cache is not available'));
+  const id = nextRequestId++;
+  return new Promise<T>((resolve, reject) => {
+    pendingRequests.set(id, { resolve, reject });
+    target.postMessage({ ...body, id });
+  });
+}
+
+function toBatchEntry(project: Project): CacheWriteBatch['projects'][number] {
+  const files: { path: string; content: string }[] = [];
+  const paths: string[] = [];
+  const strip = (item: FileOrFolder, path: string): TreeNode => {
+    if (item.type === 'folder') {
+      const prefix = path ? `${path}/` : '';
+      return { name: item.name, type: 'folder', children: (item.children || []).map(child => strip(child, prefix + child.name)) };
+    }
+    paths.push(path);
+    // A body that never loaded keeps whatever the cache has for it
+    if (!item.lazy) files.push({ path, content: item.content });
+    return { name: item.name, type: 'file', contentHash: item.contentHash, uploadPath: item.uploadPath };
+  };
+
+  return {
+    record: {
+      id: project.id,
+      name: project.name,
+      description: project.description || '',
+      createdAt: new Date(project.createdAt).toISOString(),
+      updatedAt: new Date(project.updatedAt).toISOString(),
+      tree: strip(project.fileTree, ''),
+    },
+    files,
+    paths,
+  };
+}
+
+function scheduleFlush() {
+  if (flushTimer || !getWorker()) return;
+  flushTimer = setTimeout(flushProjectCache, WRITE_DELAY_MS);
+}
+
+/**
+ * Send all queued writes to the worker now
+ */
+export function flushProjectCache(): void {
+  if (flushTimer) {
+    clearTimeout(flushTimer);
+    flushTimer = null;
+  }
+  if (pendingProjects.size === 0 && pendingFiles.size === 0) return;
+
+  const batch: CacheWriteBatch = { projects: [], files: Array.from(pendingFiles.values()) };
+  pendingProjects.forEach((snapshot) => {
+    const project = snapshot();
+    if (project && !project.isListing) batch.projects.push(toBatchEntry(project));
+  });
+  pendingProjects.clear();
+  pendingFiles.clear();
+
+  call<void>({ type: 'write', batch }).catch((error) => {
+    console.error('[projectCache] Failed to write to the project cache:', error.message);
+  });
+}
+
+/**
+ * Cache a project's tree and loaded bodies. The snapshot is taken when the
+ * batch is written, so a burst of changes costs one write.
+ */
+export function cacheProject(projectId: string, snapshot: () => Project | null): void {
+  pendingProjects.set(projectId, snapshot);
+  scheduleFlush();
+}
+
+/**
+ * Cache the new body of one file of an already cached project
+ */
+export function cacheFile(projectId: string, path: string, content: string): void {
+  pendingFiles.set(`${projectId}\u0000${path}`, { projectId, path, content });
+  scheduleFlush();
+}
+
+/**
+ * A cached project with its tree put back together. Files whose body is not
+ * cached come back empty and `lazy`, with their contentHash.
+ */
+export async function readCachedProject(projectId: string): Promise<Project | null> {
+  if (!getWorker()) return null;
+  const cached = await call<{ project: CachedProjectRecord; files: CachedFileRecord[] } | null>({ type: 'read', projectId });
+  if (!cached) return null;
+
+  const bodies = new Map(cached.files.map(file => [file.path, file.content]));
+  const build = (node: TreeNode, path: string): FileOrFolder => {
+    if (node.type === 'folder') {
+      const prefix = path ? `${path}/` : '';
+      return { name: node.name, type: 'folder', children: (node.children || []).map(child => build(child, prefix + child.name)) };
+    }
+    const file: CachedFile = { name: node.name, type: 'file', content: bodies.get(path) ?? '' };
+    if (node.contentHash) file.contentHash = node.contentHash;
+    if (node.uploadPath) file.uploadPath = node.uploadPath;
+    if (!bodies.has(path)) file.lazy = true;
+    return file;
+  };
+
+  return {
+    id: cached.project.id,
+    name: cached.project.name,
+    description: cached.project.description,
+    createdAt: new Date(cached.project.createdAt),
+    updatedAt: new Date(cached.project.updatedAt),
+    fileTree: build(cached.project.tree, '') as Project['fileTree'],
+  };
+}
+
+/**
+ * List entries of every cached project, most recently updated first
+ */
+export async function listCachedProjects(): Promise<Project[]> {
+  if (!getWorker()) return [];
+  const records = await call<Omit<CachedProjectRecord, 'tree'>[]>({ type: 'list' });
+  return records
+    .map((record): Project => ({
+      id: record.id,
+      name: record.name,
+      description: record.description,
+      createdAt: new Date(record.createdAt),
+      updatedAt: new Date(record.updatedAt),
+      fileTree: { name: record.name, type: 'folder', children: [] },
+      isListing: true,
+    }))
+    .sort((a, b) => b.updatedAt.getTime() - a.updatedAt.getTime());
+}
+
+/**
+ * Forget every cached project, e.g. on logout
+ */
+export function clearProjectCache(): Promise<void> {
+  pendingProjects.clear();
+  pendingFiles.clear();
+  if (!getWorker()) return Promise.resolve();
+  return call<void>({ type: 'clear' });
+}
+
+function migrateLegacyMirror() {
+  let projects: Project[];
+  try {
+    const saved = localStorage.getItem(LEGACY_MIRROR_KEY);
+    if (!saved) return;
+    projects = JSON.parse(saved);
+    localStorage.removeItem(LEGACY_MIRROR_KEY);
+  } catch {
+    return;
+  }
+  if (!Array.isArray(projects)) return;
+  for (const project of projects) {
+    if (project && project.id && project.fileTree && !project.isListing) {
+      cacheProject(project.id, () => project);
+    }
+  }
+}
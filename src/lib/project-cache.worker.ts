@@ -0,0 +1,186 @@
+import type { CacheRequest, CacheResponse, CachedFileRecord, CachedProjectRecord, CacheWriteBatch } from './project-cache';
+
+/**
+ * IndexedDB side of the offline project cache (see project-cache.ts). Runs in
+ * a worker so that serializing and writing project files never blocks the
+ * editor.
+ */
+
+const DB_NAME = 'pycode-cache';
+const DB_VERSION = 1;
+// Projects kept; the least recently opened or edited ones go first
+const MAX_CACHED_PROJECTS = 20;
+
+let database: Promise<IDBDatabase> | null = null;
+
+function openDatabase(): Promise<IDBDatabase> {
+  if (!database) {
+    database = new Promise((resolve, reject) => {
+      const request = indexedDB.open(DB_NAME, DB_VERSION);
+      request.onupgradeneeded = () => {
+        const db = request.result;
+        const projects = db.createObjectStore('projects', { keyPath: 'id' });
+        projects.createIndex('accessedAt', 'accessedAt');
+        const files = db.createObjectStore('files', { keyPath: ['projectId', 'path'] });
+        files.createIndex('projectId', 'projectId');
+      };
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => {
+        database = null;
+        reject(request.error);
+      };
+    });
+  }
+  return database;
+}
+
+function requestResult<T>(request: IDBRequest<T>): Promise<T> {
+  return new Promise((resolve, reject) => {
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+  });
+}
+
+function transactionDone(transaction: IDBTransaction): Promise<void> {
+  return new Promise((resolve, reject) => {
+    transaction.oncomplete = () => resolve();
+    transaction.onerror = () => reject(transaction.error);
+    transaction.onabort = () => reject(transaction.error);
+  });
+}
+
+// Visit the files of one project, e.g. to delete the ones no longer in its tree
+function eachProjectFile(files: IDBObjectStore, projectId: string, visit: (cursor: IDBCursorWithValue) => void): Promise<void> {
+  return new Promise((resolve, reject) => {
+    const request = files.index('projectId').openCursor(IDBKeyRange.only(projectId));
+    request.onsuccess = () => {
+      const cursor = request.result;
+      if (!cursor) return resolve();
+      visit(cursor);
+      cursor.continue();
+    };
+    request.onerror = () => reject(request.error);
+  });
+}
+
+async function writeBatch(batch: CacheWriteBatch): Promise<void> {
+  const db = await openDatabase();
+  const transaction = db.transaction(['projects', 'files'], 'readwrite');
+  const done = transactionDone(transaction);
+  const projects = transaction.objectStore('projects');
+  const files = transaction.objectStore('files');
+  const now = Date.now();
+
+  for (const { record, files: bodies, paths } of batch.projects) {
+    projects.put({ ...record, accessedAt: now } as CachedProjectRecord);
+    const keep = new Set(paths);
+    await eachProjectFile(files, record.id, (cursor) => {
+      if (!keep.has((cursor.value as CachedFileRecord).path)) cursor.delete();
+    });
+    for (const body of bodies) {
+      files.put({ projectId: record.id, path: body.path, content: body.content } as CachedFileRecord);
+    }
+  }
+
+  // Edits of projects that are not (or no longer) cached are dropped
+  const byProject = new Map<string, CachedFileRecord[]>();
+  for (const file of batch.files) {
+    byProject.set(file.projectId, [...(byProject.get(file.projectId) || []), file]);
+  }
+  for (const [projectId, edits] of byProject) {
+    const project = await requestResult(projects.get(projectId)) as CachedProjectRecord | undefined;
+    if (!project) continue;
+    projects.put({ ...project, accessedAt: now });
+    edits.forEach(file => files.put(file));
+  }
+
+  await done;
+  await evict(MAX_CACHED_PROJECTS);
+}
+
+async function evict(keep: number): Promise<void> {
+  const db = await openDatabase();
+  const transaction = db.transaction(['projects', 'files'], 'readwrite');
+  const done = transactionDone(transaction);
+  const projects = transaction.objectStore('projects');
+  const files = transaction.objectStore('files');
+
+  let excess = await requestResult(projects.count()) - keep;
+  const stale: string[] = [];
+  await new Promise<void>((resolve, reject) => {
+    const request = projects.index('accessedAt').openKeyCursor();
+    request.onsuccess = () => {
+      const cursor = request.result;
+      if (!cursor || excess <= 0) return resolve();
+      stale.push(String(cursor.primaryKey));
+      excess--;
+      cursor.continue();
+    };
+    request.onerror = () => reject(request.error);
+  });
+
+  for (const projectId of stale) {
+    projects.delete(projectId);
+    await eachProjectFile(files, projectId, cursor => cursor.delete());
+  }
+  await done;
+}
+
+async function readProject(projectId: string) {
+  const db = await openDatabase();
+  const transaction = db.transaction(['projects', 'files'], 'readwrite');
+  const done = transactionDone(transaction);
+  const projects = transaction.objectStore('projects');
+  const project = await requestResult(projects.get(projectId)) as CachedProjectRecord | undefined;
+  if (!project) {
+    await done;
+    return null;
+  }
+
+  projects.put({ ...project, accessedAt: Date.now() });
+  const files = await requestResult(transaction.objectStore('files').index('projectId').getAll(IDBKeyRange.only(projectId)));
+  await done;
+  return { project, files: files as CachedFileRecord[] };
+}
+
+async function listProjects(): Promise<Omit<CachedProjectRecord, 'tree'>[]> {
+  const db = await openDatabase();
+  const records = await requestResult(db.transaction('projects').objectStore('projects').getAll()) as CachedProjectRecord[];
+  return records.map(({ tree, ...project }) => project);
+}
+
+async function clear(): Promise<void> {
+  const db = await openDatabase();
+  const transaction = db.transaction(['projects', 'files'], 'readwrite');
+  transaction.objectStore('projects').clear();
+  transaction.objectStore('files').clear();
+  await transactionDone(transaction);
+}
+
+async function handle(request: CacheRequest): Promise<unknown> {
+  switch (request.type) {
+    case 'write':
+      try {
+        return await writeBatch(request.batch);
+      } catch (error: any) {
+        if (error?.name !== 'QuotaExceededError') throw error;
+        // Out of space: make room and try once more
+        await evict(Math.floor(MAX_CACHED_PROJECTS / 2));
+        return await writeBatch(request.batch);
+      }
+    case 'read':
+      return readProject(request.projectId);
+    case 'list':
+      return listProjects();
+    case 'clear':
+      return clear();
+  }
+}
+
+addEventListener('message', (event: MessageEvent<CacheRequest>) => {
+  const request = event.data;
+  handle(request).then(
+    (result) => postMessage({ id: request.id, result } as CacheResponse),
+    (error) => postMessage({ id: request.id, error: error?.message || String(error) } as CacheResponse),
+  );
+});
@@ -0,0 +1,142 @@
+/**
+ * Patches for project autosave (PATCH /api/projects).
+ *
+ * Instead of the whole file tree, the editor sends only the files that
+ * changed, addressed by their path inside the project ("src/utils.py"). Each
+ * change is either the full content or a text delta against the content the
+ * server acknowledged last; the delta carries a hash of that base so the
+ * server can refuse it when its copy is different (the client then resends
+ * the full content). Shared by the store and the route handler.
+ */
+
+export interface TextDelta {
+  /** Replace base[start, end) with text */
+  start: number;
+  end: number;
+  text: string;
+}
+
+export type FilePatch =
+  | { path: string; content: string }
+  | { path: string; baseHash: string; delta: TextDelta };
+
+interface PatchableNode {
+  name: string;
+  type: 'file' | 'folder';
+  content?: string;
+  children?: PatchableNode[];
+}
+
+/**
+ * SHA-256 of a text's UTF-8 bytes, in hex (Web Crypto, so the browser and
+ * the server compute it the same way)
+ */
+export async function hashText(text: string): Promise<string> {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+  return Array.from(new Uint8Array(digest), byte => byte.toString(16).padStart(2, '0')).join('');
+}
+
+/**
+ * Single replaced span between two versions of a text (common prefix and
+ * suffix are left out), which covers typing, pasting and deleting in one place
+ */
+export function computeTextDelta(base: string, next: string): TextDelta {
+  const max = Math.min(base.length, next.length);
+  let start = 0;
+  while (start < max && base.charCodeAt(start) === next.charCodeAt(start)) start++;
+  let suffix = 0;
+  while (
+    suffix < max - start &&
+    base.charCodeAt(base.length - 1 - suffix) === next.charCodeAt(next.length - 1 - suffix)
+  ) {
+    suffix++;
+  }
+  return { start, end: base.length - suffix, text: next.slice(start, next.length - suffix) };
+}
+
+export function applyTextDelta(base: string, delta: TextDelta): string {
+  return base.slice(0, delta.start) + delta.text + base.slice(delta.end);
+}
+
+/**
+ * Path of the first file with this name, in the same depth-first order the
+ * editor uses to look files up by name
+ */
+export function findFilePath(items: PatchableNode[], fileName: string, prefix = ''): string | null {
+  for (const item of items) {
+    if (item.type === 'file' && item.name === fileName) {
+      return prefix + item.name;
+    }
+    if (item.type === 'folder' && item.children) {
+      const found = findFilePath(item.children, fileName, `${prefix}${item.name}/`);
+      if (found) return found;
+    }
+  }
+  return null;
+}
+
+/**
+ * Apply file patches to a stored file tree in place. Files that do not exist
+ * yet are created (with their folders) when the patch has full content.
+ * Returns the paths whose delta did not match the stored content; nothing
+ * is changed when there are any.
+ */
+export async function applyProjectPatch(tree: PatchableNode, patches: FilePatch[]): Promise<{ conflicts: string[] }> {
+  const resolved: { patch: FilePatch; file: PatchableNode | null }[] = [];
+  const conflicts: string[] = [];
+
+  for (const patch of patches) {
+    const file = resolveFile(tree, patch.path);
+    if ('delta' in patch) {
+      if (!file || await hashText(file.content || '') !== patch.baseHash) {
+        conflicts.push(patch.path);
+        continue;
+      }
+    }
+    resolved.push({ patch, file });
+  }
+  if (conflicts.length > 0) {
+    return { conflicts };
+  }
+
+  for (const { patch, file } of resolved) {
+    if ('delta' in patch) {
+      file!.content = applyTextDelta(file!.content || '', patch.delta);
+    } else if (file) {
+      file.content = patch.content;
+    } else {
+      createFile(tree, patch.path, patch.content);
+    }
+  }
+  return { conflicts };
+}
+
+/**
+ * File node at a path inside the tree, if there is one
+ */
+export function resolveFile<T extends PatchableNode>(tree: T, path: string): T | null {
+  const segments = path.split('/');
+  let folder: PatchableNode | undefined = tree;
+  for (let i = 0; i < segments.length - 1; i++) {
+    folder = folder.children?.find(item => item.type === 'folder' && item.name === segments[i]);
+    if (!folder) return null;
+  }
+  const name = segments[segments.length - 1];
+  return (folder.children?.find(item => item.type === 'file' && item.name === name) as T | undefined) || null;
+}
+
+function createFile(tree: PatchableNode, path: string, content: string) {
+  const segments = path.split('/');
+  let folder = tree;
+  for (let i = 0; i < segments.length - 1; i++) {
+    if (!folder.children) folder.children = [];
+    let child = folder.children.find(item => item.type === 'folder' && item.name === segments[i]);
+    if (!child) {
+      child = { name: segments[i], type: 'folder', children: [] };
+      folder.children.push(child);
+    }
+    folder = child;
+  }
+  if (!folder.children) folder.children = [];
+  folder.children.push({ name: segments[segments.length - 1], type: 'file', content });
+}
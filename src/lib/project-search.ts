@@ -0,0 +1,225 @@
+import type { SupabaseClient } from '@supabase/supabase-js';
+import { fetchFileContents, ManifestNode } from './file-contents';
+
+/**
+ * Project search (GET /api/projects/search).
+ *
+ * The Postgres index ranks projects by their name and description
+ * (projects.search_vector, a generated column) and by their files
+ * (project_file_index, one tsvector per file), with trigram similarity on the
+ * name for partial and misspelt names; see search_projects in
+ * supabase_schema.sql. Files are indexed by content hash, so a save only
+ * re-tokenizes the files whose content changed.
+ *
+ * The memory index is a local stand-in with the same interface for tests and
+ * setups without the schema (PYCODE_SEARCH_INDEX=memory).
+ */
+
+export interface SnippetPart {
+  text: string;
+  match: boolean;
+}
+
+export interface ProjectSearchResult {
+  projectId: string;
+  name: string;
+  description: string;
+  updatedAt: string;
+  rank: number;
+  /** File the snippet comes from; null when it is from the description */
+  path: string | null;
+  snippet: SnippetPart[];
+}
+
+export interface IndexedProject {
+  id: string;
+  userId?: string;
+  name?: string;
+  description?: string;
+  /** Manifest of the saved tree; omitted when only metadata changed */
+  fileTree?: ManifestNode;
+}
+
+export interface ProjectSearchIndex {
+  indexProject(supabase: SupabaseClient, project: IndexedProject): Promise<void>;
+  removeProject(supabase: SupabaseClient, projectId: string): Promise<void>;
+  search(supabase: SupabaseClient, userId: string, query: string, limit: number): Promise<ProjectSearchResult[]>;
+}
+
+// ts_headline marks matches with these; they cannot appear in search terms
+const MATCH_START = '\u0002';
+const MATCH_END = '\u0003';
+
+export function splitSnippet(snippet: string): SnippetPart[] {
+  const parts: SnippetPart[] = [];
+  const pattern = new RegExp(`${MATCH_START}([^${MATCH_END}]*)${MATCH_END}`, 'g');
+  let last = 0;
+  for (const match of snippet.matchAll(pattern)) {
+    if (match.index! > last) parts.push({ text: snippet.slice(last, match.index), match: false });
+    parts.push({ text: match[1], match: true });
+    last = match.index! + match[0].length;
+  }
+  if (last < snippet.length) parts.push({ text: snippet.slice(last), match: false });
+  return parts;
+}
+
+export function listManifestFiles(tree: ManifestNode, prefix = ''): { path: string; hash: string }[] {
+  const files: { path: string; hash: string }[] = [];
+  for (const item of tree.children || []) {
+    if (item.type === 'file') {
+      if (item.contentHash) files.push({ path: prefix + item.name, hash: item.contentHash });
+    } else {
+      files.push(...listManifestFiles(item, `${prefix}${item.name}/`));
+    }
+  }
+  return files;
+}
+
+export class SupabaseProjectSearch implements ProjectSearchIndex {
+  async indexProject(supabase: SupabaseClient, project: IndexedProject): Promise<void> {
+    // Name and description are indexed by the generated search_vector column
+    if (!project.fileTree) return;
+    const { error } = await supabase.rpc('index_project_files', {
+      p_project_id: project.id,
+      p_files: listManifestFiles(project.fileTree),
+    });
+    if (error) throw error;
+  }
+
+  async removeProject(): Promise<void> {
+    // Index rows go with the project (on delete cascade)
+  }
+
+  async search(supabase: SupabaseClient, userId: string, query: string, limit: number): Promise<ProjectSearchResult[]> {
+    const { data, error } = await supabase.rpc('search_projects', {
+      p_user_id: userId,
+      p_query: query,
+      p_limit: limit,
+    });
+    if (error) throw error;
+
+    return (data || []).map((row: any) => ({
+      projectId: row.project_id,
+      name: row.name,
+      description: row.description || '',
+      updatedAt: row.updated_at,
+      rank: Number(row.rank),
+      path: row.path,
+      snippet: splitSnippet(row.snippet || ''),
+    }));
+  }
+}
+
+interface MemoryEntry {
+  userId?: string;
+  name: string;
+  description: string;
+  updatedAt: string;
+  // path -> content hash and body
+  files: Map<string, { hash: string; content: string }>;
+}
+
+const tokenize = (text: string) => text.toLowerCase().match(/[\w\u00c0-\uffff]+/g) || [];
+
+export class MemoryProjectSearch implements ProjectSearchIndex {
+  readonly projects = new Map<string, MemoryEntry>();
+
+  async indexProject(supabase: SupabaseClient, project: IndexedProject): Promise<void> {
+    const entry = this.projects.get(project.id) ||
+      { name: '', description: '', updatedAt: '', files: new Map() };
+    if (project.userId) entry.userId = project.userId;
+    if (project.name !== undefined) entry.name = project.name;
+    if (project.description !== undefined) entry.description = project.description;
+    entry.updatedAt = new Date().toISOString();
+
+    if (project.fileTree) {
+      const files = listManifestFiles(project.fileTree);
+      // Only files whose content changed are fetched again
+      const changed = files.filter(file => entry.files.get(file.path)?.hash !== file.hash);
+      const contents = changed.length > 0
+        ? await fetchFileContents(supabase, changed.map(file => file.hash))
+        : new Map<string, string>();
+      const next = new Map<string, { hash: string; content: string }>();
+      for (const file of files) {
+        next.set(file.path, entry.files.get(file.path)?.hash === file.hash
+          ? entry.files.get(file.path)!
+          : { hash: file.hash, content: contents.get(file.hash) ?? '' });
+      }
+      entry.files = next;
+    }
+    this.projects.set(project.id, entry);
+  }
+
+  async removeProject(_supabase: SupabaseClient, projectId: string): Promise<void> {
+    this.projects.delete(projectId);
+  }
+
+  async search(_supabase: SupabaseClient, userId: string, query: string, limit: number): Promise<ProjectSearchResult[]> {
+    const terms = Array.from(new Set(tokenize(query)));
+    if (terms.length === 0) return [];
+
+    const count = (text: string) => {
+      const tokens = tokenize(text);
+      return terms.reduce((sum, term) => sum + tokens.filter(token => token.startsWith(term)).length, 0);
+    };
+
+    const results: ProjectSearchResult[] = [];
+    this.projects.forEach((entry, projectId) => {
+      if (entry.userId !== userId) return;
+
+      let fileHit: { path: string; content: string; score: number } | null = null;
+      for (const [path, file] of entry.files) {
+        const score = count(path) * 2 + count(file.content);
+        if (score > 0 && (!fileHit || score > fileHit.score)) {
+          fileHit = { path, content: file.content, score };
+        }
+      }
+
+      const rank = count(entry.name) * 4 + count(entry.description) * 2 + (fileHit ? Math.log1p(fileHit.score) : 0);
+      if (rank === 0) return;
+
+      results.push({
+        projectId,
+        name: entry.name,
+        description: entry.description,
+        updatedAt: entry.updatedAt,
+        rank,
+        path: fileHit?.path ?? null,
+        snippet: highlight(fileHit?.content ?? entry.description, terms),
+      });
+    });
+
+    return results.sort((a, b) => b.rank - a.rank).slice(0, limit);
+  }
+}
+
+// A dozen or so words around the first match, matches marked
+function highlight(text: string, terms: string[]): SnippetPart[] {
+  const words = text.split(/(\s+)/);
+  const isMatch = (word: string) => tokenize(word).some(token => terms.some(term => token.startsWith(term)));
+  const first = Math.max(0, words.findIndex(isMatch));
+  const span = words.slice(Math.max(0, first - 8), first + 20);
+
+  const parts: SnippetPart[] = [];
+  for (const word of span) {
+    const match = !/^\s+$/.test(word) && isMatch(word);
+    const previous = parts[parts.length - 1];
+    if (previous && previous.match === match) {
+      previous.text += word;
+    } else {
+      parts.push({ text: word, match });
+    }
+  }
+  return parts;
+}
+
+const globalForSearch = globalThis as unknown as { pycodeProjectSearch?: ProjectSearchIndex };
+
+export function getProjectSearch(): ProjectSearchIndex {
+  if (!globalForSearch.pycodeProjectSearch) {
+    globalForSearch.pycodeProjectSearch = process.env.PYCODE_SEARCH_INDEX === 'memory'
+      ? new MemoryProjectSearch()
+      : new SupabaseProjectSearch();
+  }
+  return globalForSearch.pycodeProjectSearch;
+}
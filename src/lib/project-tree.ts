@@ -0,0 +1,106 @@
+import type { FileOrFolder } from './store';
+
+/**
+ * Loading a project and its file tree (GET /api/projects?projectId=).
+ *
+ * The tree comes without file bodies: stored files carry only their
+ * contentHash and are marked `lazy` here, to be fetched when opened. The
+ * editor runs this in a worker (project-tree.worker.ts) so that fetching and
+ * parsing a large tree does not hold it up.
+ */
+
+type Folder = Extract<FileOrFolder, { type: 'folder' }>;
+
+export interface LoadedProject {
+  id: string;
+  name: string;
+  description: string;
+  createdAt: string;
+  updatedAt: string;
+  fileTree: Folder;
+}
+
+export type TreeRequest = { id: number; projectId: string };
+
+export interface TreeResponse {
+  id: number;
+  /** null when the server could not be reached or had no such project */
+  result?: LoadedProject | null;
+  error?: string;
+}
+
+export function defaultFileTree(name: string): Folder {
+  return {
+    name,
+    type: 'folder',
+    children: [{
+      name: 'main.py',
+      type: 'file',
+      content: `# ${name}\nprint("Hello from ${name}!")\n`
+    }]
+  };
+}
+
+// Stored files come with a contentHash only; their bodies are fetched later
+function markLazyFiles(items: FileOrFolder[]) {
+  for (const item of items) {
+    if (item.type === 'file') {
+      if (typeof item.content !== 'string') {
+        item.content = '';
+        item.lazy = true;
+      }
+    } else if (Array.isArray(item.children)) {
+      markLazyFiles(item.children);
+    } else {
+      item.children = [];
+    }
+  }
+}
+
+/**
+ * The file tree of a project row, whatever shape it was stored in (older
+ * rows and servers have it as a JSON string). Invalid trees fall back to a
+ * project with a single main.py.
+ */
+export function normalizeFileTree(raw: unknown, projectName: string): Folder {
+  try {
+    if (raw === null || raw === undefined) {
+      console.warn(`[projectTree] Project ${projectName} has no file_tree, creating default`);
+      return defaultFileTree(projectName);
+    }
+    const fileTree = (typeof raw === 'string' ? JSON.parse(raw) : raw) as Folder;
+    if (!fileTree || typeof fileTree !== 'object' || !fileTree.name) {
+      throw new Error('Invalid fileTree structure after parsing');
+    }
+    if (!Array.isArray(fileTree.children)) {
+      fileTree.children = [];
+    }
+    markLazyFiles(fileTree.children);
+    return fileTree;
+  } catch (error: any) {
+    console.error(`[projectTree] Error parsing file_tree of ${projectName}:`, error.message);
+    return defaultFileTree(projectName);
+  }
+}
+
+/**
+ * Fetch and parse a project on the current thread
+ */
+export async function fetchProjectTree(projectId: string): Promise<LoadedProject | null> {
+  const response = await fetch(`/api/projects?projectId=${encodeURIComponent(projectId)}`).catch((error) => {
+    console.warn('[projectTree] Could not reach the server:', error);
+    return null;
+  });
+  if (!response?.ok) return null;
+
+  const { project } = await response.json();
+  if (!project) return null;
+  return {
+    id: project.id,
+    name: project.name,
+    description: project.description || '',
+    createdAt: project.created_at,
+    updatedAt: project.updated_at,
+    fileTree: normalizeFileTree(project.file_tree, project.name),
+  };
+}
@@ -0,0 +1,14 @@
+import { fetchProjectTree, TreeRequest, TreeResponse } from './project-tree';
+
+/**
+ * Fetches and parses project trees for the editor store, so that neither the
+ * download nor the JSON parsing of a large tree blocks the editor.
+ */
+
+addEventListener('message', (event: MessageEvent<TreeRequest>) => {
+  const { id, projectId } = event.data;
+  fetchProjectTree(projectId).then(
+    (result) => postMessage({ id, result } as TreeResponse),
+    (error) => postMessage({ id, error: error?.message || String(error) } as TreeResponse),
+  );
+});
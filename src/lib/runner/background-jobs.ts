@@ -0,0 +1,576 @@
+import { spawn } from 'child_process';
+import { randomUUID } from 'crypto';
+import { readFileSync } from 'fs';
+import { mkdir, open, readdir, readFile, rename, rm, stat, writeFile } from 'fs/promises';
+import path from 'path';
+import { describeResourceUsage, RunCgroup } from './cgroups';
+import { getCacheDir, listProjectFiles, resolveProjectPath } from './project-files';
+import { getUsageMeter } from './metering';
+import { getProjectActivity } from './project-activity';
+import { finishPythonRun, preparePythonRun, PythonRunInput } from './python-run';
+import type { RunMetrics } from './run-metrics';
+import { sandboxCommandLine } from './sandbox-pool';
+
+/**
+ * Durable background runs for long scripts.
+ *
+ * A detached run is owned by a small supervisor process in its own session,
+ * not by the web server: the supervisor starts the Python run, appends its
+ * output to log files and records the exit status, so the run survives page
+ * reloads, dropped connections and server restarts. Job state is plain files
+ * under PYCODE_JOBS_DIR (default .cache/pycode/jobs):
+ *
+ *   <jobId>/job.json    metadata and final status
+ *   <jobId>/stdout.log  output as it is produced
+ *   <jobId>/stderr.log
+ *   <jobId>/exit.json   written by the supervisor when the run exits
+ *   <jobId>/cancelled   written when the user cancels the run
+ *   index/users/<userId>/<createdAt>-<jobId>  a user's jobs, newest last
+ *   index/running/<jobId>                     jobs not finalized yet
+ *
+ * A job is finalized (billed, its cgroup removed) as soon as its supervisor
+ * exits when this server started it, and otherwise by the periodic sweep of
+ * startJobMaintenance(), which also deletes finished jobs after
+ * PYCODE_JOB_RETENTION_MS (default 7 days).
+ */
+
+export type BackgroundJobStatus = 'running' | 'succeeded' | 'failed' | 'cancelled';
+
+export interface JobArtifact {
+  /** Project-relative path of a file the run created or modified */
+  path: string;
+  size: number;
+}
+
+export interface BackgroundJob {
+  id: string;
+  userId: string;
+  projectId?: string;
+  fileName?: string;
+  status: BackgroundJobStatus;
+  plan: string;
+  workingDir: string;
+  createdAt: number;
+  startedAt?: number;
+  finishedAt?: number;
+  pid?: number;
+  /** Start time of the supervisor process, telling it apart from a later process with the same pid */
+  pidStartTime?: string;
+  sandboxed?: boolean;
+  exitCode?: number | null;
+  signal?: string | null;
+  cancelRequested?: boolean;
+  cgroup?: RunCgroup | null;
+  error?: string;
+  metrics?: RunMetrics;
+  artifacts?: JobArtifact[];
+}
+
+export interface StartBackgroundJobOptions {
+  userId: string;
+  plan?: string;
+  fileName?: string;
+}
+
+export interface JobOutputChunk {
+  stdout: Buffer;
+  stderr: Buffer;
+  offsets: { stdout: number; stderr: number };
+}
+
+interface ExitRecord {
+  exitCode: number | null;
+  signal: string | null;
+  finishedAt: number;
+}
+
+const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
+
+// Upper bound for a single background run (default 6 hours)
+const MAX_RUNTIME_MS = parseInt(process.env.PYCODE_JOB_MAX_RUNTIME_MS || String(6 * 60 * 60 * 1000), 10);
+// Finished jobs and their output are deleted after this long (default 7 days)
+const JOB_RETENTION_MS = parseInt(process.env.PYCODE_JOB_RETENTION_MS || String(7 * 24 * 60 * 60 * 1000), 10);
+const SWEEP_INTERVAL_MS = 30 * 1000;
+const COLLECT_INTERVAL_MS = 60 * 60 * 1000;
+// Jobs of a user read at once when listing
+const LIST_BATCH_SIZE = 20;
+const INDEX_DIR = 'index';
+
+// Runs detached from the web server. Reads one JSON launch line on stdin:
+// {argv, cwd, input?, readyFd, cgroup?, timeoutMs}.
+const SUPERVISOR_SOURCE = `
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+job_dir = sys.argv[1]
+launch = json.loads(sys.stdin.readline())
+
+stdout = open(os.path.join(job_dir, 'stdout.log'), 'ab', buffering=0)
+stderr = open(os.path.join(job_dir, 'stderr.log'), 'ab', buffering=0)
+ready_r, ready_w = os.pipe()
+cgroup = launch.get('cgroup')
+
+def prepare_child():
+    # Runs in the child before exec, so the run starts inside its cgroup
+    # (sandboxes included) and never has to join it itself
+    if cgroup:
+        try:
+            with open(os.path.join(cgroup, 'cgroup.procs'), 'w') as procs:
+                procs.write('0')
+        except OSError as error:
+            os.write(2, f'[WARNING] Could not apply resource limits: {error}\\n'.encode())
+    if launch.get('readyFd'):
+        # Sandboxes report ready on fd 3; nobody waits for it here
+        os.dup2(ready_w, 3)
+
+child = subprocess.Popen(
+    launch['argv'],
+    cwd=launch['cwd'],
+    stdin=subprocess.PIPE,
+    stdout=stdout,
+    stderr=stderr,
+    preexec_fn=prepare_child,
+    pass_fds=(3,) if launch.get('readyFd') else (),
+)
+os.close(ready_w)
+if launch.get('input'):
+    child.stdin.write(launch['input'].encode())
+child.stdin.close()
+
+def forward(signum, frame):
+    try:
+        child.send_signal(signum)
+    except ProcessLookupError:
+        pass
+
+signal.signal(signal.SIGTERM, forward)
+signal.signal(signal.SIGINT, forward)
+
+try:
+    code = child.wait(timeout=launch['timeoutMs'] / 1000)
+except subprocess.TimeoutExpired:
+    stderr.write(b'\\n[ERROR] Background run exceeded its maximum runtime and was stopped.\\n')
+    child.kill()
+    code = child.wait()
+
+record = {
+    'exitCode': code if code >= 0 else None,
+    'signal': signal.Signals(-code).name if code < 0 else None,
+    'finishedAt': time.time() * 1000,
+}
+with open(os.path.join(job_dir, 'exit.json.tmp'), 'w') as f:
+    json.dump(record, f)
+os.replace(os.path.join(job_dir, 'exit.json.tmp'), os.path.join(job_dir, 'exit.json'))
+`;
+
+export function getJobsDir(): string {
+  return process.env.PYCODE_JOBS_DIR || getCacheDir('jobs');
+}
+
+function jobDir(jobId: string): string {
+  return path.join(getJobsDir(), path.basename(jobId));
+}
+
+function userIndexDir(userId: string): string {
+  return path.join(getJobsDir(), INDEX_DIR, 'users', path.basename(userId));
+}
+
+function runningIndexDir(): string {
+  return path.join(getJobsDir(), INDEX_DIR, 'running');
+}
+
+// Entry names sort by creation time, so a user's newest jobs are found without reading any
+function userIndexEntry(job: Pick<BackgroundJob, 'id' | 'userId' | 'createdAt'>): string {
+  return path.join(userIndexDir(job.userId), `${String(job.createdAt).padStart(15, '0')}-${job.id}`);
+}
+
+async function indexJob(job: BackgroundJob): Promise<void> {
+  await mkdir(userIndexDir(job.userId), { recursive: true });
+  await writeFile(userIndexEntry(job), '');
+  if (job.status === 'running') {
+    await mkdir(runningIndexDir(), { recursive: true });
+    await writeFile(path.join(runningIndexDir(), job.id), '');
+  }
+}
+
+async function readJson<T>(file: string): Promise<T | null> {
+  try {
+    return JSON.parse(await readFile(file, 'utf8')) as T;
+  } catch {
+    return null;
+  }
+}
+
+async function saveJob(job: BackgroundJob): Promise<void> {
+  const dir = jobDir(job.id);
+  // Write then rename so readers never see a half-written file
+  await writeFile(path.join(dir, 'job.json.tmp'), JSON.stringify(job, null, 2));
+  await rename(path.join(dir, 'job.json.tmp'), path.join(dir, 'job.json'));
+}
+
+// Start time of a process in clock ticks since boot (field 22 of
+// /proc/<pid>/stat), or null where there is no /proc or no such process
+function processStartTime(pid: number): string | null {
+  try {
+    const stat = readFileSync(`/proc/${pid}/stat`, 'utf8');
+    // Fields after the command name, which may itself contain spaces
+    return stat.slice(stat.lastIndexOf(')') + 2).split(' ')[19] || null;
+  } catch {
+    return null;
+  }
+}
+
+function isProcessAlive(pid?: number, startTime?: string): boolean {
+  if (!pid) return false;
+  // After a restart the pid may belong to an unrelated process
+  if (startTime && process.platform === 'linux') {
+    return processStartTime(pid) === startTime;
+  }
+  try {
+    process.kill(pid, 0);
+    return true;
+  } catch (error: any) {
+    return error?.code === 'EPERM';
+  }
+}
+
+/**
+ * Start a run that outlives the request. Resolves once the supervisor has
+ * been launched; the run itself continues in the background.
+ */
+export async function startBackgroundJob(input: PythonRunInput, options: StartBackgroundJobOptions): Promise<BackgroundJob> {
+  const id = randomUUID();
+  const dir = jobDir(id);
+  await mkdir(dir, { recursive: true });
+
+  const plan = options.plan || 'free';
+  const job: BackgroundJob = {
+    id,
+    userId: options.userId,
+    projectId: input.projectId,
+    fileName: options.fileName,
+    status: 'running',
+    plan,
+    workingDir: '',
+    createdAt: Date.now(),
+  };
+  await writeFile(path.join(dir, 'stdout.log'), '');
+  await writeFile(path.join(dir, 'stderr.log'), '');
+
+  const prepared = await preparePythonRun(input, { plan });
+  const sandbox = sandboxCommandLine();
+
+  // The script and environment go over the supervisor's stdin rather than to
+  // disk, so server secrets in the environment never land in the job directory
+  const launch = sandbox
+    ? {
+      argv: sandbox,
+      cwd: prepared.workingDir,
+      input: JSON.stringify({ script: prepared.script, cwd: prepared.workingDir, env: prepared.env }) + '\n',
+      readyFd: true,
+      cgroup: prepared.cgroup?.path,
+      timeoutMs: MAX_RUNTIME_MS,
+    }
+    : {
+      // Program on stdin: scripts can be larger than a single argument may be
+      argv: [pythonCommand, '-u', '-'],
+      cwd: prepared.workingDir,
+      input: prepared.script,
+      readyFd: false,
+      cgroup: prepared.cgroup?.path,
+      timeoutMs: MAX_RUNTIME_MS,
+    };
+
+  const supervisor = spawn(pythonCommand, ['-c', SUPERVISOR_SOURCE, dir], {
+    env: prepared.env,
+    cwd: prepared.workingDir,
+    detached: true,
+    stdio: ['pipe', 'ignore', 'ignore'],
+  });
+  supervisor.stdin.end(JSON.stringify(launch) + '\n');
+  supervisor.unref();
+  // Bill the run and release its cgroup as soon as it exits; the periodic
+  // sweep covers runs whose exit this server does not see
+  supervisor.once('exit', () => {
+    getBackgroundJob(id).catch((error) => console.error(`[BackgroundJobs] Failed to finalize ${id}:`, error));
+  });
+
+  Object.assign(job, {
+    workingDir: prepared.workingDir,
+    startedAt: Date.now(),
+    pid: supervisor.pid,
+    pidStartTime: supervisor.pid ? processStartTime(supervisor.pid) ?? undefined : undefined,
+    sandboxed: !!sandbox,
+    cgroup: prepared.cgroup,
+  });
+  if (!supervisor.pid) {
+    job.status = 'failed';
+    job.finishedAt = Date.now();
+    job.error = 'Failed to start the background run';
+  }
+  await saveJob(job);
+  await indexJob(job);
+
+  console.log(`[BackgroundJobs] Started ${id} (pid ${supervisor.pid}) for user ${options.userId}`);
+  return job;
+}
+
+// Finalization reads cgroup counters and removes the cgroup, so it must run once
+const finalizing = new Map<string, Promise<BackgroundJob>>();
+
+// Cancelling only adds this marker and never rewrites job.json, which the
+// supervisor's exit may be finalizing at the same moment
+const cancelMarker = (jobId: string) => path.join(jobDir(jobId), 'cancelled');
+
+const isCancelRequested = (jobId: string) =>
+  stat(cancelMarker(jobId)).then(() => true, () => false);
+
+async function finalizeJob(job: BackgroundJob, exit: ExitRecord | null): Promise<BackgroundJob> {
+  const finishedAt = exit?.finishedAt ?? Date.now();
+  const rawStderr = await readFile(path.join(jobDir(job.id), 'stderr.log'), 'utf8').catch(() => '');
+  const { metrics } = await finishPythonRun(
+    { cgroup: job.cgroup ?? null, plan: job.plan },
+    rawStderr,
+    finishedAt - (job.startedAt ?? job.createdAt)
+  );
+
+  // Bill the run once, even when several processes finalize it
+  const firstToBill = await writeFile(path.join(jobDir(job.id), 'billed'), String(process.pid), { flag: 'wx' })
+    .then(() => true, () => false);
+  if (firstToBill) {
+    metrics.creditsCharged = getUsageMeter().recordRun(job.userId, job.plan, metrics);
+    getProjectActivity().recordRun(job.projectId, finishedAt);
+  }
+
+  // Files written by the run count as its artifacts
+  const since = job.startedAt ?? job.createdAt;
+  const artifacts: JobArtifact[] = [];
+  for (const file of await listProjectFiles(job.workingDir)) {
+    const info = await stat(path.join(job.workingDir, file)).catch(() => null);
+    if (info && info.mtimeMs >= since) {
+      artifacts.push({ path: file, size: info.size });
+    }
+  }
+
+  const notice = metrics.resources ? describeResourceUsage(metrics.resources, job.plan) : null;
+  let status: BackgroundJobStatus;
+  let error: string | undefined;
+  if (job.cancelRequested || await isCancelRequested(job.id)) {
+    status = 'cancelled';
+    error = 'Cancelled';
+  } else if (!exit) {
+    status = 'failed';
+    error = 'The background run stopped unexpectedly';
+  } else if (exit.exitCode === 0) {
+    status = 'succeeded';
+  } else {
+    status = 'failed';
+    error = exit.signal ? `Terminated by ${exit.signal}` : `Exited with code ${exit.exitCode}`;
+  }
+
+  const finished: BackgroundJob = {
+    ...job,
+    status,
+    finishedAt,
+    exitCode: exit?.exitCode ?? null,
+    signal: exit?.signal ?? null,
+    error: notice ? [error, notice].filter(Boolean).join('\n') : error,
+    metrics,
+    artifacts,
+  };
+  await saveJob(finished);
+  await rm(path.join(runningIndexDir(), job.id), { force: true });
+  return finished;
+}
+
+/**
+ * Read a job, bringing its status up to date when the run has exited
+ */
+export async function getBackgroundJob(jobId: string): Promise<BackgroundJob | null> {
+  const dir = jobDir(jobId);
+  const job = await readJson<BackgroundJob>(path.join(dir, 'job.json'));
+  if (!job || job.status !== 'running') {
+    return job;
+  }
+
+  const exit = await readJson<ExitRecord>(path.join(dir, 'exit.json'));
+  if (!exit && isProcessAlive(job.pid, job.pidStartTime)) {
+    return { ...job, cancelRequested: job.cancelRequested || await isCancelRequested(job.id) };
+  }
+
+  let pending = finalizing.get(job.id);
+  if (!pending) {
+    pending = finalizeJob(job, exit).finally(() => finalizing.delete(job.id));
+    finalizing.set(job.id, pending);
+  }
+  return pending;
+}
+
+/**
+ * A user's jobs, newest first, optionally limited to one project. Only this
+ * user's jobs are read, newest first until the limit is reached.
+ */
+export async function listBackgroundJobs(userId: string, projectId?: string, limit = 50): Promise<BackgroundJob[]> {
+  const entries = (await readdir(userIndexDir(userId)).catch(() => [] as string[])).sort().reverse();
+  const jobs: BackgroundJob[] = [];
+  for (let i = 0; i < entries.length && jobs.length < limit; i += LIST_BATCH_SIZE) {
+    const batch = await Promise.all(entries.slice(i, i + LIST_BATCH_SIZE).map(entry =>
+      getBackgroundJob(entry.slice(entry.indexOf('-') + 1)).catch(() => null)
+    ));
+    for (const job of batch) {
+      if (job && job.userId === userId && (!projectId || job.projectId === projectId) && jobs.length < limit) {
+        jobs.push(job);
+      }
+    }
+  }
+  return jobs;
+}
+
+/**
+ * Finalize jobs whose run has exited without anyone looking at them, e.g.
+ * after the server that started them restarted
+ */
+export async function sweepBackgroundJobs(): Promise<void> {
+  const ids = await readdir(runningIndexDir()).catch(() => [] as string[]);
+  for (const id of ids) {
+    const job = await getBackgroundJob(id).catch((error) => {
+      console.error(`[BackgroundJobs] Failed to finalize ${id}:`, error);
+      return undefined;
+    });
+    // Gone, or finalized by someone else after it was indexed
+    if (job === null || (job && job.status !== 'running')) {
+      await rm(path.join(runningIndexDir(), id), { force: true });
+    }
+  }
+}
+
+/**
+ * Delete finished jobs past the retention period. Also indexes jobs written
+ * before the per-user index existed.
+ */
+export async function collectFinishedJobs(now = Date.now()): Promise<void> {
+  const cutoff = now - JOB_RETENTION_MS;
+  const ids = await readdir(getJobsDir()).catch(() => [] as string[]);
+  for (const id of ids) {
+    if (id === INDEX_DIR) continue;
+    const job = await readJson<BackgroundJob>(path.join(jobDir(id), 'job.json'));
+    if (!job) {
+      // A start that failed before its metadata was written
+      const info = await stat(jobDir(id)).catch(() => null);
+      if (info?.isDirectory() && info.mtimeMs < cutoff) {
+        await rm(jobDir(id), { recursive: true, force: true });
+      }
+      continue;
+    }
+
+    if (job.status !== 'running' && (job.finishedAt ?? job.createdAt) < cutoff) {
+      await rm(userIndexEntry(job), { force: true });
+      await rm(jobDir(id), { recursive: true, force: true });
+    } else {
+      await indexJob(job);
+    }
+  }
+}
+
+const globalForJobs = globalThis as unknown as { pycodeJobMaintenance?: boolean };
+
+/**
+ * Finalize exited jobs every SWEEP_INTERVAL_MS and delete expired ones every
+ * COLLECT_INTERVAL_MS, starting now (once per process)
+ */
+export function startJobMaintenance() {
+  if (globalForJobs.pycodeJobMaintenance) return;
+  globalForJobs.pycodeJobMaintenance = true;
+
+  const sweep = () => sweepBackgroundJobs().catch(error => console.error('[BackgroundJobs] Sweep failed:', error));
+  const collect = () => collectFinishedJobs().catch(error => console.error('[BackgroundJobs] Cleanup failed:', error));
+  collect().then(sweep);
+  setInterval(sweep, SWEEP_INTERVAL_MS).unref?.();
+  setInterval(collect, COLLECT_INTERVAL_MS).unref?.();
+}
+
+/**
+ * Stop a running job. The supervisor forwards SIGTERM to the run; whatever
+ * is still alive after the grace period is killed.
+ */
+export async function cancelBackgroundJob(jobId: string): Promise<BackgroundJob | null> {
+  const job = await getBackgroundJob(jobId);
+  if (!job || job.status !== 'running' || !job.pid) {
+    return job;
+  }
+
+  await writeFile(cancelMarker(jobId), '');
+  job.cancelRequested = true;
+
+  const pid = job.pid;
+  const signalGroup = (signal: NodeJS.Signals) => {
+    // The group's pid may have been reused once the supervisor exited
+    if (!isProcessAlive(pid, job.pidStartTime)) return;
+    try {
+      // Negative pid: the supervisor's whole process group
+      process.kill(-pid, signal);
+    } catch {
+      // Already gone
+    }
+  };
+  signalGroup('SIGTERM');
+  setTimeout(() => signalGroup('SIGKILL'), 5000).unref();
+
+  return job;
+}
+
+/**
+ * Output appended since the given byte offsets
+ */
+export async function readJobOutput(
+  jobId: string,
+  offsets: { stdout: number; stderr: number },
+  maxBytes = 256 * 1024
+): Promise<JobOutputChunk> {
+  const readFrom = async (name: string, offset: number): Promise<Buffer> => {
+    const handle = await open(path.join(jobDir(jobId), name), 'r').catch(() => null);
+    if (!handle) return Buffer.alloc(0);
+    try {
+      const { size } = await handle.stat();
+      const length = Math.min(Math.max(size - offset, 0), maxBytes);
+      if (length === 0) return Buffer.alloc(0);
+      const buffer = Buffer.alloc(length);
+      const { bytesRead } = await handle.read(buffer, 0, length, offset);
+      return buffer.subarray(0, bytesRead);
+    } finally {
+      await handle.close();
+    }
+  };
+
+  const [stdout, stderr] = await Promise.all([
+    readFrom('stdout.log', offsets.stdout),
+    readFrom('stderr.log', offsets.stderr),
+  ]);
+  return {
+    stdout,
+    stderr,
+    offsets: { stdout: offsets.stdout + stdout.length, stderr: offsets.stderr + stderr.length },
+  };
+}
+
+/**
+ * Current sizes of a job's logs
+ */
+export async function getJobOutputSize(jobId: string): Promise<{ stdout: number; stderr: number }> {
+  const sizeOf = async (name: string) => (await stat(path.join(jobDir(jobId), name)).catch(() => null))?.size ?? 0;
+  return { stdout: await sizeOf('stdout.log'), stderr: await sizeOf('stderr.log') };
+}
+
+/**
+ * Absolute path of an artifact, or null when the job did not produce it
+ */
+export function resolveJobArtifact(job: BackgroundJob, relativePath: string): string | null {
+  if (!job.artifacts?.some(artifact => artifact.path === relativePath)) {
+    return null;
+  }
+  return resolveProjectPath(job.workingDir, relativePath);
+}
@@ -0,0 +1,54 @@
+import { execFile } from 'child_process';
+import path from 'path';
+import { getCacheDir, hashContent } from './project-files';
+
+export interface PythonInfo {
+  cacheTag: string;
+  executable: string;
+  version: string;
+}
+
+let pythonInfoPromise: Promise<PythonInfo> | null = null;
+
+/**
+ * Probe the interpreter once per server process. The cache tag (e.g.
+ * cpython-311) and executable decide which bytecode is compatible.
+ */
+export function getPythonInfo(): Promise<PythonInfo> {
+  if (!pythonInfoPromise) {
+    const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
+    pythonInfoPromise = new Promise((resolve) => {
+      execFile(
+        pythonCommand,
+        ['-c', 'import json, sys; print(json.dumps({"cacheTag": sys.implementation.cache_tag, "executable": sys.executable, "version": sys.version.split()[0]}))'],
+        { timeout: 10000 },
+        (error, stdout) => {
+          if (error) {
+            console.error('[getPythonInfo] Failed to probe Python:', error.message);
+            // Retry on the next run rather than caching a bad probe
+            pythonInfoPromise = null;
+            resolve({ cacheTag: 'unknown', executable: pythonCommand, version: 'unknown' });
+            return;
+          }
+          try {
+            resolve(JSON.parse(stdout.trim()));
+          } catch {
+            pythonInfoPromise = null;
+            resolve({ cacheTag: 'unknown', executable: pythonCommand, version: 'unknown' });
+          }
+        }
+      );
+    });
+  }
+  return pythonInfoPromise;
+}
+
+/**
+ * Stable PYTHONPYCACHEPREFIX for a project. Keyed by Python version and
+ * interpreter so switching environments never loads incompatible bytecode.
+ */
+export async function getBytecodeCacheDir(projectId?: string): Promise<string> {
+  const info = await getPythonInfo();
+  const envKey = `${info.cacheTag}-${hashContent(info.executable).slice(0, 8)}`;
+  return getCacheDir('pycache', path.basename(projectId || 'default'), envKey);
+}
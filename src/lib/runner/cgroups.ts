@@ -0,0 +1,188 @@
+import { promises as fs, writeFileSync } from 'fs';
+import path from 'path';
+import { randomUUID } from 'crypto';
+
+/**
+ * Per-run cgroup v2 limits.
+ *
+ * Every run gets its own child cgroup under PYCODE_CGROUP_ROOT (default
+ * /sys/fs/cgroup/pycode, which must be delegated to the server's user). The
+ * limits come from the user's plan. After the run, the cgroup's counters
+ * report OOM kills, CPU throttling and peak memory.
+ *
+ * Runs never join their cgroup themselves: the server (or the background job
+ * supervisor) moves the process in before any user code executes. The
+ * delegated tree is owned by the server's user, which a sandboxed run maps
+ * to, so sandboxes hide the cgroup filesystem and drop their capabilities;
+ * otherwise a run could write its pid into another cgroup and leave its
+ * limits behind. Runs without a sandbox execute as the server's user and are
+ * not contained either way.
+ *
+ * Hosts without cgroup v2 or without a writable root simply run unlimited
+ * (with one warning), the same as before.
+ */
+
+export interface ResourceLimits {
+  memoryMb: number;
+  /** Percent of one CPU (100 = one full core) */
+  cpuPercent: number;
+  pids: number;
+}
+
+export interface ResourceUsage {
+  oom: boolean;
+  oomKills: number;
+  memoryLimitMb: number;
+  memoryPeakMb?: number;
+  cpuUsageMs: number;
+  throttledMs: number;
+  throttledPeriods: number;
+}
+
+export interface RunCgroup {
+  path: string;
+  limits: ResourceLimits;
+}
+
+export const PLAN_RESOURCE_LIMITS: Record<string, ResourceLimits> = {
+  free: { memoryMb: 256, cpuPercent: 50, pids: 64 },
+  pro: { memoryMb: 1024, cpuPercent: 100, pids: 256 },
+  team: { memoryMb: 2048, cpuPercent: 200, pids: 512 },
+};
+
+const CPU_PERIOD_USEC = 100000;
+
+export function getResourceLimits(plan?: string): ResourceLimits {
+  return PLAN_RESOURCE_LIMITS[plan || 'free'] || PLAN_RESOURCE_LIMITS.free;
+}
+
+let rootReady: Promise<string | null> | null = null;
+
+function getCgroupRoot(): Promise<string | null> {
+  if (!rootReady) {
+    rootReady = (async () => {
+      if (process.platform !== 'linux' || process.env.PYCODE_CGROUP_ROOT === 'off') {
+        return null;
+      }
+      const root = process.env.PYCODE_CGROUP_ROOT || '/sys/fs/cgroup/pycode';
+      try {
+        await fs.mkdir(root, { recursive: true });
+        const controllers = (await fs.readFile(path.join(root, 'cgroup.controllers'), 'utf8')).split(/\s+/);
+        const missing = ['memory', 'cpu', 'pids'].filter(c => !controllers.includes(c));
+        if (missing.length > 0) {
+          throw new Error(`controllers not delegated: ${missing.join(', ')}`);
+        }
+        await fs.writeFile(path.join(root, 'cgroup.subtree_control'), '+memory +cpu +pids');
+        return root;
+      } catch (error: any) {
+        console.warn(`[cgroups] Resource limits disabled (${root}): ${error?.message || error}`);
+        return null;
+      }
+    })();
+  }
+  return rootReady;
+}
+
+/**
+ * Create a cgroup for one run with the given limits. Returns null when
+ * cgroups are unavailable on this host.
+ */
+export async function createRunCgroup(limits: ResourceLimits): Promise<RunCgroup | null> {
+  const root = await getCgroupRoot();
+  if (!root) {
+    return null;
+  }
+
+  const cgroupPath = path.join(root, `run-${randomUUID()}`);
+  try {
+    await fs.mkdir(cgroupPath);
+    await fs.writeFile(path.join(cgroupPath, 'memory.max'), String(limits.memoryMb * 1024 * 1024));
+    // Without this the kernel swaps instead of OOM-killing, which is exactly
+    // what pushes the host into swap
+    await fs.writeFile(path.join(cgroupPath, 'memory.swap.max'), '0').catch(() => undefined);
+    await fs.writeFile(
+      path.join(cgroupPath, 'cpu.max'),
+      `${Math.round(CPU_PERIOD_USEC * limits.cpuPercent / 100)} ${CPU_PERIOD_USEC}`
+    );
+    await fs.writeFile(path.join(cgroupPath, 'pids.max'), String(limits.pids));
+    return { path: cgroupPath, limits };
+  } catch (error: any) {
+    console.error('[cgroups] Failed to create run cgroup:', error?.message || error);
+    await fs.rmdir(cgroupPath).catch(() => undefined);
+    return null;
+  }
+}
+
+/**
+ * Move processes into a run cgroup. Synchronous so callers can do it between
+ * starting a process and letting it run; throws when the kernel refuses.
+ */
+export function moveIntoCgroup(cgroupPath: string, pids: number[]): void {
+  for (const pid of pids) {
+    writeFileSync(path.join(cgroupPath, 'cgroup.procs'), String(pid));
+  }
+}
+
+function parseKeyedFile(content: string): Record<string, number> {
+  const values: Record<string, number> = {};
+  for (const line of content.split('\n')) {
+    const [key, value] = line.trim().split(/\s+/);
+    if (key && value !== undefined) {
+      values[key] = Number(value);
+    }
+  }
+  return values;
+}
+
+/**
+ * Read OOM, CPU and memory counters for a finished run
+ */
+export async function readCgroupUsage(cgroup: RunCgroup): Promise<ResourceUsage> {
+  const read = (file: string) => fs.readFile(path.join(cgroup.path, file), 'utf8').catch(() => '');
+
+  const [memoryEvents, cpuStat, memoryPeak] = await Promise.all([
+    read('memory.events'),
+    read('cpu.stat'),
+    read('memory.peak'),
+  ]);
+  const events = parseKeyedFile(memoryEvents);
+  const cpu = parseKeyedFile(cpuStat);
+  const oomKills = events.oom_kill || 0;
+
+  return {
+    oom: oomKills > 0,
+    oomKills,
+    memoryLimitMb: cgroup.limits.memoryMb,
+    memoryPeakMb: memoryPeak.trim() ? Math.round(Number(memoryPeak) / (1024 * 1024)) : undefined,
+    cpuUsageMs: Math.round((cpu.usage_usec || 0) / 1000),
+    throttledMs: Math.round((cpu.throttled_usec || 0) / 1000),
+    throttledPeriods: cpu.nr_throttled || 0,
+  };
+}
+
+/**
+ * Remove a run cgroup. The kernel refuses while processes remain, so kill
+ * stragglers first and retry briefly.
+ */
+export async function removeRunCgroup(cgroup: RunCgroup): Promise<void> {
+  await fs.writeFile(path.join(cgroup.path, 'cgroup.kill'), '1').catch(() => undefined);
+  for (let attempt = 0; attempt < 5; attempt++) {
+    try {
+      await fs.rmdir(cgroup.path);
+      return;
+    } catch {
+      await new Promise((resolve) => setTimeout(resolve, 50));
+    }
+  }
+  console.warn('[cgroups] Could not remove', cgroup.path);
+}
+
+/**
+ * Human-readable explanation appended to stderr when a run hit its limits
+ */
+export function describeResourceUsage(usage: ResourceUsage, plan?: string): string | null {
+  if (usage.oom) {
+    return `[RESOURCE LIMIT] The process was killed because it exceeded the ${usage.memoryLimitMb} MB memory limit of the ${plan || 'free'} plan. Output above may be incomplete.`;
+  }
+  return null;
+}
@@ -0,0 +1,126 @@
+/**
+ * Minimal cron expressions for project schedules: five fields (minute, hour,
+ * day of month, month, day of week) with `*`, lists, ranges and steps, plus
+ * the usual @hourly/@daily/@weekly/@monthly/@yearly aliases. Times are UTC.
+ */
+
+interface CronFields {
+  minutes: Set<number>;
+  hours: Set<number>;
+  daysOfMonth: Set<number>;
+  months: Set<number>;
+  daysOfWeek: Set<number>;
+  // Standard cron: when both day fields are restricted, either may match
+  anyDayOfMonth: boolean;
+  anyDayOfWeek: boolean;
+}
+
+const ALIASES: Record<string, string> = {
+  '@yearly': '0 0 1 1 *',
+  '@annually': '0 0 1 1 *',
+  '@monthly': '0 0 1 * *',
+  '@weekly': '0 0 * * 0',
+  '@daily': '0 0 * * *',
+  '@midnight': '0 0 * * *',
+  '@hourly': '0 * * * *',
+};
+
+function parseField(field: string, min: number, max: number): Set<number> | null {
+  const values = new Set<number>();
+  for (const part of field.split(',')) {
+    const match = part.match(/^(\*|(\d+)(?:-(\d+))?)(?:\/(\d+))?$/);
+    if (!match) return null;
+
+    let start = min;
+    let end = max;
+    if (match[2] !== undefined) {
+      start = parseInt(match[2], 10);
+      // "5/15" means from 5 to the end in steps of 15
+      end = match[3] !== undefined ? parseInt(match[3], 10) : (match[4] !== undefined ? max : start);
+    }
+    const step = match[4] !== undefined ? parseInt(match[4], 10) : 1;
+    if (start < min || end > max || start > end || step < 1) return null;
+
+    for (let value = start; value <= end; value += step) {
+      values.add(value);
+    }
+  }
+  return values;
+}
+
+function parseCron(expression: string): CronFields | null {
+  const normalized = ALIASES[expression.trim().toLowerCase()] || expression.trim();
+  const parts = normalized.split(/\s+/);
+  if (parts.length !== 5) return null;
+
+  const minutes = parseField(parts[0], 0, 59);
+  const hours = parseField(parts[1], 0, 23);
+  const daysOfMonth = parseField(parts[2], 1, 31);
+  const months = parseField(parts[3], 1, 12);
+  // 0 and 7 are both Sunday
+  const daysOfWeek = parseField(parts[4], 0, 7);
+  if (!minutes || !hours || !daysOfMonth || !months || !daysOfWeek) return null;
+  if (daysOfWeek.has(7)) daysOfWeek.add(0);
+
+  return {
+    minutes,
+    hours,
+    daysOfMonth,
+    months,
+    daysOfWeek,
+    anyDayOfMonth: parts[2] === '*',
+    anyDayOfWeek: parts[4] === '*',
+  };
+}
+
+export function isValidCron(expression: string): boolean {
+  return parseCron(expression) !== null;
+}
+
+function dayMatches(fields: CronFields, date: Date): boolean {
+  const dom = fields.daysOfMonth.has(date.getUTCDate());
+  const dow = fields.daysOfWeek.has(date.getUTCDay());
+  if (fields.anyDayOfMonth && fields.anyDayOfWeek) return true;
+  if (fields.anyDayOfMonth) return dow;
+  if (fields.anyDayOfWeek) return dom;
+  return dom || dow;
+}
+
+/**
+ * First time strictly after `after` (ms since epoch) matching the
+ * expression, or null when the expression is invalid or never matches
+ */
+export function nextCronTime(expression: string, after: number): number | null {
+  const fields = parseCron(expression);
+  if (!fields) return null;
+
+  const date = new Date(after);
+  date.setUTCSeconds(0, 0);
+  date.setUTCMinutes(date.getUTCMinutes() + 1);
+
+  // Skip whole months, days and hours that cannot match; five years covers
+  // every valid expression (Feb 29 included)
+  const limit = after + 5 * 366 * 24 * 60 * 60 * 1000;
+  while (date.getTime() <= limit) {
+    if (!fields.months.has(date.getUTCMonth() + 1)) {
+      date.setUTCMonth(date.getUTCMonth() + 1, 1);
+      date.setUTCHours(0, 0, 0, 0);
+      continue;
+    }
+    if (!dayMatches(fields, date)) {
+      date.setUTCDate(date.getUTCDate() + 1);
+      date.setUTCHours(0, 0, 0, 0);
+      continue;
+    }
+    if (!fields.hours.has(date.getUTCHours())) {
+      date.setUTCHours(date.getUTCHours() + 1, 0, 0, 0);
+      continue;
+    }
+    if (!fields.minutes.has(date.getUTCMinutes())) {
+      date.setUTCMinutes(date.getUTCMinutes() + 1, 0, 0);
+      continue;
+    }
+    return date.getTime();
+  }
+  return null;
+}
@@ -0,0 +1,173 @@
+import net from 'net';
+import { decodeJsonPayload, encodeFrame, Frame, FrameDecoder, FrameType } from './protocol';
+import type { ExecHandlers, ExecRequest, ExecResult } from './process-exec';
+import type { DaemonHealth, DaemonMetrics } from './daemon';
+
+interface PendingRequest {
+  onFrame: (frame: Frame) => void;
+  onDisconnect: () => void;
+}
+
+/**
+ * Client side of the execution daemon protocol. Keeps one multiplexed
+ * connection per server process and reconnects lazily after failures.
+ */
+export class DaemonClient {
+  private socket: net.Socket | null = null;
+  private connecting: Promise<net.Socket> | null = null;
+  private nextRequestId = 1;
+  private pending = new Map<number, PendingRequest>();
+
+  constructor(private readonly socketPath: string) {}
+
+  private connect(): Promise<net.Socket> {
+    if (this.socket && !this.socket.destroyed) {
+      return Promise.resolve(this.socket);
+    }
+    if (!this.connecting) {
+      this.connecting = new Promise((resolve, reject) => {
+        const socket = net.createConnection(this.socketPath);
+        const decoder = new FrameDecoder();
+
+        socket.once('connect', () => {
+          this.socket = socket;
+          this.connecting = null;
+          resolve(socket);
+        });
+
+        socket.on('data', (chunk) => {
+          let frames: Frame[];
+          try {
+            frames = decoder.push(chunk);
+          } catch (error: any) {
+            console.error('[DaemonClient] Corrupt stream from daemon:', error.message);
+            socket.destroy();
+            return;
+          }
+          for (const frame of frames) {
+            this.pending.get(frame.requestId)?.onFrame(frame);
+          }
+        });
+
+        socket.on('error', (error) => {
+          if (this.connecting) {
+            this.connecting = null;
+            reject(error);
+          }
+        });
+
+        socket.on('close', () => {
+          if (this.socket === socket) {
+            this.socket = null;
+          }
+          const orphaned = [...this.pending.values()];
+          this.pending.clear();
+          orphaned.forEach(request => request.onDisconnect());
+        });
+      });
+    }
+    return this.connecting;
+  }
+
+  private allocateRequestId(): number {
+    const id = this.nextRequestId;
+    this.nextRequestId = this.nextRequestId >= 0xffffffff ? 1 : this.nextRequestId + 1;
+    return id;
+  }
+
+  async exec(request: ExecRequest, handlers: ExecHandlers = {}): Promise<ExecResult> {
+    let socket: net.Socket;
+    try {
+      socket = await this.connect();
+    } catch (error: any) {
+      return {
+        exitCode: null,
+        signal: null,
+        timedOut: false,
+        durationMs: 0,
+        error: `Execution service unavailable: ${error?.message || error}`,
+      };
+    }
+
+    const requestId = this.allocateRequestId();
+    return new Promise((resolve) => {
+      const abort = () => socket.write(encodeFrame(FrameType.KILL, requestId));
+
+      const done = (result: ExecResult) => {
+        this.pending.delete(requestId);
+        handlers.signal?.removeEventListener('abort', abort);
+        resolve(result);
+      };
+
+      this.pending.set(requestId, {
+        onFrame: (frame) => {
+          if (frame.type === FrameType.STDOUT) {
+            handlers.onStdout?.(frame.payload);
+          } else if (frame.type === FrameType.STDERR) {
+            handlers.onStderr?.(frame.payload);
+          } else if (frame.type === FrameType.EXIT) {
+            done(decodeJsonPayload<ExecResult>(frame));
+          }
+        },
+        onDisconnect: () => done({
+          exitCode: null,
+          signal: null,
+          timedOut: false,
+          durationMs: 0,
+          error: 'Execution service connection lost',
+        }),
+      });
+
+      handlers.signal?.addEventListener('abort', abort);
+      socket.write(encodeFrame(FrameType.EXEC, requestId, request));
+    });
+  }
+
+  private async query<T>(type: FrameType.HEALTH | FrameType.METRICS, timeoutMs: number): Promise<T> {
+    const socket = await this.connect();
+    const requestId = this.allocateRequestId();
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(requestId);
+        reject(new Error('Execution service did not respond'));
+      }, timeoutMs);
+
+      this.pending.set(requestId, {
+        onFrame: (frame) => {
+          clearTimeout(timer);
+          this.pending.delete(requestId);
+          resolve(decodeJsonPayload<T>(frame));
+        },
+        onDisconnect: () => {
+          clearTimeout(timer);
+          reject(new Error('Execution service connection lost'));
+        },
+      });
+      socket.write(encodeFrame(type, requestId));
+    });
+  }
+
+  health(timeoutMs = 2000): Promise<DaemonHealth> {
+    return this.query<DaemonHealth>(FrameType.HEALTH, timeoutMs);
+  }
+
+  metrics(timeoutMs = 2000): Promise<DaemonMetrics> {
+    return this.query<DaemonMetrics>(FrameType.METRICS, timeoutMs);
+  }
+}
+
+let client: DaemonClient | null = null;
+
+/**
+ * Client for PYCODE_RUNNER_SOCKET, or null when processes run in-process
+ */
+export function getDaemonClient(): DaemonClient | null {
+  const socketPath = process.env.PYCODE_RUNNER_SOCKET;
+  if (!socketPath) {
+    return null;
+  }
+  if (!client) {
+    client = new DaemonClient(socketPath);
+  }
+  return client;
+}
@@ -0,0 +1,273 @@
+import net from 'net';
+import os from 'os';
+import { promises as fs } from 'fs';
+import { encodeFrame, decodeJsonPayload, Frame, FrameDecoder, FrameType } from './protocol';
+import { ExecRequest, ExecResult, executeLocally } from './process-exec';
+import { getSandboxPool, getSandboxPoolStatus, SandboxPoolStatus } from './sandbox-pool';
+
+/**
+ * Standalone execution daemon. Accepts EXEC frames over a Unix socket, runs
+ * them with a bounded number of concurrent workers and streams output back.
+ * Started with `npm run runner:daemon`.
+ */
+
+export interface DaemonHealth {
+  status: 'ok' | 'saturated';
+  pid: number;
+  uptimeMs: number;
+  running: number;
+  queued: number;
+  maxWorkers: number;
+  sandbox: SandboxPoolStatus;
+}
+
+export interface DaemonMetrics {
+  started: number;
+  completed: number;
+  failed: number;
+  timedOut: number;
+  killed: number;
+  stdoutBytes: number;
+  stderrBytes: number;
+  avgQueueWaitMs: number;
+  avgDurationMs: number;
+  loadAverage: number[];
+  rssBytes: number;
+}
+
+interface PendingJob {
+  socket: net.Socket;
+  /** Jobs of the same connection, so finished ones can be forgotten */
+  connectionJobs: Map<number, PendingJob>;
+  requestId: number;
+  request: ExecRequest;
+  enqueuedAt: number;
+  abort: AbortController;
+}
+
+export interface DaemonOptions {
+  socketPath: string;
+  maxWorkers?: number;
+}
+
+export class ExecutionDaemon {
+  private server: net.Server | null = null;
+  private readonly maxWorkers: number;
+  private readonly startedAt = Date.now();
+  private running = new Set<PendingJob>();
+  private queue: PendingJob[] = [];
+  private totals = {
+    started: 0,
+    completed: 0,
+    failed: 0,
+    timedOut: 0,
+    killed: 0,
+    stdoutBytes: 0,
+    stderrBytes: 0,
+    queueWaitMs: 0,
+    durationMs: 0,
+  };
+
+  constructor(private readonly options: DaemonOptions) {
+    this.maxWorkers = options.maxWorkers || Math.max(2, os.cpus().length * 2);
+  }
+
+  async listen(): Promise<void> {
+    // A stale socket file from a crashed daemon would make listen() fail
+    await fs.unlink(this.options.socketPath).catch(() => undefined);
+
+    this.server = net.createServer((socket) => this.handleConnection(socket));
+    await new Promise<void>((resolve, reject) => {
+      this.server!.once('error', reject);
+      this.server!.listen(this.options.socketPath, () => resolve());
+    });
+    await fs.chmod(this.options.socketPath, 0o660).catch(() => undefined);
+
+    // Start warming sandboxes before the first request arrives
+    getSandboxPool();
+    console.log(`[ExecutionDaemon] Listening on ${this.options.socketPath} (max ${this.maxWorkers} workers)`);
+  }
+
+  async close(): Promise<void> {
+    for (const job of [...this.running.values(), ...this.queue]) {
+      job.abort.abort();
+    }
+    this.queue = [];
+    getSandboxPool()?.shutdown();
+    await new Promise<void>((resolve) => (this.server ? this.server.close(() => resolve()) : resolve()));
+  }
+
+  health(): DaemonHealth {
+    return {
+      status: this.running.size >= this.maxWorkers ? 'saturated' : 'ok',
+      pid: process.pid,
+      uptimeMs: Date.now() - this.startedAt,
+      running: this.running.size,
+      queued: this.queue.length,
+      maxWorkers: this.maxWorkers,
+      sandbox: getSandboxPoolStatus(),
+    };
+  }
+
+  metrics(): DaemonMetrics {
+    const finished = this.totals.completed + this.totals.failed;
+    return {
+      started: this.totals.started,
+      completed: this.totals.completed,
+      failed: this.totals.failed,
+      timedOut: this.totals.timedOut,
+      killed: this.totals.killed,
+      stdoutBytes: this.totals.stdoutBytes,
+      stderrBytes: this.totals.stderrBytes,
+      avgQueueWaitMs: this.totals.started ? this.totals.queueWaitMs / this.totals.started : 0,
+      avgDurationMs: finished ? this.totals.durationMs / finished : 0,
+      loadAverage: os.loadavg(),
+      rssBytes: process.memoryUsage().rss,
+    };
+  }
+
+  private handleConnection(socket: net.Socket) {
+    const decoder = new FrameDecoder();
+    const jobs = new Map<number, PendingJob>();
+
+    socket.on('data', (chunk) => {
+      let frames: Frame[];
+      try {
+        frames = decoder.push(chunk);
+      } catch (error: any) {
+        console.error('[ExecutionDaemon] Dropping connection:', error.message);
+        socket.destroy();
+        return;
+      }
+      for (const frame of frames) {
+        this.handleFrame(socket, jobs, frame);
+      }
+    });
+
+    // Clients going away take their processes with them
+    socket.on('close', () => {
+      for (const job of jobs.values()) {
+        job.abort.abort();
+      }
+      this.queue = this.queue.filter(job => job.socket !== socket);
+    });
+    socket.on('error', () => undefined);
+  }
+
+  private handleFrame(socket: net.Socket, jobs: Map<number, PendingJob>, frame: Frame) {
+    switch (frame.type) {
+      case FrameType.EXEC: {
+        let request: ExecRequest;
+        try {
+          request = decodeJsonPayload<ExecRequest>(frame);
+        } catch {
+          this.send(socket, FrameType.EXIT, frame.requestId, {
+            exitCode: null, signal: null, timedOut: false, durationMs: 0, error: 'Malformed EXEC payload',
+          } satisfies ExecResult);
+          return;
+        }
+        const job: PendingJob = {
+          socket,
+          connectionJobs: jobs,
+          requestId: frame.requestId,
+          request,
+          enqueuedAt: Date.now(),
+          abort: new AbortController(),
+        };
+        jobs.set(frame.requestId, job);
+        this.queue.push(job);
+        this.drain();
+        break;
+      }
+      case FrameType.KILL: {
+        const job = jobs.get(frame.requestId);
+        if (job) {
+          this.totals.killed++;
+          job.abort.abort();
+          // A job still waiting in the queue never started; answer it directly
+          if (this.queue.includes(job)) {
+            this.queue = this.queue.filter(j => j !== job);
+            jobs.delete(frame.requestId);
+            this.send(socket, FrameType.EXIT, frame.requestId, {
+              exitCode: null, signal: 'SIGTERM', timedOut: false, durationMs: 0,
+            } satisfies ExecResult);
+          }
+        }
+        break;
+      }
+      case FrameType.HEALTH:
+        this.send(socket, FrameType.HEALTH, frame.requestId, this.health());
+        break;
+      case FrameType.METRICS:
+        this.send(socket, FrameType.METRICS, frame.requestId, this.metrics());
+        break;
+      default:
+        console.warn('[ExecutionDaemon] Ignoring frame type', frame.type);
+    }
+  }
+
+  private drain() {
+    while (this.running.size < this.maxWorkers && this.queue.length > 0) {
+      const job = this.queue.shift()!;
+      this.start(job);
+    }
+  }
+
+  private async start(job: PendingJob) {
+    this.running.add(job);
+    this.totals.started++;
+    this.totals.queueWaitMs += Date.now() - job.enqueuedAt;
+
+    const result = await executeLocally(job.request, {
+      signal: job.abort.signal,
+      onStdout: (chunk) => {
+        this.totals.stdoutBytes += chunk.length;
+        return this.send(job.socket, FrameType.STDOUT, job.requestId, chunk);
+      },
+      onStderr: (chunk) => {
+        this.totals.stderrBytes += chunk.length;
+        return this.send(job.socket, FrameType.STDERR, job.requestId, chunk);
+      },
+      // A client reading slowly pauses the process instead of growing the socket's buffer
+      drained: () => new Promise<void>((resolve) => {
+        if (job.socket.destroyed) {
+          resolve();
+          return;
+        }
+        const done = () => {
+          job.socket.off('drain', done);
+          job.socket.off('close', done);
+          resolve();
+        };
+        job.socket.on('drain', done);
+        job.socket.on('close', done);
+      }),
+    });
+
+    this.running.delete(job);
+    job.connectionJobs.delete(job.requestId);
+    this.totals.durationMs += result.durationMs;
+    if (result.error || result.exitCode !== 0) {
+      this.totals.failed++;
+    } else {
+      this.totals.completed++;
+    }
+    if (result.timedOut) {
+      this.totals.timedOut++;
+    }
+
+    this.send(job.socket, FrameType.EXIT, job.requestId, result);
+    this.drain();
+  }
+
+  /**
+   * Write a frame; false when the socket's buffer is full and the caller
+   * should wait for 'drain'
+   */
+  private send(socket: net.Socket, type: FrameType, requestId: number, payload?: Buffer | object): boolean {
+    if (socket.destroyed) {
+      return true;
+    }
+    return socket.write(encodeFrame(type, requestId, payload));
+  }
+}
@@ -0,0 +1,197 @@
+import { parseImports } from './project-files';
+import { runProcess } from './process-exec';
+
+/**
+ * Resolving and installing third-party packages ahead of a run, so the
+ * bootstrap's auto-install finds everything already present.
+ *
+ * Only modules with a known pip package are installed. Installing whatever
+ * name appears in an import statement would let typo'd or AI-hallucinated
+ * module names pull arbitrary packages from PyPI.
+ */
+
+// import name -> pip package
+export const IMPORT_PACKAGE_MAP: Record<string, string> = {
+  matplotlib: 'matplotlib',
+  pandas: 'pandas',
+  numpy: 'numpy',
+  seaborn: 'seaborn',
+  sklearn: 'scikit-learn',
+  scipy: 'scipy',
+  statsmodels: 'statsmodels',
+  plotly: 'plotly',
+  bokeh: 'bokeh',
+  altair: 'altair',
+  cv2: 'opencv-python',
+  tensorflow: 'tensorflow',
+  keras: 'keras',
+  torch: 'torch',
+  torchvision: 'torchvision',
+  nltk: 'nltk',
+  spacy: 'spacy',
+  textblob: 'textblob',
+  transformers: 'transformers',
+  xgboost: 'xgboost',
+  lightgbm: 'lightgbm',
+  catboost: 'catboost',
+  requests: 'requests',
+  bs4: 'beautifulsoup4',
+  PIL: 'Pillow',
+  yaml: 'PyYAML',
+  dash: 'dash',
+  dask: 'dask',
+  sqlalchemy: 'SQLAlchemy',
+  pygame: 'pygame',
+  flask: 'Flask',
+  pytest: 'pytest',
+};
+
+const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
+
+/**
+ * Wrap a command so background work yields the CPU to interactive runs
+ */
+export function lowPriority(command: string, args: string[]): { command: string; args: string[] } {
+  return process.platform === 'win32'
+    ? { command, args }
+    : { command: 'nice', args: ['-n', '10', command, ...args] };
+}
+
+/**
+ * Top-level third-party modules imported by the given sources, excluding
+ * modules that are provided by the project itself
+ */
+export function collectThirdPartyImports(sources: string[], localModules: Set<string> = new Set()): string[] {
+  const modules = new Set<string>();
+  for (const source of sources) {
+    for (const name of parseImports(source)) {
+      const top = name.split('.')[0];
+      if (top && !localModules.has(top) && IMPORT_PACKAGE_MAP[top]) {
+        modules.add(top);
+      }
+    }
+  }
+  return [...modules];
+}
+
+/**
+ * Pip packages for the modules that cannot be imported yet
+ */
+export async function findMissingPackages(modules: string[], signal?: AbortSignal): Promise<string[]> {
+  if (modules.length === 0) return [];
+
+  let stdout = '';
+  const result = await runProcess({
+    kind: 'command',
+    command: pythonCommand,
+    args: [
+      '-c',
+      'import importlib.util, json, sys; print(json.dumps([m for m in sys.argv[1:] if importlib.util.find_spec(m) is None]))',
+      ...modules,
+    ],
+    timeoutMs: 30000,
+  }, {
+    onStdout: (chunk) => { stdout += chunk.toString(); },
+    signal,
+  });
+
+  if (result.exitCode !== 0) {
+    return [];
+  }
+  try {
+    const missing: string[] = JSON.parse(stdout.trim());
+    return [...new Set(missing.map(module => IMPORT_PACKAGE_MAP[module]).filter(Boolean))];
+  } catch {
+    return [];
+  }
+}
+
+// One pip process and the callers waiting on it; it is aborted only when the
+// last of them cancels
+type SharedInstall = {
+  done: Promise<boolean>;
+  waiters: number;
+  controller: AbortController;
+};
+
+// Installs in flight per package, shared by prewarm, prefetch and run callers
+const inFlightInstalls = new Map<string, SharedInstall>();
+
+/**
+ * Wait for a shared install on behalf of one caller: false when the caller's
+ * signal aborts first
+ */
+function waitForInstall(install: SharedInstall, signal?: AbortSignal): Promise<boolean> {
+  if (signal?.aborted) return Promise.resolve(false);
+  install.waiters++;
+  return new Promise<boolean>((resolve, reject) => {
+    let waiting = true;
+    const leave = () => {
+      waiting = false;
+      install.waiters--;
+      signal?.removeEventListener('abort', onAbort);
+    };
+    const onAbort = () => {
+      if (!waiting) return;
+      leave();
+      if (install.waiters === 0) install.controller.abort();
+      resolve(false);
+    };
+    signal?.addEventListener('abort', onAbort, { once: true });
+    install.done.then(
+      ok => { if (waiting) { leave(); resolve(ok); } },
+      error => { if (waiting) { leave(); reject(error); } },
+    );
+  });
+}
+
+/**
+ * Install packages in the background at low priority. Concurrent requests
+ * for the same package share one pip process, which keeps running while any
+ * of them still waits for it.
+ */
+export async function installPackages(packages: string[], signal?: AbortSignal): Promise<{ installed: string[]; failed: string[] }> {
+  const pending = packages.filter(pkg => !inFlightInstalls.has(pkg));
+
+  if (pending.length > 0) {
+    const { command, args } = lowPriority(pythonCommand, [
+      '-m', 'pip', 'install', '--user', '--prefer-binary', '--disable-pip-version-check', '-q', ...pending,
+    ]);
+    const controller = new AbortController();
+    const install: SharedInstall = {
+      done: runProcess({ kind: 'command', command, args, timeoutMs: 600000 }, { signal: controller.signal })
+        .then(result => result.exitCode === 0)
+        .finally(() => pending.forEach(pkg => inFlightInstalls.delete(pkg))),
+      waiters: 0,
+      controller,
+    };
+    pending.forEach(pkg => inFlightInstalls.set(pkg, install));
+  }
+
+  // Each pip process is waited for once, however many of the packages it installs
+  const installs = new Map(packages.map(pkg => [pkg, inFlightInstalls.get(pkg)]));
+  const results = new Map<SharedInstall, Promise<boolean>>();
+  installs.forEach(install => {
+    if (install && !results.has(install)) results.set(install, waitForInstall(install, signal));
+  });
+  const outcomes = await Promise.all(packages.map(async pkg => {
+    const install = installs.get(pkg);
+    return { pkg, ok: install ? await results.get(install)! : true };
+  }));
+  return {
+    installed: outcomes.filter(o => o.ok).map(o => o.pkg),
+    failed: outcomes.filter(o => !o.ok).map(o => o.pkg),
+  };
+}
+
+/**
+ * Wait for background installs of the given modules' packages that are still
+ * running, so a run started mid-prefetch does not launch a second pip for the
+ * same package
+ */
+export async function waitForPendingInstalls(modules: string[], signal?: AbortSignal): Promise<void> {
+  const pending = new Set(modules
+    .map(module => inFlightInstalls.get(IMPORT_PACKAGE_MAP[module]))
+    .filter((install): install is SharedInstall => !!install));
+  await Promise.all(Array.from(pending, install => waitForInstall(install, signal).catch(() => false)));
+}
@@ -0,0 +1,427 @@
+import { randomUUID, timingSafeEqual } from 'crypto';
+import type { PythonRunInput, PythonRunResult } from './python-run';
+import { NodeLoad, ProjectPlacement } from './placement';
+import { createAdminClient } from '../supabase/admin';
+import { SupabaseJobBroker } from './supabase-job-broker';
+
+/**
+ * Job protocol between the web tier and remote runner nodes.
+ *
+ * Runner agents register their capacity, then long-poll for jobs, stream
+ * output events back while a job runs, report completion and heartbeat.
+ * API routes submit runs and await the result. Because nodes pull work only
+ * when they have free slots, throughput grows with the number of nodes.
+ *
+ * LocalJobBroker keeps all state in memory: a broker for a single web
+ * instance hosting /api/runner/*, and a stand-in for tests. With several web
+ * instances, nodes, queue and results have to be shared between them, which
+ * SupabaseJobBroker (supabase-job-broker.ts) does through Postgres.
+ */
+
+export interface RunJobPayload {
+  /** 'warm' jobs only prepare a project's caches on a node (see placement.ts) */
+  kind?: 'run' | 'warm';
+  input: PythonRunInput;
+  plan: string;
+}
+
+export type JobEvent =
+  | { type: 'stdout'; data: string }
+  | { type: 'stderr'; data: string };
+
+export interface RunnerRegistration {
+  name?: string;
+  /** Jobs the node runs concurrently */
+  capacity: number;
+  labels?: Record<string, string>;
+}
+
+export interface RunnerNode extends RunnerRegistration {
+  id: string;
+  running: number;
+  registeredAt: number;
+  lastHeartbeat: number;
+  completed: number;
+}
+
+export interface HeartbeatResponse {
+  /** False when the broker no longer knows the node; it must register again */
+  known: boolean;
+  /** Jobs the node should stop (cancelled or timed out on the submitting side) */
+  cancel: string[];
+}
+
+export interface BrokerJob {
+  id: string;
+  payload: RunJobPayload;
+  status: 'queued' | 'assigned' | 'completed' | 'failed';
+  nodeId?: string;
+  createdAt: number;
+  assignedAt?: number;
+  /** True once the node streamed output, so the job cannot be retried elsewhere */
+  started: boolean;
+  /** Only this node may run the job */
+  pinnedNodeId?: string;
+}
+
+export interface SubmitOptions {
+  onEvent?: (event: JobEvent) => void;
+  signal?: AbortSignal;
+  timeoutMs?: number;
+  /** Pin the job to one node */
+  nodeId?: string;
+}
+
+export interface JobBroker {
+  registerNode(registration: RunnerRegistration): Promise<RunnerNode>;
+  deregisterNode(nodeId: string): Promise<void>;
+  heartbeat(nodeId: string, running: number): Promise<HeartbeatResponse>;
+  pull(nodeId: string, maxJobs: number, waitMs: number): Promise<BrokerJob[]>;
+  publish(jobId: string, nodeId: string, events: JobEvent[]): Promise<boolean>;
+  complete(jobId: string, nodeId: string, result: PythonRunResult): Promise<boolean>;
+  submit(payload: RunJobPayload, options?: SubmitOptions): Promise<PythonRunResult>;
+  listNodes(): Promise<RunnerNode[]>;
+}
+
+interface JobWaiter {
+  job: BrokerJob;
+  options: SubmitOptions;
+  resolve: (result: PythonRunResult) => void;
+  timer?: ReturnType<typeof setTimeout>;
+}
+
+interface PullWaiter {
+  nodeId: string;
+  maxJobs: number;
+  resolve: (jobs: BrokerJob[]) => void;
+  timer: ReturnType<typeof setTimeout>;
+}
+
+export const HEARTBEAT_TIMEOUT_MS = 15000;
+export const DEFAULT_JOB_TIMEOUT_MS = 10 * 60 * 1000;
+export const WARM_JOB_TIMEOUT_MS = 5 * 60 * 1000;
+// Re-check waiting jobs so placement spill-over is not tied to new arrivals
+const DISPATCH_INTERVAL_MS = 500;
+
+export class LocalJobBroker implements JobBroker {
+  protected nodes = new Map<string, RunnerNode>();
+  protected queue: BrokerJob[] = [];
+  protected jobs = new Map<string, JobWaiter>();
+  private pullWaiters: PullWaiter[] = [];
+  private cancelled = new Map<string, string[]>();
+  private reaper: ReturnType<typeof setInterval>;
+  private dispatcher: ReturnType<typeof setInterval>;
+
+  /**
+   * Without a placement every node takes jobs in FIFO order; with one, jobs
+   * stick to the nodes owning their project (see placement.ts)
+   */
+  constructor(
+    private readonly heartbeatTimeoutMs = HEARTBEAT_TIMEOUT_MS,
+    private readonly placement: ProjectPlacement | null = null
+  ) {
+    this.reaper = setInterval(() => this.reapDeadNodes(), Math.max(1000, heartbeatTimeoutMs / 3));
+    this.reaper.unref?.();
+    this.dispatcher = setInterval(() => {
+      if (this.queue.length > 0) this.dispatch();
+    }, DISPATCH_INTERVAL_MS);
+    this.dispatcher.unref?.();
+  }
+
+  async registerNode(registration: RunnerRegistration): Promise<RunnerNode> {
+    const node: RunnerNode = {
+      ...registration,
+      capacity: Math.max(1, Math.floor(registration.capacity || 1)),
+      id: randomUUID(),
+      running: 0,
+      registeredAt: Date.now(),
+      lastHeartbeat: Date.now(),
+      completed: 0,
+    };
+    this.nodes.set(node.id, node);
+    console.log(`[JobBroker] Runner ${node.name || node.id} registered with capacity ${node.capacity}`);
+    this.rebalance();
+    return node;
+  }
+
+  async deregisterNode(nodeId: string): Promise<void> {
+    this.removeNode(nodeId);
+  }
+
+  private removeNode(nodeId: string) {
+    if (!this.nodes.delete(nodeId)) {
+      return;
+    }
+    this.cancelled.delete(nodeId);
+    this.pullWaiters = this.pullWaiters.filter(waiter => {
+      if (waiter.nodeId !== nodeId) return true;
+      clearTimeout(waiter.timer);
+      waiter.resolve([]);
+      return false;
+    });
+    this.recoverJobs(nodeId);
+    this.rebalance();
+  }
+
+  async heartbeat(nodeId: string, running: number): Promise<HeartbeatResponse> {
+    const node = this.nodes.get(nodeId);
+    if (!node) {
+      // Unknown node (e.g. the broker restarted): it has to register again
+      return { known: false, cancel: [] };
+    }
+    node.lastHeartbeat = Date.now();
+    node.running = running;
+    const cancel = this.cancelled.get(nodeId) || [];
+    this.cancelled.delete(nodeId);
+    return { known: true, cancel };
+  }
+
+  pull(nodeId: string, maxJobs: number, waitMs: number): Promise<BrokerJob[]> {
+    const node = this.nodes.get(nodeId);
+    if (!node) {
+      return Promise.reject(new Error('Unknown runner node'));
+    }
+    node.lastHeartbeat = Date.now();
+
+    const jobs = this.take(nodeId, maxJobs);
+    if (jobs.length > 0 || waitMs <= 0) {
+      return Promise.resolve(jobs);
+    }
+
+    return new Promise((resolve) => {
+      const waiter: PullWaiter = {
+        nodeId,
+        maxJobs,
+        resolve,
+        timer: setTimeout(() => {
+          this.pullWaiters = this.pullWaiters.filter(w => w !== waiter);
+          resolve([]);
+        }, waitMs),
+      };
+      this.pullWaiters.push(waiter);
+    });
+  }
+
+  async publish(jobId: string, nodeId: string, events: JobEvent[]): Promise<boolean> {
+    const waiter = this.jobs.get(jobId);
+    if (!waiter || waiter.job.nodeId !== nodeId) {
+      return false;
+    }
+    waiter.job.started = true;
+    for (const event of events) {
+      waiter.options.onEvent?.(event);
+    }
+    return true;
+  }
+
+  async complete(jobId: string, nodeId: string, result: PythonRunResult): Promise<boolean> {
+    const waiter = this.jobs.get(jobId);
+    if (!waiter || waiter.job.nodeId !== nodeId) {
+      return false;
+    }
+    const node = this.nodes.get(nodeId);
+    if (node) {
+      node.running = Math.max(0, node.running - 1);
+      node.completed++;
+    }
+    this.finish(waiter, 'completed', result);
+    return true;
+  }
+
+  submit(payload: RunJobPayload, options: SubmitOptions = {}): Promise<PythonRunResult> {
+    if (payload.kind !== 'warm') {
+      this.placement?.recordRun(payload);
+    }
+
+    const job: BrokerJob = {
+      id: randomUUID(),
+      payload,
+      status: 'queued',
+      createdAt: Date.now(),
+      started: false,
+      pinnedNodeId: options.nodeId,
+    };
+
+    return new Promise((resolve) => {
+      const waiter: JobWaiter = { job, options, resolve };
+      this.jobs.set(job.id, waiter);
+
+      waiter.timer = setTimeout(() => {
+        this.finish(waiter, 'failed', { output: '', error: 'Execution timed out on the runner fleet' });
+      }, options.timeoutMs || DEFAULT_JOB_TIMEOUT_MS);
+
+      options.signal?.addEventListener('abort', () => {
+        this.finish(waiter, 'failed', { output: '', error: 'Execution cancelled' });
+      });
+
+      this.enqueue(job);
+    });
+  }
+
+  async listNodes(): Promise<RunnerNode[]> {
+    return [...this.nodes.values()];
+  }
+
+  /**
+   * Queue a job and hand it straight to a waiting node when one is free
+   */
+  protected enqueue(job: BrokerJob) {
+    job.status = 'queued';
+    job.nodeId = undefined;
+    this.queue.push(job);
+    this.dispatch();
+  }
+
+  protected dispatch() {
+    for (const waiter of [...this.pullWaiters]) {
+      const jobs = this.take(waiter.nodeId, waiter.maxJobs);
+      if (jobs.length === 0) continue;
+      clearTimeout(waiter.timer);
+      this.pullWaiters = this.pullWaiters.filter(w => w !== waiter);
+      waiter.resolve(jobs);
+    }
+  }
+
+  /**
+   * Select up to maxJobs queued jobs for a node. Placement strategies
+   * override this.
+   */
+  protected selectJobs(nodeId: string, maxJobs: number): BrokerJob[] {
+    const pinnedOk = (job: BrokerJob) => !job.pinnedNodeId || job.pinnedNodeId === nodeId;
+    if (!this.placement) {
+      return this.queue.filter(pinnedOk).slice(0, maxJobs);
+    }
+
+    const loads = new Map<string, NodeLoad>(
+      [...this.nodes.values()].map(node => [node.id, { running: node.running, capacity: node.capacity }])
+    );
+    const selected: BrokerJob[] = [];
+    for (const job of this.queue) {
+      if (selected.length >= maxJobs) break;
+      if (!pinnedOk(job)) continue;
+      if (job.pinnedNodeId || this.placement.isEligible(job, nodeId, loads)) {
+        selected.push(job);
+        loads.get(nodeId)!.running++;
+      }
+    }
+    return selected;
+  }
+
+  /**
+   * After membership changes, warm recently active projects on the nodes
+   * that now own them
+   */
+  private rebalance() {
+    if (!this.placement) return;
+    for (const handoff of this.placement.updateNodes([...this.nodes.values()])) {
+      this.submit(
+        { ...handoff.payload, kind: 'warm' },
+        { nodeId: handoff.nodeId, timeoutMs: WARM_JOB_TIMEOUT_MS }
+      );
+    }
+  }
+
+  private take(nodeId: string, maxJobs: number): BrokerJob[] {
+    const node = this.nodes.get(nodeId);
+    if (!node) return [];
+
+    const free = Math.min(maxJobs, node.capacity - node.running);
+    if (free <= 0 || this.queue.length === 0) return [];
+
+    const jobs = this.selectJobs(nodeId, free);
+    const taken = new Set(jobs);
+    this.queue = this.queue.filter(job => !taken.has(job));
+    for (const job of jobs) {
+      job.status = 'assigned';
+      job.nodeId = nodeId;
+      job.assignedAt = Date.now();
+    }
+    node.running += jobs.length;
+    return jobs;
+  }
+
+  private finish(waiter: JobWaiter, status: 'completed' | 'failed', result: PythonRunResult) {
+    if (!this.jobs.has(waiter.job.id)) return;
+    this.jobs.delete(waiter.job.id);
+    clearTimeout(waiter.timer);
+    // A job abandoned while a node still runs it is stopped on the next heartbeat
+    if (status === 'failed' && waiter.job.status === 'assigned' && waiter.job.nodeId) {
+      const nodeId = waiter.job.nodeId;
+      this.cancelled.set(nodeId, [...(this.cancelled.get(nodeId) || []), waiter.job.id]);
+    }
+    waiter.job.status = status;
+    this.queue = this.queue.filter(job => job !== waiter.job);
+    waiter.resolve(result);
+  }
+
+  /**
+   * Jobs of a lost node go back to the queue unless they already produced
+   * output; re-running those would duplicate side effects and output.
+   */
+  protected recoverJobs(nodeId: string) {
+    for (const waiter of [...this.jobs.values()]) {
+      if (waiter.job.pinnedNodeId === nodeId) {
+        this.finish(waiter, 'failed', { output: '', error: 'The runner node for this job went offline' });
+        continue;
+      }
+      if (waiter.job.nodeId !== nodeId || waiter.job.status !== 'assigned') continue;
+      if (waiter.job.started) {
+        this.finish(waiter, 'failed', { output: '', error: 'The runner node executing this code went offline' });
+      } else {
+        this.enqueue(waiter.job);
+      }
+    }
+  }
+
+  private reapDeadNodes() {
+    const cutoff = Date.now() - this.heartbeatTimeoutMs;
+    for (const node of [...this.nodes.values()]) {
+      if (node.lastHeartbeat < cutoff) {
+        console.warn(`[JobBroker] Runner ${node.name || node.id} missed its heartbeat, removing`);
+        this.removeNode(node.id);
+      }
+    }
+  }
+}
+
+const globalForBroker = globalThis as unknown as { pycodeJobBroker?: JobBroker };
+
+/**
+ * Broker shared by route handlers and server actions of this instance
+ * (kept on globalThis because Next.js may load this module more than once).
+ * Backed by Postgres so every web instance sees the same nodes and queue;
+ * PYCODE_JOB_BROKER=local keeps it in memory, for a single web instance.
+ */
+export function getJobBroker(): JobBroker {
+  if (!globalForBroker.pycodeJobBroker) {
+    const supabase = process.env.PYCODE_JOB_BROKER === 'local' ? null : createAdminClient();
+    if (!supabase && process.env.PYCODE_JOB_BROKER !== 'local') {
+      console.warn('[JobBroker] SUPABASE_SERVICE_ROLE_KEY is not set; the broker only serves this instance');
+    }
+    globalForBroker.pycodeJobBroker = supabase
+      ? new SupabaseJobBroker(supabase, HEARTBEAT_TIMEOUT_MS, new ProjectPlacement())
+      : new LocalJobBroker(HEARTBEAT_TIMEOUT_MS, new ProjectPlacement());
+  }
+  return globalForBroker.pycodeJobBroker;
+}
+
+/**
+ * Whether runs should be offloaded to runner nodes instead of executing here
+ */
+export function isBrokerMode(): boolean {
+  return process.env.PYCODE_RUNNER_MODE === 'broker';
+}
+
+/**
+ * Runner routes are called by agents, not users: they authenticate with the
+ * shared PYCODE_RUNNER_TOKEN. Without a configured token they refuse all.
+ */
+export function isAuthorizedRunner(authHeader: string | null): boolean {
+  const expected = process.env.PYCODE_RUNNER_TOKEN;
+  if (!expected || !authHeader || !authHeader.startsWith('Bearer ')) {
+    return false;
+  }
+  const provided = Buffer.from(authHeader.substring(7));
+  const secret = Buffer.from(expected);
+  return provided.length === secret.length && timingSafeEqual(provided, secret);
+}
@@ -0,0 +1,346 @@
+import type { RunMetrics } from './run-metrics';
+import { publishUsageEvent } from './usage-events';
+import { createUsageStore, UsageBalance, UsageDelta, UsageStore } from './usage-store';
+
+/**
+ * Usage-based credit charges for code runs.
+ *
+ * A run is priced from what it actually used: CPU-seconds from its cgroup
+ * (wall-clock time on hosts without cgroups) and its peak memory above the
+ * plan's included amount, held for the length of the run. Each plan has its
+ * own price curve; PYCODE_PRICE_CURVES (JSON, e.g. {"free":{"baseCredits":0.5}})
+ * overrides parts of it.
+ *
+ * Charges (and AI queries) are aggregated in memory per user and day, and
+ * each flush writes the whole batch with one atomic call to the usage store
+ * (usage-store.ts) every PYCODE_METER_FLUSH_MS, so recording usage costs no
+ * database round trip. Fractions of a credit carry over between flushes.
+ * Every change is also published on the usage event channel (usage-events.ts).
+ */
+
+export interface CpuPriceTier {
+  /** CPU-seconds of a single run covered by this tier; omitted for the last tier */
+  upToSeconds?: number;
+  creditsPerSecond: number;
+}
+
+export interface PriceCurve {
+  /** Charged for every run, however short */
+  baseCredits: number;
+  cpuTiers: CpuPriceTier[];
+  /** Peak memory that is free of charge */
+  includedMemoryMb: number;
+  /** Per GB of peak memory above the included amount, per second of run time */
+  creditsPerGbSecond: number;
+}
+
+export const PLAN_PRICE_CURVES: Record<string, PriceCurve> = {
+  free: {
+    baseCredits: 0.2,
+    cpuTiers: [
+      { upToSeconds: 10, creditsPerSecond: 0.1 },
+      { upToSeconds: 60, creditsPerSecond: 0.2 },
+      { creditsPerSecond: 0.4 },
+    ],
+    includedMemoryMb: 128,
+    creditsPerGbSecond: 0.05,
+  },
+  pro: {
+    baseCredits: 0.1,
+    cpuTiers: [
+      { upToSeconds: 60, creditsPerSecond: 0.05 },
+      { creditsPerSecond: 0.1 },
+    ],
+    includedMemoryMb: 512,
+    creditsPerGbSecond: 0.02,
+  },
+  team: {
+    baseCredits: 0.05,
+    cpuTiers: [
+      { upToSeconds: 300, creditsPerSecond: 0.03 },
+      { creditsPerSecond: 0.05 },
+    ],
+    includedMemoryMb: 1024,
+    creditsPerGbSecond: 0.01,
+  },
+};
+
+export interface RunUsage {
+  cpuSeconds: number;
+  peakMemoryMb: number;
+  wallSeconds: number;
+  /** False when the host has no cgroup counters and wall time stands in for CPU */
+  measured: boolean;
+}
+
+const FLUSH_INTERVAL_MS = Number(process.env.PYCODE_METER_FLUSH_MS) || 10000;
+// Flush early when this many user/day entries are waiting
+const MAX_PENDING_ENTRIES = 500;
+
+let priceCurves: Record<string, PriceCurve> | null = null;
+
+function getPriceCurves(): Record<string, PriceCurve> {
+  if (!priceCurves) {
+    priceCurves = { ...PLAN_PRICE_CURVES };
+    if (process.env.PYCODE_PRICE_CURVES) {
+      try {
+        const overrides = JSON.parse(process.env.PYCODE_PRICE_CURVES) as Record<string, Partial<PriceCurve>>;
+        for (const [plan, curve] of Object.entries(overrides)) {
+          priceCurves[plan] = { ...(priceCurves[plan] || PLAN_PRICE_CURVES.free), ...curve };
+        }
+      } catch (error: any) {
+        console.error('[Metering] Ignoring malformed PYCODE_PRICE_CURVES:', error?.message || error);
+      }
+    }
+  }
+  return priceCurves;
+}
+
+export function getPriceCurve(plan?: string): PriceCurve {
+  const curves = getPriceCurves();
+  return curves[plan || 'free'] || curves.free;
+}
+
+export function measureRunUsage(metrics?: RunMetrics | null): RunUsage {
+  const wallSeconds = (metrics?.durationMs || 0) / 1000;
+  const resources = metrics?.resources;
+  return {
+    cpuSeconds: resources ? resources.cpuUsageMs / 1000 : wallSeconds,
+    peakMemoryMb: resources?.memoryPeakMb || 0,
+    wallSeconds,
+    measured: !!resources,
+  };
+}
+
+/**
+ * Credits for one run, to three decimals
+ */
+export function priceRun(usage: RunUsage, plan?: string): number {
+  const curve = getPriceCurve(plan);
+  let credits = curve.baseCredits;
+
+  let remaining = usage.cpuSeconds;
+  let tierStart = 0;
+  for (const tier of curve.cpuTiers) {
+    if (remaining <= 0) break;
+    const span = tier.upToSeconds === undefined ? remaining : Math.min(remaining, tier.upToSeconds - tierStart);
+    if (span > 0) {
+      credits += span * tier.creditsPerSecond;
+      remaining -= span;
+    }
+    if (tier.upToSeconds !== undefined) tierStart = tier.upToSeconds;
+  }
+
+  const excessGb = Math.max(0, usage.peakMemoryMb - curve.includedMemoryMb) / 1024;
+  credits += excessGb * usage.wallSeconds * curve.creditsPerGbSecond;
+
+  return Math.round(credits * 1000) / 1000;
+}
+
+interface PendingUsage {
+  userId: string;
+  /** UTC day the usage happened on (daily_stats.date) */
+  date: string;
+  codeRuns: number;
+  aiQueries: number;
+  /** Fractional credits */
+  credits: number;
+}
+
+export class UsageMeter {
+  private pending = new Map<string, PendingUsage>();
+  // The batch being written; still owed until the store has taken it
+  private writing: PendingUsage[] = [];
+  // Fractions of a credit charged but not yet taken from the balance
+  private remainders = new Map<string, number>();
+  private timer: NodeJS.Timeout | null = null;
+  private flushing: Promise<UsageBalance[]> | null = null;
+
+  constructor(private store: UsageStore) {}
+
+  /**
+   * Record a finished run and return the credits it costs. Nothing is
+   * written until the next flush.
+   */
+  recordRun(userId: string, plan: string | undefined, metrics?: RunMetrics | null): number {
+    const credits = priceRun(measureRunUsage(metrics), plan);
+    this.add(userId, { codeRuns: 1, aiQueries: 0, credits });
+    return credits;
+  }
+
+  recordAiQuery(userId: string, credits = 1): void {
+    this.add(userId, { codeRuns: 0, aiQueries: 1, credits });
+  }
+
+  /**
+   * Credits a user can still spend: the stored balance minus usage that is
+   * recorded but not yet written. A flush may land while the balance is
+   * read, so the larger of the amounts owed before and after is taken: usage
+   * is at worst counted twice for a moment, never not at all.
+   */
+  async availableCredits(userId: string): Promise<number> {
+    const owedBefore = this.pendingUsage(userId).credits;
+    const balance = await this.store.balance(userId);
+    return balance - Math.max(owedBefore, this.pendingUsage(userId).credits);
+  }
+
+  /**
+   * Write all pending usage in one batch and return the new balances.
+   * When the write fails the usage stays pending for the next flush; when the
+   * store rejects the batch's data, its entries are written one by one and
+   * those still rejected are dropped.
+   */
+  flush(): Promise<UsageBalance[]> {
+    if (!this.flushing) {
+      this.flushing = this.writePending().finally(() => {
+        this.flushing = null;
+      });
+    }
+    return this.flushing;
+  }
+
+  async stop(): Promise<void> {
+    if (this.timer) {
+      clearInterval(this.timer);
+      this.timer = null;
+    }
+    await this.flush().catch(() => undefined);
+  }
+
+  /**
+   * Usage of one user recorded but not yet written (or being written),
+   * including carried-over fractions of a credit
+   */
+  pendingUsage(userId: string): { codeRuns: number; aiQueries: number; credits: number } {
+    const owed = { codeRuns: 0, aiQueries: 0, credits: this.remainders.get(userId) || 0 };
+    for (const entry of [...this.writing, ...this.pending.values()]) {
+      if (entry.userId !== userId) continue;
+      owed.codeRuns += entry.codeRuns;
+      owed.aiQueries += entry.aiQueries;
+      owed.credits += entry.credits;
+    }
+    return owed;
+  }
+
+  // Bursts from one user on one day coalesce into a single pending entry
+  private add(userId: string, usage: { codeRuns: number; aiQueries: number; credits: number }) {
+    const date = new Date().toISOString().split('T')[0];
+    const key = `${userId}:${date}`;
+    const entry = this.pending.get(key) || { userId, date, codeRuns: 0, aiQueries: 0, credits: 0 };
+    entry.codeRuns += usage.codeRuns;
+    entry.aiQueries += usage.aiQueries;
+    entry.credits += usage.credits;
+    this.pending.set(key, entry);
+    publishUsageEvent({ type: 'delta', userId, ...usage, at: Date.now() });
+
+    this.ensureTimer();
+    if (this.pending.size >= MAX_PENDING_ENTRIES) {
+      this.flush().catch(() => undefined);
+    }
+  }
+
+  private ensureTimer() {
+    if (this.timer) return;
+    this.timer = setInterval(() => {
+      this.flush().catch(() => undefined);
+    }, FLUSH_INTERVAL_MS);
+    this.timer.unref?.();
+  }
+
+  private async writePending(): Promise<UsageBalance[]> {
+    if (this.pending.size === 0) return [];
+
+    const batch = Array.from(this.pending.values());
+    this.pending.clear();
+    this.writing = batch;
+
+    // Only whole credits are taken; the rest waits for the next flush
+    const remainders = new Map(this.remainders);
+    const deltas: UsageDelta[] = batch.map((entry) => {
+      const owed = entry.credits + (remainders.get(entry.userId) || 0);
+      const whole = Math.floor(owed + 1e-9);
+      remainders.set(entry.userId, Math.max(0, owed - whole));
+      return { userId: entry.userId, date: entry.date, codeRuns: entry.codeRuns, aiQueries: entry.aiQueries, credits: whole };
+    });
+
+    let balances: UsageBalance[];
+    try {
+      balances = await this.store.apply(deltas);
+    } catch (error: any) {
+      if (!isRejectedData(error)) {
+        console.error(`[Metering] Failed to write usage for ${batch.length} user/day entries:`, error?.message || error);
+        this.writing = [];
+        this.requeue(batch);
+        throw error;
+      }
+      console.error(`[Metering] Usage batch rejected, writing its ${batch.length} entries one by one:`, error?.message || error);
+      balances = [];
+      const retry: PendingUsage[] = [];
+      for (let i = 0; i < deltas.length; i++) {
+        try {
+          balances.push(...await this.store.apply([deltas[i]]));
+        } catch (entryError: any) {
+          if (isRejectedData(entryError)) {
+            console.error('[Metering] Dropping usage the store rejected:', JSON.stringify(deltas[i]), entryError?.message || entryError);
+          } else {
+            // The fraction of a credit is already in the new remainder
+            retry.push({ ...batch[i], credits: deltas[i].credits });
+          }
+        }
+      }
+      this.writing = [];
+      this.requeue(retry);
+    }
+
+    this.writing = [];
+    this.remainders = remainders;
+    for (const balance of balances) {
+      // Usage recorded while this batch was being written is still owed
+      const owed = this.pendingUsage(balance.userId);
+      publishUsageEvent({
+        type: 'balance',
+        userId: balance.userId,
+        credits: Math.max(0, balance.credits - owed.credits),
+        codeRuns: balance.codeRuns + owed.codeRuns,
+        aiQueries: balance.aiQueries + owed.aiQueries,
+        at: Date.now(),
+      });
+    }
+    return balances;
+  }
+
+  // Put entries that could not be written back, merged with usage recorded since
+  private requeue(entries: PendingUsage[]) {
+    for (const entry of entries) {
+      const key = `${entry.userId}:${entry.date}`;
+      const current = this.pending.get(key);
+      this.pending.set(key, current
+        ? {
+          ...current,
+          codeRuns: current.codeRuns + entry.codeRuns,
+          aiQueries: current.aiQueries + entry.aiQueries,
+          credits: current.credits + entry.credits,
+        }
+        : entry);
+    }
+  }
+}
+
+// SQLSTATE classes 22 (data exception) and 23 (integrity constraint
+// violation): the entries themselves are bad and retrying cannot succeed
+function isRejectedData(error: any): boolean {
+  return typeof error?.code === 'string' && /^2[23]/.test(error.code);
+}
+
+const globalForMeter = globalThis as unknown as { pycodeUsageMeter?: UsageMeter };
+
+/**
+ * Meter shared by route handlers, server actions and background work of this
+ * process (kept on globalThis because Next.js may load this module more than once)
+ */
+export function getUsageMeter(): UsageMeter {
+  if (!globalForMeter.pycodeUsageMeter) {
+    globalForMeter.pycodeUsageMeter = new UsageMeter(createUsageStore());
+  }
+  return globalForMeter.pycodeUsageMeter;
+}
@@ -0,0 +1,169 @@
+import { createHash } from 'crypto';
+import type { BrokerJob, RunJobPayload, RunnerNode } from './job-broker';
+
+/**
+ * Sticky project placement for the job broker.
+ *
+ * Projects are mapped to runner nodes with a consistent-hash ring, so runs of
+ * the same project keep landing on the node that already has its files,
+ * packages and bytecode. Bounded loads keep a popular project from
+ * overloading its owner. A job goes to the first node clockwise from the
+ * project's hash whose load is below
+ *
+ *   ceil(LOAD_FACTOR * capacity * (running + 1) / totalCapacity)
+ *
+ * so a hot primary spills to the secondary owner rather than queueing. When
+ * nodes join or leave, recently active projects that changed owner are
+ * warmed on their new node.
+ */
+
+const VIRTUAL_NODES = 100;
+const LOAD_FACTOR = 1.25;
+// Jobs waiting this long may run anywhere rather than wait for their owners
+const SPILL_AFTER_MS = 2000;
+const MAX_RECENT_PROJECTS = 200;
+const MAX_RECENT_BYTES = 50 * 1024 * 1024;
+
+export interface NodeLoad {
+  running: number;
+  capacity: number;
+}
+
+export interface WarmHandoff {
+  nodeId: string;
+  payload: RunJobPayload;
+}
+
+function hash32(value: string): number {
+  return createHash('md5').update(value).digest().readUInt32BE(0);
+}
+
+export class ConsistentHashRing {
+  private points: { hash: number; nodeId: string }[] = [];
+  private nodeIds: string[] = [];
+
+  constructor(nodeIds: string[] = [], private readonly virtualNodes = VIRTUAL_NODES) {
+    this.setNodes(nodeIds);
+  }
+
+  setNodes(nodeIds: string[]) {
+    this.nodeIds = [...new Set(nodeIds)];
+    this.points = this.nodeIds
+      .flatMap(nodeId => Array.from({ length: this.virtualNodes }, (_, i) => ({ hash: hash32(`${nodeId}#${i}`), nodeId })))
+      .sort((a, b) => a.hash - b.hash);
+  }
+
+  /**
+   * Distinct nodes in ring order starting at the key's position: the primary
+   * owner first, then the secondary, and so on
+   */
+  getOwners(key: string, count = this.nodeIds.length): string[] {
+    if (this.points.length === 0) return [];
+
+    const target = hash32(key);
+    let low = 0;
+    let high = this.points.length;
+    while (low < high) {
+      const mid = (low + high) >>> 1;
+      if (this.points[mid].hash < target) low = mid + 1;
+      else high = mid;
+    }
+
+    const owners: string[] = [];
+    for (let i = 0; i < this.points.length && owners.length < count; i++) {
+      const { nodeId } = this.points[(low + i) % this.points.length];
+      if (!owners.includes(nodeId)) owners.push(nodeId);
+    }
+    return owners;
+  }
+}
+
+function projectKey(payload: RunJobPayload): string | null {
+  return payload.input.projectId || null;
+}
+
+function payloadSize(payload: RunJobPayload): number {
+  return payload.input.code.length + (payload.input.files || []).reduce((sum, file) => sum + file.content.length, 0);
+}
+
+export class ProjectPlacement {
+  private ring = new ConsistentHashRing();
+  // Insertion order doubles as LRU order
+  private recent = new Map<string, RunJobPayload>();
+  private recentBytes = 0;
+
+  /**
+   * Rebuild the ring and return warm-up work for recent projects whose
+   * primary owner changed
+   */
+  updateNodes(nodes: RunnerNode[]): WarmHandoff[] {
+    const before = new Map([...this.recent.keys()].map(key => [key, this.ring.getOwners(key, 1)[0]]));
+    this.ring.setNodes(nodes.map(node => node.id));
+
+    const handoffs: WarmHandoff[] = [];
+    for (const [key, payload] of this.recent) {
+      const owner = this.ring.getOwners(key, 1)[0];
+      if (owner && owner !== before.get(key)) {
+        handoffs.push({ nodeId: owner, payload });
+      }
+    }
+    return handoffs;
+  }
+
+  /**
+   * Remember the latest files of a project so a new owner can be warmed
+   */
+  recordRun(payload: RunJobPayload) {
+    const key = projectKey(payload);
+    if (!key) return;
+
+    const previous = this.recent.get(key);
+    if (previous) {
+      this.recentBytes -= payloadSize(previous);
+      this.recent.delete(key);
+    }
+    this.recent.set(key, payload);
+    this.recentBytes += payloadSize(payload);
+
+    while (this.recent.size > MAX_RECENT_PROJECTS || this.recentBytes > MAX_RECENT_BYTES) {
+      const [oldestKey, oldest] = this.recent.entries().next().value as [string, RunJobPayload];
+      this.recent.delete(oldestKey);
+      this.recentBytes -= payloadSize(oldest);
+    }
+  }
+
+  /**
+   * Owner for a project under the current loads: the first node in ring
+   * order that is below its load bound
+   */
+  chooseNode(key: string, loads: Map<string, NodeLoad>): string | null {
+    let running = 0;
+    let capacity = 0;
+    for (const load of loads.values()) {
+      running += load.running;
+      capacity += load.capacity;
+    }
+    if (capacity === 0) return null;
+
+    for (const nodeId of this.ring.getOwners(key)) {
+      const load = loads.get(nodeId);
+      if (!load) continue;
+      const bound = Math.min(load.capacity, Math.ceil(LOAD_FACTOR * load.capacity * (running + 1) / capacity));
+      if (load.running < bound) {
+        return nodeId;
+      }
+    }
+    return null;
+  }
+
+  /**
+   * Whether the pulling node should take this job now
+   */
+  isEligible(job: BrokerJob, nodeId: string, loads: Map<string, NodeLoad>, now = Date.now()): boolean {
+    const key = projectKey(job.payload);
+    if (!key || now - job.createdAt >= SPILL_AFTER_MS) {
+      return true;
+    }
+    return this.chooseNode(key, loads) === nodeId;
+  }
+}
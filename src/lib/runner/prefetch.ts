@@ -0,0 +1,54 @@
+import { collectThirdPartyImports, findMissingPackages, installPackages } from './dependencies';
+import { isBrokerMode } from './job-broker';
+import { getSandboxPool } from './sandbox-pool';
+
+/**
+ * Speculative preparation for code the AI assistant just returned. Users
+ * usually click Run within seconds, so the imported packages start
+ * installing and the sandbox pool is topped up before the run is requested.
+ */
+
+export interface PrefetchSummary {
+  modules: string[];
+  installed: string[];
+  failed: string[];
+}
+
+/**
+ * Install the third-party packages imported by `code` that are missing on
+ * this host. Files of the project (`localModules`) are never installed.
+ */
+export async function prefetchDependencies(code: string, localModules: Set<string> = new Set()): Promise<PrefetchSummary> {
+  const modules = collectThirdPartyImports([code], localModules);
+
+  // Have warm workers ready for the run itself
+  getSandboxPool()?.replenish();
+
+  const missing = await findMissingPackages(modules);
+  if (missing.length === 0) {
+    return { modules, installed: [], failed: [] };
+  }
+  const { installed, failed } = await installPackages(missing);
+  return { modules, installed, failed };
+}
+
+/**
+ * Fire-and-forget wrapper used when AI code arrives
+ */
+export function startDependencyPrefetch(code: string, localModules?: Set<string>): void {
+  // In broker mode runs execute on runner nodes, so installing here would not help
+  if (!code.trim() || isBrokerMode()) return;
+
+  prefetchDependencies(code, localModules)
+    .then((summary) => {
+      if (summary.installed.length > 0 || summary.failed.length > 0) {
+        console.log(
+          `[Prefetch] Installed ${summary.installed.join(', ') || 'nothing'}`,
+          summary.failed.length > 0 ? `(failed: ${summary.failed.join(', ')})` : ''
+        );
+      }
+    })
+    .catch((error) => {
+      console.error('[Prefetch] Dependency prefetch failed:', error);
+    });
+}
@@ -0,0 +1,111 @@
+import { readFile } from 'fs/promises';
+import path from 'path';
+import { getProjectDir, listProjectFiles, materializeProjectFiles, ProjectFileInput } from './project-files';
+import { getBytecodeCacheDir } from './bytecode-cache';
+import { collectThirdPartyImports, findMissingPackages, installPackages, lowPriority } from './dependencies';
+import { runProcess } from './process-exec';
+import { runEnvironment } from './run-env';
+
+/**
+ * Background preparation of a project so its first Run is fast: write the
+ * files, install the third-party packages its .py files import and compile
+ * everything into the persistent bytecode cache. All steps run at low
+ * priority and stop as soon as the prewarm is cancelled.
+ */
+
+export interface PrewarmInput {
+  projectId?: string;
+  files?: ProjectFileInput[];
+}
+
+export interface PrewarmSummary {
+  workingDir: string;
+  written: number;
+  installed: string[];
+  failed: string[];
+  compiled: number;
+  cancelled: boolean;
+}
+
+export async function prewarmProject(input: PrewarmInput, signal?: AbortSignal): Promise<PrewarmSummary> {
+  const workingDir = getProjectDir(input.projectId);
+  const summary: PrewarmSummary = { workingDir, written: 0, installed: [], failed: [], compiled: 0, cancelled: false };
+  const cancelled = () => {
+    summary.cancelled = !!signal?.aborted;
+    return summary.cancelled;
+  };
+
+  const { written } = await materializeProjectFiles(workingDir, input.files || []);
+  summary.written = written;
+  if (cancelled()) return summary;
+
+  const sources = await listProjectFiles(workingDir, (file) => file.endsWith('.py'));
+  // Top-level names the project provides itself (main.py -> main, pkg/x.py -> pkg)
+  const localModules = new Set(sources.map(file => file.split(/[\\/]/)[0].replace(/\.py$/, '')));
+  const contents = await Promise.all(
+    sources.map(file => readFile(path.join(workingDir, file), 'utf8').catch(() => ''))
+  );
+
+  const missing = await findMissingPackages(collectThirdPartyImports(contents, localModules), signal);
+  if (cancelled()) return summary;
+  if (missing.length > 0) {
+    const { installed, failed } = await installPackages(missing, signal);
+    summary.installed = installed;
+    summary.failed = failed;
+    if (cancelled()) return summary;
+  }
+
+  if (sources.length > 0) {
+    const env = runEnvironment({ PYTHONPYCACHEPREFIX: await getBytecodeCacheDir(input.projectId) });
+
+    const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
+    const { command, args } = lowPriority(pythonCommand, ['-m', 'compileall', '-q', ...sources]);
+    const result = await runProcess({ kind: 'command', command, args, cwd: workingDir, env, timeoutMs: 120000 }, { signal });
+    if (result.exitCode === 0) {
+      summary.compiled = sources.length;
+    }
+  }
+
+  cancelled();
+  return summary;
+}
+
+// One prewarm per project; opening the project again restarts it
+const activePrewarms = new Map<string, AbortController>();
+
+/**
+ * Start a prewarm in the background, replacing any running one for the
+ * same project
+ */
+export function startPrewarm(input: PrewarmInput): void {
+  const key = input.projectId || 'default';
+  activePrewarms.get(key)?.abort();
+
+  const controller = new AbortController();
+  activePrewarms.set(key, controller);
+
+  prewarmProject(input, controller.signal)
+    .then((summary) => {
+      console.log(
+        `[Prewarm] ${key}: ${summary.cancelled ? 'cancelled' : 'done'}, ${summary.written} written,`,
+        `${summary.installed.length} installed, ${summary.compiled} compiled`
+      );
+    })
+    .catch((error) => {
+      console.error(`[Prewarm] ${key} failed:`, error);
+    })
+    .finally(() => {
+      if (activePrewarms.get(key) === controller) {
+        activePrewarms.delete(key);
+      }
+    });
+}
+
+export function cancelPrewarm(projectId?: string): boolean {
+  const key = projectId || 'default';
+  const controller = activePrewarms.get(key);
+  if (!controller) return false;
+  controller.abort();
+  activePrewarms.delete(key);
+  return true;
+}
@@ -0,0 +1,162 @@
+import { ChildProcess, spawn } from 'child_process';
+import { spawnPythonScript } from './sandbox-pool';
+import { getDaemonClient } from './daemon-client';
+
+/**
+ * Shared process execution for API routes and flows.
+ *
+ * When PYCODE_RUNNER_SOCKET is set, processes run in the standalone
+ * execution daemon (see daemon.ts) and output is streamed back over its Unix
+ * socket, keeping spawning and output buffering off the Next.js event loop.
+ * Otherwise the same executor runs in-process.
+ */
+
+export interface CommandExecRequest {
+  kind: 'command';
+  command: string;
+  args: string[];
+  cwd?: string;
+  env?: NodeJS.ProcessEnv;
+  timeoutMs?: number;
+}
+
+export interface PythonExecRequest {
+  kind: 'python';
+  /** Script passed to the interpreter as with `python -u -c` */
+  script: string;
+  cwd: string;
+  env: NodeJS.ProcessEnv;
+  cgroup?: string;
+  timeoutMs?: number;
+}
+
+export type ExecRequest = CommandExecRequest | PythonExecRequest;
+
+export interface ExecResult {
+  exitCode: number | null;
+  signal: string | null;
+  timedOut: boolean;
+  durationMs: number;
+  /** Set when the process could not be started at all */
+  error?: string;
+}
+
+export interface ExecHandlers {
+  /** Returning false pauses the process's output until `drained` resolves */
+  onStdout?: (chunk: Buffer) => boolean | void;
+  onStderr?: (chunk: Buffer) => boolean | void;
+  /** Resolves when a consumer that returned false can take more output */
+  drained?: () => Promise<void>;
+  signal?: AbortSignal;
+}
+
+function startProcess(request: ExecRequest): ChildProcess {
+  if (request.kind === 'python') {
+    return spawnPythonScript({
+      script: request.script,
+      cwd: request.cwd,
+      env: request.env,
+      cgroup: request.cgroup,
+    }).process;
+  }
+  return spawn(request.command, request.args, {
+    cwd: request.cwd,
+    env: request.env || process.env,
+    shell: false,
+  });
+}
+
+/**
+ * Run a process in this Node.js process. Used directly when no daemon is
+ * configured, and by the daemon itself.
+ */
+export function executeLocally(request: ExecRequest, handlers: ExecHandlers = {}): Promise<ExecResult> {
+  return new Promise((resolve) => {
+    const startedAt = Date.now();
+    let timedOut = false;
+    let settled = false;
+
+    let child: ChildProcess;
+    try {
+      child = startProcess(request);
+    } catch (err: any) {
+      resolve({ exitCode: null, signal: null, timedOut: false, durationMs: 0, error: err?.message || String(err) });
+      return;
+    }
+
+    const finish = (result: Omit<ExecResult, 'durationMs' | 'timedOut'>) => {
+      if (settled) return;
+      settled = true;
+      clearTimeout(timer);
+      handlers.signal?.removeEventListener('abort', abort);
+      resolve({ ...result, timedOut, durationMs: Date.now() - startedAt });
+    };
+
+    const abort = () => child.kill();
+    handlers.signal?.addEventListener('abort', abort);
+    if (handlers.signal?.aborted) {
+      abort();
+    }
+
+    const timer = request.timeoutMs
+      ? setTimeout(() => {
+          timedOut = true;
+          child.kill();
+        }, request.timeoutMs)
+      : undefined;
+
+    // A backed-up consumer stops reading the pipes, which blocks the process
+    // on its next write instead of buffering its output here
+    let paused = false;
+    const deliver = (handler: ExecHandlers['onStdout'], data: Buffer) => {
+      if (handler?.(data) !== false || paused || !handlers.drained) return;
+      paused = true;
+      child.stdout?.pause();
+      child.stderr?.pause();
+      handlers.drained().then(() => {
+        paused = false;
+        child.stdout?.resume();
+        child.stderr?.resume();
+      });
+    };
+    child.stdout?.on('data', (data: Buffer) => deliver(handlers.onStdout, data));
+    child.stderr?.on('data', (data: Buffer) => deliver(handlers.onStderr, data));
+
+    child.on('close', (code, signal) => {
+      finish({ exitCode: code, signal: signal || null });
+    });
+
+    child.on('error', (err) => {
+      finish({ exitCode: null, signal: null, error: err.message });
+    });
+  });
+}
+
+/**
+ * Run a process through the execution daemon when configured, otherwise
+ * locally
+ */
+export function runProcess(request: ExecRequest, handlers: ExecHandlers = {}): Promise<ExecResult> {
+  const client = getDaemonClient();
+  if (client) {
+    return client.exec(request, handlers);
+  }
+  return executeLocally(request, handlers);
+}
+
+/**
+ * Convenience wrapper collecting stdout and stderr as strings
+ */
+export async function runProcessToString(
+  request: ExecRequest,
+  signal?: AbortSignal
+): Promise<ExecResult & { stdout: string; stderr: string }> {
+  let stdout = '';
+  let stderr = '';
+  const result = await runProcess(request, {
+    onStdout: (chunk) => { stdout += chunk.toString(); },
+    onStderr: (chunk) => { stderr += chunk.toString(); },
+    signal,
+  });
+  return { ...result, stdout, stderr };
+}
@@ -0,0 +1,91 @@
+import type { SupabaseClient } from '@supabase/supabase-js';
+import { createAdminClient } from '../supabase/admin';
+
+/**
+ * Last-run times for the project list (projects.last_run_at).
+ *
+ * Runs only mark their project as run; marks are written every
+ * PYCODE_ACTIVITY_FLUSH_MS with one update per distinct run time, so a burst
+ * of runs costs no database round trips of its own.
+ */
+
+const FLUSH_INTERVAL_MS = Number(process.env.PYCODE_ACTIVITY_FLUSH_MS) || 10000;
+
+export class ProjectActivity {
+  // projectId -> time of its latest run
+  private pending = new Map<string, number>();
+  private timer: NodeJS.Timeout | null = null;
+  private flushing: Promise<void> | null = null;
+
+  constructor(private supabase: SupabaseClient | null) {}
+
+  recordRun(projectId?: string | null, at = Date.now()): void {
+    if (!projectId || !this.supabase) return;
+    this.pending.set(projectId, Math.max(at, this.pending.get(projectId) || 0));
+    this.ensureTimer();
+  }
+
+  flush(): Promise<void> {
+    if (!this.flushing) {
+      this.flushing = this.writePending().finally(() => {
+        this.flushing = null;
+      });
+    }
+    return this.flushing;
+  }
+
+  async stop(): Promise<void> {
+    if (this.timer) {
+      clearInterval(this.timer);
+      this.timer = null;
+    }
+    await this.flush();
+  }
+
+  private ensureTimer() {
+    if (this.timer) return;
+    this.timer = setInterval(() => {
+      this.flush();
+    }, FLUSH_INTERVAL_MS);
+    this.timer.unref?.();
+  }
+
+  private async writePending(): Promise<void> {
+    if (!this.supabase || this.pending.size === 0) return;
+
+    const batch = new Map(this.pending);
+    this.pending.clear();
+
+    // Projects run in the same second share one update
+    const byTime = new Map<string, string[]>();
+    batch.forEach((at, projectId) => {
+      const time = new Date(Math.floor(at / 1000) * 1000).toISOString();
+      byTime.set(time, [...(byTime.get(time) || []), projectId]);
+    });
+
+    for (const [time, projectIds] of byTime) {
+      const { error } = await this.supabase
+        .from('projects')
+        .update({ last_run_at: time })
+        .in('id', projectIds);
+      if (error) {
+        console.error(`[ProjectActivity] Failed to record runs of ${projectIds.length} projects:`, error.message);
+        // Keep them for the next flush unless they ran again since
+        for (const projectId of projectIds) {
+          if (!this.pending.has(projectId)) {
+            this.pending.set(projectId, batch.get(projectId)!);
+          }
+        }
+      }
+    }
+  }
+}
+
+const globalForActivity = globalThis as unknown as { pycodeProjectActivity?: ProjectActivity };
+
+export function getProjectActivity(): ProjectActivity {
+  if (!globalForActivity.pycodeProjectActivity) {
+    globalForActivity.pycodeProjectActivity = new ProjectActivity(createAdminClient());
+  }
+  return globalForActivity.pycodeProjectActivity;
+}
@@ -0,0 +1,139 @@
+import { createHash } from 'crypto';
+import { existsSync } from 'fs';
+import { mkdir, readFile, readdir, writeFile } from 'fs/promises';
+import path from 'path';
+
+/**
+ * A project file sent from the editor, addressed by its path relative to the
+ * project root (e.g. `main.py` or `snake_game/game.py`).
+ */
+export interface ProjectFileInput {
+  path: string;
+  content: string;
+}
+
+// Directories that never contain user code and should not be walked
+const IGNORED_DIRS = new Set(['__pycache__', 'node_modules', 'venv', '.venv', '.git', '.pytest_cache']);
+
+/**
+ * Working directory for a project's runs: uploads/<projectId>, or uploads/default
+ */
+export function getProjectDir(projectId?: string): string {
+  const safeId = projectId ? path.basename(projectId) : 'default';
+  return path.join(process.cwd(), 'uploads', safeId || 'default');
+}
+
+/**
+ * Root for server-side caches (test results, bytecode, ...). Lives outside
+ * uploads/ so cached artifacts never show up as project files.
+ */
+export function getCacheDir(...segments: string[]): string {
+  const root = process.env.PYCODE_CACHE_DIR || path.join(process.cwd(), '.cache', 'pycode');
+  return path.join(root, ...segments);
+}
+
+export function hashContent(content: string | Buffer): string {
+  return createHash('sha256').update(content).digest('hex');
+}
+
+/**
+ * Resolve a project-relative path, refusing anything that escapes the project directory
+ */
+export function resolveProjectPath(projectDir: string, relativePath: string): string | null {
+  const resolved = path.resolve(projectDir, relativePath.replace(/^\/+/, ''));
+  if (resolved !== projectDir && !resolved.startsWith(projectDir + path.sep)) {
+    return null;
+  }
+  return resolved;
+}
+
+/**
+ * Write editor files into the project directory. Files whose content is
+ * unchanged are left alone so their mtimes (and any cached bytecode) stay valid.
+ */
+export async function materializeProjectFiles(
+  projectDir: string,
+  files: ProjectFileInput[]
+): Promise<{ written: number; unchanged: number }> {
+  let written = 0;
+  let unchanged = 0;
+
+  if (!existsSync(projectDir)) {
+    await mkdir(projectDir, { recursive: true });
+  }
+
+  for (const file of files) {
+    const target = resolveProjectPath(projectDir, file.path);
+    if (!target) {
+      console.warn('[materializeProjectFiles] Skipping path outside project:', file.path);
+      continue;
+    }
+
+    if (existsSync(target)) {
+      // Uploaded datasets may arrive without content; keep what is on disk
+      if (!file.content) {
+        unchanged++;
+        continue;
+      }
+      const current = await readFile(target, 'utf-8').catch(() => null);
+      if (current === file.content) {
+        unchanged++;
+        continue;
+      }
+    }
+
+    await mkdir(path.dirname(target), { recursive: true });
+    await writeFile(target, file.content, 'utf-8');
+    written++;
+  }
+
+  return { written, unchanged };
+}
+
+/**
+ * Recursively list files under a project directory as project-relative POSIX paths
+ */
+export async function listProjectFiles(
+  projectDir: string,
+  filter: (relativePath: string) => boolean = () => true
+): Promise<string[]> {
+  const results: string[] = [];
+
+  const walk = async (dir: string, prefix: string) => {
+    const entries = await readdir(dir, { withFileTypes: true }).catch(() => []);
+    for (const entry of entries) {
+      if (entry.name.startsWith('.') || IGNORED_DIRS.has(entry.name)) continue;
+      const relativePath = prefix ? `${prefix}/${entry.name}` : entry.name;
+      if (entry.isDirectory()) {
+        await walk(path.join(dir, entry.name), relativePath);
+      } else if (entry.isFile() && filter(relativePath)) {
+        results.push(relativePath);
+      }
+    }
+  };
+
+  await walk(projectDir, '');
+  return results.sort();
+}
+
+/**
+ * Module names (dotted, possibly relative) imported by a piece of Python source
+ */
+export function parseImports(source: string): string[] {
+  const modules = new Set<string>();
+  const importPattern = /^\s*(?:from\s+([.\w]+)\s+import\s|import\s+([\w., ]+))/gm;
+  let match: RegExpExecArray | null;
+
+  while ((match = importPattern.exec(source)) !== null) {
+    if (match[1]) {
+      modules.add(match[1]);
+    } else if (match[2]) {
+      match[2].split(',').forEach(part => {
+        const name = part.trim().split(/\s+as\s+/)[0].trim();
+        if (name) modules.add(name);
+      });
+    }
+  }
+
+  return Array.from(modules);
+}
@@ -0,0 +1,96 @@
+/**
+ * Binary framing between the web tier and the execution daemon.
+ *
+ * Every frame is:
+ *
+ *   u32 length   bytes that follow (type + requestId + payload)
+ *   u8  type     FrameType
+ *   u32 request  id chosen by the client, echoed on every reply
+ *   ...payload   raw bytes for STDOUT/STDERR, UTF-8 JSON otherwise
+ *
+ * Output is streamed as raw bytes so the daemon never decodes or buffers it.
+ */
+
+export enum FrameType {
+  /** client -> daemon: JSON ExecRequest */
+  EXEC = 1,
+  /** daemon -> client: raw stdout bytes */
+  STDOUT = 2,
+  /** daemon -> client: raw stderr bytes */
+  STDERR = 3,
+  /** daemon -> client: JSON ExecResult, last frame for a request */
+  EXIT = 4,
+  /** client -> daemon: kill the process for this request */
+  KILL = 5,
+  /** both ways: empty request, JSON DaemonHealth reply */
+  HEALTH = 6,
+  /** both ways: empty request, JSON DaemonMetrics reply */
+  METRICS = 7,
+}
+
+export interface Frame {
+  type: FrameType;
+  requestId: number;
+  payload: Buffer;
+}
+
+const HEADER_SIZE = 9;
+// Refuse absurd lengths from a corrupted stream instead of buffering forever
+const MAX_FRAME_SIZE = 64 * 1024 * 1024;
+
+export function encodeFrame(type: FrameType, requestId: number, payload?: Buffer | string | object): Buffer {
+  const body = payload === undefined
+    ? Buffer.alloc(0)
+    : Buffer.isBuffer(payload)
+      ? payload
+      : Buffer.from(typeof payload === 'string' ? payload : JSON.stringify(payload));
+
+  const frame = Buffer.allocUnsafe(HEADER_SIZE + body.length);
+  frame.writeUInt32BE(5 + body.length, 0);
+  frame.writeUInt8(type, 4);
+  frame.writeUInt32BE(requestId >>> 0, 5);
+  body.copy(frame, HEADER_SIZE);
+  return frame;
+}
+
+export function decodeJsonPayload<T>(frame: Frame): T {
+  return JSON.parse(frame.payload.toString('utf8')) as T;
+}
+
+/**
+ * Incremental decoder: push socket chunks, get complete frames back
+ */
+export class FrameDecoder {
+  private chunks: Buffer[] = [];
+  private buffered = 0;
+
+  push(chunk: Buffer): Frame[] {
+    this.chunks.push(chunk);
+    this.buffered += chunk.length;
+
+    const frames: Frame[] = [];
+    while (this.buffered >= 4) {
+      const head = this.chunks.length === 1 ? this.chunks[0] : Buffer.concat(this.chunks);
+      this.chunks = [head];
+
+      const length = head.readUInt32BE(0);
+      if (length < 5 || length > MAX_FRAME_SIZE) {
+        throw new Error(`Invalid frame length ${length}`);
+      }
+      if (head.length < 4 + length) {
+        break;
+      }
+
+      frames.push({
+        type: head.readUInt8(4) as FrameType,
+        requestId: head.readUInt32BE(5),
+        payload: head.subarray(HEADER_SIZE, 4 + length),
+      });
+
+      const rest = head.subarray(4 + length);
+      this.chunks = rest.length > 0 ? [rest] : [];
+      this.buffered = rest.length;
+    }
+    return frames;
+  }
+}
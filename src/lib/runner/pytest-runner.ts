@@ -0,0 +1,390 @@
+import { existsSync } from 'fs';
+import { mkdir, readFile, writeFile } from 'fs/promises';
+import os from 'os';
+import path from 'path';
+import { getCacheDir, hashContent, listProjectFiles, parseImports } from './project-files';
+import { runProcess } from './process-exec';
+import { runEnvironment } from './run-env';
+
+export type TestOutcome = 'passed' | 'failed' | 'skipped' | 'error';
+
+export interface TestResult {
+  nodeId: string;
+  file: string;
+  outcome: TestOutcome;
+  durationMs: number;
+  message?: string;
+}
+
+/**
+ * Events streamed to the editor while a test run is in progress
+ */
+export type TestRunEvent =
+  | { type: 'start'; files: string[]; cachedFiles: string[]; workers: number }
+  | ({ type: 'test'; cached: boolean; worker?: number } & TestResult)
+  | { type: 'output'; worker: number; text: string }
+  | {
+    type: 'summary';
+    passed: number;
+    failed: number;
+    skipped: number;
+    errors: number;
+    cached: number;
+    durationMs: number;
+    /** Credits the test run cost, added by the route that meters it */
+    creditsCharged?: number;
+  };
+
+export interface RunTestsOptions {
+  projectId?: string;
+  projectDir: string;
+  workers?: number;
+  signal?: AbortSignal;
+  onEvent: (event: TestRunEvent) => void;
+}
+
+interface CachedFileResult {
+  key: string;
+  durationMs: number;
+  results: TestResult[];
+}
+
+type TestResultCache = Record<string, CachedFileResult>;
+
+const EVENT_MARKER = '@@PYCODE_TEST@@';
+const PLUGIN_MODULE = 'pycode_pytest_events';
+const MAX_WORKERS = 4;
+
+// pytest plugin that reports each test over a dup of the original stdout, so
+// events still reach us while pytest has fd 1 captured.
+const PLUGIN_SOURCE = `import json
+import os
+
+_MARKER = ${JSON.stringify(EVENT_MARKER)}
+_out = os.fdopen(os.dup(1), 'w', buffering=1, encoding='utf-8')
+
+
+def _emit(nodeid, outcome, duration, message=None):
+    payload = {
+        'nodeId': nodeid,
+        'file': nodeid.split('::', 1)[0],
+        'outcome': outcome,
+        'durationMs': round(duration * 1000, 2),
+    }
+    if message:
+        payload['message'] = message[:4000]
+    _out.write(_MARKER + json.dumps(payload) + '\\n')
+
+
+def pytest_runtest_logreport(report):
+    if report.when == 'call':
+        _emit(report.nodeid, report.outcome, report.duration,
+              report.longreprtext if report.failed else None)
+    elif report.failed:
+        _emit(report.nodeid, 'error', report.duration, report.longreprtext)
+    elif report.when == 'setup' and report.skipped:
+        _emit(report.nodeid, 'skipped', report.duration)
+
+
+def pytest_collectreport(report):
+    if report.failed:
+        _emit(report.nodeid, 'error', 0, report.longreprtext)
+`;
+
+export function isTestFile(relativePath: string): boolean {
+  const name = path.posix.basename(relativePath);
+  return /^test_.*\.py$/.test(name) || /_test\.py$/.test(name);
+}
+
+/**
+ * Resolve an import to project source files (module.py or package/__init__.py),
+ * trying the importing file's directory first and then the project root
+ */
+function resolveLocalModule(projectFiles: Set<string>, fromFile: string, moduleName: string): string[] {
+  const fromDir = path.posix.dirname(fromFile);
+  let baseDirs: string[];
+  let name = moduleName;
+
+  if (name.startsWith('.')) {
+    const level = name.match(/^\.+/)![0].length;
+    name = name.slice(level);
+    let dir = fromDir;
+    for (let i = 1; i < level; i++) dir = path.posix.dirname(dir);
+    baseDirs = [dir];
+  } else {
+    baseDirs = fromDir === '.' ? ['.'] : [fromDir, '.'];
+  }
+
+  const parts = name ? name.split('.') : [];
+  for (const baseDir of baseDirs) {
+    const found: string[] = [];
+    // Include every package __init__ along the dotted path, then the leaf module
+    for (let i = 1; i <= parts.length; i++) {
+      const stem = path.posix.normalize(path.posix.join(baseDir, ...parts.slice(0, i)));
+      if (projectFiles.has(`${stem}.py`)) found.push(`${stem}.py`);
+      else if (projectFiles.has(`${stem}/__init__.py`)) found.push(`${stem}/__init__.py`);
+    }
+    if (!parts.length) {
+      const init = path.posix.normalize(path.posix.join(baseDir, '__init__.py'));
+      if (projectFiles.has(init)) found.push(init);
+    }
+    if (found.length) return found;
+  }
+
+  return [];
+}
+
+/**
+ * Cache key for a test file: its own hash plus the hashes of every project
+ * module it (transitively) imports and the conftest.py files that apply to it
+ */
+async function computeCacheKey(
+  projectDir: string,
+  projectFiles: Set<string>,
+  testFile: string,
+  hashes: Map<string, string>,
+  sources: Map<string, string>
+): Promise<string> {
+  const load = async (file: string) => {
+    if (!sources.has(file)) {
+      const content = await readFile(path.join(projectDir, file), 'utf-8').catch(() => '');
+      sources.set(file, content);
+      hashes.set(file, hashContent(content));
+    }
+    return sources.get(file)!;
+  };
+
+  const seen = new Set<string>();
+  const stack = [testFile];
+
+  // conftest.py files from the project root down to the test's directory
+  let dir = path.posix.dirname(testFile);
+  while (true) {
+    const conftest = path.posix.normalize(path.posix.join(dir, 'conftest.py'));
+    if (projectFiles.has(conftest)) stack.push(conftest);
+    if (dir === '.' || dir === '/' || dir === '') break;
+    dir = path.posix.dirname(dir);
+  }
+
+  while (stack.length) {
+    const file = stack.pop()!;
+    if (seen.has(file)) continue;
+    seen.add(file);
+    const source = await load(file);
+    for (const moduleName of parseImports(source)) {
+      for (const dep of resolveLocalModule(projectFiles, file, moduleName)) {
+        if (!seen.has(dep)) stack.push(dep);
+      }
+    }
+  }
+
+  const parts = Array.from(seen).sort().map(file => `${file}:${hashes.get(file)}`);
+  return hashContent(parts.join('\n'));
+}
+
+/**
+ * Longest-processing-time-first assignment of test files to workers, using
+ * durations from the previous run (unknown files count as one second)
+ */
+function shardFiles(files: string[], workers: number, cache: TestResultCache): string[][] {
+  const shards = Array.from({ length: workers }, () => ({ files: [] as string[], load: 0 }));
+  const weighted = files
+    .map(file => ({ file, weight: cache[file]?.durationMs || 1000 }))
+    .sort((a, b) => b.weight - a.weight);
+
+  for (const { file, weight } of weighted) {
+    const target = shards.reduce((min, shard) => (shard.load < min.load ? shard : min), shards[0]);
+    target.files.push(file);
+    target.load += weight;
+  }
+
+  return shards.map(shard => shard.files).filter(shard => shard.length > 0);
+}
+
+async function ensurePlugin(): Promise<string> {
+  const pluginDir = getCacheDir('pytest-plugin');
+  const pluginPath = path.join(pluginDir, `${PLUGIN_MODULE}.py`);
+  const current = existsSync(pluginPath) ? await readFile(pluginPath, 'utf-8').catch(() => '') : '';
+  if (current !== PLUGIN_SOURCE) {
+    await mkdir(pluginDir, { recursive: true });
+    await writeFile(pluginPath, PLUGIN_SOURCE, 'utf-8');
+  }
+  return pluginDir;
+}
+
+// Exit code of pytest for one shard, or null when pytest did not run properly
+function runShard(
+  shardIndex: number,
+  files: string[],
+  projectDir: string,
+  pluginDir: string,
+  signal: AbortSignal | undefined,
+  onResult: (result: TestResult) => void,
+  onEvent: (event: TestRunEvent) => void
+): Promise<number | null> {
+  return new Promise((resolve) => {
+    const env = runEnvironment({
+      PYTHONPATH: [pluginDir, process.env.PYTHONPATH].filter(Boolean).join(path.delimiter),
+    });
+
+    const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
+    let buffered = '';
+    let stderr = '';
+    let reported = 0;
+
+    runProcess({
+      kind: 'command',
+      command: pythonCommand,
+      args: [
+        '-m', 'pytest',
+        '-p', PLUGIN_MODULE,
+        '-p', 'no:cacheprovider',
+        '--continue-on-collection-errors',
+        '-q', '--no-header', '-rN',
+        ...files,
+      ],
+      env,
+      cwd: projectDir,
+    }, {
+      signal,
+      onStdout: (data) => {
+        buffered += data.toString();
+        const lines = buffered.split('\n');
+        buffered = lines.pop() || '';
+        for (const line of lines) {
+          if (!line.startsWith(EVENT_MARKER)) continue;
+          try {
+            onResult(JSON.parse(line.slice(EVENT_MARKER.length)));
+            reported++;
+          } catch (error) {
+            console.error('[runTests] Malformed test event:', line);
+          }
+        }
+      },
+      onStderr: (data) => {
+        stderr += data.toString();
+      },
+    }).then((result) => {
+      if (result.error) {
+        onEvent({ type: 'output', worker: shardIndex, text: `Failed to start pytest: ${result.error}` });
+        resolve(null);
+        return;
+      }
+      const code = result.exitCode;
+      // 0: all passed, 1: some failed, 5: nothing collected. Anything else is a
+      // pytest problem, and so is 1 without a single result: python exits with
+      // 1 when the pytest module is missing.
+      const missingPytest = /No module named pytest/.test(stderr);
+      const failed = missingPytest || (code !== 0 && code !== 1 && code !== 5) || (code === 1 && reported === 0);
+      if (failed) {
+        const hint = missingPytest
+          ? '\n[INFO] pytest is not installed. Run "pip install pytest" in the Terminal tab.'
+          : '';
+        onEvent({ type: 'output', worker: shardIndex, text: `${stderr.trim()}${hint}` });
+      }
+      resolve(failed ? null : code);
+    });
+  });
+}
+
+/**
+ * Discover pytest files in a project directory and run them across worker
+ * processes. Files whose source and local dependencies are unchanged since a
+ * fully passing run are reported from cache instead of being executed.
+ */
+export async function runTests(options: RunTestsOptions): Promise<void> {
+  const { projectDir, onEvent, signal } = options;
+  const startedAt = Date.now();
+  const cachePath = getCacheDir('tests', path.basename(options.projectId || 'default'), 'results.json');
+
+  let cache: TestResultCache = {};
+  try {
+    cache = JSON.parse(await readFile(cachePath, 'utf-8'));
+  } catch {
+    // No previous results
+  }
+
+  const allFiles = await listProjectFiles(projectDir, file => file.endsWith('.py'));
+  const projectFiles = new Set(allFiles);
+  const testFiles = allFiles.filter(isTestFile);
+
+  const hashes = new Map<string, string>();
+  const sources = new Map<string, string>();
+  const keys = new Map<string, string>();
+  for (const file of testFiles) {
+    keys.set(file, await computeCacheKey(projectDir, projectFiles, file, hashes, sources));
+  }
+
+  const cachedFiles = testFiles.filter(file => cache[file] && cache[file].key === keys.get(file));
+  const pendingFiles = testFiles.filter(file => !cachedFiles.includes(file));
+  const workerCount = Math.max(1, Math.min(
+    pendingFiles.length,
+    options.workers || Math.max(1, os.cpus().length - 1),
+    MAX_WORKERS
+  ));
+
+  onEvent({ type: 'start', files: testFiles, cachedFiles, workers: pendingFiles.length ? workerCount : 0 });
+
+  const totals = { passed: 0, failed: 0, skipped: 0, errors: 0, cached: 0 };
+  const count = (outcome: TestOutcome) => {
+    if (outcome === 'passed') totals.passed++;
+    else if (outcome === 'failed') totals.failed++;
+    else if (outcome === 'skipped') totals.skipped++;
+    else totals.errors++;
+  };
+
+  for (const file of cachedFiles) {
+    for (const result of cache[file].results) {
+      count(result.outcome);
+      totals.cached++;
+      onEvent({ type: 'test', cached: true, ...result });
+    }
+  }
+
+  const fresh = new Map<string, TestResult[]>();
+  // Files of shards where pytest itself failed; their results may be partial
+  const incomplete = new Set<string>();
+  if (pendingFiles.length) {
+    const pluginDir = await ensurePlugin();
+    const shards = shardFiles(pendingFiles, workerCount, cache);
+
+    const codes = await Promise.all(shards.map((files, index) =>
+      runShard(index, files, projectDir, pluginDir, signal, (result) => {
+        count(result.outcome);
+        if (!fresh.has(result.file)) fresh.set(result.file, []);
+        fresh.get(result.file)!.push(result);
+        onEvent({ type: 'test', cached: false, worker: index, ...result });
+      }, onEvent)
+    ));
+    // A shard where pytest itself failed counts as an error, not as 0 tests
+    if (!signal?.aborted) {
+      totals.errors += codes.filter(code => code === null).length;
+    }
+    codes.forEach((code, index) => {
+      if (code === null) shards[index].forEach(file => incomplete.add(file));
+    });
+  }
+
+  // Only fully passing (or skipped) files are cached; failures always re-run
+  if (!signal?.aborted) {
+    const nextCache: TestResultCache = {};
+    for (const file of cachedFiles) nextCache[file] = cache[file];
+    fresh.forEach((results, file) => {
+      const key = keys.get(file);
+      if (!key || incomplete.has(file) || results.some(r => r.outcome === 'failed' || r.outcome === 'error')) return;
+      nextCache[file] = {
+        key,
+        durationMs: results.reduce((sum, r) => sum + r.durationMs, 0),
+        results,
+      };
+    });
+    try {
+      await mkdir(path.dirname(cachePath), { recursive: true });
+      await writeFile(cachePath, JSON.stringify(nextCache), 'utf-8');
+    } catch (error) {
+      console.error('[runTests] Failed to write test result cache:', error);
+    }
+  }
+
+  onEvent({ type: 'summary', ...totals, durationMs: Date.now() - startedAt });
+}
@@ -0,0 +1,504 @@
+import { getProjectDir, materializeProjectFiles, ProjectFileInput } from './project-files';
+import { getBytecodeCacheDir } from './bytecode-cache';
+import { extractRunMetrics, METRICS_PREAMBLE, RunMetrics } from './run-metrics';
+import { runProcess } from './process-exec';
+import { runEnvironment } from './run-env';
+import { prewarmProject } from './prewarm';
+import { collectThirdPartyImports, findMissingPackages, installPackages, waitForPendingInstalls } from './dependencies';
+import { isSandboxNetworkIsolated } from './sandbox-pool';
+import { createRunCgroup, describeResourceUsage, getResourceLimits, readCgroupUsage, removeRunCgroup, RunCgroup } from './cgroups';
+
+export interface PythonRunInput {
+  code: string;
+  projectId?: string;
+  files?: ProjectFileInput[];
+}
+
+export interface PythonRunResult {
+  output: string;
+  error?: string;
+  workingDir?: string;
+  metrics?: RunMetrics;
+}
+
+export interface PythonRunOptions {
+  /** Subscription plan deciding the resource limits (defaults to free) */
+  plan?: string;
+  onStdout?: (chunk: Buffer) => void;
+  onStderr?: (chunk: Buffer) => void;
+  signal?: AbortSignal;
+}
+
+export interface PreparedPythonRun {
+  workingDir: string;
+  /** Bootstrap script wrapping the user code */
+  script: string;
+  env: NodeJS.ProcessEnv;
+  cgroup: RunCgroup | null;
+  plan: string;
+  isGraphical: boolean;
+}
+
+/**
+ * Write the project files, set up caches and limits and wrap the code in the
+ * bootstrap (auto-install, graphics backends, metrics). The result can be
+ * executed attached (executePythonRun) or detached as a background job.
+ */
+export async function preparePythonRun(input: PythonRunInput, options: Pick<PythonRunOptions, 'plan' | 'signal'> = {}): Promise<PreparedPythonRun> {
+  // Get project directory from projectId or use uploads/default as fallback
+  // Files should be created in the project's directory
+  const workingDir = getProjectDir(input.projectId);
+
+  // Write the other project files first. Unchanged files keep their mtimes,
+  // so bytecode cached by earlier runs stays valid.
+  if (input.files && input.files.length > 0) {
+    await materializeProjectFiles(workingDir, input.files);
+  }
+
+  // Persist compiled modules per project across runs instead of in
+  // __pycache__ folders inside the working directory
+  const bytecodeCacheDir = await getBytecodeCacheDir(input.projectId);
+
+  // Packages prefetched for this code may still be installing; let them
+  // finish rather than having the bootstrap start a second pip
+  const imports = collectThirdPartyImports([input.code]);
+  await waitForPendingInstalls(imports, options.signal);
+  // A sandbox without network cannot pip install; do it here
+  if (imports.length > 0 && isSandboxNetworkIsolated()) {
+    const missing = await findMissingPackages(imports, options.signal);
+    if (missing.length > 0) {
+      await installPackages(missing, options.signal);
+    }
+  }
+
+  // Memory, CPU and process limits come from the user's plan
+  const plan = options.plan || 'free';
+  const cgroup = await createRunCgroup(getResourceLimits(plan));
+
+  // Check if code uses graphical libraries
+  const isGraphical = /pygame|tkinter|turtle|matplotlib|plotly|seaborn|bokeh/i.test(input.code);
+
+  // Only an allowlist of the server's variables (run-env.ts), with UTF-8
+  // output so Windows handles Unicode characters properly. PYTHONUSERBASE is
+  // left out to let Python find the correct default path, especially for
+  // Windows Store versions.
+  const env = runEnvironment({ PYTHONPYCACHEPREFIX: bytecodeCacheDir });
+
+  if (isGraphical) {
+    // Set up virtual display for graphical applications
+    // env.DISPLAY = ':99'; // Commented out to allow local GUI
+  }
+
+  // Use different execution strategy for graphical vs text-based code
+  const script = isGraphical
+    ? `
+import sys
+import os
+import io
+import site
+import tempfile
+import subprocess
+${METRICS_PREAMBLE}
+# Set UTF-8 encoding for Windows to handle Unicode characters
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+if sys.stderr.encoding != 'utf-8':
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+# Add user site-packages to Python path for installed packages
+# First try standard user site
+user_site = site.getusersitepackages()
+if user_site and os.path.exists(user_site):
+    sys.path.insert(0, user_site)
+    print(f"[DEBUG] Added user site-packages: {user_site}")
+
+# Also try to find packages in common Windows locations including Windows Store Python
+if os.name == 'nt':  # Windows
+    user_base = os.environ.get('USERPROFILE', os.path.expanduser('~'))
+    possible_paths = [
+        os.path.join(user_base, 'AppData', 'Roaming', 'Python', 'Python*', 'site-packages'),
+        os.path.join(user_base, 'Python*', 'site-packages'),
+        # Windows Store Python path
+        os.path.join(user_base, 'AppData', 'Local', 'Packages', 'PythonSoftwareFoundation.Python.3.11_*', 'LocalCache', 'local-packages', 'Python311', 'site-packages'),
+        os.path.join(user_base, 'AppData', 'Local', 'Packages', 'PythonSoftwareFoundation.Python.3.10_*', 'LocalCache', 'local-packages', 'Python310', 'site-packages'),
+    ]
+    import glob
+    for pattern in possible_paths:
+        for path in glob.glob(pattern):
+            if os.path.exists(path) and path not in sys.path:
+                sys.path.insert(0, path)
+                print(f"[DEBUG] Added extra site-packages: {path}")
+
+# Get the user code
+user_code = '''${input.code.replace(/'/g, "\\'").replace(/\n/g, '\\n')}'''
+
+# Check if required packages are installed, auto-install if missing
+missing_packages = []
+required_packages = {
+    'matplotlib': 'matplotlib',
+    'plt': 'matplotlib',
+    'pandas': 'pandas',
+    'pd': 'pandas',
+    'numpy': 'numpy',
+    'np': 'numpy',
+    'seaborn': 'seaborn',
+    'sns': 'seaborn',
+    'sklearn': 'scikit-learn',
+    'scikit-learn': 'scikit-learn',
+    'scipy': 'scipy',
+    'statsmodels': 'statsmodels',
+    'plotly': 'plotly',
+    'bokeh': 'bokeh',
+    'opencv': 'opencv-python',
+    'cv2': 'opencv-python',
+    'tensorflow': 'tensorflow',
+    'keras': 'keras',
+    'torch': 'torch',
+    'nltk': 'nltk',
+    'spacy': 'spacy',
+    'xgboost': 'xgboost',
+    'lightgbm': 'lightgbm',
+    'catboost': 'catboost',
+}
+
+for module_name, package_name in required_packages.items():
+    if module_name in user_code or f'import {module_name}' in user_code or f'from {module_name}' in user_code:
+        try:
+            __import__(package_name)
+        except ImportError:
+            if package_name not in missing_packages:
+                missing_packages.append(package_name)
+
+# Auto-install missing packages
+if missing_packages:
+    import subprocess
+    import sys
+    import io
+    # Set stdout/stderr to UTF-8 to handle any Unicode characters
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    if sys.stderr.encoding != 'utf-8':
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+    
+    print(f"[INFO] Auto-installing missing packages: {', '.join(set(missing_packages))}")
+    print("[INFO] This may take a minute...\\n")
+    
+    # Try installing with pre-built wheels first (faster, no compilation needed)
+    install_cmd = [sys.executable, '-m', 'pip', 'install', '--user', '--only-binary=:all:', '--upgrade', 'pip', 'setuptools', 'wheel']
+    
+    try:
+        # First, upgrade pip/setuptools/wheel to ensure we can use wheels
+        subprocess.run(install_cmd, capture_output=True, text=True, timeout=60, encoding='utf-8', errors='replace')
+        
+        # Now install the packages, prefer wheels but allow source if needed
+        install_cmd = [sys.executable, '-m', 'pip', 'install', '--user', '--prefer-binary'] + list(set(missing_packages))
+        result = subprocess.run(install_cmd, capture_output=True, text=True, timeout=600, encoding='utf-8', errors='replace')
+        
+        if result.returncode == 0:
+            print(f"[SUCCESS] Successfully installed: {', '.join(set(missing_packages))}\\n")
+            # Re-import site to pick up newly installed packages
+            import importlib
+            importlib.reload(site)
+            user_site = site.getusersitepackages()
+            if user_site and os.path.exists(user_site):
+                sys.path.insert(0, user_site)
+        else:
+            # If installation failed, try installing one by one to see which ones work
+            print(f"[WARNING] Bulk installation had issues, trying individual packages...")
+            successfully_installed = []
+            failed_packages = []
+            
+            for pkg in set(missing_packages):
+                try:
+                    cmd = [sys.executable, '-m', 'pip', 'install', '--user', '--prefer-binary', pkg]
+                    result_single = subprocess.run(cmd, capture_output=True, text=True, timeout=300, encoding='utf-8', errors='replace')
+                    if result_single.returncode == 0:
+                        successfully_installed.append(pkg)
+                    else:
+                        failed_packages.append(pkg)
+                except:
+                    failed_packages.append(pkg)
+            
+            if successfully_installed:
+                print(f"[SUCCESS] Installed: {', '.join(successfully_installed)}")
+                import importlib
+                importlib.reload(site)
+                user_site = site.getusersitepackages()
+                if user_site and os.path.exists(user_site):
+                    sys.path.insert(0, user_site)
+            
+            if failed_packages:
+                print(f"\\n[WARNING] Failed to install: {', '.join(failed_packages)}")
+                print(f"[INFO] For matplotlib on Windows, you may need Visual C++ Build Tools.")
+                print(f"[INFO] Or try: pip install --user --only-binary=:all: {' '.join(failed_packages)}")
+    except Exception as e:
+        print(f"[WARNING] Could not auto-install: {str(e)}")
+        print(f"\\n[INFO] Please install manually using the Terminal tab:")
+        print(f"   pip install --user {' '.join(set(missing_packages))}")
+
+# Set up virtual display for graphical applications
+if 'pygame' in user_code:
+    # os.environ['SDL_VIDEODRIVER'] = 'dummy'  <-- Commented out to allow local GUI
+    os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+# For matplotlib, use Agg backend
+if 'matplotlib' in user_code:
+    # Check if we are in a headless environment (e.g. cloud) or local
+    # For now, default to Agg for web safety, but user can override if they know what they are doing
+    import matplotlib
+    matplotlib.use('Agg')
+
+# For turtle graphics, set up headless mode
+if 'turtle' in user_code:
+    # os.environ['DISPLAY'] = ':99' <-- Commented out to allow local GUI
+    pass
+
+# Execute the modified user code
+exec(user_code)
+`
+    : `
+import sys
+import os
+import io
+import site
+${METRICS_PREAMBLE}
+# Set UTF-8 encoding for Windows
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+if sys.stderr.encoding != 'utf-8':
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+# Add user site-packages to Python path for installed packages
+user_base = os.environ.get('PYTHONUSERBASE', os.path.expanduser('~'))
+user_site = site.getusersitepackages()
+if user_site and os.path.exists(user_site):
+    sys.path.insert(0, user_site)
+
+# Also try to find packages in common Windows locations
+if os.name == 'nt':  # Windows
+    possible_paths = [
+        os.path.join(user_base, 'AppData', 'Roaming', 'Python', 'Python*', 'site-packages'),
+        os.path.join(user_base, 'Python*', 'site-packages'),
+    ]
+    try:
+        import glob
+        for pattern in possible_paths:
+            for path in glob.glob(pattern):
+                if os.path.exists(path) and path not in sys.path:
+                    sys.path.insert(0, path)
+    except:
+        pass
+
+import warnings
+warnings.filterwarnings('ignore')
+
+# Get the user code first to check what packages are needed
+user_code = '''${input.code.replace(/'/g, "\\'").replace(/\n/g, '\\n')}'''
+
+# Check if required packages are installed, auto-install if missing
+missing_packages = []
+required_packages = {
+    'matplotlib': 'matplotlib',
+    'plt': 'matplotlib',
+    'pandas': 'pandas',
+    'pd': 'pandas',
+    'numpy': 'numpy',
+    'np': 'numpy',
+    'seaborn': 'seaborn',
+    'sns': 'seaborn',
+    'sklearn': 'scikit-learn',
+    'scikit-learn': 'scikit-learn',
+    'scipy': 'scipy',
+    'statsmodels': 'statsmodels',
+    'plotly': 'plotly',
+    'bokeh': 'bokeh',
+    'opencv': 'opencv-python',
+    'cv2': 'opencv-python',
+    'tensorflow': 'tensorflow',
+    'keras': 'keras',
+    'torch': 'torch',
+    'nltk': 'nltk',
+    'spacy': 'spacy',
+    'xgboost': 'xgboost',
+    'lightgbm': 'lightgbm',
+    'catboost': 'catboost',
+}
+
+for module_name, package_name in required_packages.items():
+    if module_name in user_code or f'import {module_name}' in user_code or f'from {module_name}' in user_code:
+        try:
+            __import__(package_name)
+        except ImportError:
+            if package_name not in missing_packages:
+                missing_packages.append(package_name)
+
+# Auto-install missing packages
+if missing_packages:
+    import subprocess
+    import sys
+    import io
+    # Set stdout/stderr to UTF-8 to handle Unicode properly on Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    if sys.stderr.encoding != 'utf-8':
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+    
+    print(f"[INFO] Auto-installing missing packages: {', '.join(set(missing_packages))}")
+    print("[INFO] This may take a minute...\\n")
+    
+    # Try installing with pre-built wheels first (faster, no compilation needed)
+    install_cmd = [sys.executable, '-m', 'pip', 'install', '--user', '--only-binary=:all:', '--upgrade', 'pip', 'setuptools', 'wheel']
+    
+    try:
+        # First, upgrade pip/setuptools/wheel to ensure we can use wheels
+        subprocess.run(install_cmd, capture_output=True, text=True, timeout=60, encoding='utf-8', errors='replace')
+        
+        # Now install the packages, prefer wheels but allow source if needed
+        install_cmd = [sys.executable, '-m', 'pip', 'install', '--user', '--prefer-binary'] + list(set(missing_packages))
+        result = subprocess.run(install_cmd, capture_output=True, text=True, timeout=600, encoding='utf-8', errors='replace')
+        
+        if result.returncode == 0:
+            print(f"[SUCCESS] Successfully installed: {', '.join(set(missing_packages))}")
+            # Re-import site to pick up newly installed packages
+            import importlib
+            importlib.reload(site)
+            user_site = site.getusersitepackages()
+            if user_site and os.path.exists(user_site):
+                sys.path.insert(0, user_site)
+        else:
+            # If installation failed, try installing one by one to see which ones work
+            print(f"[WARNING] Bulk installation had issues, trying individual packages...")
+            successfully_installed = []
+            failed_packages = []
+            
+            for pkg in set(missing_packages):
+                try:
+                    cmd = [sys.executable, '-m', 'pip', 'install', '--user', '--prefer-binary', pkg]
+                    result_single = subprocess.run(cmd, capture_output=True, text=True, timeout=300, encoding='utf-8', errors='replace')
+                    if result_single.returncode == 0:
+                        successfully_installed.append(pkg)
+                    else:
+                        failed_packages.append(pkg)
+                except:
+                    failed_packages.append(pkg)
+            
+            if successfully_installed:
+                print(f"[SUCCESS] Installed: {', '.join(successfully_installed)}")
+                import importlib
+                importlib.reload(site)
+                user_site = site.getusersitepackages()
+                if user_site and os.path.exists(user_site):
+                    sys.path.insert(0, user_site)
+            
+            if failed_packages:
+                print(f"\\n[WARNING] Failed to install: {', '.join(failed_packages)}")
+                print(f"[INFO] For matplotlib on Windows, you may need Visual C++ Build Tools.")
+                print(f"[INFO] Or try: pip install --user --only-binary=:all: {' '.join(failed_packages)}")
+    except Exception as e:
+        print(f"[WARNING] Could not auto-install packages: {str(e)}")
+        print(f"\\n[INFO] Please install manually using the Terminal tab:")
+        print(f"   pip install --user {' '.join(set(missing_packages))}")
+
+# Execute the user code
+exec(user_code)
+`;
+
+  // Ensure directory exists
+  const fs = require('fs');
+  if (!fs.existsSync(workingDir)) {
+    fs.mkdirSync(workingDir, { recursive: true });
+  }
+
+  return { workingDir, script, env, cgroup, plan, isGraphical };
+}
+
+/**
+ * Collect metrics and resource usage once a prepared run has exited, and
+ * release its cgroup
+ */
+export async function finishPythonRun(
+  prepared: Pick<PreparedPythonRun, 'cgroup' | 'plan'>,
+  rawStderr: string,
+  durationMs: number
+): Promise<{ error: string; metrics: RunMetrics }> {
+  let { stderr, metrics } = extractRunMetrics(rawStderr, durationMs);
+  if (prepared.cgroup) {
+    const resources = await readCgroupUsage(prepared.cgroup);
+    await removeRunCgroup(prepared.cgroup);
+    metrics = { ...metrics, resources };
+    const notice = describeResourceUsage(resources, prepared.plan);
+    if (notice) {
+      stderr = stderr ? `${stderr}\n${notice}` : notice;
+    }
+  }
+  return { error: stderr, metrics };
+}
+
+/**
+ * Run the active file of a project: write the project files, wrap the code
+ * in the bootstrap (auto-install, graphics backends, metrics) and execute it.
+ * Shared by the runPythonCode flow and remote runner agents, so it must not
+ * depend on request context such as cookies.
+ */
+export async function executePythonRun(input: PythonRunInput, options: PythonRunOptions = {}): Promise<PythonRunResult> {
+  const prepared = await preparePythonRun(input, options);
+  const { workingDir, script, env, cgroup, isGraphical } = prepared;
+
+  return new Promise<PythonRunResult>((resolve) => {
+    let output = '';
+    let error = '';
+
+    // Runs through the execution daemon when configured, in a pre-started
+    // namespace sandbox when the host supports it, otherwise as a plain
+    // child process
+    runProcess({
+      kind: 'python',
+      script,
+      env,
+      cwd: workingDir, // Execute in project directory so files are created there
+      cgroup: cgroup?.path,
+    }, {
+      onStdout: (data) => {
+        output += data.toString();
+        options.onStdout?.(data);
+      },
+      onStderr: (data) => {
+        error += data.toString();
+        options.onStderr?.(data);
+      },
+      signal: options.signal,
+    }).then(async (result) => {
+      if (result.error) {
+        // This handles errors in spawning the process itself
+        if (cgroup) {
+          await removeRunCgroup(cgroup);
+        }
+        resolve({ output: '', error: `Failed to start Python process: ${result.error}` });
+        return;
+      }
+
+      const { error: stderr, metrics } = await finishPythonRun(prepared, error, result.durationMs);
+      // Add a small delay for graphical applications to prevent quick shutdown
+      if (isGraphical) {
+        setTimeout(() => {
+          resolve({ output, error: stderr, workingDir, metrics });
+        }, 1000); // 1 second delay for graphical apps
+      } else {
+        resolve({ output, error: stderr, workingDir, metrics });
+      }
+    });
+  });
+}
+
+/**
+ * Prepare a project's caches on this machine without running it. Used when
+ * a project's runs move to a new runner node.
+ */
+export async function warmProjectCache(input: PythonRunInput): Promise<PythonRunResult> {
+  const summary = await prewarmProject(input);
+  return {
+    output: `Warmed ${input.projectId || 'default'}: ${summary.written} file(s) written, ${summary.installed.length} package(s) installed, ${summary.compiled} module(s) compiled`,
+    error: summary.failed.length > 0 ? `Failed to install: ${summary.failed.join(', ')}` : undefined,
+    workingDir: summary.workingDir,
+  };
+}
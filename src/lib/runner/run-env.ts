@@ -0,0 +1,41 @@
+/**
+ * Environment for processes that run user code.
+ *
+ * Only the variables listed here are taken from the server's environment;
+ * everything else (SUPABASE_SERVICE_ROLE_KEY, API keys, database URLs) never
+ * reaches a run, which could otherwise print os.environ.
+ */
+
+const ALLOWED_VARIABLES = [
+  'PATH', 'HOME', 'USER', 'LOGNAME', 'LANG', 'LANGUAGE', 'LC_ALL', 'LC_CTYPE', 'TZ', 'TERM',
+  // Interpreter and installed packages
+  'VIRTUAL_ENV', 'PYTHONHOME', 'PYTHONPATH',
+  // Local GUI runs (pygame, tkinter)
+  'DISPLAY', 'WAYLAND_DISPLAY', 'XAUTHORITY',
+  // Windows: Python and pip need these to start
+  'SYSTEMROOT', 'SYSTEMDRIVE', 'WINDIR', 'COMSPEC', 'PATHEXT', 'TEMP', 'TMP', 'USERPROFILE', 'APPDATA', 'LOCALAPPDATA',
+];
+
+/**
+ * Allowed variables of the server's environment plus UTF-8 output settings;
+ * an override of undefined removes a variable
+ */
+export function runEnvironment(overrides: Record<string, string | undefined> = {}): NodeJS.ProcessEnv {
+  const env: NodeJS.ProcessEnv = {};
+  for (const name of ALLOWED_VARIABLES) {
+    if (process.env[name] !== undefined) {
+      env[name] = process.env[name];
+    }
+  }
+  env.PYTHONIOENCODING = 'utf-8';
+  env.PYTHONUTF8 = '1';
+
+  for (const [name, value] of Object.entries(overrides)) {
+    if (value === undefined) {
+      delete env[name];
+    } else {
+      env[name] = value;
+    }
+  }
+  return env;
+}
@@ -0,0 +1,94 @@
+import type { ResourceUsage } from './cgroups';
+
+/**
+ * Metrics reported by the Python bootstrap at interpreter exit
+ */
+export interface RunMetrics {
+  durationMs: number;
+  bytecodeCache?: {
+    hits: number;
+    misses: number;
+    hitRate: number;
+  };
+  resources?: ResourceUsage;
+  /** Credits the run cost, set where usage is metered */
+  creditsCharged?: number;
+}
+
+const METRICS_MARKER = '@@PYCODE_METRICS@@';
+
+/**
+ * Python snippet placed at the top of the run bootstrap. At exit it checks
+ * every imported project module: bytecode written during this run is a miss,
+ * bytecode reused from an earlier run is a hit.
+ */
+export const METRICS_PREAMBLE = `
+import atexit as _pycode_atexit
+import time as _pycode_time
+_pycode_started = _pycode_time.time()
+_pycode_root = os.path.join(os.getcwd(), '')
+
+def _pycode_report_metrics():
+    import json
+    hits = 0
+    misses = 0
+    for _module in list(sys.modules.values()):
+        _source = getattr(_module, '__file__', None)
+        _cached = getattr(_module, '__cached__', None)
+        if not _source or not _cached or not _source.startswith(_pycode_root):
+            continue
+        try:
+            if os.path.getmtime(_cached) >= _pycode_started:
+                misses += 1
+            else:
+                hits += 1
+        except OSError:
+            misses += 1
+    try:
+        sys.stderr.write('\\n${METRICS_MARKER}' + json.dumps({'bytecodeHits': hits, 'bytecodeMisses': misses}) + '\\n')
+        sys.stderr.flush()
+    except Exception:
+        pass
+
+_pycode_atexit.register(_pycode_report_metrics)
+`;
+
+/**
+ * Strip the metrics line from stderr and turn it into RunMetrics
+ */
+export function extractRunMetrics(stderr: string, durationMs: number): { stderr: string; metrics: RunMetrics } {
+  const metrics: RunMetrics = { durationMs };
+  const index = stderr.lastIndexOf(METRICS_MARKER);
+  if (index === -1) {
+    return { stderr, metrics };
+  }
+
+  const lineEnd = stderr.indexOf('\n', index);
+  const payload = stderr.slice(index + METRICS_MARKER.length, lineEnd === -1 ? undefined : lineEnd);
+  const cleaned = (stderr.slice(0, index) + (lineEnd === -1 ? '' : stderr.slice(lineEnd + 1))).replace(/\n$/, '');
+
+  try {
+    const raw = JSON.parse(payload);
+    const hits = Number(raw.bytecodeHits) || 0;
+    const misses = Number(raw.bytecodeMisses) || 0;
+    metrics.bytecodeCache = {
+      hits,
+      misses,
+      hitRate: hits + misses > 0 ? hits / (hits + misses) : 0,
+    };
+  } catch (error) {
+    console.error('[extractRunMetrics] Malformed metrics line:', payload);
+  }
+
+  return { stderr: cleaned, metrics };
+}
+
+/**
+ * Drop metrics lines from streamed stderr. Expects whole lines.
+ */
+export function stripMetricsLines(text: string): string {
+  return text
+    .split('\n')
+    .filter(line => !line.startsWith(METRICS_MARKER))
+    .join('\n');
+}
@@ -0,0 +1,159 @@
+import os from 'os';
+import type { BrokerJob, HeartbeatResponse, JobEvent, RunnerNode } from './job-broker';
+import { executePythonRun, PythonRunResult, warmProjectCache } from './python-run';
+
+/**
+ * Runner node agent. Registers with the broker at PYCODE_BROKER_URL, keeps
+ * `capacity` jobs in flight by long-polling /api/runner/pull, streams output
+ * back in small batches and heartbeats so the broker notices when it dies.
+ * Started with `npm run runner:agent`.
+ */
+
+export interface RunnerAgentOptions {
+  brokerUrl: string;
+  token: string;
+  capacity: number;
+  name?: string;
+  heartbeatIntervalMs?: number;
+  pollWaitMs?: number;
+}
+
+const EVENT_FLUSH_INTERVAL_MS = 100;
+
+export class RunnerAgent {
+  private node: RunnerNode | null = null;
+  private running = new Map<string, AbortController>();
+  private stopped = false;
+  private heartbeatTimer: ReturnType<typeof setInterval> | null = null;
+
+  constructor(private readonly options: RunnerAgentOptions) {}
+
+  private async request<T>(route: string, body: unknown, method = 'POST'): Promise<T> {
+    const response = await fetch(`${this.options.brokerUrl.replace(/\/$/, '')}/api/runner/${route}`, {
+      method,
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${this.options.token}`,
+      },
+      body: JSON.stringify(body),
+    });
+    if (!response.ok) {
+      const data = await response.json().catch(() => ({}));
+      throw new Error(data.error || `Broker responded with ${response.status}`);
+    }
+    return response.json();
+  }
+
+  async start(): Promise<void> {
+    await this.register();
+    this.heartbeatTimer = setInterval(() => this.heartbeat(), this.options.heartbeatIntervalMs || 5000);
+
+    // One poll loop per slot keeps exactly `capacity` jobs in flight
+    const loops = Array.from({ length: this.options.capacity }, () => this.pollLoop());
+    await Promise.all(loops);
+  }
+
+  async stop(): Promise<void> {
+    this.stopped = true;
+    if (this.heartbeatTimer) {
+      clearInterval(this.heartbeatTimer);
+    }
+    for (const controller of this.running.values()) {
+      controller.abort();
+    }
+    if (this.node) {
+      await this.request('register', { nodeId: this.node.id }, 'DELETE').catch(() => undefined);
+    }
+  }
+
+  private async register() {
+    const { node } = await this.request<{ node: RunnerNode }>('register', {
+      name: this.options.name || os.hostname(),
+      capacity: this.options.capacity,
+      labels: { platform: process.platform, cpus: String(os.cpus().length) },
+    });
+    this.node = node;
+    console.log(`[RunnerAgent] Registered as ${node.id} with capacity ${node.capacity}`);
+  }
+
+  private async heartbeat() {
+    if (!this.node) return;
+    try {
+      const response = await this.request<HeartbeatResponse>('heartbeat', {
+        nodeId: this.node.id,
+        running: this.running.size,
+      });
+      if (!response.known) {
+        console.warn('[RunnerAgent] Broker forgot this node, registering again');
+        await this.register();
+        return;
+      }
+      for (const jobId of response.cancel) {
+        this.running.get(jobId)?.abort();
+      }
+    } catch (error: any) {
+      console.error('[RunnerAgent] Heartbeat failed:', error.message);
+    }
+  }
+
+  private async pollLoop() {
+    while (!this.stopped) {
+      try {
+        const { jobs } = await this.request<{ jobs: BrokerJob[] }>('pull', {
+          nodeId: this.node?.id,
+          maxJobs: 1,
+          waitMs: this.options.pollWaitMs || 20000,
+        });
+        for (const job of jobs) {
+          await this.runJob(job);
+        }
+      } catch (error: any) {
+        console.error('[RunnerAgent] Pull failed:', error.message);
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+      }
+    }
+  }
+
+  private async runJob(job: BrokerJob) {
+    const controller = new AbortController();
+    this.running.set(job.id, controller);
+
+    let pending: JobEvent[] = [];
+    let flushing: Promise<unknown> = Promise.resolve();
+    const flush = () => {
+      if (pending.length === 0) return flushing;
+      const events = pending;
+      pending = [];
+      // Keep batches in order
+      flushing = flushing.then(() =>
+        this.request('events', { nodeId: this.node?.id, jobId: job.id, events }).catch((error) => {
+          console.error('[RunnerAgent] Failed to stream events:', error.message);
+        })
+      );
+      return flushing;
+    };
+    const flushTimer = setInterval(flush, EVENT_FLUSH_INTERVAL_MS);
+
+    let result: PythonRunResult;
+    try {
+      result = job.payload.kind === 'warm'
+        ? await warmProjectCache(job.payload.input)
+        : await executePythonRun(job.payload.input, {
+          plan: job.payload.plan,
+          signal: controller.signal,
+          onStdout: (chunk) => { pending.push({ type: 'stdout', data: chunk.toString() }); },
+          onStderr: (chunk) => { pending.push({ type: 'stderr', data: chunk.toString() }); },
+        });
+    } catch (error: any) {
+      result = { output: '', error: `Runner failed: ${error?.message || error}` };
+    } finally {
+      clearInterval(flushTimer);
+      this.running.delete(job.id);
+    }
+
+    await flush();
+    await this.request('complete', { nodeId: this.node?.id, jobId: job.id, result }).catch((error) => {
+      console.error('[RunnerAgent] Failed to report completion:', error.message);
+    });
+  }
+}
@@ -0,0 +1,498 @@
+import { ChildProcessWithoutNullStreams, spawn, spawnSync } from 'child_process';
+import { readFileSync } from 'fs';
+import os from 'os';
+import { Readable } from 'stream';
+import { moveIntoCgroup } from './cgroups';
+import { runEnvironment } from './run-env';
+
+/**
+ * Pool of pre-started Python sandboxes.
+ *
+ * Each sandbox is a Python interpreter started inside fresh user, mount,
+ * pid and network namespaces via util-linux `unshare`. It imports
+ * what every run needs, builds a read-only root filesystem holding only the
+ * system directories, the interpreter and its packages, reports ready on fd 3
+ * and then blocks reading a single job from stdin. The job's working
+ * directory and bytecode cache are bound in (writable) before pivot_root,
+ * so a run cannot see the server's files or other projects. Handing a run to
+ * an idle sandbox only costs writing one JSON line and a few mounts; the
+ * interpreter and namespaces already exist.
+ *
+ * A sandbox runs exactly one job and then exits, so no state leaks between
+ * runs; the pool immediately starts a replacement in the background, as it
+ * does when an idle sandbox dies.
+ *
+ * Configuration:
+ * - PYCODE_SANDBOX=off disables sandboxing (plain child processes)
+ * - PYCODE_SANDBOX_POOL_SIZE warm sandboxes kept ready (default 2)
+ * - PYCODE_SANDBOX_NET=host keeps the host network in sandboxes (default:
+ *   no network; imported packages are installed by the server before the
+ *   run instead of by pip inside it)
+ */
+
+export interface SandboxJob {
+  script: string;
+  cwd: string;
+  env: NodeJS.ProcessEnv;
+  /** cgroup v2 directory the run is moved into before it executes */
+  cgroup?: string;
+}
+
+export interface SpawnedPython {
+  process: ChildProcessWithoutNullStreams;
+  sandboxed: boolean;
+  /** True when the run was handed to an already-running sandbox */
+  warm: boolean;
+}
+
+export interface SandboxPoolStatus {
+  enabled: boolean;
+  size: number;
+  idle: number;
+  starting: number;
+  warmStarts: number;
+  coldStarts: number;
+  isolation: string[];
+}
+
+interface Sandbox {
+  process: ChildProcessWithoutNullStreams;
+  ready: Promise<boolean>;
+  isReady: boolean;
+}
+
+// Runs inside the namespaces. Everything before the stdin read is paid for
+// ahead of time; the job itself is executed in-process with exec().
+const ZYGOTE_SOURCE = `
+import ctypes
+import importlib.util
+import io
+import json
+import os
+import site
+import sys
+import traceback
+
+_libc = ctypes.CDLL(None, use_errno=True)
+
+# The run sees only a read-only root built here: system directories, the
+# interpreter and its packages, device nodes, a private /tmp, and (added when
+# the job arrives) its working directory and bytecode cache. The host root
+# with .env, the source tree and other projects is gone after pivot_root, and
+# so is /sys with the cgroup tree the run could otherwise move itself out of.
+_MS_RDONLY, _MS_NOSUID, _MS_NODEV, _MS_NOEXEC = 0x1, 0x2, 0x4, 0x8
+_MS_REMOUNT, _MS_BIND, _MS_MOVE, _MS_REC, _MS_PRIVATE = 0x20, 0x1000, 0x2000, 0x4000, 0x40000
+_MNT_DETACH = 2
+_SYS_PIVOT_ROOT = {'x86_64': 155, 'aarch64': 41, 'riscv64': 41, 'ppc64le': 203, 's390x': 217}.get(os.uname().machine)
+_ROOT = '/tmp'
+_SYSTEM_PATHS = (
+    '/usr', '/bin', '/sbin', '/lib', '/lib32', '/lib64', '/libx32',
+    '/etc/alternatives', '/etc/ca-certificates', '/etc/fonts', '/etc/group', '/etc/hosts',
+    '/etc/ld.so.cache', '/etc/localtime', '/etc/mime.types', '/etc/nsswitch.conf', '/etc/passwd',
+    '/etc/pki', '/etc/resolv.conf', '/etc/ssl',
+)
+_DEVICES = ('null', 'zero', 'full', 'random', 'urandom', 'tty')
+_bound = []
+
+def _mount(source, target, fstype, flags, data=None):
+    encode = lambda value: value.encode() if isinstance(value, str) else value
+    if _libc.mount(encode(source), encode(target), encode(fstype), flags, encode(data)) != 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error), target)
+
+def _host_path(path):
+    # Host paths stay reachable through these fds while /tmp holds the new root
+    if path == _ROOT or path.startswith(_ROOT + '/'):
+        return '/proc/self/fd/%d%s' % (_host_tmp, path[len(_ROOT):])
+    return '/proc/self/fd/%d%s' % (_host, path)
+
+def _locked_flags(source):
+    # A bind remount has to keep the flags of the mount it comes from
+    flag = os.statvfs(source).f_flag
+    flags = flag & (_MS_NOSUID | _MS_NODEV | _MS_NOEXEC | 0x400 | 0x800)
+    if flag & 0x1000:
+        flags |= 0x200000  # ST_RELATIME -> MS_RELATIME
+    return flags
+
+def _bind(path, writable=False):
+    if not path or not os.path.isabs(path):
+        return
+    path = os.path.normpath(path)
+    source = _host_path(path)
+    covered = any(path == p or path.startswith(p.rstrip('/') + '/') for p in _bound)
+    if covered and not writable:
+        return
+    if writable and not os.path.exists(source):
+        os.makedirs(source, exist_ok=True)
+    if not os.path.lexists(source):
+        return
+    target = _ROOT + path
+    if os.path.islink(source) and os.path.dirname(path) == '/':
+        # Top-level links such as /bin -> usr/bin
+        os.symlink(os.readlink(source), target)
+        return
+    if os.path.isdir(source):
+        os.makedirs(target, exist_ok=True)
+    elif not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        open(target, 'a').close()
+    _mount(source, target, None, _MS_BIND | _MS_REC)
+    if not writable:
+        _mount(None, target, None, _MS_REMOUNT | _MS_BIND | _MS_RDONLY | _locked_flags(source))
+    _bound.append(path)
+
+def _build_root():
+    _mount(None, '/', None, _MS_REC | _MS_PRIVATE)
+    interpreter = [sys.prefix, sys.base_prefix, sys.exec_prefix, sys.base_exec_prefix,
+                   os.environ.get('VIRTUAL_ENV'), site.getusersitepackages()]
+    interpreter += [p for p in sys.path if p and os.path.isdir(p)]
+    interpreter = [os.path.realpath(p) for p in interpreter if p]
+    _mount('tmpfs', _ROOT, 'tmpfs', _MS_NOSUID | _MS_NODEV, 'size=16m,mode=0755')
+    for path in _SYSTEM_PATHS + tuple(interpreter):
+        _bind(path)
+
+    os.makedirs(_ROOT + '/dev/shm')
+    for name in _DEVICES:
+        _bind('/dev/' + name, writable=True)
+    for name, link in (('fd', '/proc/self/fd'), ('stdin', '/proc/self/fd/0'),
+                       ('stdout', '/proc/self/fd/1'), ('stderr', '/proc/self/fd/2')):
+        os.symlink(link, _ROOT + '/dev/' + name)
+    _mount('tmpfs', _ROOT + '/dev/shm', 'tmpfs', _MS_NOSUID | _MS_NODEV, 'size=64m,mode=1777')
+
+    os.makedirs(_ROOT + '/proc')
+    try:
+        _mount('proc', _ROOT + '/proc', 'proc', _MS_NOSUID | _MS_NODEV | _MS_NOEXEC)
+    except OSError:
+        _mount('/proc', _ROOT + '/proc', None, _MS_BIND | _MS_REC)
+
+    os.makedirs(_ROOT + '/tmp')
+    _mount('tmpfs', _ROOT + '/tmp', 'tmpfs', _MS_NOSUID | _MS_NODEV, 'size=256m,mode=1777')
+    os.makedirs(_ROOT + '/.old')
+
+def _enter_root(job):
+    env = job.get('env') or {}
+    for path in (env.get('PYTHONPATH') or '').split(os.pathsep):
+        _bind(path)
+    _bind(job['cwd'], writable=True)
+    _bind(env.get('PYTHONPYCACHEPREFIX'), writable=True)
+    _mount(None, _ROOT, None, _MS_REMOUNT | _MS_RDONLY | _MS_NOSUID | _MS_NODEV)
+    os.chdir(_ROOT)
+    if _SYS_PIVOT_ROOT is not None and _libc.syscall(_SYS_PIVOT_ROOT, b'.', b'.old') == 0:
+        _libc.umount2(b'/.old', _MNT_DETACH)
+    else:
+        _mount(_ROOT, '/', None, _MS_MOVE)
+    os.chroot('.')
+    os.close(_host)
+    os.close(_host_tmp)
+
+_host = os.open('/', os.O_PATH)
+_host_tmp = os.open(_ROOT, os.O_PATH)
+try:
+    _build_root()
+    _root_error = None
+except Exception as error:
+    _root_error = error
+
+class _CapHeader(ctypes.Structure):
+    _fields_ = [('version', ctypes.c_uint32), ('pid', ctypes.c_int)]
+
+class _CapData(ctypes.Structure):
+    _fields_ = [('effective', ctypes.c_uint32), ('permitted', ctypes.c_uint32), ('inheritable', ctypes.c_uint32)]
+
+def _drop_capabilities():
+    # Root in the user namespace could mount the host filesystem back in.
+    # PR_SET_SECUREBITS (NOROOT, NO_SETUID_FIXUP, NO_CAP_AMBIENT_RAISE, all
+    # locked) keeps exec from granting capabilities back, then capset drops them.
+    _libc.prctl(28, 0xcf, 0, 0, 0)
+    _libc.capset(ctypes.byref(_CapHeader(0x20080522, 0)), (_CapData * 2)())
+
+def _apply_seccomp():
+    # PR_SET_NO_NEW_PRIVS: setuid binaries cannot regain privileges
+    _libc.prctl(38, 1, 0, 0, 0)
+    try:
+        import seccomp
+    except ImportError:
+        return
+    f = seccomp.SyscallFilter(defaction=seccomp.ALLOW)
+    for name in ('mount', 'umount2', 'pivot_root', 'unshare', 'setns', 'ptrace',
+                 'kexec_load', 'init_module', 'finit_module', 'delete_module',
+                 'reboot', 'swapon', 'swapoff', 'bpf', 'perf_event_open',
+                 'keyctl', 'add_key', 'request_key'):
+        try:
+            f.add_rule(seccomp.ERRNO(1), name)
+        except Exception:
+            pass
+    f.load()
+
+with os.fdopen(3, 'w') as _ready:
+    _ready.write('seccomp' if importlib.util.find_spec('seccomp') else 'no_new_privs')
+
+_job = json.loads(sys.stdin.readline())
+sys.stdin = open(os.devnull)
+
+# Set by the pool when it could not move this process into its cgroup
+if _job.get('warning'):
+    sys.stderr.write(_job.pop('warning') + '\\n')
+
+# Without its own root the run would see the host filesystem: refuse it
+try:
+    if _root_error:
+        raise _root_error
+    _enter_root(_job)
+except Exception as error:
+    sys.stderr.write('[ERROR] Could not set up the sandbox filesystem: %s\\n' % error)
+    sys.exit(1)
+
+os.chdir(_job['cwd'])
+os.environ.clear()
+os.environ.update(_job['env'])
+# Only /tmp and the working directory are writable
+os.environ.setdefault('MPLCONFIGDIR', '/tmp/.matplotlib')
+os.environ.setdefault('XDG_CACHE_HOME', '/tmp/.cache')
+sys.pycache_prefix = os.environ.get('PYTHONPYCACHEPREFIX') or None
+sys.dont_write_bytecode = bool(os.environ.get('PYTHONDONTWRITEBYTECODE'))
+sys.argv = ['-c']
+_drop_capabilities()
+_apply_seccomp()
+
+_code = compile(_job.pop('script'), '<string>', 'exec')
+try:
+    exec(_code, {'__name__': '__main__', '__builtins__': __builtins__})
+except SystemExit:
+    raise
+except BaseException:
+    _type, _value, _tb = sys.exc_info()
+    traceback.print_exception(_type, _value, _tb.tb_next)
+    sys.exit(1)
+`;
+
+const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
+
+// Holds the script until the server has moved it into its cgroup; the
+// released line carries a warning when that failed
+const CGROUP_WAIT_PREAMBLE = `import sys as _pycode_sys
+_pycode_warning = _pycode_sys.stdin.readline().strip()
+if _pycode_warning:
+    _pycode_sys.stderr.write(_pycode_warning + '\\n')
+`;
+
+// Host pids of a process's children (the sandboxed interpreter under `unshare`)
+function childPids(pid: number): number[] {
+  try {
+    return readFileSync(`/proc/${pid}/task/${pid}/children`, 'utf8').trim().split(/\s+/).filter(Boolean).map(Number);
+  } catch {
+    return [];
+  }
+}
+
+// Move a started process into its cgroup; returns a warning for the run when that fails
+function placeInCgroup(cgroup: string, pids: number[]): string | undefined {
+  try {
+    moveIntoCgroup(cgroup, pids);
+    return undefined;
+  } catch (error: any) {
+    return `[WARNING] Could not apply resource limits: ${error?.message || error}`;
+  }
+}
+
+const isNetworkIsolated = () => process.env.PYCODE_SANDBOX_NET !== 'host';
+
+function namespaceArgs(): string[] {
+  const args = ['--user', '--map-root-user', '--mount', '--pid', '--fork', '--mount-proc', '--kill-child'];
+  if (isNetworkIsolated()) {
+    args.push('--net');
+  }
+  return args;
+}
+
+/**
+ * Command line that starts a single cold sandbox, for callers that manage the
+ * process themselves (e.g. detached background jobs). The sandbox speaks the
+ * zygote protocol: ready signal on fd 3, one JSON job line on stdin.
+ */
+export function sandboxCommandLine(): string[] | null {
+  if (!isSandboxSupported()) {
+    return null;
+  }
+  return ['unshare', ...namespaceArgs(), pythonCommand, '-u', '-c', ZYGOTE_SOURCE];
+}
+
+let sandboxSupport: boolean | null = null;
+
+/**
+ * Whether runs go to sandboxes without network access, so they cannot
+ * install missing packages themselves
+ */
+export function isSandboxNetworkIsolated(): boolean {
+  return isSandboxSupported() && isNetworkIsolated();
+}
+
+/**
+ * Whether unprivileged namespaces work on this host (checked once)
+ */
+export function isSandboxSupported(): boolean {
+  if (sandboxSupport === null) {
+    if (process.platform !== 'linux' || process.env.PYCODE_SANDBOX === 'off') {
+      sandboxSupport = false;
+    } else {
+      const probe = spawnSync('unshare', [...namespaceArgs(), 'true'], { timeout: 5000 });
+      sandboxSupport = probe.status === 0;
+      if (!sandboxSupport) {
+        console.warn('[SandboxPool] Linux namespaces unavailable, running Python without a sandbox:',
+          probe.error?.message || probe.stderr?.toString().trim());
+      }
+    }
+  }
+  return sandboxSupport;
+}
+
+class SandboxPool {
+  private idle: Sandbox[] = [];
+  private starting = 0;
+  private warmStarts = 0;
+  private coldStarts = 0;
+  private isolation = 'no_new_privs';
+  private closed = false;
+
+  constructor(private readonly size: number) {}
+
+  private startSandbox(): Sandbox {
+    const env = runEnvironment();
+    const child = spawn('unshare', [...namespaceArgs(), pythonCommand, '-u', '-c', ZYGOTE_SOURCE], {
+      env,
+      cwd: os.tmpdir(),
+      stdio: ['pipe', 'pipe', 'pipe', 'pipe'],
+    }) as unknown as ChildProcessWithoutNullStreams;
+
+    const sandbox: Sandbox = { process: child, ready: Promise.resolve(false), isReady: false };
+    sandbox.ready = new Promise((resolve) => {
+      const readyPipe = (child as any).stdio[3] as Readable;
+      readyPipe.once('data', (data: Buffer) => {
+        this.isolation = data.toString().trim() || this.isolation;
+        sandbox.isReady = true;
+        resolve(true);
+      });
+      child.once('exit', () => resolve(false));
+      child.once('error', (err) => {
+        console.error('[SandboxPool] Failed to start sandbox:', err.message);
+        resolve(false);
+      });
+    });
+
+    return sandbox;
+  }
+
+  /**
+   * Top the pool back up to its target size
+   */
+  replenish() {
+    while (!this.closed && this.idle.length + this.starting < this.size) {
+      this.starting++;
+      const sandbox = this.startSandbox();
+      sandbox.ready.then((ok) => {
+        this.starting--;
+        if (ok && sandbox.process.exitCode === null) {
+          this.idle.push(sandbox);
+          sandbox.process.once('exit', () => {
+            // Died while waiting for a job: replace it now rather than when
+            // the next run finds the pool short
+            if (!this.idle.includes(sandbox)) return;
+            this.idle = this.idle.filter(s => s !== sandbox);
+            this.replenish();
+          });
+        }
+      });
+    }
+  }
+
+  /**
+   * Hand a job to an idle sandbox, or start one on the spot if none is ready
+   */
+  run(job: SandboxJob): SpawnedPython {
+    let sandbox = this.idle.shift();
+    const warm = !!sandbox;
+    if (!sandbox) {
+      sandbox = this.startSandbox();
+      this.coldStarts++;
+    } else {
+      this.warmStarts++;
+    }
+
+    // The zygote blocks on stdin until the job line arrives. Once it has
+    // reported ready its interpreter exists, and is moved into the run's
+    // cgroup before the job is handed over.
+    const { cgroup, ...zygoteJob } = job;
+    const child = sandbox.process;
+    sandbox.ready.then((ok) => {
+      if (!ok || child.exitCode !== null) return;
+      const warning = cgroup && child.pid ? placeInCgroup(cgroup, [child.pid, ...childPids(child.pid)]) : undefined;
+      child.stdin.end(JSON.stringify({ ...zygoteJob, warning }) + '\n');
+    });
+    this.replenish();
+
+    return { process: sandbox.process, sandboxed: true, warm };
+  }
+
+  status(): SandboxPoolStatus {
+    return {
+      enabled: true,
+      size: this.size,
+      idle: this.idle.length,
+      starting: this.starting,
+      warmStarts: this.warmStarts,
+      coldStarts: this.coldStarts,
+      isolation: ['user', 'mount', 'pid', ...(isNetworkIsolated() ? ['net'] : []), this.isolation],
+    };
+  }
+
+  shutdown() {
+    this.closed = true;
+    for (const sandbox of this.idle) {
+      sandbox.process.kill('SIGKILL');
+    }
+    this.idle = [];
+  }
+}
+
+let pool: SandboxPool | null = null;
+
+export function getSandboxPool(): SandboxPool | null {
+  if (!isSandboxSupported()) {
+    return null;
+  }
+  if (!pool) {
+    const size = parseInt(process.env.PYCODE_SANDBOX_POOL_SIZE || '2', 10);
+    pool = new SandboxPool(Number.isFinite(size) && size >= 0 ? size : 2);
+    pool.replenish();
+  }
+  return pool;
+}
+
+export function getSandboxPoolStatus(): SandboxPoolStatus {
+  const current = getSandboxPool();
+  return current
+    ? current.status()
+    : { enabled: false, size: 0, idle: 0, starting: 0, warmStarts: 0, coldStarts: 0, isolation: [] };
+}
+
+/**
+ * Run a Python script (the equivalent of `python -u -c script`) in a warm
+ * sandbox when available, otherwise as a plain child process
+ */
+export function spawnPythonScript(job: SandboxJob): SpawnedPython {
+  const sandboxPool = getSandboxPool();
+  if (sandboxPool) {
+    return sandboxPool.run(job);
+  }
+
+  // Without the zygote, the script waits on stdin until it is in its cgroup
+  const script = job.cgroup ? CGROUP_WAIT_PREAMBLE + job.script : job.script;
+  const child = spawn(pythonCommand, ['-u', '-c', script], {
+    env: job.env,
+    cwd: job.cwd,
+  });
+  if (job.cgroup && child.pid) {
+    child.stdin.write((placeInCgroup(job.cgroup, [child.pid]) || '') + '\n');
+  }
+  return { process: child, sandboxed: false, warm: false };
+}
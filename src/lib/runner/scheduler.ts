@@ -0,0 +1,245 @@
+import { createHash, randomUUID } from 'crypto';
+import { readFile } from 'fs/promises';
+import os from 'os';
+import { getBackgroundJob, readJobOutput, startBackgroundJob } from './background-jobs';
+import { nextCronTime } from './cron';
+import { getProjectDir, resolveProjectPath } from './project-files';
+import {
+  appendScheduleRun,
+  claimScheduleStep,
+  diffOutputs,
+  getSchedule,
+  hashScheduleInputs,
+  listSchedules,
+  ProjectSchedule,
+  readLastOutput,
+  saveSchedule,
+  ScheduleRunRecord,
+  writeLastOutput,
+} from './schedules';
+
+/**
+ * Runs due project schedules as background jobs.
+ *
+ * - Each schedule fires at a fixed offset after its cron time (up to a tenth
+ *   of its interval, at most PYCODE_SCHEDULER_MAX_JITTER_MS), so schedules
+ *   on the same cron line do not all start in the same second.
+ * - A scheduler process runs at most PYCODE_SCHEDULER_CONCURRENCY scheduled
+ *   jobs at once; due runs beyond that wait for a later tick.
+ * - Several processes may share the schedules directory: claim files make
+ *   sure each run is started and recorded once.
+ * - A run is skipped when no input file changed since the last success.
+ * - Runs missed while no scheduler was up are not backfilled.
+ */
+
+export interface SchedulerOptions {
+  tickMs?: number;
+  maxConcurrent?: number;
+  maxJitterMs?: number;
+}
+
+// Stdout kept for the output diff of the next run
+const MAX_OUTPUT_BYTES = 256 * 1024;
+
+const NODE_ID = `${os.hostname()}:${process.pid}`;
+
+export class ProjectScheduler {
+  private timer: ReturnType<typeof setInterval> | null = null;
+  private ticking = false;
+  private readonly tickMs: number;
+  private readonly maxConcurrent: number;
+  private readonly maxJitterMs: number;
+
+  constructor(options: SchedulerOptions = {}) {
+    this.tickMs = options.tickMs ?? 15000;
+    this.maxConcurrent = options.maxConcurrent ?? 2;
+    this.maxJitterMs = options.maxJitterMs ?? 5 * 60 * 1000;
+  }
+
+  start() {
+    if (this.timer) return;
+    this.timer = setInterval(() => this.tick(), this.tickMs);
+    this.timer.unref?.();
+    this.tick();
+    console.log(`[Scheduler] Started on ${NODE_ID} (max ${this.maxConcurrent} concurrent runs)`);
+  }
+
+  stop() {
+    if (this.timer) {
+      clearInterval(this.timer);
+      this.timer = null;
+    }
+  }
+
+  /**
+   * Stable per-schedule delay after the cron time
+   */
+  private jitterFor(schedule: ProjectSchedule): number {
+    if (schedule.nextRunAt === null) return 0;
+    const following = nextCronTime(schedule.cron, schedule.nextRunAt);
+    const interval = following ? following - schedule.nextRunAt : this.maxJitterMs * 10;
+    const window = Math.min(this.maxJitterMs, Math.floor(interval / 10));
+    if (window <= 0) return 0;
+    return createHash('md5').update(schedule.id).digest().readUInt32BE(0) % window;
+  }
+
+  async tick() {
+    if (this.ticking) return;
+    this.ticking = true;
+    try {
+      const schedules = await listSchedules();
+      for (let i = 0; i < schedules.length; i++) {
+        if (schedules[i].activeJobId) {
+          schedules[i] = await this.collect(schedules[i]);
+        }
+      }
+
+      const now = Date.now();
+      let running = schedules.filter(s => s.activeJobId && s.activeNode === NODE_ID).length;
+      const due = schedules
+        .filter(s => s.enabled && !s.activeJobId && s.nextRunAt !== null && s.nextRunAt + this.jitterFor(s) <= now)
+        .sort((a, b) => a.nextRunAt! - b.nextRunAt!);
+
+      for (const schedule of due) {
+        if (running >= this.maxConcurrent) break;
+        if (await this.fire(schedule, now)) {
+          running++;
+        }
+      }
+    } catch (error) {
+      console.error('[Scheduler] Tick failed:', error);
+    } finally {
+      this.ticking = false;
+    }
+  }
+
+  /**
+   * Start the planned run of a due schedule. Returns true when a job was started.
+   */
+  private async fire(schedule: ProjectSchedule, now: number): Promise<boolean> {
+    const scheduledFor = schedule.nextRunAt!;
+    if (!await claimScheduleStep(schedule.id, `run-${scheduledFor}`)) {
+      return false;
+    }
+    // Another scheduler may have moved the schedule on before we claimed it
+    const current = await getSchedule(schedule.id);
+    if (!current || current.nextRunAt !== scheduledFor || current.activeJobId || !current.enabled) {
+      return false;
+    }
+
+    current.nextRunAt = nextCronTime(current.cron, Math.max(now, scheduledFor));
+    current.lastRunAt = now;
+
+    const inputsHash = await hashScheduleInputs(current);
+    const record = { id: randomUUID(), scheduleId: current.id, scheduledFor, startedAt: now, inputsHash };
+
+    if (current.lastSuccess && current.lastSuccess.inputsHash === inputsHash) {
+      await appendScheduleRun({ ...record, finishedAt: now, status: 'skipped', reason: 'Inputs unchanged since the last successful run' });
+      await saveSchedule(current);
+      return false;
+    }
+
+    const scriptPath = resolveProjectPath(getProjectDir(current.projectId), current.fileName);
+    const code = scriptPath ? await readFile(scriptPath, 'utf8').catch(() => null) : null;
+    if (code === null) {
+      await appendScheduleRun({ ...record, finishedAt: now, status: 'failed', reason: `${current.fileName} was not found in the project` });
+      await saveSchedule(current);
+      return false;
+    }
+
+    try {
+      const job = await startBackgroundJob({ code, projectId: current.projectId }, {
+        userId: current.userId,
+        plan: current.plan,
+        fileName: current.fileName,
+      });
+      current.activeJobId = job.id;
+      current.activeNode = NODE_ID;
+      current.activeInputsHash = inputsHash;
+      current.activeScheduledFor = scheduledFor;
+      console.log(`[Scheduler] Started ${current.fileName} of ${current.projectId} as job ${job.id}`);
+    } catch (error: any) {
+      console.error('[Scheduler] Failed to start scheduled run:', error);
+      await appendScheduleRun({ ...record, finishedAt: Date.now(), status: 'failed', reason: error?.message || String(error) });
+    }
+    await saveSchedule(current);
+    return !!current.activeJobId;
+  }
+
+  /**
+   * Record the run of a schedule once its job has finished
+   */
+  private async collect(schedule: ProjectSchedule): Promise<ProjectSchedule> {
+    const jobId = schedule.activeJobId!;
+    const job = await getBackgroundJob(jobId);
+    if (job && job.status === 'running') {
+      return schedule;
+    }
+    if (!await claimScheduleStep(schedule.id, `done-${jobId}`)) {
+      return (await getSchedule(schedule.id)) || schedule;
+    }
+
+    const finishedAt = job?.finishedAt ?? Date.now();
+    const record: ScheduleRunRecord = {
+      id: randomUUID(),
+      scheduleId: schedule.id,
+      scheduledFor: schedule.activeScheduledFor ?? finishedAt,
+      startedAt: job?.startedAt ?? finishedAt,
+      finishedAt,
+      status: job ? (job.status as ScheduleRunRecord['status']) : 'failed',
+      jobId,
+      inputsHash: schedule.activeInputsHash || '',
+      reason: job ? job.error : 'The background job record is missing',
+    };
+
+    let lastSuccess = schedule.lastSuccess;
+    if (job?.status === 'succeeded') {
+      const { stdout } = await readJobOutput(jobId, { stdout: 0, stderr: 0 }, MAX_OUTPUT_BYTES);
+      const output = stdout.toString('utf8');
+      const previous = await readLastOutput(schedule.id);
+      if (previous !== null) {
+        const { diff, changedLines } = diffOutputs(previous, output);
+        record.outputDiff = diff;
+        record.changedLines = changedLines;
+      }
+      await writeLastOutput(schedule.id, output);
+
+      // Fingerprint the inputs as they are now, without the files this run
+      // wrote, so its own outputs never count as changed inputs
+      const artifacts = (job.artifacts || []).map(artifact => artifact.path);
+      lastSuccess = { jobId, finishedAt, artifacts, inputsHash: '' };
+      lastSuccess.inputsHash = await hashScheduleInputs({ ...schedule, lastSuccess });
+    }
+
+    await appendScheduleRun(record);
+
+    // The definition may have been edited (or deleted) while the run was going
+    const latest = await getSchedule(schedule.id);
+    const updated: ProjectSchedule = { ...(latest || schedule), lastSuccess };
+    delete updated.activeJobId;
+    delete updated.activeNode;
+    delete updated.activeInputsHash;
+    delete updated.activeScheduledFor;
+    if (latest) {
+      await saveSchedule(updated);
+    }
+    return updated;
+  }
+}
+
+const globalForScheduler = globalThis as unknown as { pycodeScheduler?: ProjectScheduler };
+
+/**
+ * Start this process's scheduler once (kept on globalThis because Next.js
+ * may load this module more than once)
+ */
+export function startScheduler(): ProjectScheduler {
+  if (!globalForScheduler.pycodeScheduler) {
+    globalForScheduler.pycodeScheduler = new ProjectScheduler({
+      maxConcurrent: parseInt(process.env.PYCODE_SCHEDULER_CONCURRENCY || '', 10) || undefined,
+      maxJitterMs: parseInt(process.env.PYCODE_SCHEDULER_MAX_JITTER_MS || '', 10) || undefined,
+    });
+    globalForScheduler.pycodeScheduler.start();
+  }
+  return globalForScheduler.pycodeScheduler;
+}
@@ -0,0 +1,267 @@
+import { randomUUID } from 'crypto';
+import { appendFile, mkdir, readdir, readFile, rename, rm, stat, writeFile } from 'fs/promises';
+import path from 'path';
+import { nextCronTime } from './cron';
+import { getCacheDir, getProjectDir, hashContent, listProjectFiles } from './project-files';
+
+/**
+ * Cron schedules attached to a project file, e.g. a nightly main.py that
+ * turns data.json into cleaned_data.json. Stored as plain files under
+ * PYCODE_SCHEDULES_DIR (default .cache/pycode/schedules):
+ *
+ *   <scheduleId>/schedule.json   definition and scheduling state
+ *   <scheduleId>/history.jsonl   one line per finished or skipped run
+ *   <scheduleId>/last-output.txt stdout of the last successful run
+ *
+ * Runs are executed by the scheduler (scheduler.ts) as background jobs.
+ */
+
+export interface ProjectSchedule {
+  id: string;
+  userId: string;
+  plan: string;
+  projectId: string;
+  /** Project-relative path of the script to run */
+  fileName: string;
+  cron: string;
+  enabled: boolean;
+  createdAt: number;
+  /** Planned time of the next run, before jitter */
+  nextRunAt: number | null;
+  lastRunAt?: number;
+  /** Background job of the run in progress */
+  activeJobId?: string;
+  /** Scheduler process that started it (counts against its limit) */
+  activeNode?: string;
+  activeInputsHash?: string;
+  activeScheduledFor?: number;
+  lastSuccess?: {
+    jobId: string;
+    finishedAt: number;
+    inputsHash: string;
+    /** Files the run wrote; they are outputs, not inputs */
+    artifacts: string[];
+  };
+}
+
+export type ScheduleRunStatus = 'succeeded' | 'failed' | 'cancelled' | 'skipped';
+
+export interface ScheduleRunRecord {
+  id: string;
+  scheduleId: string;
+  scheduledFor: number;
+  startedAt: number;
+  finishedAt: number;
+  status: ScheduleRunStatus;
+  jobId?: string;
+  inputsHash: string;
+  /** Why a run was skipped or could not start */
+  reason?: string;
+  /** Line diff of stdout against the previous successful run */
+  outputDiff?: string;
+  changedLines?: number;
+}
+
+const CLAIM_TTL_MS = 24 * 60 * 60 * 1000;
+
+export function getSchedulesDir(): string {
+  return process.env.PYCODE_SCHEDULES_DIR || getCacheDir('schedules');
+}
+
+function scheduleDir(scheduleId: string): string {
+  return path.join(getSchedulesDir(), path.basename(scheduleId));
+}
+
+export async function saveSchedule(schedule: ProjectSchedule): Promise<void> {
+  const dir = scheduleDir(schedule.id);
+  await mkdir(dir, { recursive: true });
+  // Write then rename so readers never see a half-written file
+  await writeFile(path.join(dir, 'schedule.json.tmp'), JSON.stringify(schedule, null, 2));
+  await rename(path.join(dir, 'schedule.json.tmp'), path.join(dir, 'schedule.json'));
+}
+
+export async function getSchedule(scheduleId: string): Promise<ProjectSchedule | null> {
+  try {
+    return JSON.parse(await readFile(path.join(scheduleDir(scheduleId), 'schedule.json'), 'utf8'));
+  } catch {
+    return null;
+  }
+}
+
+export async function listSchedules(filter: { userId?: string; projectId?: string } = {}): Promise<ProjectSchedule[]> {
+  const ids = await readdir(getSchedulesDir()).catch(() => [] as string[]);
+  const schedules = await Promise.all(ids.map(id => getSchedule(id)));
+  return schedules
+    .filter((schedule): schedule is ProjectSchedule =>
+      !!schedule &&
+      (!filter.userId || schedule.userId === filter.userId) &&
+      (!filter.projectId || schedule.projectId === filter.projectId))
+    .sort((a, b) => a.createdAt - b.createdAt);
+}
+
+export async function createSchedule(input: {
+  userId: string;
+  plan?: string;
+  projectId: string;
+  fileName: string;
+  cron: string;
+}): Promise<ProjectSchedule> {
+  const schedule: ProjectSchedule = {
+    id: randomUUID(),
+    userId: input.userId,
+    plan: input.plan || 'free',
+    projectId: input.projectId,
+    fileName: input.fileName,
+    cron: input.cron,
+    enabled: true,
+    createdAt: Date.now(),
+    nextRunAt: nextCronTime(input.cron, Date.now()),
+  };
+  await saveSchedule(schedule);
+  return schedule;
+}
+
+/**
+ * Change the cron line or pause/resume a schedule. The next run is planned
+ * from now, so resuming never fires the runs missed while paused.
+ */
+export async function updateSchedule(
+  scheduleId: string,
+  changes: { cron?: string; enabled?: boolean }
+): Promise<ProjectSchedule | null> {
+  const schedule = await getSchedule(scheduleId);
+  if (!schedule) return null;
+
+  if (changes.cron !== undefined) schedule.cron = changes.cron;
+  if (changes.enabled !== undefined) schedule.enabled = changes.enabled;
+  schedule.nextRunAt = nextCronTime(schedule.cron, Date.now());
+  await saveSchedule(schedule);
+  return schedule;
+}
+
+export async function deleteSchedule(scheduleId: string): Promise<void> {
+  await rm(scheduleDir(scheduleId), { recursive: true, force: true });
+}
+
+/**
+ * Claim one step of a schedule (starting a planned run, recording a finished
+ * one). Exactly one scheduler process wins, even when several share the
+ * schedules directory.
+ */
+export async function claimScheduleStep(scheduleId: string, key: string): Promise<boolean> {
+  const dir = scheduleDir(scheduleId);
+  try {
+    await writeFile(path.join(dir, `claim-${key}`), String(process.pid), { flag: 'wx' });
+  } catch {
+    return false;
+  }
+
+  // Claims only need to outlive the window in which other schedulers could
+  // still act on the same step
+  const entries = await readdir(dir).catch(() => [] as string[]);
+  const expired = Date.now() - CLAIM_TTL_MS;
+  await Promise.all(entries
+    .filter(name => name.startsWith('claim-'))
+    .map(async (name) => {
+      const info = await stat(path.join(dir, name)).catch(() => null);
+      if (info && info.mtimeMs < expired) {
+        await rm(path.join(dir, name), { force: true });
+      }
+    }));
+  return true;
+}
+
+export async function appendScheduleRun(record: ScheduleRunRecord): Promise<void> {
+  await appendFile(path.join(scheduleDir(record.scheduleId), 'history.jsonl'), JSON.stringify(record) + '\n');
+}
+
+/**
+ * Run history, newest first
+ */
+export async function getScheduleHistory(scheduleId: string, limit = 50): Promise<ScheduleRunRecord[]> {
+  const content = await readFile(path.join(scheduleDir(scheduleId), 'history.jsonl'), 'utf8').catch(() => '');
+  const records: ScheduleRunRecord[] = [];
+  for (const line of content.split('\n')) {
+    if (!line.trim()) continue;
+    try {
+      records.push(JSON.parse(line));
+    } catch {
+      // A torn last line after a crash; skip it
+    }
+  }
+  return records.reverse().slice(0, limit);
+}
+
+export async function readLastOutput(scheduleId: string): Promise<string | null> {
+  return readFile(path.join(scheduleDir(scheduleId), 'last-output.txt'), 'utf8').catch(() => null);
+}
+
+export async function writeLastOutput(scheduleId: string, output: string): Promise<void> {
+  await writeFile(path.join(scheduleDir(scheduleId), 'last-output.txt'), output);
+}
+
+/**
+ * Fingerprint of everything a scheduled run reads: all project files except
+ * the ones the previous successful run wrote
+ */
+export async function hashScheduleInputs(schedule: ProjectSchedule): Promise<string> {
+  const projectDir = getProjectDir(schedule.projectId);
+  const outputs = new Set(schedule.lastSuccess?.artifacts || []);
+  const files = (await listProjectFiles(projectDir)).filter(file => !outputs.has(file));
+
+  const entries = await Promise.all(files.map(async (file) => {
+    const content = await readFile(path.join(projectDir, file)).catch(() => null);
+    return `${file}\0${content ? hashContent(content) : 'missing'}`;
+  }));
+  return hashContent(entries.join('\n'));
+}
+
+// Larger outputs are summarized instead of diffed line by line
+const MAX_DIFF_LINES = 2000;
+const MAX_DIFF_OUTPUT_LINES = 200;
+
+/**
+ * Unified-style line diff ("-" removed, "+" added) between two outputs
+ */
+export function diffOutputs(previous: string, current: string): { diff: string; changedLines: number } {
+  const a = previous.split('\n');
+  const b = current.split('\n');
+
+  if (a.length > MAX_DIFF_LINES || b.length > MAX_DIFF_LINES) {
+    const before = new Set(a);
+    const after = new Set(b);
+    const removed = a.filter(line => !after.has(line)).length;
+    const added = b.filter(line => !before.has(line)).length;
+    return { diff: `Output too large to diff: ~${removed} line(s) removed, ~${added} line(s) added`, changedLines: removed + added };
+  }
+
+  // Longest common subsequence table, filled from the end
+  const lcs: number[][] = Array.from({ length: a.length + 1 }, () => new Array(b.length + 1).fill(0));
+  for (let i = a.length - 1; i >= 0; i--) {
+    for (let j = b.length - 1; j >= 0; j--) {
+      lcs[i][j] = a[i] === b[j] ? lcs[i + 1][j + 1] + 1 : Math.max(lcs[i + 1][j], lcs[i][j + 1]);
+    }
+  }
+
+  const lines: string[] = [];
+  let changedLines = 0;
+  let i = 0;
+  let j = 0;
+  while (i < a.length || j < b.length) {
+    if (i < a.length && j < b.length && a[i] === b[j]) {
+      i++;
+      j++;
+    } else if (j < b.length && (i >= a.length || lcs[i][j + 1] >= lcs[i + 1][j])) {
+      lines.push(`+ ${b[j++]}`);
+      changedLines++;
+    } else {
+      lines.push(`- ${a[i++]}`);
+      changedLines++;
+    }
+  }
+
+  const diff = lines.length > MAX_DIFF_OUTPUT_LINES
+    ? [...lines.slice(0, MAX_DIFF_OUTPUT_LINES), `... ${lines.length - MAX_DIFF_OUTPUT_LINES} more changed line(s)`].join('\n')
+    : lines.join('\n');
+  return { diff, changedLines };
+}
@@ -0,0 +1,475 @@
+import type { SupabaseClient } from '@supabase/supabase-js';
+import { randomUUID } from 'crypto';
+import type { PythonRunResult } from './python-run';
+import {
+  BrokerJob,
+  DEFAULT_JOB_TIMEOUT_MS,
+  HeartbeatResponse,
+  JobBroker,
+  JobEvent,
+  RunJobPayload,
+  RunnerNode,
+  RunnerRegistration,
+  SubmitOptions,
+  WARM_JOB_TIMEOUT_MS,
+} from './job-broker';
+import { NodeLoad, ProjectPlacement } from './placement';
+
+/**
+ * Job broker shared by every web instance, kept in Postgres (runner_nodes,
+ * runner_jobs and runner_job_events in supabase_schema.sql).
+ *
+ * A node's registration, heartbeats, pulls and results may reach any
+ * instance, and runs may be submitted on any instance: the submitting one
+ * polls its job's events and row until a node completes it. Jobs are claimed
+ * with an update conditional on `status = 'queued'`, so two pulls never take
+ * the same job. Nodes that stop heartbeating, and jobs whose submitter gave
+ * up or went away, are cleaned up by whichever instance notices first.
+ */
+
+// How often a waiting pull looks at the queue again
+const PULL_POLL_MS = 250;
+// How often a submitter looks for output and the result
+const RESULT_POLL_MS = 200;
+// Queued jobs looked at per pull; placement picks among them
+const CANDIDATE_JOBS = 50;
+const EVENT_PAGE_SIZE = 1000;
+// Failed jobs are kept this long, so their node still learns of the cancellation
+const FINISHED_JOB_RETENTION_MS = 10 * 60 * 1000;
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
+function toNode(row: any): RunnerNode {
+  return {
+    id: row.id,
+    name: row.name ?? undefined,
+    capacity: row.capacity,
+    labels: row.labels ?? undefined,
+    running: row.running,
+    completed: row.completed,
+    registeredAt: Date.parse(row.registered_at),
+    lastHeartbeat: Date.parse(row.last_heartbeat),
+  };
+}
+
+function toJob(row: any): BrokerJob {
+  return {
+    id: row.id,
+    payload: row.payload,
+    status: row.status,
+    nodeId: row.node_id ?? undefined,
+    createdAt: Date.parse(row.created_at),
+    assignedAt: row.assigned_at ? Date.parse(row.assigned_at) : undefined,
+    started: row.started,
+    pinnedNodeId: row.pinned_node_id ?? undefined,
+  };
+}
+
+export class SupabaseJobBroker implements JobBroker {
+  private reaper: ReturnType<typeof setInterval>;
+  // Node ids the placement ring was last built from
+  private placementNodes = '';
+
+  constructor(
+    private readonly supabase: SupabaseClient,
+    private readonly heartbeatTimeoutMs: number,
+    private readonly placement: ProjectPlacement | null = null
+  ) {
+    this.reaper = setInterval(() => {
+      this.reap().catch(error => console.error('[JobBroker] Cleanup failed:', error?.message || error));
+    }, Math.max(1000, heartbeatTimeoutMs / 3));
+    this.reaper.unref?.();
+  }
+
+  async registerNode(registration: RunnerRegistration): Promise<RunnerNode> {
+    const now = new Date().toISOString();
+    const { data, error } = await this.supabase
+      .from('runner_nodes')
+      .insert({
+        id: randomUUID(),
+        name: registration.name ?? null,
+        capacity: Math.max(1, Math.floor(registration.capacity || 1)),
+        labels: registration.labels ?? null,
+        running: 0,
+        completed: 0,
+        registered_at: now,
+        last_heartbeat: now,
+      })
+      .select()
+      .single();
+    if (error) throw error;
+
+    const node = toNode(data);
+    console.log(`[JobBroker] Runner ${node.name || node.id} registered with capacity ${node.capacity}`);
+    await this.rebalance();
+    return node;
+  }
+
+  async deregisterNode(nodeId: string): Promise<void> {
+    // Only the instance that removes the row recovers the node's jobs
+    const { data, error } = await this.supabase.from('runner_nodes').delete().eq('id', nodeId).select('id');
+    if (error) throw error;
+    if (!data || data.length === 0) {
+      return;
+    }
+    await this.recoverJobs(nodeId);
+    await this.rebalance();
+  }
+
+  async heartbeat(nodeId: string, running: number): Promise<HeartbeatResponse> {
+    const { data, error } = await this.supabase
+      .from('runner_nodes')
+      .update({ last_heartbeat: new Date().toISOString(), running })
+      .eq('id', nodeId)
+      .select('id');
+    if (error) throw error;
+    if (!data || data.length === 0) {
+      // Unknown node (e.g. reaped after a network partition): it has to register again
+      return { known: false, cancel: [] };
+    }
+
+    const { data: cancelled, error: cancelError } = await this.supabase
+      .from('runner_jobs')
+      .update({ cancel_requested: false })
+      .eq('node_id', nodeId)
+      .eq('cancel_requested', true)
+      .select('id');
+    if (cancelError) throw cancelError;
+    return { known: true, cancel: (cancelled || []).map(row => row.id) };
+  }
+
+  async pull(nodeId: string, maxJobs: number, waitMs: number): Promise<BrokerJob[]> {
+    const { data, error } = await this.supabase
+      .from('runner_nodes')
+      .update({ last_heartbeat: new Date().toISOString() })
+      .eq('id', nodeId)
+      .select('id');
+    if (error) throw error;
+    if (!data || data.length === 0) {
+      throw new Error('Unknown runner node');
+    }
+
+    const deadline = Date.now() + Math.max(0, waitMs);
+    for (;;) {
+      const jobs = await this.take(nodeId, maxJobs);
+      if (jobs.length > 0 || Date.now() + PULL_POLL_MS > deadline) {
+        return jobs;
+      }
+      await sleep(PULL_POLL_MS);
+    }
+  }
+
+  async publish(jobId: string, nodeId: string, events: JobEvent[]): Promise<boolean> {
+    const { data, error } = await this.supabase
+      .from('runner_jobs')
+      .update({ started: true })
+      .eq('id', jobId)
+      .eq('node_id', nodeId)
+      .eq('status', 'assigned')
+      .select('id');
+    if (error) throw error;
+    if (!data || data.length === 0) {
+      return false;
+    }
+
+    if (events.length > 0) {
+      const { error: insertError } = await this.supabase
+        .from('runner_job_events')
+        .insert(events.map(event => ({ job_id: jobId, event })));
+      if (insertError) throw insertError;
+    }
+    return true;
+  }
+
+  async complete(jobId: string, nodeId: string, result: PythonRunResult): Promise<boolean> {
+    const { data, error } = await this.supabase
+      .from('runner_jobs')
+      .update({ status: 'completed', result, finished_at: new Date().toISOString() })
+      .eq('id', jobId)
+      .eq('node_id', nodeId)
+      .eq('status', 'assigned')
+      .select('id');
+    if (error) throw error;
+    if (!data || data.length === 0) {
+      return false;
+    }
+
+    // Heartbeats report the real running count; this keeps it close in between
+    const { data: node } = await this.supabase
+      .from('runner_nodes')
+      .select('running, completed')
+      .eq('id', nodeId)
+      .maybeSingle();
+    if (node) {
+      await this.supabase
+        .from('runner_nodes')
+        .update({ running: Math.max(0, node.running - 1), completed: node.completed + 1 })
+        .eq('id', nodeId);
+    }
+    return true;
+  }
+
+  async submit(payload: RunJobPayload, options: SubmitOptions = {}): Promise<PythonRunResult> {
+    if (payload.kind !== 'warm') {
+      this.placement?.recordRun(payload);
+    }
+
+    const id = randomUUID();
+    const now = Date.now();
+    const { error } = await this.supabase.from('runner_jobs').insert({
+      id,
+      payload,
+      status: 'queued',
+      pinned_node_id: options.nodeId ?? null,
+      created_at: new Date(now).toISOString(),
+      expires_at: new Date(now + (options.timeoutMs || DEFAULT_JOB_TIMEOUT_MS)).toISOString(),
+    });
+    if (error) {
+      console.error('[JobBroker] Failed to queue job:', error.message);
+      return { output: '', error: 'Could not queue the run on the runner fleet' };
+    }
+
+    const deadline = now + (options.timeoutMs || DEFAULT_JOB_TIMEOUT_MS);
+    let lastEventId = 0;
+    const forwardEvents = async () => {
+      for (;;) {
+        const { data, error: eventsError } = await this.supabase
+          .from('runner_job_events')
+          .select('id, event')
+          .eq('job_id', id)
+          .gt('id', lastEventId)
+          .order('id', { ascending: true })
+          .limit(EVENT_PAGE_SIZE);
+        if (eventsError) throw eventsError;
+        for (const row of data || []) {
+          lastEventId = row.id;
+          options.onEvent?.(row.event as JobEvent);
+        }
+        if (!data || data.length < EVENT_PAGE_SIZE) return;
+      }
+    };
+
+    try {
+      for (;;) {
+        await forwardEvents();
+        const { data: job, error: jobError } = await this.supabase
+          .from('runner_jobs')
+          .select('status, result')
+          .eq('id', id)
+          .maybeSingle();
+        if (jobError) throw jobError;
+        if (!job) {
+          return { output: '', error: 'The run was lost by the runner fleet' };
+        }
+        if (job.status === 'completed' || job.status === 'failed') {
+          // Output published between the two reads
+          await forwardEvents();
+          if (job.status === 'completed') {
+            await this.supabase.from('runner_jobs').delete().eq('id', id);
+          }
+          return job.result as PythonRunResult;
+        }
+
+        if (options.signal?.aborted) {
+          return await this.abandon(id, 'Execution cancelled');
+        }
+        if (Date.now() >= deadline) {
+          return await this.abandon(id, 'Execution timed out on the runner fleet');
+        }
+        await sleep(RESULT_POLL_MS);
+      }
+    } catch (error: any) {
+      console.error('[JobBroker] Lost track of job', id, error?.message || error);
+      return await this.abandon(id, 'Lost contact with the runner fleet').catch(() => ({
+        output: '',
+        error: 'Lost contact with the runner fleet',
+      }));
+    }
+  }
+
+  async listNodes(): Promise<RunnerNode[]> {
+    const { data, error } = await this.supabase
+      .from('runner_nodes')
+      .select('*')
+      .order('registered_at', { ascending: true });
+    if (error) throw error;
+    return (data || []).map(toNode);
+  }
+
+  /**
+   * Claim up to maxJobs queued jobs for a node
+   */
+  private async take(nodeId: string, maxJobs: number): Promise<BrokerJob[]> {
+    const nodes = await this.listNodes();
+    const node = nodes.find(n => n.id === nodeId);
+    if (!node) {
+      throw new Error('Unknown runner node');
+    }
+    const free = Math.min(maxJobs, node.capacity - node.running);
+    if (free <= 0) {
+      return [];
+    }
+
+    // nodeId is known to be a registered node's uuid here, so it is safe in the filter
+    const { data: queued, error } = await this.supabase
+      .from('runner_jobs')
+      .select('*')
+      .eq('status', 'queued')
+      .or(`pinned_node_id.is.null,pinned_node_id.eq.${nodeId}`)
+      .order('created_at', { ascending: true })
+      .limit(CANDIDATE_JOBS);
+    if (error) throw error;
+    if (!queued || queued.length === 0) {
+      return [];
+    }
+
+    this.syncPlacement(nodes);
+    const selected = this.selectJobs(nodeId, free, queued.map(toJob), nodes);
+    if (selected.length === 0) {
+      return [];
+    }
+
+    // Still conditional on being queued: another instance may have claimed some
+    const { data: claimed, error: claimError } = await this.supabase
+      .from('runner_jobs')
+      .update({ status: 'assigned', node_id: nodeId, assigned_at: new Date().toISOString() })
+      .in('id', selected.map(job => job.id))
+      .eq('status', 'queued')
+      .select('*');
+    if (claimError) throw claimError;
+    if (!claimed || claimed.length === 0) {
+      return [];
+    }
+
+    await this.supabase.from('runner_nodes').update({ running: node.running + claimed.length }).eq('id', nodeId);
+    return claimed.map(toJob).sort((a, b) => a.createdAt - b.createdAt);
+  }
+
+  private selectJobs(nodeId: string, maxJobs: number, queued: BrokerJob[], nodes: RunnerNode[]): BrokerJob[] {
+    if (!this.placement) {
+      return queued.slice(0, maxJobs);
+    }
+
+    const loads = new Map<string, NodeLoad>(
+      nodes.map(node => [node.id, { running: node.running, capacity: node.capacity }])
+    );
+    const selected: BrokerJob[] = [];
+    for (const job of queued) {
+      if (selected.length >= maxJobs) break;
+      if (job.pinnedNodeId || this.placement.isEligible(job, nodeId, loads)) {
+        selected.push(job);
+        loads.get(nodeId)!.running++;
+      }
+    }
+    return selected;
+  }
+
+  /**
+   * Rebuild the placement ring when the nodes changed, warming recently
+   * active projects (those submitted through this instance) on their new owners
+   */
+  private syncPlacement(nodes: RunnerNode[]) {
+    if (!this.placement) return;
+    const key = nodes.map(node => node.id).sort().join(',');
+    if (key === this.placementNodes) return;
+    this.placementNodes = key;
+
+    for (const handoff of this.placement.updateNodes(nodes)) {
+      this.submit(
+        { ...handoff.payload, kind: 'warm' },
+        { nodeId: handoff.nodeId, timeoutMs: WARM_JOB_TIMEOUT_MS }
+      );
+    }
+  }
+
+  private async rebalance() {
+    if (!this.placement) return;
+    this.syncPlacement(await this.listNodes());
+  }
+
+  /**
+   * Give up on a job. A node still running it stops it on its next heartbeat;
+   * a job that completed meanwhile returns its result after all.
+   */
+  private async abandon(jobId: string, message: string): Promise<PythonRunResult> {
+    const result: PythonRunResult = { output: '', error: message };
+    const { data, error } = await this.supabase
+      .from('runner_jobs')
+      .update({ status: 'failed', result, cancel_requested: true, finished_at: new Date().toISOString() })
+      .eq('id', jobId)
+      .in('status', ['queued', 'assigned'])
+      .select('id');
+    if (error) throw error;
+    if (data && data.length > 0) {
+      return result;
+    }
+
+    const { data: job } = await this.supabase.from('runner_jobs').select('result').eq('id', jobId).maybeSingle();
+    return (job?.result as PythonRunResult) || result;
+  }
+
+  /**
+   * Jobs of a lost node go back to the queue unless they already produced
+   * output; re-running those would duplicate side effects and output.
+   */
+  private async recoverJobs(nodeId: string) {
+    const finishedAt = new Date().toISOString();
+    const fail = (error: string) => ({ status: 'failed', result: { output: '', error }, finished_at: finishedAt });
+
+    const steps = [
+      this.supabase
+        .from('runner_jobs')
+        .update(fail('The runner node for this job went offline'))
+        .eq('pinned_node_id', nodeId)
+        .in('status', ['queued', 'assigned']),
+      this.supabase
+        .from('runner_jobs')
+        .update({ status: 'queued', node_id: null, assigned_at: null })
+        .eq('node_id', nodeId)
+        .eq('status', 'assigned')
+        .eq('started', false),
+      // Whatever is left had started (possibly while the step above ran)
+      this.supabase
+        .from('runner_jobs')
+        .update(fail('The runner node executing this code went offline'))
+        .eq('node_id', nodeId)
+        .eq('status', 'assigned'),
+    ];
+    for (const step of steps) {
+      const { error } = await step;
+      if (error) throw error;
+    }
+  }
+
+  private async reap() {
+    const now = Date.now();
+    const { data: dead, error } = await this.supabase
+      .from('runner_nodes')
+      .select('id, name')
+      .lt('last_heartbeat', new Date(now - this.heartbeatTimeoutMs).toISOString());
+    if (error) throw error;
+    for (const node of dead || []) {
+      console.warn(`[JobBroker] Runner ${node.name || node.id} missed its heartbeat, removing`);
+      await this.deregisterNode(node.id);
+    }
+
+    // Jobs whose submitter is gone (an instance that stopped mid-run)
+    await this.supabase
+      .from('runner_jobs')
+      .update({
+        status: 'failed',
+        result: { output: '', error: 'Execution timed out on the runner fleet' },
+        cancel_requested: true,
+        finished_at: new Date(now).toISOString(),
+      })
+      .in('status', ['queued', 'assigned'])
+      .lt('expires_at', new Date(now).toISOString());
+
+    // Events go with their jobs (on delete cascade)
+    await this.supabase
+      .from('runner_jobs')
+      .delete()
+      .in('status', ['completed', 'failed'])
+      .lt('finished_at', new Date(now - FINISHED_JOB_RETENTION_MS).toISOString());
+  }
+}
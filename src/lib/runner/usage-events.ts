@@ -0,0 +1,92 @@
+import { EventEmitter } from 'events';
+import type { RealtimeChannel } from '@supabase/supabase-js';
+import { createAdminClient } from '../supabase/admin';
+
+/**
+ * Channel for credit and usage changes made by the usage meter, relayed to
+ * browsers by GET /api/stats/stream.
+ *
+ * Events are delivered to listeners of this process and broadcast on a
+ * Supabase Realtime channel, so streams served by other instances of the web
+ * server receive them too. Without a service-role key (or with
+ * PYCODE_USAGE_EVENTS=local) they stay in this process, and streams rely on
+ * their periodic snapshots.
+ *
+ * - `delta`: usage was just recorded (not yet written); add it
+ * - `balance`: a flush was written; these are the user's current totals,
+ *   already net of usage that is still pending
+ */
+export type UsageEvent =
+  | { type: 'delta'; userId: string; codeRuns: number; aiQueries: number; credits: number; at: number }
+  | { type: 'balance'; userId: string; codeRuns: number; aiQueries: number; credits: number; at: number };
+
+export type UsageListener = (event: UsageEvent) => void;
+
+// Listener for every user (admin dashboard)
+const ALL_USERS = '*';
+const REALTIME_CHANNEL = 'pycode-usage';
+const REALTIME_EVENT = 'usage';
+
+const globalForUsageEvents = globalThis as unknown as {
+  pycodeUsageEvents?: EventEmitter;
+  pycodeUsageRelay?: RealtimeChannel | null;
+};
+
+function getEmitter(): EventEmitter {
+  if (!globalForUsageEvents.pycodeUsageEvents) {
+    const emitter = new EventEmitter();
+    // One listener per open stream
+    emitter.setMaxListeners(0);
+    globalForUsageEvents.pycodeUsageEvents = emitter;
+  }
+  return globalForUsageEvents.pycodeUsageEvents;
+}
+
+function emitLocally(event: UsageEvent): void {
+  const emitter = getEmitter();
+  emitter.emit(event.userId, event);
+  emitter.emit(ALL_USERS, event);
+}
+
+// Realtime channel shared by all instances, joined on first use; null when
+// events stay in this process
+function getRelay(): RealtimeChannel | null {
+  if (globalForUsageEvents.pycodeUsageRelay === undefined) {
+    const supabase = process.env.PYCODE_USAGE_EVENTS === 'local' ? null : createAdminClient();
+    if (!supabase) {
+      globalForUsageEvents.pycodeUsageRelay = null;
+    } else {
+      // self: false, events published here are delivered locally already
+      const channel = supabase.channel(REALTIME_CHANNEL, { config: { broadcast: { self: false } } });
+      channel.on('broadcast', { event: REALTIME_EVENT }, ({ payload }) => emitLocally(payload as UsageEvent));
+      channel.subscribe((status) => {
+        if (status === 'CHANNEL_ERROR' || status === 'TIMED_OUT') {
+          console.error(`[UsageEvents] Realtime channel ${status.toLowerCase()}; other instances will not see usage events until it reconnects`);
+        }
+      });
+      globalForUsageEvents.pycodeUsageRelay = channel;
+    }
+  }
+  return globalForUsageEvents.pycodeUsageRelay;
+}
+
+export function publishUsageEvent(event: UsageEvent): void {
+  emitLocally(event);
+  getRelay()?.send({ type: 'broadcast', event: REALTIME_EVENT, payload: event }).catch((error) => {
+    console.error('[UsageEvents] Failed to broadcast usage event:', error?.message || error);
+  });
+}
+
+/**
+ * Listen to one user's changes, or everyone's when userId is null.
+ * Returns the unsubscribe function.
+ */
+export function subscribeUsageEvents(userId: string | null, listener: UsageListener): () => void {
+  getRelay();
+  const emitter = getEmitter();
+  const channel = userId ?? ALL_USERS;
+  emitter.on(channel, listener);
+  return () => {
+    emitter.off(channel, listener);
+  };
+}
@@ -0,0 +1,113 @@
+import type { SupabaseClient } from '@supabase/supabase-js';
+import { createAdminClient } from '../supabase/admin';
+
+/**
+ * Where metered usage ends up. The Supabase store applies a whole batch in
+ * one call to the record_usage RPC (supabase_schema.sql), which increments
+ * credits, code_runs/ai_queries and daily_stats in a single transaction, so
+ * concurrent writers cannot lose counts. The RPC rejects a batch holding an
+ * out-of-range entry with SQLSTATE 22023 and never takes more credits than a
+ * user has. The memory store is a local stand-in
+ * with the same semantics for tests and setups without a service-role key
+ * (PYCODE_USAGE_STORE=memory forces it).
+ */
+
+export interface UsageDelta {
+  userId: string;
+  /** UTC day (daily_stats.date) */
+  date: string;
+  codeRuns: number;
+  aiQueries: number;
+  /** Whole credits to take from the balance */
+  credits: number;
+}
+
+export interface UsageBalance {
+  userId: string;
+  credits: number;
+  codeRuns: number;
+  aiQueries: number;
+}
+
+export interface UsageStore {
+  /** Apply a batch atomically and return the new balances of its users */
+  apply(deltas: UsageDelta[]): Promise<UsageBalance[]>;
+  /** Credits a user has as of the last write */
+  balance(userId: string): Promise<number>;
+}
+
+export class SupabaseUsageStore implements UsageStore {
+  constructor(private supabase: SupabaseClient) {}
+
+  async apply(deltas: UsageDelta[]): Promise<UsageBalance[]> {
+    const { data, error } = await this.supabase.rpc('record_usage', {
+      entries: deltas.map(delta => ({
+        user_id: delta.userId,
+        date: delta.date,
+        code_runs: delta.codeRuns,
+        ai_queries: delta.aiQueries,
+        credits: delta.credits,
+      })),
+    });
+    if (error) throw error;
+
+    return (data || []).map((row: any) => ({
+      userId: row.user_id,
+      credits: row.credits,
+      codeRuns: row.code_runs,
+      aiQueries: row.ai_queries,
+    }));
+  }
+
+  async balance(userId: string): Promise<number> {
+    const { data, error } = await this.supabase
+      .from('users')
+      .select('credits')
+      .eq('id', userId)
+      .maybeSingle();
+    if (error) throw error;
+    return data?.credits ?? 0;
+  }
+}
+
+export class MemoryUsageStore implements UsageStore {
+  readonly users = new Map<string, UsageBalance>();
+  readonly dailyStats = new Map<string, { codeRuns: number; aiQueries: number }>();
+
+  constructor(private initialCredits = 100) {}
+
+  async apply(deltas: UsageDelta[]): Promise<UsageBalance[]> {
+    const touched = new Set<string>();
+    for (const delta of deltas) {
+      const user = this.users.get(delta.userId) ||
+        { userId: delta.userId, credits: this.initialCredits, codeRuns: 0, aiQueries: 0 };
+      user.credits = Math.max(0, user.credits - delta.credits);
+      user.codeRuns += delta.codeRuns;
+      user.aiQueries += delta.aiQueries;
+      this.users.set(delta.userId, user);
+
+      const key = `${delta.userId}:${delta.date}`;
+      const daily = this.dailyStats.get(key) || { codeRuns: 0, aiQueries: 0 };
+      daily.codeRuns += delta.codeRuns;
+      daily.aiQueries += delta.aiQueries;
+      this.dailyStats.set(key, daily);
+      touched.add(delta.userId);
+    }
+    return Array.from(touched, userId => ({ ...this.users.get(userId)! }));
+  }
+
+  async balance(userId: string): Promise<number> {
+    return this.users.get(userId)?.credits ?? this.initialCredits;
+  }
+}
+
+export function createUsageStore(): UsageStore {
+  const supabase = process.env.PYCODE_USAGE_STORE === 'memory' ? null : createAdminClient();
+  if (!supabase) {
+    if (process.env.PYCODE_USAGE_STORE !== 'memory') {
+      console.warn('[Metering] SUPABASE_SERVICE_ROLE_KEY is not set; usage is kept in memory only');
+    }
+    return new MemoryUsageStore();
+  }
+  return new SupabaseUsageStore(supabase);
+}
@@ -1,16 +1,36 @@
 import { create } from 'zustand';
-import { produce } from 'immer';
+import { current, isDraft, produce } from 'immer';
 import { aiCodeAssistance, AiCodeAssistanceInput } from '@/ai/flows/ai-code-assistance';
 import { decideCodeAssistanceActions } from '@/ai/flows/decide-code-assistance-actions';
-import { runPythonCode } from '@/ai/flows/run-python-code';
+import { runPythonCode, RunPythonCodeOutput } from '@/ai/flows/run-python-code';
+import type { BackgroundJob } from '@/lib/runner/background-jobs';
+import type { ProjectSchedule, ScheduleRunRecord } from '@/lib/runner/schedules';
+import type { ProjectSearchResult } from '@/lib/project-search';
+import type { CodeSearchResult } from '@/lib/code-search';
 import JSZip from 'jszip';
 import { saveAs } from 'file-saver';
+import { computeTextDelta, FilePatch, hashText } from '@/lib/project-patch';
+import { cacheFile, cacheProject, clearProjectCache, readCachedProject } from '@/lib/project-cache';
+import { fetchProjectTree, LoadedProject, TreeResponse } from '@/lib/project-tree';
+import {
+  addIndexedItem,
+  baseName,
+  buildFileTree,
+  ensureIndexedFolder,
+  FileIndex,
+  indexFileTree,
+  listFilePaths,
+  removeIndexedItem,
+  resolveFilePath,
+} from '@/lib/file-index';
 
 type File = {
   name: string;
   type: 'file';
   content: string;
   uploadPath?: string; // Optional path for uploaded files
+  contentHash?: string; // Key of the stored body in file_contents
+  lazy?: boolean; // Body not fetched yet; content is empty until it is
 };
 
 type Folder = {
@@ -26,13 +46,24 @@ type ChatMessage = {
   message: string;
 };
 
-type Project = {
+export type ProjectStats = {
+  fileCount: number;
+  totalSize: number; // Bytes
+  mainLanguage: string | null;
+  lastRunAt: Date | null;
+};
+
+export type Project = {
   id: string;
   name: string;
   description: string;
   createdAt: Date;
   updatedAt: Date;
+  // For the open project, the tree as of its last structural change; the
+  // store's fileIndex has the current file contents
   fileTree: Folder;
+  stats?: ProjectStats;
+  isListing?: boolean; // From the project list; fileTree is empty until the project is opened
 };
 
 type User = {
@@ -67,32 +98,66 @@ type AdminStats = {
   premiumUsers: number;
 };
 
+type UsersQuery = {
+  search: string;
+  sort: 'created_at' | 'last_active' | 'credits' | 'code_runs' | 'ai_queries' | 'name' | 'email';
+  order: 'asc' | 'desc';
+  subscription: '' | 'free' | 'pro' | 'team';
+};
+
 type EditorState = {
   currentProject: Project | null;
-  fileTree: Folder;
-  openFiles: File[];
-  activeFile: File | null;
+  /** Files of the open project by path; see selectFileTree for the nested tree */
+  fileIndex: FileIndex;
+  openFilePaths: string[];
+  activeFilePath: string | null;
   output: string;
   chatHistory: ChatMessage[];
   isAiLoading: boolean;
   isCodeRunning: boolean;
+  lastRunMetrics: RunPythonCodeOutput['metrics'] | null;
+  backgroundJobs: BackgroundJob[];
+  attachedJobId: string | null;
+  schedules: ProjectSchedule[];
   quickActions: string[];
   codeContext: string;
   projects: Project[];
+  projectsNextCursor: string | null;
   currentUser: User | null;
   users: User[];
+  usersQuery: UsersQuery;
+  /** Cursor of the next page of users, null when all are loaded */
+  usersNextCursor: string | null;
+  /** Rows changed after this point are fetched by refreshChangedUsers */
+  usersSyncCursor: string | null;
   adminStats: AdminStats;
   isAdmin: boolean;
   dailyCodeRuns: number;
   dailyAiQueries: number;
+  /** Where the editor should move the cursor once the file is shown */
+  revealPosition: { path: string; line: number; column: number } | null;
 };
 
 type EditorActions = {
-  openFile: (file: File) => void;
-  closeFile: (fileName: string) => void;
-  setActiveFile: (fileName: string) => void;
-  updateFileContent: (fileName: string, content: string) => void;
+  openFile: (path: string) => void;
+  loadFileContents: (paths?: string[]) => Promise<void>;
+  closeFile: (path: string) => void;
+  setActiveFile: (path: string) => void;
+  /** Takes a path, or the bare name of a file for callers that only know that */
+  updateFileContent: (pathOrName: string, content: string) => void;
   runCode: () => void;
+  runTests: () => Promise<void>;
+  runInBackground: () => Promise<void>;
+  loadBackgroundJobs: () => Promise<void>;
+  attachBackgroundJob: (jobId: string) => Promise<void>;
+  detachBackgroundJob: () => void;
+  cancelBackgroundJob: (jobId: string) => Promise<void>;
+  downloadJobArtifact: (jobId: string, path: string) => Promise<void>;
+  loadSchedules: () => Promise<void>;
+  addSchedule: (cron: string) => Promise<{ success: boolean, error?: string }>;
+  toggleSchedule: (scheduleId: string, enabled: boolean) => Promise<void>;
+  removeSchedule: (scheduleId: string) => Promise<void>;
+  fetchScheduleHistory: (scheduleId: string) => Promise<ScheduleRunRecord[]>;
   clearOutput: () => void;
   sendMessage: (message: string, attachCode: boolean) => Promise<void>;
   runQuickAction: (action: string) => void;
@@ -104,7 +169,14 @@ type EditorActions = {
   downloadProjectAsZip: () => void;
   createProject: (name: string, description?: string) => void;
   loadUserProjects: () => Promise<void>;
+  loadMoreProjects: () => Promise<void>;
+  searchProjects: (query: string, signal?: AbortSignal) => Promise<ProjectSearchResult[]>;
+  searchFiles: (query: string, options?: { regex?: boolean; caseSensitive?: boolean; signal?: AbortSignal }) => Promise<CodeSearchResult>;
+  openFileAt: (path: string, line?: number, column?: number) => void;
+  clearRevealPosition: () => void;
   loadProject: (projectId: string) => Promise<void>;
+  prewarmProject: (projectId: string) => void;
+  cancelPrewarm: (projectId: string) => void;
   saveProject: () => void;
   // User functions
   registerUser: (name: string, email: string, password: string, subscription?: 'free' | 'pro' | 'team') => Promise<{ success: boolean, user?: User, error?: string }>;
@@ -113,11 +185,18 @@ type EditorActions = {
   // Admin functions
   adminLogin: (email: string, password: string) => boolean;
   adminLogout: () => void;
-  getAllUsers: () => User[];
+  getAllUsers: () => Promise<User[]>;
+  loadMoreUsers: () => Promise<void>;
+  setUsersQuery: (changes: Partial<UsersQuery>) => Promise<void>;
+  refreshChangedUsers: () => Promise<void>;
   updateUserCredits: (userId: string, credits: number) => void;
   updateUserSubscription: (userId: string, subscription: 'free' | 'pro' | 'team') => void;
-  getUserStats: () => AdminStats;
-  incrementCodeRun: () => void;
+  getUserStats: () => Promise<AdminStats>;
+  incrementCodeRun: (creditsCharged?: number) => void;
+  connectUsageStream: () => void;
+  disconnectUsageStream: () => void;
+  connectAdminUsageStream: () => void;
+  disconnectAdminUsageStream: () => void;
   incrementAiQuery: () => void;
   checkCreditLimit: () => boolean;
   updateCurrentUser: (updates: Partial<User>) => void;
@@ -134,19 +213,437 @@ const initialFileTree: Folder = {
   children: [initialFile],
 };
 
-const findFileByPath = (tree: Folder, path: string[]): File | undefined => {
-  let current: FileOrFolder | undefined = tree;
-  for (const name of path) {
-    if (current?.type === 'folder') {
-      current = current.children.find(child => child.name === name);
-    } else {
-      return undefined;
+const initialFileIndex = indexFileTree(initialFileTree);
+
+// Nested tree of the open project, rebuilt only when the index changes
+const fileTrees = new WeakMap<FileIndex, Folder>();
+
+export const selectFileTree = (state: EditorState): Folder => {
+  let tree = fileTrees.get(state.fileIndex);
+  if (!tree) {
+    tree = buildFileTree(state.fileIndex);
+    fileTrees.set(state.fileIndex, tree);
+  }
+  return tree;
+};
+
+export const selectActiveFile = (state: EditorState): File | null =>
+  (state.activeFilePath && state.fileIndex.files[state.activeFilePath]) || null;
+
+type EditorStore = EditorState & EditorActions;
+
+// Slices of the store for the editor's panels. Select one through useShallow
+// so a panel re-renders only when a field of its own slice changes, not on
+// every output chunk, keystroke or chat message elsewhere:
+//   const { output, runCode } = useEditorStore(useShallow(selectRunSlice));
+
+// Without output: the console follows it through useOutputLog
+export const selectRunSlice = (state: EditorStore) => ({
+  isCodeRunning: state.isCodeRunning,
+  backgroundJobs: state.backgroundJobs,
+  runCode: state.runCode,
+  runTests: state.runTests,
+  runInBackground: state.runInBackground,
+  clearOutput: state.clearOutput,
+});
+
+export const selectJobsSlice = (state: EditorStore) => ({
+  backgroundJobs: state.backgroundJobs,
+  attachedJobId: state.attachedJobId,
+  loadBackgroundJobs: state.loadBackgroundJobs,
+  attachBackgroundJob: state.attachBackgroundJob,
+  cancelBackgroundJob: state.cancelBackgroundJob,
+  downloadJobArtifact: state.downloadJobArtifact,
+});
+
+export const selectScheduleSlice = (state: EditorStore) => ({
+  schedules: state.schedules,
+  activeFilePath: state.activeFilePath,
+  addSchedule: state.addSchedule,
+  toggleSchedule: state.toggleSchedule,
+  removeSchedule: state.removeSchedule,
+  fetchScheduleHistory: state.fetchScheduleHistory,
+});
+
+export const selectChatSlice = (state: EditorStore) => ({
+  chatHistory: state.chatHistory,
+  isAiLoading: state.isAiLoading,
+  quickActions: state.quickActions,
+  codeContext: state.codeContext,
+  currentUser: state.currentUser,
+  sendMessage: state.sendMessage,
+  runQuickAction: state.runQuickAction,
+});
+
+// Uploaded files sit at the project root. A new array every time, but with
+// useShallow it only re-renders when one of the files itself changes.
+export const selectUploadedFiles = (state: EditorState): File[] =>
+  (state.fileIndex.children[''] || [])
+    .map(path => state.fileIndex.files[path])
+    .filter(file => file && file.uploadPath);
+
+// Flatten the tree into project-relative paths for the server (e.g. snake_game/game.py)
+const collectProjectFiles = (items: FileOrFolder[], prefix = ''): { path: string; content: string }[] => {
+  const files: { path: string; content: string }[] = [];
+  for (const item of items) {
+    const itemPath = prefix ? `${prefix}/${item.name}` : item.name;
+    if (item.type === 'file') {
+      files.push({ path: itemPath, content: item.content });
+    } else if (item.children) {
+      files.push(...collectProjectFiles(item.children, itemPath));
     }
   }
-  return current?.type === 'file' ? current : undefined;
+  return files;
+};
+
+// Project files with every body loaded (bodies arrive lazily after a project opens)
+const collectAllProjectFiles = async () => {
+  await useEditorStore.getState().loadFileContents();
+  return collectProjectFiles(selectFileTree(useEditorStore.getState()).children);
+};
+
+const findFirstFile = (items: FileOrFolder[]): File | null => {
+  for (const item of items) {
+    if (item.type === 'file') return item;
+    const found = item.children ? findFirstFile(item.children) : null;
+    if (found) return found;
+  }
+  return null;
+};
+
+const CONTENT_HASH_BATCH = 100;
+
+const fetchContentBodies = async (hashes: string[]): Promise<Record<string, string>> => {
+  const contents: Record<string, string> = {};
+  for (let i = 0; i < hashes.length; i += CONTENT_HASH_BATCH) {
+    const token = localStorage.getItem('pycode-user-token');
+    const response = await fetch(`/api/projects/contents?hashes=${hashes.slice(i, i + CONTENT_HASH_BATCH).join(',')}`, {
+      headers: { 'Authorization': `Bearer ${token || ''}` }
+    });
+    if (!response.ok) {
+      throw new Error(`Failed to load file contents (HTTP ${response.status})`);
+    }
+    const data = await response.json();
+    Object.assign(contents, data.contents);
+  }
+  return contents;
+};
+
+// Body of an uploaded file as it is on disk. The server answers with an
+// ETag, so reopening an unchanged dataset costs a 304 instead of a download.
+const fetchUploadedBody = async (projectId: string, uploadPath: string): Promise<string> => {
+  const response = await fetch(`/api/files/project?projectId=${encodeURIComponent(projectId)}&path=${encodeURIComponent(uploadPath)}`);
+  if (!response.ok) {
+    throw new Error(`Failed to load ${uploadPath} (HTTP ${response.status})`);
+  }
+  const data = await response.json();
+  return data.content || '';
+};
+
+const fetchFileBody = async (projectId: string, file: File): Promise<string | null> => {
+  if (file.uploadPath) return fetchUploadedBody(projectId, file.uploadPath);
+  if (!file.contentHash) return null;
+  const contents = await fetchContentBodies([file.contentHash]);
+  return file.contentHash in contents ? contents[file.contentHash] : null;
+};
+
+// In-flight body loads, by project and upload path or content hash
+const contentLoads = new Map<string, Promise<void>>();
+
+// Project trees are fetched and parsed in a worker (project-tree.worker.ts);
+// where there is none, on this thread
+let treeWorker: Worker | null = null;
+let treeWorkerFailed = false;
+let nextTreeRequestId = 1;
+const pendingTreeRequests = new Map<number, { resolve: (project: LoadedProject | null) => void; reject: (error: Error) => void }>();
+
+const getTreeWorker = (): Worker | null => {
+  if (treeWorker || treeWorkerFailed) return treeWorker;
+  if (typeof window === 'undefined' || typeof Worker === 'undefined') {
+    treeWorkerFailed = true;
+    return null;
+  }
+  try {
+    treeWorker = new Worker(new URL('./project-tree.worker.ts', import.meta.url));
+  } catch (error) {
+    console.error('[loadProject] Could not start the project tree worker:', error);
+    treeWorkerFailed = true;
+    return null;
+  }
+  treeWorker.addEventListener('message', (event: MessageEvent<TreeResponse>) => {
+    const { id, result, error } = event.data;
+    const pending = pendingTreeRequests.get(id);
+    if (!pending) return;
+    pendingTreeRequests.delete(id);
+    if (error) pending.reject(new Error(error));
+    else pending.resolve(result ?? null);
+  });
+  treeWorker.addEventListener('error', (event) => {
+    console.error('[loadProject] Project tree worker failed:', event.message);
+    treeWorker?.terminate();
+    treeWorker = null;
+    treeWorkerFailed = true;
+    for (const pending of pendingTreeRequests.values()) {
+      pending.reject(new Error('Project tree worker failed'));
+    }
+    pendingTreeRequests.clear();
+  });
+  return treeWorker;
+};
+
+const loadProjectTree = (projectId: string): Promise<LoadedProject | null> => {
+  const worker = getTreeWorker();
+  if (!worker) return fetchProjectTree(projectId);
+  const id = nextTreeRequestId++;
+  return new Promise<LoadedProject | null>((resolve, reject) => {
+    pendingTreeRequests.set(id, { resolve, reject });
+    worker.postMessage({ id, projectId });
+  }).catch((error) => {
+    console.warn('[loadProject] Loading the tree in the worker failed, loading it here:', error);
+    return fetchProjectTree(projectId);
+  });
+};
+
+// Uploaded files join the tree by name; their bodies are read from disk when opened
+const mergeUploadedFiles = (fileTree: Folder, uploadedFiles: { originalName: string; filePath: string }[]) => {
+  const findByName = (items: FileOrFolder[], name: string): File | null => {
+    for (const item of items) {
+      if (item.type === 'file' && item.name === name) return item;
+      const found = item.type === 'folder' ? findByName(item.children, name) : null;
+      if (found) return found;
+    }
+    return null;
+  };
+
+  for (const uploadedFile of uploadedFiles) {
+    let file = findByName(fileTree.children, uploadedFile.originalName);
+    if (!file) {
+      file = { name: uploadedFile.originalName, type: 'file', content: '' };
+      fileTree.children.push(file);
+    }
+    file.content = '';
+    file.lazy = true;
+    file.uploadPath = uploadedFile.filePath;
+  }
 };
 
 // Fallback function for AI assistant when the main AI service fails
+// Live output stream of the attached background job
+let jobStreamController: AbortController | null = null;
+
+const notifyJobFinished = (job: BackgroundJob) => {
+  if (typeof window === 'undefined' || !('Notification' in window) || Notification.permission !== 'granted') {
+    return;
+  }
+  const title = job.status === 'succeeded' ? 'Background run finished' : `Background run ${job.status}`;
+  new Notification(title, { body: job.fileName || job.id });
+};
+
+// Streamed output (test runs, attached background runs) is appended to the
+// store at most once per animation frame, however many chunks arrive in
+// between, so a chatty program costs one render per frame instead of one
+// per line. Anything that replaces the output discards what is still queued.
+let pendingOutput = '';
+let outputFrame: number | null = null;
+// The latest flush, so the console can index the new text without reading
+// the whole output
+let lastOutputAppend: { from: string; to: string; text: string } | null = null;
+
+const requestFrame = (callback: () => void): number =>
+  typeof requestAnimationFrame === 'function'
+    ? requestAnimationFrame(callback)
+    : setTimeout(callback, 16) as unknown as number;
+
+const cancelFrame = (handle: number) => {
+  if (typeof cancelAnimationFrame === 'function') cancelAnimationFrame(handle);
+  else clearTimeout(handle);
+};
+
+export const flushOutput = () => {
+  if (outputFrame !== null) {
+    cancelFrame(outputFrame);
+    outputFrame = null;
+  }
+  if (!pendingOutput) return;
+  const text = pendingOutput;
+  pendingOutput = '';
+  const from = useEditorStore.getState().output;
+  lastOutputAppend = { from, to: from + text, text };
+  useEditorStore.setState({ output: lastOutputAppend.to });
+};
+
+/**
+ * The text appended to get from one output to the next, or null if the
+ * output was replaced instead
+ */
+export const appendedOutput = (from: string, to: string): string | null =>
+  lastOutputAppend && lastOutputAppend.from === from && lastOutputAppend.to === to ? lastOutputAppend.text : null;
+
+export const appendOutput = (text: string) => {
+  pendingOutput += text;
+  if (outputFrame === null) outputFrame = requestFrame(flushOutput);
+};
+
+const discardPendingOutput = () => {
+  if (outputFrame !== null) cancelFrame(outputFrame);
+  outputFrame = null;
+  pendingOutput = '';
+};
+
+// Admin users list: only the latest request may replace the list
+let usersRequestId = 0;
+// Pages of changed rows fetched per refresh at most
+const MAX_USER_SYNC_PAGES = 10;
+
+const adminHeaders = (): Record<string, string> => ({
+  'Authorization': `Bearer ${localStorage.getItem('pycode-admin-token') || ''}`
+});
+
+const mapUserRow = (row: any): User => ({
+  id: row.id,
+  email: row.email,
+  name: row.name,
+  subscription: row.subscription,
+  credits: row.credits,
+  creditLimit: row.credit_limit,
+  codeRuns: row.code_runs,
+  aiQueries: row.ai_queries,
+  createdAt: new Date(row.created_at),
+  lastActive: new Date(row.last_active),
+  isActive: row.is_active,
+});
+
+// Live credit and usage updates (GET /api/stats/stream)
+let usageStreamController: AbortController | null = null;
+// Whether the usage stream is connected and has sent its snapshot; while it
+// is reconnecting, the client mirrors its own usage (the next snapshot
+// replaces those numbers)
+let usageStreamLive = false;
+let adminUsageStreamController: AbortController | null = null;
+// Updates arriving within this window are applied in a single store update
+const USAGE_COALESCE_MS = 250;
+const USAGE_RECONNECT_MS = 5000;
+
+type UsageTotals = { credits: number; codeRuns: number; aiQueries: number };
+
+type UsageUpdate = {
+  /** Latest totals from a metering flush; replace everything before them */
+  balance: UsageTotals | null;
+  /** Usage recorded after the balance (or since the last update) */
+  credits: number;
+  codeRuns: number;
+  aiQueries: number;
+  /** Usage recorded today, for the daily counters */
+  dailyCodeRuns: number;
+  dailyAiQueries: number;
+};
+
+const createUsageCoalescer = (apply: (updates: Map<string, UsageUpdate>) => void) => {
+  let updates = new Map<string, UsageUpdate>();
+  let timer: ReturnType<typeof setTimeout> | null = null;
+
+  const push = (type: string, event: any) => {
+    const update = updates.get(event.userId) ||
+      { balance: null, credits: 0, codeRuns: 0, aiQueries: 0, dailyCodeRuns: 0, dailyAiQueries: 0 };
+    if (type === 'balance') {
+      update.balance = { credits: event.credits, codeRuns: event.codeRuns, aiQueries: event.aiQueries };
+      update.credits = 0;
+      update.codeRuns = 0;
+      update.aiQueries = 0;
+    } else if (type === 'delta') {
+      update.credits += event.credits;
+      update.codeRuns += event.codeRuns;
+      update.aiQueries += event.aiQueries;
+      update.dailyCodeRuns += event.codeRuns;
+      update.dailyAiQueries += event.aiQueries;
+    }
+    updates.set(event.userId, update);
+
+    if (!timer) {
+      timer = setTimeout(() => {
+        timer = null;
+        const batch = updates;
+        updates = new Map();
+        apply(batch);
+      }, USAGE_COALESCE_MS);
+    }
+  };
+
+  const cancel = () => {
+    if (timer) clearTimeout(timer);
+    timer = null;
+    updates = new Map();
+  };
+
+  return { push, cancel };
+};
+
+const applyUsageUpdate = (user: User, update: UsageUpdate) => {
+  if (update.balance) {
+    user.credits = update.balance.credits;
+    user.codeRuns = update.balance.codeRuns;
+    user.aiQueries = update.balance.aiQueries;
+  }
+  user.credits = Math.max(0, user.credits - update.credits);
+  user.codeRuns += update.codeRuns;
+  user.aiQueries += update.aiQueries;
+  if (update.balance || update.codeRuns || update.aiQueries) {
+    user.lastActive = new Date();
+  }
+};
+
+/**
+ * Follow a usage stream until the signal aborts, reconnecting after drops
+ */
+const followUsageStream = async (
+  url: string,
+  token: string,
+  signal: AbortSignal,
+  onEvent: (type: string, payload: any) => void,
+  onDisconnect?: () => void
+) => {
+  while (!signal.aborted) {
+    try {
+      const response = await fetch(url, {
+        headers: { 'Authorization': `Bearer ${token}` },
+        signal
+      });
+      if (response.status === 401) {
+        return;
+      }
+      if (response.ok && response.body) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          buffered += decoder.decode(value, { stream: true });
+          const events = buffered.split('\n\n');
+          buffered = events.pop() || '';
+
+          for (const rawEvent of events) {
+            let type = 'message';
+            let data = '';
+            for (const line of rawEvent.split('\n')) {
+              if (line.startsWith('event: ')) type = line.slice(7);
+              else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            if (data) onEvent(type, JSON.parse(data));
+          }
+        }
+      }
+    } catch (error: any) {
+      if (error?.name === 'AbortError') return;
+      console.error('Usage stream error:', error);
+    }
+    // Closed or failed; reconnect after a pause
+    onDisconnect?.();
+    await new Promise(resolve => setTimeout(resolve, USAGE_RECONNECT_MS));
+  }
+};
+
 const getFallbackResponse = (message: string, currentCode: string): string => {
   const lowerMessage = message.toLowerCase();
 
@@ -380,8 +877,13 @@ const saveProjectToDatabase = async (projectId: string, name: string, descriptio
       return false;
     }
 
-    // Serialize fileTree to check size
-    const fileTreeJson = JSON.stringify(fileTree);
+    // Serialize fileTree to check size. Files whose body was never loaded are
+    // sent by contentHash, which the server keeps as it is.
+    const fileTreeJson = JSON.stringify(fileTree, (key, value) =>
+      value && value.type === 'file' && value.lazy
+        ? { name: value.name, type: 'file', contentHash: value.contentHash, uploadPath: value.uploadPath }
+        : value
+    );
     const fileTreeSize = new Blob([fileTreeJson]).size;
 
     console.log(`[saveProjectToDatabase] Saving project ${projectId}, fileTree size: ${(fileTreeSize / 1024).toFixed(2)} KB`);
@@ -397,7 +899,7 @@ const saveProjectToDatabase = async (projectId: string, name: string, descriptio
         projectId,
         name,
         description: description || '',
-        fileTree
+        fileTree: JSON.parse(fileTreeJson)
       })
     });
 
@@ -408,6 +910,8 @@ const saveProjectToDatabase = async (projectId: string, name: string, descriptio
     }
 
     console.log(`[saveProjectToDatabase] Successfully saved project ${projectId}`);
+    // fileTree may be an immer draft that is gone by now; use the serialized copy
+    seedAutosave(projectId, JSON.parse(fileTreeJson));
     return true;
   } catch (error: any) {
     console.error('[saveProjectToDatabase] Error saving project to database:', error);
@@ -416,20 +920,281 @@ const saveProjectToDatabase = async (projectId: string, name: string, descriptio
   }
 };
 
+// Entry of the project list (GET /api/projects?view=summary). A project whose
+// tree is already in the store keeps it.
+const projectFromSummary = (row: any, loaded?: Project): Project => ({
+  id: row.id,
+  name: row.name,
+  description: row.description || '',
+  createdAt: new Date(row.created_at),
+  updatedAt: new Date(row.updated_at),
+  fileTree: loaded && !loaded.isListing ? loaded.fileTree : { name: row.name, type: 'folder', children: [] },
+  isListing: !loaded || !!loaded.isListing,
+  stats: {
+    fileCount: row.file_count ?? 0,
+    totalSize: row.total_size ?? 0,
+    mainLanguage: row.main_language || null,
+    lastRunAt: row.last_run_at ? new Date(row.last_run_at) : null,
+  },
+});
+
+// Debounced, patch-based autosave. Each edited file waits for a pause in
+// typing, then its change is sent as a patch (PATCH /api/projects) instead of
+// the whole file tree. Changes that become ready while a save is in flight are
+// coalesced into the next request, so a project has one request at a time.
+const AUTOSAVE_DEBOUNCE_MS = 1000;
+const AUTOSAVE_RETRY_MS = 5000;
+
+type AutosaveQueue = {
+  timers: Map<string, ReturnType<typeof setTimeout>>;
+  // Latest content of each edited file, by path
+  latest: Map<string, string>;
+  // Paths whose debounce has elapsed
+  ready: Set<string>;
+  // Content the server is known to have, by path (delta bases)
+  saved: Map<string, string>;
+  inFlight: boolean;
+  retryTimer: ReturnType<typeof setTimeout> | null;
+};
+
+const autosaveQueues = new Map<string, AutosaveQueue>();
+
+const getAutosaveQueue = (projectId: string): AutosaveQueue => {
+  let queue = autosaveQueues.get(projectId);
+  if (!queue) {
+    queue = { timers: new Map(), latest: new Map(), ready: new Set(), saved: new Map(), inFlight: false, retryTimer: null };
+    autosaveQueues.set(projectId, queue);
+  }
+  return queue;
+};
+
+// Record what the server holds after a load or a full save
+const seedAutosave = (projectId: string, fileTree: Folder) => {
+  const queue = getAutosaveQueue(projectId);
+  queue.saved.clear();
+  const walk = (items: FileOrFolder[], prefix: string) => {
+    for (const item of items) {
+      if (item.type === 'file') {
+        // Bodies not loaded yet are recorded when they arrive
+        if (!item.lazy && typeof item.content === 'string') {
+          queue.saved.set(prefix + item.name, item.content);
+        }
+      } else if (item.children) {
+        walk(item.children, `${prefix}${item.name}/`);
+      }
+    }
+  };
+  walk(fileTree.children || [], '');
+};
+
+const scheduleAutosave = (projectId: string, path: string, content: string) => {
+  const queue = getAutosaveQueue(projectId);
+  queue.latest.set(path, content);
+  clearTimeout(queue.timers.get(path));
+  queue.timers.set(path, setTimeout(() => {
+    queue.timers.delete(path);
+    queue.ready.add(path);
+    flushAutosave(projectId);
+  }, AUTOSAVE_DEBOUNCE_MS));
+};
+
+// Edits are saved in the background, so that is when a project counts as updated
+const markProjectUpdated = (projectId: string) => {
+  useEditorStore.setState(produce((state: EditorState) => {
+    const now = new Date();
+    if (state.currentProject?.id === projectId) state.currentProject.updatedAt = now;
+    const project = state.projects.find(p => p.id === projectId);
+    if (project) project.updatedAt = now;
+  }));
+};
+
+const flushAutosave = async (projectId: string) => {
+  const queue = autosaveQueues.get(projectId);
+  if (!queue || queue.inFlight || queue.ready.size === 0) return;
+  if (queue.retryTimer) {
+    clearTimeout(queue.retryTimer);
+    queue.retryTimer = null;
+  }
+
+  const sent = new Map<string, string>();
+  const changes: { path: string; base?: string; content: string }[] = [];
+  for (const path of queue.ready) {
+    const content = queue.latest.get(path);
+    if (content === undefined) continue;
+    sent.set(path, content);
+    const base = queue.saved.get(path);
+    if (base === content) continue;
+    changes.push({ path, base, content });
+  }
+  queue.ready.clear();
+  if (changes.length === 0) return;
+
+  queue.inFlight = true;
+  let retry = false;
+  try {
+    const files: FilePatch[] = await Promise.all(changes.map(async ({ path, base, content }) => {
+      // Without Web Crypto (insecure origins) the full content is sent
+      const baseHash = base === undefined ? null : await hashText(base).catch(() => null);
+      return baseHash === null
+        ? { path, content }
+        : { path, baseHash, delta: computeTextDelta(base!, content) };
+    }));
+    const response = await fetch('/api/projects', {
+      method: 'PATCH',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ projectId, files }),
+    });
+
+    if (response.ok) {
+      sent.forEach((content, path) => queue.saved.set(path, content));
+      markProjectUpdated(projectId);
+    } else if (response.status === 409) {
+      // The server's copy is not what the deltas were based on: resend in full
+      const data = await response.json().catch(() => ({}));
+      const conflicts: string[] = Array.isArray(data.conflicts) ? data.conflicts : changes.map(change => change.path);
+      sent.forEach((content, path) => {
+        if (!conflicts.includes(path)) queue.saved.set(path, content);
+      });
+      for (const path of conflicts) {
+        queue.saved.delete(path);
+        queue.ready.add(path);
+      }
+    } else {
+      console.error('[autosave] Failed to save project:', response.status, response.statusText);
+      sent.forEach((_, path) => queue.ready.add(path));
+      retry = true;
+    }
+  } catch (error) {
+    console.error('[autosave] Error saving project:', error);
+    sent.forEach((_, path) => queue.ready.add(path));
+    retry = true;
+  } finally {
+    queue.inFlight = false;
+  }
+
+  if (queue.ready.size > 0) {
+    if (retry) {
+      queue.retryTimer = setTimeout(() => flushAutosave(projectId), AUTOSAVE_RETRY_MS);
+    } else {
+      flushAutosave(projectId);
+    }
+  }
+};
+
+// Send a project's pending changes without waiting for the debounce
+const flushPendingAutosave = (projectId: string) => {
+  const queue = autosaveQueues.get(projectId);
+  if (!queue) return Promise.resolve();
+  queue.timers.forEach((timer, path) => {
+    clearTimeout(timer);
+    queue.ready.add(path);
+  });
+  queue.timers.clear();
+  return flushAutosave(projectId);
+};
+
+// The page is going away: send the full text of every file the server is not
+// known to have, right away and in one keepalive request. Nothing is awaited
+// before the fetch (a hash would be), and files of a request still in flight
+// are sent again, since its response may never be seen.
+const sendAutosavesOnExit = () => {
+  autosaveQueues.forEach((queue, projectId) => {
+    // Debounce timers are left running: a page restored from the back/forward
+    // cache then saves through the normal path as well
+    const files: FilePatch[] = [];
+    queue.latest.forEach((content, path) => {
+      if (queue.saved.get(path) !== content) files.push({ path, content });
+    });
+    if (files.length === 0) return;
+    fetch('/api/projects', {
+      method: 'PATCH',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ projectId, files }),
+      keepalive: true,
+    }).catch(error => console.error('[autosave] Error saving project on exit:', error));
+  });
+};
+
+if (typeof window !== 'undefined') {
+  window.addEventListener('pagehide', sendAutosavesOnExit);
+}
+
+// Queue a project for the offline cache; its tree is read when the write happens
+const cacheProjectSoon = (projectId: string) => cacheProject(projectId, () => {
+  const state = useEditorStore.getState();
+  const { currentProject, projects } = state;
+  if (currentProject?.id === projectId) return { ...currentProject, fileTree: selectFileTree(state) };
+  return projects.find(p => p.id === projectId && !p.isListing) || null;
+});
+
+// The cached copy shown while a project loads is read-only: its files are
+// marked lazy until the server's copy replaces them
+const markCachedCopy = (items: FileOrFolder[]) => {
+  for (const item of items) {
+    if (item.type === 'file') {
+      item.lazy = true;
+      // Not to be fetched by hash; the whole project is on its way
+      delete item.contentHash;
+    } else if (Array.isArray(item.children)) {
+      markCachedCopy(item.children);
+    }
+  }
+};
+
+// Show a project's tree in the editor, every file in a tab and the first one active
+const showFileTree = (state: EditorState, fileTree: Folder) => {
+  state.fileIndex = indexFileTree(fileTree);
+  state.openFilePaths = listFilePaths(state.fileIndex);
+  state.activeFilePath = state.openFilePaths[0] || null;
+};
+
+// After files or folders were added or removed: the project keeps the new
+// tree, which goes to the offline cache and is saved whole
+const commitFileTree = (state: EditorState, saveErrorMessage: string) => {
+  if (!state.currentProject) return;
+  const fileTree = buildFileTree(isDraft(state.fileIndex) ? current(state.fileIndex) : state.fileIndex);
+  state.currentProject.fileTree = fileTree;
+  state.currentProject.updatedAt = new Date();
+
+  // Update in projects array
+  const projectIndex = state.projects.findIndex(p => p.id === state.currentProject!.id);
+  if (projectIndex !== -1) {
+    state.projects[projectIndex] = { ...state.currentProject, stats: state.projects[projectIndex].stats };
+  }
+
+  cacheProjectSoon(state.currentProject.id);
+  saveProjectToDatabase(
+    state.currentProject.id,
+    state.currentProject.name,
+    state.currentProject.description,
+    fileTree
+  ).catch(error => {
+    console.error(saveErrorMessage, error);
+  });
+};
+
 export const useEditorStore = create<EditorState & EditorActions>((set, get) => ({
   currentProject: null,
-  fileTree: initialFileTree,
-  openFiles: [initialFile],
-  activeFile: initialFile,
+  fileIndex: initialFileIndex,
+  openFilePaths: [initialFile.name],
+  activeFilePath: initialFile.name,
   output: ``,
   chatHistory: [],
   isAiLoading: false,
   isCodeRunning: false,
+  lastRunMetrics: null,
+  backgroundJobs: [],
+  attachedJobId: null,
+  schedules: [],
   quickActions: [],
   codeContext: '',
   projects: [],
+  projectsNextCursor: null,
   currentUser: null,
   users: [],
+  usersQuery: { search: '', sort: 'created_at', order: 'desc', subscription: '' },
+  usersNextCursor: null,
+  usersSyncCursor: null,
   adminStats: {
     totalUsers: 1,
     totalProjects: 0,
@@ -441,81 +1206,120 @@ export const useEditorStore = create<EditorState & EditorActions>((set, get) =>
   isAdmin: false,
   dailyCodeRuns: 0,
   dailyAiQueries: 0,
+  revealPosition: null,
 
-  openFile: (file) => set(produce((state: EditorState) => {
-    if (!state.openFiles.find(f => f.name === file.name)) {
-      state.openFiles.push(file);
+  openFile: (path) => {
+    const file = get().fileIndex.files[path];
+    if (!file) return;
+    set(produce((state: EditorState) => {
+      if (!state.openFilePaths.includes(path)) {
+        state.openFilePaths.push(path);
+      }
+      state.activeFilePath = path;
+    }));
+    if (file.lazy) {
+      get().loadFileContents([path]);
     }
-    state.activeFile = file;
-  })),
+  },
 
-  closeFile: (fileName) => set(produce((state: EditorState) => {
-    const fileIndex = state.openFiles.findIndex(f => f.name === fileName);
-    if (fileIndex !== -1) {
-      state.openFiles.splice(fileIndex, 1);
-      if (state.activeFile?.name === fileName) {
-        state.activeFile = state.openFiles[Math.max(0, fileIndex - 1)] || state.openFiles[0] || null;
-      }
+  loadFileContents: (paths) => {
+    const { currentProject, fileIndex } = get();
+    const projectId = currentProject?.id || '';
+
+    // Bodies already on their way are waited for, not fetched again
+    const loads: Promise<void>[] = [];
+    const hashes = new Set<string>();
+    const uploads = new Set<string>();
+    for (const path of paths || Object.keys(fileIndex.files)) {
+      const file = fileIndex.files[path];
+      if (!file?.lazy) continue;
+      // Uploads are read from disk, which is where they change; that needs
+      // the project they belong to
+      if (file.uploadPath && !projectId) continue;
+      const key = file.uploadPath ? `upload:${file.uploadPath}` : file.contentHash ? `hash:${file.contentHash}` : null;
+      if (!key) continue;
+      const inFlight = contentLoads.get(`${projectId}:${key}`);
+      if (inFlight) loads.push(inFlight);
+      else if (file.uploadPath) uploads.add(file.uploadPath);
+      else hashes.add(file.contentHash!);
     }
-  })),
 
-  setActiveFile: (fileName) => set(produce((state: EditorState) => {
-    const file = get().openFiles.find(f => f.name === fileName);
-    if (file) {
-      state.activeFile = file;
+    if (hashes.size > 0 || uploads.size > 0) {
+      const keys = [
+        ...Array.from(hashes, hash => `${projectId}:hash:${hash}`),
+        ...Array.from(uploads, uploadPath => `${projectId}:upload:${uploadPath}`),
+      ];
+      const load = Promise.all([
+        hashes.size > 0 ? fetchContentBodies(Array.from(hashes)) : Promise.resolve({} as Record<string, string>),
+        Promise.all(Array.from(uploads, async uploadPath => [uploadPath, await fetchUploadedBody(projectId, uploadPath)] as const)),
+      ])
+        .then(([contents, uploaded]) => {
+          // Another project was opened meanwhile
+          if ((get().currentProject?.id || '') !== projectId) return;
+
+          const uploadedBodies = new Map(uploaded);
+          set(produce((state: EditorState) => {
+            for (const path in state.fileIndex.files) {
+              const file = state.fileIndex.files[path];
+              if (!file.lazy) continue;
+              const body = file.uploadPath
+                ? uploadedBodies.get(file.uploadPath)
+                : file.contentHash ? contents[file.contentHash] : undefined;
+              if (body === undefined) continue;
+              file.content = body;
+              delete file.lazy;
+              if (projectId) {
+                getAutosaveQueue(projectId).saved.set(path, body);
+              }
+            }
+          }));
+          if (projectId) cacheProjectSoon(projectId);
+        })
+        .catch((error) => {
+          console.error('[loadFileContents] Error loading file contents:', error);
+        })
+        .finally(() => {
+          keys.forEach(key => contentLoads.delete(key));
+        });
+      keys.forEach(key => contentLoads.set(key, load));
+      loads.push(load);
     }
-  })),
 
-  updateFileContent: (fileName, content) => set(produce((state: EditorState) => {
-    const findAndUpdate = (items: FileOrFolder[]) => {
-      for (let i = 0; i < items.length; i++) {
-        const item = items[i];
-        if (item.type === 'file' && item.name === fileName) {
-          item.content = content;
-          return true;
-        }
-        if (item.type === 'folder') {
-          if (findAndUpdate(item.children)) return true;
-        }
-      }
-      return false;
-    };
-    findAndUpdate(state.fileTree.children);
+    return Promise.all(loads).then(() => undefined);
+  },
 
-    const openFile = state.openFiles.find(f => f.name === fileName);
-    if (openFile) {
-      openFile.content = content;
+  closeFile: (path) => set(produce((state: EditorState) => {
+    const tabIndex = state.openFilePaths.indexOf(path);
+    if (tabIndex !== -1) {
+      state.openFilePaths.splice(tabIndex, 1);
+      if (state.activeFilePath === path) {
+        state.activeFilePath = state.openFilePaths[Math.max(0, tabIndex - 1)] || state.openFilePaths[0] || null;
+      }
     }
-    if (state.activeFile?.name === fileName) {
-      state.activeFile.content = content;
+  })),
+
+  setActiveFile: (path) => set(produce((state: EditorState) => {
+    if (state.openFilePaths.includes(path)) {
+      state.activeFilePath = path;
     }
+  })),
 
-    // Auto-save project to database
-    if (state.currentProject) {
-      // Update current project's fileTree
-      state.currentProject.fileTree = state.fileTree;
-      state.currentProject.updatedAt = new Date();
-
-      // Update in projects array
-      const projectIndex = state.projects.findIndex(p => p.id === state.currentProject!.id);
-      if (projectIndex !== -1) {
-        state.projects[projectIndex] = { ...state.currentProject! };
-      }
+  updateFileContent: (pathOrName, content) => {
+    const { fileIndex, currentProject } = get();
+    const path = resolveFilePath(fileIndex, pathOrName);
+    if (!path || fileIndex.files[path].content === content) return;
 
-      // Save to localStorage (for quick access)
-      localStorage.setItem('pycode-projects', JSON.stringify(state.projects));
-
-      // Save to database (async, don't block UI)
-      saveProjectToDatabase(
-        state.currentProject.id,
-        state.currentProject.name,
-        state.currentProject.description,
-        state.fileTree
-      ).catch(error => {
-        console.error('Error auto-saving project to database:', error);
-      });
+    // Only this file's entry changes; the tree is not walked or copied
+    set(produce((state: EditorState) => {
+      state.fileIndex.files[path].content = content;
+    }));
+
+    // Save to database once typing pauses, as a patch of this file only
+    if (currentProject) {
+      scheduleAutosave(currentProject.id, path, content);
+      cacheFile(currentProject.id, path, content);
     }
-  })),
+  },
 
   updateCurrentUser: (updates) => set(produce((state: EditorState) => {
     if (state.currentUser) {
@@ -524,7 +1328,8 @@ export const useEditorStore = create<EditorState & EditorActions>((set, get) =>
   })),
 
   runCode: async () => {
-    const { activeFile, checkCreditLimit, incrementCodeRun, fileTree } = get();
+    const { checkCreditLimit, incrementCodeRun, fileIndex } = get();
+    const activeFile = selectActiveFile(get());
     if (!activeFile) {
       set({ output: `[${new Date().toLocaleTimeString()}] No active file to run.` });
       return;
@@ -536,91 +1341,27 @@ export const useEditorStore = create<EditorState & EditorActions>((set, get) =>
       return;
     }
 
+    // The console now belongs to this run; any background run keeps going
+    get().detachBackgroundJob();
     set({ isCodeRunning: true, output: `[${new Date().toLocaleTimeString()}] Running ${activeFile.name}...\n\n` });
 
     try {
-      // Get all files in the project to include in execution context
-      const getAllFiles = (items: FileOrFolder[]): File[] => {
-        const files: File[] = [];
-        for (const item of items) {
-          if (item.type === 'file') {
-            files.push(item as File);
-          } else if (item.type === 'folder' && item.children) {
-            files.push(...getAllFiles(item.children));
-          }
-        }
-        return files;
-      };
-
-      const projectFiles = getAllFiles(fileTree.children);
-
-      // Create a wrapper that includes all project files
-      let wrappedCode = activeFile.content;
-
-      // Add file creation code for all project files (including uploaded files)
-      if (projectFiles.length > 0) {
-        const fileCreationCode = projectFiles
-          .filter(file => file.name !== activeFile.name) // Don't recreate the current file
-          .map(file => {
-            // Handle uploaded files - use their content from the file tree
-            let fileContent = file.content;
-
-            // If file has uploadPath but content is available, use the content
-            // Otherwise, if it's an uploaded file without content, try to read it
-            if (file.uploadPath && !fileContent) {
-              // For uploaded files without content in memory, we'll need to fetch it
-              // But since we're in execution context, we'll use the content from fileTree
-              fileContent = file.content || '';
-            }
-
-            // Escape content properly for Python string
-            const escapedContent = fileContent
-              .replace(/\\/g, '\\\\')  // Escape backslashes first
-              .replace(/"/g, '\\"')     // Escape double quotes
-              .replace(/\$/g, '\\$')     // Escape dollar signs (for f-strings)
-              .replace(/\n/g, '\\n')     // Escape newlines
-              .replace(/\r/g, '\\r')     // Escape carriage returns
-              .replace(/\t/g, '\\t');    // Escape tabs
-
-            // Use triple quotes to handle multiline content better
-            return `# Create ${file.name} file
-import os
-if not os.path.exists('${file.name}'):
-    with open('${file.name}', 'w', encoding='utf-8') as f:
-        f.write("""${escapedContent}""")
-`;
-          })
-          .join('\n');
-
-        if (fileCreationCode) {
-          wrappedCode = `${fileCreationCode}\n\n# Original code:\n${activeFile.content}`;
-        }
-      }
-
-      // Execute code in project directory so created files are saved there
+      // Send the project files along so the server can write them into the
+      // working directory. Unchanged files are not rewritten, which keeps their
+      // cached bytecode valid between runs.
       const { currentProject } = get();
 
       const result = await runPythonCode({
-        code: wrappedCode,
-        projectId: currentProject?.id // Pass projectId, server will handle path
+        code: activeFile.content,
+        projectId: currentProject?.id, // Pass projectId, server will handle path
+        files: await collectAllProjectFiles()
       });
 
       // After code execution, detect and add newly created files
       if (currentProject && get().currentUser && result.output && !result.error) {
         try {
-          // Get list of existing files from fileTree
-          const getAllFileNames = (items: FileOrFolder[]): string[] => {
-            const names: string[] = [];
-            items.forEach(item => {
-              if (item.type === 'file') {
-                names.push(item.name);
-              } else if (item.type === 'folder') {
-                names.push(...getAllFileNames(item.children));
-              }
-            });
-            return names;
-          };
-          const existingFiles = getAllFileNames(fileTree.children);
+          // Names of the files already in the project
+          const existingFiles = listFilePaths(fileIndex).map(baseName);
 
           // Call API to detect new files
           const filesResponse = await fetch('/api/files/detect-new', {
@@ -638,52 +1379,24 @@ if not os.path.exists('${file.name}'):
             const newFiles = filesData.newFiles || [];
 
             if (newFiles.length > 0) {
-              // Add new files to fileTree
+              // Add new files to the project root
               set(produce((state: EditorState) => {
+                let added = false;
                 newFiles.forEach((file: any) => {
                   // Check if file already exists
-                  const fileExists = (items: FileOrFolder[]): boolean => {
-                    return items.some(item => {
-                      if (item.type === 'file' && item.name === file.name) {
-                        return true;
-                      }
-                      if (item.type === 'folder') {
-                        return fileExists(item.children);
-                      }
-                      return false;
-                    });
-                  };
-
-                  if (!fileExists(state.fileTree.children)) {
-                    // Add new file to fileTree
-                    state.fileTree.children.push({
-                      name: file.name,
-                      type: 'file',
-                      content: file.content || '',
-                      uploadPath: file.path
-                    });
-
-                    // Update current project's fileTree
-                    if (state.currentProject) {
-                      state.currentProject.fileTree = state.fileTree;
-
-                      // Save to database
-                      fetch('/api/projects', {
-                        method: 'PUT',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({
-                          projectId: state.currentProject.id,
-                          name: state.currentProject.name,
-                          description: state.currentProject.description,
-                          fileTree: state.fileTree
-                        })
-                      }).catch(error => {
-                        console.error('Error saving new files to project:', error);
-                      });
-                    }
-                  }
+                  if (resolveFilePath(state.fileIndex, file.name)) return;
+                  addIndexedItem(state.fileIndex, '', {
+                    name: file.name,
+                    type: 'file',
+                    content: file.content || '',
+                    uploadPath: file.path
+                  });
+                  added = true;
                 });
 
+                // Save to database
+                if (added) commitFileTree(state, 'Error saving new files to project:');
+
                 // Add message about new files to output
                 const filesList = newFiles.map((f: any) => f.name).join(', ');
                 result.output += `\n[INFO] New files created: ${filesList}`;
@@ -696,25 +1409,425 @@ if not os.path.exists('${file.name}'):
       }
 
       set(produce((state: EditorState) => {
-        state.output += result.output;
-        if (result.error) {
-          state.output += `\nError:\n${result.error}`;
-        }
+        state.lastRunMetrics = result.metrics || null;
+        state.output += result.output;
+        if (result.error) {
+          state.output += `\nError:\n${result.error}`;
+        }
+        const resources = result.metrics?.resources;
+        if (resources && !resources.oom && resources.throttledMs >= 1000) {
+          state.output += `\n[INFO] CPU was throttled for ${(resources.throttledMs / 1000).toFixed(1)}s by your plan's CPU limit.`;
+        }
+      }));
+
+      // The server meters the run; mirror its charge locally
+      incrementCodeRun(result.metrics?.creditsCharged);
+    } catch (error) {
+      console.error("Code execution error:", error);
+      set(produce((state: EditorState) => {
+        state.output += "An unexpected error occurred during execution.";
+      }));
+    } finally {
+      set({ isCodeRunning: false });
+    }
+  },
+
+  runTests: async () => {
+    const { currentProject, checkCreditLimit, incrementCodeRun } = get();
+
+    if (checkCreditLimit()) {
+      set({ output: `[${new Date().toLocaleTimeString()}] Credit limit reached! Please upgrade to premium to continue running code.` });
+      return;
+    }
+
+    get().detachBackgroundJob();
+    set({ isCodeRunning: true, output: `[${new Date().toLocaleTimeString()}] Running tests...\n\n` });
+
+    try {
+      const token = localStorage.getItem('pycode-user-token');
+      const response = await fetch('/api/code/test', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${token || ''}`
+        },
+        body: JSON.stringify({
+          projectId: currentProject?.id,
+          files: await collectAllProjectFiles()
+        })
+      });
+
+      if (!response.ok || !response.body) {
+        const errorData = await response.json().catch(() => ({}));
+        appendOutput(`Error: ${errorData.error || `Test run failed (HTTP ${response.status})`}\n`);
+        return;
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = '';
+      let creditsCharged: number | undefined;
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split('\n');
+        buffered = lines.pop() || '';
+
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const event = JSON.parse(line);
+          if (event.type === 'start') {
+            if (event.files.length === 0) {
+              appendOutput('[INFO] No tests found. Test files must be named test_*.py or *_test.py.\n');
+            } else {
+              appendOutput(`[INFO] Collected ${event.files.length} test file(s), ${event.cachedFiles.length} unchanged since last run, ${event.workers} worker(s)\n`);
+            }
+          } else if (event.type === 'test') {
+            const label = event.outcome.toUpperCase();
+            const cached = event.cached ? ' [cached]' : '';
+            appendOutput(`${label} ${event.nodeId} (${Math.round(event.durationMs)} ms)${cached}\n`);
+            if (event.message) {
+              appendOutput(`${event.message}\n`);
+            }
+          } else if (event.type === 'output') {
+            appendOutput(`${event.text}\n`);
+          } else if (event.type === 'summary') {
+            creditsCharged = event.creditsCharged;
+            appendOutput(`\n[INFO] ${event.passed} passed, ${event.failed} failed, ${event.skipped} skipped, ${event.errors} errors (${event.cached} from cache) in ${(event.durationMs / 1000).toFixed(2)}s\n`);
+          }
+        }
+      }
+
+      incrementCodeRun(creditsCharged);
+    } catch (error) {
+      console.error("Test run error:", error);
+      appendOutput("An unexpected error occurred while running tests.");
+    } finally {
+      flushOutput();
+      set({ isCodeRunning: false });
+    }
+  },
+
+  runInBackground: async () => {
+    const { activeFilePath, currentProject, checkCreditLimit } = get();
+    const activeFile = selectActiveFile(get());
+    if (!activeFile || !activeFilePath) {
+      set({ output: `[${new Date().toLocaleTimeString()}] No active file to run.` });
+      return;
+    }
+
+    if (checkCreditLimit()) {
+      set({ output: `[${new Date().toLocaleTimeString()}] Credit limit reached! Please upgrade to premium to continue running code.` });
+      return;
+    }
+
+    // Ask now, while handling a click, so the finish notification can be shown later
+    if (typeof window !== 'undefined' && 'Notification' in window && Notification.permission === 'default') {
+      Notification.requestPermission().catch(() => undefined);
+    }
+
+    try {
+      const token = localStorage.getItem('pycode-user-token');
+      const response = await fetch('/api/jobs', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${token || ''}`
+        },
+        body: JSON.stringify({
+          code: activeFile.content,
+          projectId: currentProject?.id,
+          fileName: activeFilePath,
+          files: await collectAllProjectFiles()
+        })
+      });
+      const data = await response.json().catch(() => ({}));
+      if (!response.ok || !data.job) {
+        set({ output: `[${new Date().toLocaleTimeString()}] Error: ${data.error || `Could not start background run (HTTP ${response.status})`}` });
+        return;
+      }
+
+      set(produce((state: EditorState) => {
+        state.backgroundJobs.unshift(data.job);
+      }));
+      await get().attachBackgroundJob(data.job.id);
+    } catch (error) {
+      console.error('Background run error:', error);
+      set({ output: `[${new Date().toLocaleTimeString()}] An unexpected error occurred while starting the background run.` });
+    }
+  },
+
+  loadBackgroundJobs: async () => {
+    const { currentProject, attachedJobId } = get();
+    const token = localStorage.getItem('pycode-user-token');
+    if (!token) return;
+
+    try {
+      const query = currentProject ? `?projectId=${encodeURIComponent(currentProject.id)}` : '';
+      const response = await fetch(`/api/jobs${query}`, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      if (!response.ok) return;
+
+      const { jobs } = await response.json() as { jobs: BackgroundJob[] };
+      set({ backgroundJobs: jobs });
+
+      // Reattach to a run that was still going when the page was left
+      const running = jobs.find(job => job.status === 'running');
+      if (running && !attachedJobId) {
+        get().attachBackgroundJob(running.id);
+      }
+    } catch (error) {
+      console.error('Error loading background jobs:', error);
+    }
+  },
+
+  attachBackgroundJob: async (jobId: string) => {
+    jobStreamController?.abort();
+    const controller = new AbortController();
+    jobStreamController = controller;
+
+    const job = get().backgroundJobs.find(j => j.id === jobId);
+    discardPendingOutput();
+    set({
+      attachedJobId: jobId,
+      output: `[${new Date().toLocaleTimeString()}] Attached to background run${job?.fileName ? ` of ${job.fileName}` : ''}. It keeps running if you leave this page.\n\n`
+    });
+
+    const updateJob = (updated: BackgroundJob) => set(produce((state: EditorState) => {
+      const index = state.backgroundJobs.findIndex(j => j.id === updated.id);
+      if (index === -1) {
+        state.backgroundJobs.unshift(updated);
+      } else {
+        state.backgroundJobs[index] = updated;
+      }
+    }));
+
+    try {
+      const token = localStorage.getItem('pycode-user-token');
+      const response = await fetch(`/api/jobs/stream?jobId=${encodeURIComponent(jobId)}`, {
+        headers: { 'Authorization': `Bearer ${token || ''}` },
+        signal: controller.signal
+      });
+
+      if (!response.ok || !response.body) {
+        const errorData = await response.json().catch(() => ({}));
+        appendOutput(`Error: ${errorData.error || `Could not attach to background run (HTTP ${response.status})`}\n`);
+        return;
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+        const events = buffered.split('\n\n');
+        buffered = events.pop() || '';
+
+        for (const rawEvent of events) {
+          let type = 'message';
+          let data = '';
+          for (const line of rawEvent.split('\n')) {
+            if (line.startsWith('event: ')) type = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+          }
+          if (!data) continue;
+          const payload = JSON.parse(data);
+
+          if (type === 'job') {
+            updateJob(payload);
+          } else if (type === 'output') {
+            appendOutput(payload.text);
+          } else if (type === 'done' && payload) {
+            const finished = payload as BackgroundJob;
+            updateJob(finished);
+            const seconds = finished.finishedAt && finished.startedAt
+              ? ` in ${((finished.finishedAt - finished.startedAt) / 1000).toFixed(1)}s`
+              : '';
+            appendOutput(`\n[INFO] Background run ${finished.status}${seconds}.\n`);
+            if (finished.error && finished.status !== 'succeeded') {
+              appendOutput(`Error:\n${finished.error}\n`);
+            }
+            if (finished.artifacts && finished.artifacts.length > 0) {
+              appendOutput(`[INFO] Files written: ${finished.artifacts.map(a => a.path).join(', ')}\n`);
+            }
+            // Background runs are billed when they finish
+            get().incrementCodeRun(finished.metrics?.creditsCharged);
+            notifyJobFinished(finished);
+          } else if (type === 'error') {
+            appendOutput(`Error: ${payload.error}\n`);
+          }
+        }
+      }
+    } catch (error: any) {
+      if (error?.name !== 'AbortError') {
+        console.error('Background job stream error:', error);
+        appendOutput('\n[INFO] Lost connection to the background run. It is still running; reattach from the Jobs tab.\n');
+      }
+    } finally {
+      if (jobStreamController === controller) {
+        flushOutput();
+        jobStreamController = null;
+        set({ attachedJobId: null });
+      }
+    }
+  },
+
+  detachBackgroundJob: () => {
+    jobStreamController?.abort();
+    jobStreamController = null;
+    discardPendingOutput();
+    set({ attachedJobId: null });
+  },
+
+  cancelBackgroundJob: async (jobId: string) => {
+    try {
+      const token = localStorage.getItem('pycode-user-token');
+      const response = await fetch(`/api/jobs?jobId=${encodeURIComponent(jobId)}`, {
+        method: 'DELETE',
+        headers: { 'Authorization': `Bearer ${token || ''}` }
+      });
+      const data = await response.json().catch(() => ({}));
+      if (response.ok && data.job) {
+        set(produce((state: EditorState) => {
+          const index = state.backgroundJobs.findIndex(j => j.id === jobId);
+          if (index !== -1) state.backgroundJobs[index] = data.job;
+        }));
+      }
+    } catch (error) {
+      console.error('Error cancelling background job:', error);
+    }
+  },
+
+  downloadJobArtifact: async (jobId: string, path: string) => {
+    try {
+      const token = localStorage.getItem('pycode-user-token');
+      const response = await fetch(`/api/jobs/artifact?jobId=${encodeURIComponent(jobId)}&path=${encodeURIComponent(path)}`, {
+        headers: { 'Authorization': `Bearer ${token || ''}` }
+      });
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+      }
+      saveAs(await response.blob(), path.split('/').pop() || path);
+    } catch (error) {
+      console.error('Error downloading job artifact:', error);
+    }
+  },
+
+  loadSchedules: async () => {
+    const { currentProject } = get();
+    const token = localStorage.getItem('pycode-user-token');
+    if (!token || !currentProject) return;
+
+    try {
+      const response = await fetch(`/api/schedules?projectId=${encodeURIComponent(currentProject.id)}`, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      if (!response.ok) return;
+      const { schedules } = await response.json();
+      set({ schedules });
+    } catch (error) {
+      console.error('Error loading schedules:', error);
+    }
+  },
+
+  addSchedule: async (cron: string) => {
+    const { currentProject, activeFilePath } = get();
+    if (!currentProject || !activeFilePath) {
+      return { success: false, error: 'Open a project file to schedule it' };
+    }
+
+    try {
+      const token = localStorage.getItem('pycode-user-token');
+      const response = await fetch('/api/schedules', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${token || ''}`
+        },
+        body: JSON.stringify({
+          projectId: currentProject.id,
+          fileName: activeFilePath,
+          cron,
+          files: await collectAllProjectFiles()
+        })
+      });
+      const data = await response.json().catch(() => ({}));
+      if (!response.ok) {
+        return { success: false, error: data.error || `HTTP ${response.status}` };
+      }
+      set(produce((state: EditorState) => {
+        state.schedules.push(data.schedule);
+      }));
+      return { success: true };
+    } catch (error) {
+      console.error('Error creating schedule:', error);
+      return { success: false, error: 'Could not create schedule' };
+    }
+  },
+
+  toggleSchedule: async (scheduleId: string, enabled: boolean) => {
+    try {
+      const token = localStorage.getItem('pycode-user-token');
+      const response = await fetch('/api/schedules', {
+        method: 'PUT',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${token || ''}`
+        },
+        body: JSON.stringify({ scheduleId, enabled })
+      });
+      if (!response.ok) return;
+      const { schedule } = await response.json();
+      set(produce((state: EditorState) => {
+        const index = state.schedules.findIndex(s => s.id === scheduleId);
+        if (index !== -1) state.schedules[index] = schedule;
       }));
-
-      // Increment code run counter
-      incrementCodeRun();
     } catch (error) {
-      console.error("Code execution error:", error);
+      console.error('Error updating schedule:', error);
+    }
+  },
+
+  removeSchedule: async (scheduleId: string) => {
+    try {
+      const token = localStorage.getItem('pycode-user-token');
+      const response = await fetch(`/api/schedules?scheduleId=${encodeURIComponent(scheduleId)}`, {
+        method: 'DELETE',
+        headers: { 'Authorization': `Bearer ${token || ''}` }
+      });
+      if (!response.ok) return;
       set(produce((state: EditorState) => {
-        state.output += "An unexpected error occurred during execution.";
+        state.schedules = state.schedules.filter(s => s.id !== scheduleId);
       }));
-    } finally {
-      set({ isCodeRunning: false });
+    } catch (error) {
+      console.error('Error deleting schedule:', error);
+    }
+  },
+
+  fetchScheduleHistory: async (scheduleId: string) => {
+    try {
+      const token = localStorage.getItem('pycode-user-token');
+      const response = await fetch(`/api/schedules/history?scheduleId=${encodeURIComponent(scheduleId)}`, {
+        headers: { 'Authorization': `Bearer ${token || ''}` }
+      });
+      if (!response.ok) return [];
+      const { history } = await response.json();
+      return history;
+    } catch (error) {
+      console.error('Error loading schedule history:', error);
+      return [];
     }
   },
 
-  clearOutput: () => set({ output: '' }),
+  clearOutput: () => {
+    discardPendingOutput();
+    set({ output: '' });
+  },
 
   sendMessage: async (message, attachCode, provider?: 'gemini' | 'openai') => {
     if (!message.trim()) return;
@@ -736,25 +1849,14 @@ if not os.path.exists('${file.name}'):
     }));
 
     try {
-      const { activeFile, updateFileContent, addNewFile } = get();
+      const { activeFilePath, fileIndex, updateFileContent, addNewFile } = get();
+      const activeFile = selectActiveFile(get());
 
       const instruction = message.toLowerCase();
       const isCreatingFile = instruction.includes('create a file') || instruction.includes('make a file');
 
       // Get all files in the project for context
-      const getAllFiles = (items: FileOrFolder[]): File[] => {
-        const files: File[] = [];
-        for (const item of items) {
-          if (item.type === 'file') {
-            files.push(item as File);
-          } else if (item.type === 'folder' && item.children) {
-            files.push(...getAllFiles(item.children));
-          }
-        }
-        return files;
-      };
-
-      const projectFiles = getAllFiles(get().fileTree.children);
+      const projectFiles = listFilePaths(fileIndex).map(path => fileIndex.files[path]);
       const uploadedFiles = projectFiles.map(file => ({
         name: file.name,
         content: file.content,
@@ -785,8 +1887,8 @@ if not os.path.exists('${file.name}'):
 
       if (newCode !== undefined && newCode !== null) {
         if (newFileName) {
-          // Check if file already exists in openFiles
-          const existingFile = get().openFiles.find((f: File) => f.name === newFileName);
+          // Check if file already exists in the project
+          const existingFile = resolveFilePath(get().fileIndex, newFileName);
 
           if (existingFile) {
             // File exists - update it
@@ -797,10 +1899,10 @@ if not os.path.exists('${file.name}'):
             console.log('[AI] Creating new file:', newFileName);
             addNewFile(newFileName, newCode);
           }
-        } else if (activeFile) {
+        } else if (activeFilePath) {
           // AI is updating the currently active file
-          console.log('[AI] Updating active file:', activeFile.name);
-          updateFileContent(activeFile.name, newCode);
+          console.log('[AI] Updating active file:', activeFilePath);
+          updateFileContent(activeFilePath, newCode);
         }
       }
     } catch (error: any) {
@@ -881,7 +1983,7 @@ The system will automatically retry your request when capacity becomes available
       }
 
       // Fallback response for common requests
-      const fallbackResponse = getFallbackResponse(message, get().activeFile?.content || '');
+      const fallbackResponse = getFallbackResponse(message, selectActiveFile(get())?.content || '');
 
       set(produce((state: EditorState) => {
         state.chatHistory.push({ role: 'assistant', message: fallbackResponse });
@@ -889,7 +1991,7 @@ The system will automatically retry your request when capacity becomes available
 
       // Handle complex project creation requests
       const lowerMessage = message.toLowerCase();
-      const { addNewFile, addNewFolder, updateFileContent, activeFile } = get();
+      const { addNewFile, addNewFolder, updateFileContent, activeFilePath } = get();
 
       if (lowerMessage.includes('snake game') || lowerMessage.includes('make a snake game')) {
         // Create a complete snake game project structure
@@ -1114,8 +2216,8 @@ SNAKE_BODY_COLOR = "grey"
 SCORE_COLOR = "white"`);
 
         // Update main.py to import and run the game
-        if (activeFile) {
-          updateFileContent(activeFile.name, `from snake_game.game import SnakeGame
+        if (activeFilePath) {
+          updateFileContent(activeFilePath, `from snake_game.game import SnakeGame
 
 if __name__ == "__main__":
     print("Starting Snake Game...")
@@ -1288,8 +2390,8 @@ Edit \`config.py\` to customize:
 ## Legal Notice
 Always respect robots.txt and website terms of service when scraping.`);
 
-        if (activeFile) {
-          updateFileContent(activeFile.name, `from web_scraper.scraper import WebScraper
+        if (activeFilePath) {
+          updateFileContent(activeFilePath, `from web_scraper.scraper import WebScraper
 
 # Example: Scrape a website
 scraper = WebScraper("https://httpbin.org")
@@ -1318,7 +2420,7 @@ print("Web scraping completed!")`);
   },
 
   fetchQuickActions: async () => {
-    const { activeFile } = get();
+    const activeFile = selectActiveFile(get());
     if (activeFile && activeFile.content) {
       try {
         const { actions, codeContext } = await decideCodeAssistanceActions({ code: activeFile.content });
@@ -1332,210 +2434,113 @@ print("Web scraping completed!")`);
   },
 
   addNewFile: (name, content = '') => set(produce((state: EditorState) => {
-    const fileExists = (items: FileOrFolder[]): boolean => {
-      return items.some(item => {
-        if (item.type === 'file' && item.name === name) return true;
-        if (item.type === 'folder') return fileExists(item.children);
-        return false;
-      });
-    };
+    // A name with slashes (snake_game/game.py) goes into those folders
+    const path = name.split('/').filter(Boolean).join('/');
+    if (!path) return;
 
-    if (fileExists(state.fileTree.children)) {
+    if (path in state.fileIndex.files) {
       // Don't alert, just open the existing file.
-      const fileToOpen = get().openFiles.find(f => f.name === name);
-      if (fileToOpen) {
-        state.activeFile = fileToOpen;
-      }
+      if (!state.openFilePaths.includes(path)) state.openFilePaths.push(path);
+      state.activeFilePath = path;
+      return;
+    }
+    if (path in state.fileIndex.children) {
+      console.warn('[addNewFile] A folder already has this path:', path);
       return;
     }
 
-    const newFile: File = { name, type: 'file', content: content || `# ${name}\n\n` };
-    state.fileTree.children.push(newFile);
+    const folder = ensureIndexedFolder(state.fileIndex, path.includes('/') ? path.slice(0, path.lastIndexOf('/')) : '');
+    if (folder === null) {
+      console.warn('[addNewFile] A file is in the way of the folders of', path);
+      return;
+    }
+    const fileName = path.slice(path.lastIndexOf('/') + 1);
+    addIndexedItem(state.fileIndex, folder, { name: fileName, type: 'file', content: content || `# ${fileName}\n\n` });
 
     // Open the new file
-    if (!state.openFiles.find(f => f.name === newFile.name)) {
-      state.openFiles.push(newFile);
-    }
-    state.activeFile = newFile;
+    state.openFilePaths.push(path);
+    state.activeFilePath = path;
 
     // Save to database if there's a current project
-    if (state.currentProject) {
-      state.currentProject.fileTree = state.fileTree;
-      state.currentProject.updatedAt = new Date();
-
-      // Update in projects array
-      const projectIndex = state.projects.findIndex(p => p.id === state.currentProject!.id);
-      if (projectIndex !== -1) {
-        state.projects[projectIndex] = { ...state.currentProject! };
-      }
-
-      // Save to localStorage
-      localStorage.setItem('pycode-projects', JSON.stringify(state.projects));
-
-      // Save to database
-      saveProjectToDatabase(
-        state.currentProject.id,
-        state.currentProject.name,
-        state.currentProject.description,
-        state.fileTree
-      ).catch(error => {
-        console.error('Error saving new file to database:', error);
-      });
-    }
+    commitFileTree(state, 'Error saving new file to database:');
   })),
 
   addNewFileFromUpload: (name: string, path: string, content: string) => set(produce((state: EditorState) => {
-    const newFile: File = {
+    // An upload whose name is taken comes in as name (1).py
+    const filePath = addIndexedItem(state.fileIndex, '', {
       name,
       type: 'file',
       content,
       uploadPath: path // Store the upload path for reference
-    };
-    state.fileTree.children.push(newFile);
+    });
 
     // Open the new file
-    if (!state.openFiles.find(f => f.name === newFile.name)) {
-      state.openFiles.push(newFile);
+    if (!state.openFilePaths.includes(filePath)) {
+      state.openFilePaths.push(filePath);
     }
-    state.activeFile = newFile;
+    state.activeFilePath = filePath;
 
     // Auto-save project to database
-    if (state.currentProject) {
-      state.currentProject.fileTree = state.fileTree;
-      state.currentProject.updatedAt = new Date();
-
-      // Update in projects array
-      const projectIndex = state.projects.findIndex(p => p.id === state.currentProject!.id);
-      if (projectIndex !== -1) {
-        state.projects[projectIndex] = state.currentProject!;
-      }
-
-      // Save to localStorage
-      localStorage.setItem('pycode-projects', JSON.stringify(state.projects));
-
-      // Save to database
-      saveProjectToDatabase(
-        state.currentProject.id,
-        state.currentProject.name,
-        state.currentProject.description,
-        state.fileTree
-      ).catch(error => {
-        console.error('Error auto-saving project after file upload:', error);
-      });
-    }
+    commitFileTree(state, 'Error auto-saving project after file upload:');
   })),
 
-  deleteFile: (path) => set(produce((state: EditorState) => {
-    let currentLevel: FileOrFolder[] = state.fileTree.children;
-    for (let i = 0; i < path.length - 1; i++) {
-      const segment = path[i];
-      const nextLevel = currentLevel.find(item => item.name === segment && item.type === 'folder') as Folder;
-      if (nextLevel) {
-        currentLevel = nextLevel.children;
-      } else {
-        return; // Path not found
-      }
-    }
-
-    const fileNameToDelete = path[path.length - 1];
-    const fileIndex = currentLevel.findIndex(item => item.name === fileNameToDelete);
-
-    if (fileIndex !== -1) {
-      currentLevel.splice(fileIndex, 1);
+  deleteFile: (segments) => set(produce((state: EditorState) => {
+    const path = segments.join('/');
+    if (!(path in state.fileIndex.parents)) return; // Path not found
 
-      // Close the tab if it's open
-      const openFileIndex = state.openFiles.findIndex(f => f.name === fileNameToDelete);
-      if (openFileIndex !== -1) {
-        state.openFiles.splice(openFileIndex, 1);
-        if (state.activeFile?.name === fileNameToDelete) {
-          state.activeFile = state.openFiles[Math.max(0, openFileIndex - 1)] || state.openFiles[0] || null;
-        }
-      }
-
-      // Save to database if there's a current project
-      if (state.currentProject) {
-        state.currentProject.fileTree = state.fileTree;
-        state.currentProject.updatedAt = new Date();
-
-        // Update in projects array
-        const projectIndex = state.projects.findIndex(p => p.id === state.currentProject!.id);
-        if (projectIndex !== -1) {
-          state.projects[projectIndex] = { ...state.currentProject! };
-        }
+    removeIndexedItem(state.fileIndex, path);
 
-        // Save to localStorage
-        localStorage.setItem('pycode-projects', JSON.stringify(state.projects));
-
-        // Save to database
-        saveProjectToDatabase(
-          state.currentProject.id,
-          state.currentProject.name,
-          state.currentProject.description,
-          state.fileTree
-        ).catch(error => {
-          console.error('Error saving file deletion to database:', error);
-        });
-      }
+    // Close the tabs of everything that went with it
+    const activeIndex = state.activeFilePath ? state.openFilePaths.indexOf(state.activeFilePath) : -1;
+    state.openFilePaths = state.openFilePaths.filter(openPath => openPath in state.fileIndex.files);
+    if (state.activeFilePath && !(state.activeFilePath in state.fileIndex.files)) {
+      state.activeFilePath = state.openFilePaths[Math.max(0, activeIndex - 1)] || state.openFilePaths[0] || null;
     }
+
+    // Save to database if there's a current project
+    commitFileTree(state, 'Error saving file deletion to database:');
   })),
 
   downloadProjectAsZip: () => {
-    const zip = new JSZip();
-    const projectFolder = zip.folder(get().fileTree.name.replace(/\s/g, '_'));
-
-    const addFilesToZip = (folder: JSZip | null, items: FileOrFolder[]) => {
-      if (!folder) return;
-      items.forEach(item => {
-        if (item.type === 'file') {
-          folder.file(item.name, item.content);
-        } else if (item.type === 'folder') {
-          const subFolder = folder.folder(item.name);
-          addFilesToZip(subFolder, item.children);
-        }
-      });
-    };
+    // Every body has to be loaded before it goes into the archive
+    get().loadFileContents().then(() => {
+      const fileTree = selectFileTree(get());
+      const zip = new JSZip();
+      const projectFolder = zip.folder(fileTree.name.replace(/\s/g, '_'));
+
+      const addFilesToZip = (folder: JSZip | null, items: FileOrFolder[]) => {
+        if (!folder) return;
+        items.forEach(item => {
+          if (item.type === 'file') {
+            folder.file(item.name, item.content);
+          } else if (item.type === 'folder') {
+            const subFolder = folder.folder(item.name);
+            addFilesToZip(subFolder, item.children);
+          }
+        });
+      };
 
-    addFilesToZip(projectFolder, get().fileTree.children);
+      addFilesToZip(projectFolder, fileTree.children);
 
-    zip.generateAsync({ type: "blob" }).then(content => {
-      saveAs(content, `${get().fileTree.name.replace(/\s/g, '_')}.zip`);
+      zip.generateAsync({ type: "blob" }).then(content => {
+        saveAs(content, `${fileTree.name.replace(/\s/g, '_')}.zip`);
+      });
     });
   },
 
   addNewFolder: (name: string) => {
-    const newFolder: Folder = {
-      name,
-      type: 'folder',
-      children: [],
-    };
+    const path = name.split('/').filter(Boolean).join('/');
+    if (!path) return;
 
     set(produce((state: EditorState) => {
-      state.fileTree.children.push(newFolder);
+      if (path in state.fileIndex.children) return;
+      if (ensureIndexedFolder(state.fileIndex, path) === null) {
+        console.warn('[addNewFolder] A file is in the way of', path);
+        return;
+      }
 
       // Update current project if exists
-      if (state.currentProject) {
-        state.currentProject.fileTree = state.fileTree;
-        state.currentProject.updatedAt = new Date();
-
-        // Update in projects array
-        const projectIndex = state.projects.findIndex(p => p.id === state.currentProject!.id);
-        if (projectIndex !== -1) {
-          state.projects[projectIndex] = { ...state.currentProject! };
-        }
-
-        // Save to localStorage
-        localStorage.setItem('pycode-projects', JSON.stringify(state.projects));
-
-        // Save to database
-        saveProjectToDatabase(
-          state.currentProject.id,
-          state.currentProject.name,
-          state.currentProject.description,
-          state.fileTree
-        ).catch(error => {
-          console.error('Error saving new folder to database:', error);
-        });
-      }
+      commitFileTree(state, 'Error saving new folder to database:');
     }));
   },
 
@@ -1592,12 +2597,11 @@ print("Web scraping completed!")`);
         set(produce((state: EditorState) => {
           state.projects.push(newProject);
           state.currentProject = newProject;
-          state.fileTree = newProject.fileTree;
-          state.openFiles = [newProject.fileTree.children[0] as File];
-          state.activeFile = newProject.fileTree.children[0] as File;
+          showFileTree(state, newProject.fileTree);
           state.chatHistory = [];
           state.output = '';
         }));
+        cacheProjectSoon(newProject.id);
       } else {
         let errorMessage = 'Failed to create project'
         try {
@@ -1623,7 +2627,9 @@ print("Web scraping completed!")`);
       }
 
       console.log('[loadUserProjects] Loading projects for user:', currentUser.id);
-      const response = await fetch(`/api/projects?userId=${currentUser.id}`);
+      // List entries only; a project's tree is fetched when it is opened.
+      // The browser revalidates with the ETag, so an unchanged list is a 304.
+      const response = await fetch(`/api/projects?userId=${currentUser.id}&view=summary`);
 
       if (response.ok) {
         const data = await response.json();
@@ -1633,83 +2639,19 @@ print("Web scraping completed!")`);
           console.warn('[loadUserProjects] Invalid projects data received:', data);
           set(produce((state: EditorState) => {
             state.projects = [];
+            state.projectsNextCursor = null;
           }));
           return [];
         }
 
-        const loadedProjects = data.projects.map((project: any) => {
-          let fileTree: Folder;
-          try {
-            // Handle different JSON formats from MySQL
-            let rawFileTree = project.file_tree;
-
-            // MySQL JSON columns can return as string, object, or null
-            if (rawFileTree === null || rawFileTree === undefined) {
-              console.warn(`[loadUserProjects] Project ${project.id} has null file_tree, creating default`);
-              rawFileTree = JSON.stringify({
-                name: project.name,
-                type: 'folder',
-                children: [{
-                  name: 'main.py',
-                  type: 'file',
-                  content: `# ${project.name}\nprint("Hello from ${project.name}!")\n`
-                }]
-              });
-            }
-
-            if (typeof rawFileTree === 'string') {
-              // Try parsing the string
-              if (rawFileTree.trim() === '') {
-                throw new Error('Empty file_tree string');
-              }
-              fileTree = JSON.parse(rawFileTree);
-            } else if (typeof rawFileTree === 'object') {
-              // Already parsed (shouldn't happen with mysql2, but handle it)
-              fileTree = rawFileTree;
-            } else {
-              throw new Error(`Unexpected file_tree type: ${typeof rawFileTree}`);
-            }
-
-            // Validate fileTree structure
-            if (!fileTree || typeof fileTree !== 'object' || !fileTree.name) {
-              throw new Error('Invalid fileTree structure after parsing');
-            }
-
-            // Validate it has children array
-            if (!Array.isArray(fileTree.children)) {
-              console.warn(`[loadUserProjects] Project ${project.id} has invalid children, initializing empty array`);
-              fileTree.children = [];
-            }
-
-            console.log(`[loadUserProjects] Successfully loaded project ${project.id} with ${fileTree.children.length} items`);
-          } catch (error: any) {
-            console.error(`[loadUserProjects] Error parsing file_tree for project ${project.id}:`, error.message);
-            // Fallback to default file tree structure
-            fileTree = {
-              name: project.name,
-              type: 'folder',
-              children: [{
-                name: 'main.py',
-                type: 'file',
-                content: `# ${project.name}\nprint("Hello from ${project.name}!")\n`
-              }]
-            };
-          }
-
-          return {
-            id: project.id,
-            name: project.name,
-            description: project.description || '',
-            fileTree,
-            createdAt: new Date(project.created_at),
-            updatedAt: new Date(project.updated_at)
-          };
-        });
+        const known = new Map(get().projects.map(project => [project.id, project]));
+        const loadedProjects: Project[] = data.projects.map((row: any) => projectFromSummary(row, known.get(row.id)));
 
         console.log('[loadUserProjects] Successfully loaded', loadedProjects.length, 'projects');
 
         set(produce((state: EditorState) => {
           state.projects = loadedProjects;
+          state.projectsNextCursor = data.nextCursor || null;
         }));
 
         return loadedProjects;
@@ -1765,92 +2707,134 @@ print("Web scraping completed!")`);
     }
   },
 
-  loadProject: async (projectId: string) => {
+  loadMoreProjects: async () => {
+    const { currentUser, projectsNextCursor } = get();
+    if (!currentUser || !projectsNextCursor) return;
+
     try {
-      console.log('[loadProject] Loading project:', projectId);
+      const response = await fetch(`/api/projects?userId=${currentUser.id}&view=summary&cursor=${encodeURIComponent(projectsNextCursor)}`);
+      if (!response.ok) {
+        console.error('[loadMoreProjects] Failed to load projects:', response.status);
+        return;
+      }
+      const data = await response.json();
+      set(produce((state: EditorState) => {
+        for (const row of data.projects || []) {
+          if (!state.projects.some(project => project.id === row.id)) {
+            state.projects.push(projectFromSummary(row));
+          }
+        }
+        state.projectsNextCursor = data.nextCursor || null;
+      }));
+    } catch (error) {
+      console.error('[loadMoreProjects] Error loading projects:', error);
+    }
+  },
 
-      // First, try to fetch directly from database to get the latest data
-      const projectResponse = await fetch(`/api/projects?projectId=${projectId}`);
+  searchProjects: async (query, signal) => {
+    const token = localStorage.getItem('pycode-user-token');
+    if (!token || !query.trim()) return [];
 
-      let project: Project | null = null;
+    const response = await fetch(`/api/projects/search?q=${encodeURIComponent(query.trim())}`, {
+      headers: { 'Authorization': `Bearer ${token}` },
+      signal,
+    });
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.error || `Search failed (HTTP ${response.status})`);
+    }
+    const data = await response.json();
+    return data.results || [];
+  },
 
-      if (projectResponse.ok) {
-        const projectData = await projectResponse.json();
-        if (projectData.project) {
-          let fileTree: Folder;
-          try {
-            // Handle different JSON formats from MySQL
-            let rawFileTree = projectData.project.file_tree;
-
-            // MySQL JSON columns can return as string, object, or null
-            if (rawFileTree === null || rawFileTree === undefined) {
-              console.warn(`[loadProject] Project ${projectId} has null file_tree, creating default`);
-              rawFileTree = JSON.stringify({
-                name: projectData.project.name,
-                type: 'folder',
-                children: [{
-                  name: 'main.py',
-                  type: 'file',
-                  content: `# ${projectData.project.name}\nprint("Hello from ${projectData.project.name}!")\n`
-                }]
-              });
-            }
+  searchFiles: async (query, options = {}) => {
+    const token = localStorage.getItem('pycode-user-token');
+    const projectId = get().currentProject?.id;
+    const empty: CodeSearchResult = { files: [], totalMatches: 0, truncated: false, scannedFiles: 0 };
+    if (!token || !projectId || !query) return empty;
 
-            if (typeof rawFileTree === 'string') {
-              if (rawFileTree.trim() === '') {
-                throw new Error('Empty file_tree string');
-              }
-              fileTree = JSON.parse(rawFileTree);
-            } else if (typeof rawFileTree === 'object') {
-              fileTree = rawFileTree;
-            } else {
-              throw new Error(`Unexpected file_tree type: ${typeof rawFileTree}`);
-            }
+    // The server searches the saved files, so send edits still being debounced
+    await flushPendingAutosave(projectId);
 
-            // Validate fileTree structure
-            if (!fileTree || typeof fileTree !== 'object' || !fileTree.name) {
-              throw new Error('Invalid fileTree structure after parsing');
-            }
+    const params = new URLSearchParams({
+      projectId,
+      q: query,
+      regex: String(!!options.regex),
+      caseSensitive: String(!!options.caseSensitive),
+    });
+    const response = await fetch(`/api/files/search?${params}`, {
+      headers: { 'Authorization': `Bearer ${token}` },
+      signal: options.signal,
+    });
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.details || errorData.error || `Search failed (HTTP ${response.status})`);
+    }
+    const data = await response.json();
+    return { ...empty, ...data };
+  },
 
-            // Validate it has children array
-            if (!Array.isArray(fileTree.children)) {
-              console.warn(`[loadProject] Project ${projectId} has invalid children, initializing empty array`);
-              fileTree.children = [];
-            }
+  openFileAt: (path, line, column) => {
+    if (!(path in get().fileIndex.files)) return;
+    get().openFile(path);
+    if (line) {
+      set({ revealPosition: { path, line, column: column || 1 } });
+    }
+  },
 
-            console.log(`[loadProject] Successfully loaded project ${projectId} with ${fileTree.children.length} items`);
-          } catch (error: any) {
-            console.error(`[loadProject] Error parsing file_tree for project ${projectId}:`, error.message);
-            // Fallback to default file tree structure
-            fileTree = {
-              name: projectData.project.name,
-              type: 'folder',
-              children: [{
-                name: 'main.py',
-                type: 'file',
-                content: `# ${projectData.project.name}\nprint("Hello from ${projectData.project.name}!")\n`
-              }]
-            };
-          }
+  clearRevealPosition: () => set({ revealPosition: null }),
 
-          project = {
-            id: projectData.project.id,
-            name: projectData.project.name,
-            description: projectData.project.description || '',
-            fileTree,
-            createdAt: new Date(projectData.project.created_at),
-            updatedAt: new Date(projectData.project.updated_at)
-          };
+  loadProject: async (projectId: string) => {
+    try {
+      console.log('[loadProject] Loading project:', projectId);
 
-          console.log('[loadProject] Successfully loaded project from database');
-        }
+      // The tree (without file bodies) is fetched and parsed off the main
+      // thread; the uploaded files' metadata comes alongside
+      const projectRequest = loadProjectTree(projectId);
+      const uploadsRequest = fetch(`/api/files/project?projectId=${projectId}`)
+        .then(response => response.ok ? response.json() : null)
+        .then(data => data ? (data.files || []) as { originalName: string; filePath: string }[] : null)
+        .catch((error) => {
+          console.error('Error loading uploaded files:', error);
+          return null;
+        });
+
+      // Meanwhile show the copy from the offline cache, if there is one
+      const cached = await readCachedProject(projectId).catch(() => null);
+      if (cached && get().currentProject?.id !== projectId) {
+        set(produce((state: EditorState) => {
+          const fileTree: Folder = JSON.parse(JSON.stringify(cached.fileTree));
+          markCachedCopy(fileTree.children);
+          // No project is current until the server's copy is in, so nothing
+          // done to the cached copy is saved over it
+          state.currentProject = null;
+          state.fileIndex = indexFileTree(fileTree);
+          state.activeFilePath = listFilePaths(state.fileIndex)[0] || null;
+          state.openFilePaths = state.activeFilePath ? [state.activeFilePath] : [];
+          state.chatHistory = [];
+          state.output = '';
+        }));
+      }
+
+      const loaded = await projectRequest;
+      let project: Project | null = null;
+
+      if (loaded) {
+        project = {
+          ...loaded,
+          createdAt: new Date(loaded.createdAt),
+          updatedAt: new Date(loaded.updatedAt)
+        };
+        console.log(`[loadProject] Successfully loaded project ${projectId} with ${loaded.fileTree.children.length} items`);
       } else {
         console.warn('[loadProject] Failed to fetch project from database, trying in-memory fallback');
       }
 
-      // Fallback to in-memory array if database fetch fails
+      // Fallback to the offline cache if database fetch fails, then to the
+      // in-memory array (whose tree only changes when files are added or
+      // removed, so the cache has the later edits)
       if (!project) {
-        project = get().projects.find(p => p.id === projectId) || null;
+        project = cached || get().projects.find(p => p.id === projectId && !p.isListing) || null;
       }
 
       if (!project) {
@@ -1858,140 +2842,92 @@ print("Web scraping completed!")`);
         return;
       }
 
-      // Load uploaded files from database and merge with fileTree
-      try {
-        const filesResponse = await fetch(`/api/files/project?projectId=${projectId}`);
-        if (filesResponse.ok) {
-          const filesData = await filesResponse.json();
-          const uploadedFiles = filesData.files || [];
-
-          // Merge uploaded files into fileTree
-          const projectFileTree = { ...project.fileTree };
-
-          // Ensure children array exists
-          if (!projectFileTree.children) {
-            projectFileTree.children = [];
-          }
-
-          // Check if uploaded files are already in fileTree
-          uploadedFiles.forEach((uploadedFile: any) => {
-            const fileName = uploadedFile.originalName;
-            // Check if file already exists in fileTree
-            const fileExists = (items: FileOrFolder[]): boolean => {
-              return items.some(item => {
-                if (item.type === 'file' && item.name === fileName) {
-                  return true;
-                }
-                if (item.type === 'folder') {
-                  return fileExists(item.children);
-                }
-                return false;
-              });
-            };
-
-            if (!fileExists(projectFileTree.children)) {
-              // Add uploaded file to fileTree
-              projectFileTree.children.push({
-                name: fileName,
-                type: 'file',
-                content: uploadedFile.content || '',
-                uploadPath: uploadedFile.filePath
-              });
-            } else {
-              // Update existing file content
-              const updateFile = (items: FileOrFolder[]): boolean => {
-                for (let i = 0; i < items.length; i++) {
-                  if (items[i].type === 'file' && items[i].name === fileName) {
-                    (items[i] as File).content = uploadedFile.content || '';
-                    (items[i] as File).uploadPath = uploadedFile.filePath;
-                    return true;
-                  }
-                  if (items[i].type === 'folder') {
-                    if (updateFile((items[i] as Folder).children)) return true;
-                  }
-                }
-                return false;
-              };
-              updateFile(projectFileTree.children);
-            }
-          });
-
-          // Update projects array with latest project
-          set(produce((state: EditorState) => {
-            const projectIndex = state.projects.findIndex(p => p.id === projectId);
-            if (projectIndex !== -1) {
-              state.projects[projectIndex] = { ...project, fileTree: projectFileTree };
-            } else {
-              state.projects.push({ ...project, fileTree: projectFileTree });
-            }
-
-            state.currentProject = { ...project, fileTree: projectFileTree };
-            state.fileTree = projectFileTree;
-
-            // Get all files from the fileTree (including nested ones)
-            const getAllFiles = (items: FileOrFolder[]): File[] => {
-              const files: File[] = [];
-              for (const item of items) {
-                if (item.type === 'file') {
-                  files.push(item as File);
-                } else if (item.type === 'folder' && item.children) {
-                  files.push(...getAllFiles(item.children));
-                }
-              }
-              return files;
-            };
+      // The fallbacks' trees are shared with other state, so uploads merge into a copy
+      const fileTree: Folder = loaded ? loaded.fileTree : JSON.parse(JSON.stringify(project.fileTree));
+      const uploadedFiles = await uploadsRequest;
+      if (uploadedFiles) {
+        mergeUploadedFiles(fileTree, uploadedFiles);
+      }
 
-            const allFiles = getAllFiles(projectFileTree.children);
-            state.openFiles = allFiles;
-            state.activeFile = allFiles[0] || null;
-            state.chatHistory = [];
-            state.output = '';
-          }));
-          return;
+      // The rest of the bodies load when their files are opened, but the file
+      // that opens first is needed right away
+      const firstFile = findFirstFile(fileTree.children);
+      if (firstFile?.lazy) {
+        const body = await fetchFileBody(projectId, firstFile).catch(() => null);
+        if (body !== null) {
+          firstFile.content = body;
+          delete firstFile.lazy;
         }
-      } catch (error) {
-        console.error('Error loading uploaded files:', error);
       }
 
-      // Fallback: load project without uploaded files if API call fails
+      // Update projects array with latest project
       set(produce((state: EditorState) => {
         const projectIndex = state.projects.findIndex(p => p.id === projectId);
         if (projectIndex !== -1) {
-          state.projects[projectIndex] = project;
+          state.projects[projectIndex] = { ...project, fileTree, stats: state.projects[projectIndex].stats };
         } else {
-          state.projects.push(project);
+          state.projects.push({ ...project, fileTree });
         }
 
-        state.currentProject = project;
-        state.fileTree = project.fileTree;
-
-        // Get all files from the fileTree (including nested ones)
-        const getAllFiles = (items: FileOrFolder[]): File[] => {
-          const files: File[] = [];
-          for (const item of items) {
-            if (item.type === 'file') {
-              files.push(item as File);
-            } else if (item.type === 'folder' && item.children) {
-              files.push(...getAllFiles(item.children));
-            }
-          }
-          return files;
-        };
-
-        const allFiles = getAllFiles(project.fileTree.children);
-        state.openFiles = allFiles;
-        state.activeFile = allFiles[0] || null;
+        state.currentProject = { ...project, fileTree };
+        showFileTree(state, fileTree);
         state.chatHistory = [];
         state.output = '';
       }));
+      seedAutosave(projectId, fileTree);
+      cacheProjectSoon(projectId);
+      get().prewarmProject(projectId);
+      get().loadBackgroundJobs();
+      get().loadSchedules();
     } catch (error) {
       console.error('Error loading project:', error);
     }
   },
 
+  prewarmProject: (projectId: string) => {
+    const token = localStorage.getItem('pycode-user-token');
+
+    // Bodies that have not been loaded go as content hashes for the server to
+    // look up, so prewarming does not download the whole project. Uploads that
+    // have not been opened stay out: they are read from disk at run time.
+    const { fileIndex } = get();
+    const files: ({ path: string; content: string } | { path: string; contentHash: string })[] = [];
+    for (const path of listFilePaths(fileIndex)) {
+      const file = fileIndex.files[path];
+      if (!file.lazy) files.push({ path, content: file.content });
+      else if (file.contentHash && !file.uploadPath) files.push({ path, contentHash: file.contentHash });
+    }
+
+    // Fire and forget: get files, packages and bytecode ready before the first Run
+    fetch('/api/code/prewarm', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${token || ''}`
+      },
+      body: JSON.stringify({
+        projectId,
+        files
+      })
+    }).catch(error => {
+      console.error('Error starting project prewarm:', error);
+    });
+  },
+
+  cancelPrewarm: (projectId: string) => {
+    const token = localStorage.getItem('pycode-user-token');
+    fetch(`/api/code/prewarm?projectId=${encodeURIComponent(projectId)}`, {
+      method: 'DELETE',
+      headers: { 'Authorization': `Bearer ${token || ''}` },
+      // Still delivered when the page is being unloaded
+      keepalive: true
+    }).catch(() => undefined);
+  },
+
   saveProject: async () => {
     const { currentProject } = get();
     if (!currentProject) return;
+    const fileTree = selectFileTree(get());
 
     try {
       const response = await fetch('/api/projects', {
@@ -2001,13 +2937,13 @@ print("Web scraping completed!")`);
           projectId: currentProject.id,
           name: currentProject.name,
           description: currentProject.description,
-          fileTree: get().fileTree
+          fileTree
         })
       });
 
       if (response.ok) {
         set(produce((state: EditorState) => {
-          state.currentProject!.fileTree = state.fileTree;
+          state.currentProject!.fileTree = fileTree;
           state.currentProject!.updatedAt = new Date();
 
           // Update in projects array
@@ -2080,10 +3016,11 @@ print("Web scraping completed!")`);
         set(produce((state: EditorState) => {
           // Clear old project state first
           state.projects = [];
+          state.projectsNextCursor = null;
           state.currentProject = null;
-          state.fileTree = initialFileTree;
-          state.openFiles = [initialFile];
-          state.activeFile = initialFile;
+          state.fileIndex = initialFileIndex;
+          state.openFilePaths = [initialFile.name];
+          state.activeFilePath = initialFile.name;
           state.output = '';
           state.chatHistory = [];
 
@@ -2124,12 +3061,14 @@ print("Web scraping completed!")`);
 
   // User logout
   logoutUser: async () => {
+    get().disconnectUsageStream();
     try {
       // Save all projects to database before logout
-      const { projects, currentProject, fileTree } = get();
+      const { projects, currentProject } = get();
+      const fileTree = selectFileTree(get());
 
       // Save current project if it exists
-      if (currentProject && fileTree) {
+      if (currentProject) {
         console.log('[logoutUser] Saving current project before logout');
         await saveProjectToDatabase(
           currentProject.id,
@@ -2141,7 +3080,7 @@ print("Web scraping completed!")`);
 
       // Save all other projects
       for (const project of projects) {
-        if (project.id !== currentProject?.id && project.fileTree) {
+        if (project.id !== currentProject?.id && project.fileTree && !project.isListing) {
           console.log(`[logoutUser] Saving project ${project.id} before logout`);
           await saveProjectToDatabase(
             project.id,
@@ -2165,7 +3104,7 @@ print("Web scraping completed!")`);
     } finally {
       // Clear local storage and reset user state
       localStorage.removeItem('pycode-user-token');
-      localStorage.removeItem('pycode-projects'); // Clear cached projects
+      clearProjectCache().catch(() => undefined); // Clear cached projects
 
       set(produce((state: EditorState) => {
         // Reset user to demo
@@ -2185,10 +3124,11 @@ print("Web scraping completed!")`);
         };
         // Clear all project-related state
         state.projects = [];
+        state.projectsNextCursor = null;
         state.currentProject = null;
-        state.fileTree = initialFileTree;
-        state.openFiles = [initialFile];
-        state.activeFile = initialFile;
+        state.fileIndex = initialFileIndex;
+        state.openFilePaths = [initialFile.name];
+        state.activeFilePath = initialFile.name;
         state.output = '';
         state.chatHistory = [];
       }));
@@ -2232,12 +3172,19 @@ print("Web scraping completed!")`);
   },
 
   getAllUsers: async () => {
+    const { usersQuery } = get();
+    const requestId = ++usersRequestId;
     try {
-      const response = await fetch('/api/users');
-      if (response.ok) {
+      const params = new URLSearchParams({ sort: usersQuery.sort, order: usersQuery.order });
+      if (usersQuery.search) params.set('search', usersQuery.search);
+      if (usersQuery.subscription) params.set('subscription', usersQuery.subscription);
+
+      const response = await fetch(`/api/users?${params}`, { headers: adminHeaders() });
+      if (response.ok && requestId === usersRequestId) {
         const data = await response.json();
-        set({ users: data.users });
-        return data.users;
+        const users = data.users.map(mapUserRow);
+        set({ users, usersNextCursor: data.nextCursor, usersSyncCursor: data.syncCursor });
+        return users;
       }
       return get().users;
     } catch (error) {
@@ -2246,6 +3193,72 @@ print("Web scraping completed!")`);
     }
   },
 
+  loadMoreUsers: async () => {
+    const { usersQuery, usersNextCursor } = get();
+    if (!usersNextCursor) return;
+    const requestId = ++usersRequestId;
+    try {
+      const params = new URLSearchParams({ sort: usersQuery.sort, order: usersQuery.order, cursor: usersNextCursor });
+      if (usersQuery.search) params.set('search', usersQuery.search);
+      if (usersQuery.subscription) params.set('subscription', usersQuery.subscription);
+
+      const response = await fetch(`/api/users?${params}`, { headers: adminHeaders() });
+      if (response.ok && requestId === usersRequestId) {
+        const data = await response.json();
+        set(produce((state: EditorState) => {
+          const loaded = new Set(state.users.map(u => u.id));
+          state.users.push(...data.users.map(mapUserRow).filter((u: User) => !loaded.has(u.id)));
+          state.usersNextCursor = data.nextCursor;
+        }));
+      }
+    } catch (error) {
+      console.error('Error fetching more users:', error);
+    }
+  },
+
+  setUsersQuery: async (changes) => {
+    set(produce((state: EditorState) => {
+      state.usersQuery = { ...state.usersQuery, ...changes };
+    }));
+    await get().getAllUsers();
+  },
+
+  refreshChangedUsers: async () => {
+    let since = get().usersSyncCursor;
+    if (!since) return;
+    const requestId = usersRequestId;
+
+    try {
+      for (let page = 0; page < MAX_USER_SYNC_PAGES; page++) {
+        const response = await fetch(`/api/users?changedSince=${encodeURIComponent(since)}`, { headers: adminHeaders() });
+        // A new list was requested meanwhile; it brings its own cursor
+        if (!response.ok || requestId !== usersRequestId) return;
+        const data = await response.json();
+
+        set(produce((state: EditorState) => {
+          const { search, subscription, sort, order } = state.usersQuery;
+          for (const row of data.users) {
+            const user = mapUserRow(row);
+            const index = state.users.findIndex(u => u.id === user.id);
+            if (index !== -1) {
+              state.users[index] = user;
+            } else if (!search && !subscription && sort === 'created_at' && order === 'desc' &&
+              (state.users.length === 0 || user.createdAt > state.users[0].createdAt)) {
+              // A new sign-up belongs at the top of the default listing
+              state.users.unshift(user);
+            }
+          }
+        }));
+
+        since = data.syncCursor as string;
+        if (!data.hasMore) break;
+      }
+      set({ usersSyncCursor: since });
+    } catch (error) {
+      console.error('Error refreshing users:', error);
+    }
+  },
+
   updateUserCredits: async (userId: string, credits: number) => {
     try {
       const response = await fetch('/api/users', {
@@ -2299,7 +3312,7 @@ print("Web scraping completed!")`);
 
   getUserStats: async () => {
     try {
-      const response = await fetch('/api/stats', { method: 'PUT' });
+      const response = await fetch('/api/users/stats', { headers: adminHeaders() });
       if (response.ok) {
         const data = await response.json();
         set({ adminStats: data.stats });
@@ -2329,30 +3342,18 @@ print("Web scraping completed!")`);
     };
   },
 
-  incrementCodeRun: async () => {
-    const { currentUser } = get();
-    if (!currentUser) return;
-
-    try {
-      const response = await fetch('/api/stats', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ userId: currentUser.id, type: 'code_run' })
-      });
-
-      if (response.ok) {
-        set(produce((state: EditorState) => {
-          state.dailyCodeRuns += 1;
-          if (state.currentUser) {
-            state.currentUser.codeRuns += 1;
-            state.currentUser.credits -= 1;
-            state.currentUser.lastActive = new Date();
-          }
-        }));
+  incrementCodeRun: (creditsCharged = 0) => {
+    // Code runs are metered and billed on the server. The usage stream
+    // reports the charge when connected; otherwise mirror it here.
+    if (usageStreamLive) return;
+    set(produce((state: EditorState) => {
+      state.dailyCodeRuns += 1;
+      if (state.currentUser) {
+        state.currentUser.codeRuns += 1;
+        state.currentUser.credits = Math.max(0, state.currentUser.credits - creditsCharged);
+        state.currentUser.lastActive = new Date();
       }
-    } catch (error) {
-      console.error('Error incrementing code run:', error);
-    }
+    }));
   },
 
   incrementAiQuery: async () => {
@@ -2360,13 +3361,17 @@ print("Web scraping completed!")`);
     if (!currentUser) return;
 
     try {
+      const token = localStorage.getItem('pycode-user-token');
       const response = await fetch('/api/stats', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ userId: currentUser.id, type: 'ai_query' })
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${token || ''}`
+        },
+        body: JSON.stringify({ type: 'ai_query' })
       });
 
-      if (response.ok) {
+      if (response.ok && !usageStreamLive) {
         set(produce((state: EditorState) => {
           state.dailyAiQueries += 1;
           if (state.currentUser) {
@@ -2381,6 +3386,89 @@ print("Web scraping completed!")`);
     }
   },
 
+  connectUsageStream: () => {
+    const token = localStorage.getItem('pycode-user-token');
+    if (usageStreamController || !token) return;
+
+    const controller = new AbortController();
+    usageStreamController = controller;
+    const updates = createUsageCoalescer((batch) => set(produce((state: EditorState) => {
+      const update = state.currentUser && batch.get(state.currentUser.id);
+      if (!state.currentUser || !update) return;
+      applyUsageUpdate(state.currentUser, update);
+      state.dailyCodeRuns += update.dailyCodeRuns;
+      state.dailyAiQueries += update.dailyAiQueries;
+    })));
+
+    followUsageStream('/api/stats/stream', token, controller.signal, (type, payload) => {
+      if (type === 'snapshot') {
+        // Fresh totals on every (re)connect
+        updates.cancel();
+        usageStreamLive = usageStreamController === controller;
+        set(produce((state: EditorState) => {
+          if (state.currentUser?.id !== payload.userId) return;
+          state.currentUser.credits = payload.credits;
+          state.currentUser.codeRuns = payload.codeRuns;
+          state.currentUser.aiQueries = payload.aiQueries;
+          state.dailyCodeRuns = payload.dailyCodeRuns;
+          state.dailyAiQueries = payload.dailyAiQueries;
+        }));
+      } else {
+        updates.push(type, payload);
+      }
+    }, () => {
+      if (usageStreamController === controller) usageStreamLive = false;
+    }).finally(() => {
+      updates.cancel();
+      if (usageStreamController === controller) {
+        usageStreamController = null;
+        usageStreamLive = false;
+      }
+    });
+  },
+
+  disconnectUsageStream: () => {
+    usageStreamController?.abort();
+    usageStreamController = null;
+    usageStreamLive = false;
+  },
+
+  connectAdminUsageStream: () => {
+    const token = localStorage.getItem('pycode-admin-token');
+    if (adminUsageStreamController || !token) return;
+
+    const controller = new AbortController();
+    adminUsageStreamController = controller;
+    const updates = createUsageCoalescer((batch) => set(produce((state: EditorState) => {
+      for (const [userId, update] of batch) {
+        const user = state.users.find(u => u.id === userId);
+        if (user) {
+          const before = { codeRuns: user.codeRuns, aiQueries: user.aiQueries };
+          applyUsageUpdate(user, update);
+          state.adminStats.totalCodeRuns += user.codeRuns - before.codeRuns;
+          state.adminStats.totalAiQueries += user.aiQueries - before.aiQueries;
+        } else {
+          state.adminStats.totalCodeRuns += update.dailyCodeRuns;
+          state.adminStats.totalAiQueries += update.dailyAiQueries;
+        }
+      }
+    })));
+
+    followUsageStream('/api/stats/stream?scope=admin', token, controller.signal, (type, payload) => {
+      updates.push(type, payload);
+    }).finally(() => {
+      updates.cancel();
+      if (adminUsageStreamController === controller) {
+        adminUsageStreamController = null;
+      }
+    });
+  },
+
+  disconnectAdminUsageStream: () => {
+    adminUsageStreamController?.abort();
+    adminUsageStreamController = null;
+  },
+
   checkCreditLimit: () => {
     const { currentUser } = get();
     if (!currentUser) return false;
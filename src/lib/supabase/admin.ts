@@ -0,0 +1,26 @@
+import { createClient, SupabaseClient } from '@supabase/supabase-js'
+
+let adminClient: SupabaseClient | null = null
+
+/**
+ * Service-role client for server work that runs outside a request (timers,
+ * background flushes), where there are no session cookies to act with.
+ * Returns null when SUPABASE_SERVICE_ROLE_KEY is not configured.
+ */
+export function createAdminClient(): SupabaseClient | null {
+    const url = process.env.NEXT_PUBLIC_SUPABASE_URL
+    const serviceKey = process.env.SUPABASE_SERVICE_ROLE_KEY
+    if (!url || !serviceKey) {
+        return null
+    }
+
+    if (!adminClient) {
+        adminClient = createClient(url, serviceKey, {
+            auth: {
+                autoRefreshToken: false,
+                persistSession: false
+            }
+        })
+    }
+    return adminClient
+}
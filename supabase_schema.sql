@@ -129,3 +129,512 @@ $$ language plpgsql security definer;
 create trigger on_auth_user_created
   after insert on auth.users
   for each row execute procedure public.handle_new_user();
+
+-- Apply a batch of metered usage in one transaction. Called by the server's
+-- usage meter (src/lib/runner/usage-store.ts) with one entry per user and day:
+--   [{"user_id": "...", "date": "2026-01-31", "code_runs": 3, "ai_queries": 1, "credits": 2}]
+-- Counters are incremented in place, so concurrent batches never lose counts,
+-- and a user is never charged more credits than their balance.
+-- A batch holding a malformed or out-of-range entry is rejected as a whole
+-- with SQLSTATE 22023; the meter then writes its entries one by one and drops
+-- the ones that are rejected again.
+-- Returns the new balances of the users in the batch.
+create or replace function public.record_usage(entries jsonb)
+returns table (user_id uuid, credits int, code_runs int, ai_queries int)
+language plpgsql
+security definer
+set search_path = public
+as $$
+#variable_conflict use_column
+begin
+  if exists (
+    select 1
+    from jsonb_array_elements(entries) as e
+    where jsonb_typeof(e) <> 'object'
+       or coalesce(e->>'code_runs', '0') !~ '^[0-9]{1,6}$'
+       or coalesce(e->>'ai_queries', '0') !~ '^[0-9]{1,6}$'
+       or coalesce(e->>'credits', '0') !~ '^[0-9]{1,6}$'
+  ) then
+    raise exception 'record_usage: counters must be whole numbers between 0 and 999999'
+      using errcode = '22023';
+  end if;
+
+  return query
+  with usage as (
+    select (e->>'user_id')::uuid as user_id,
+           (e->>'date')::date as date,
+           coalesce((e->>'code_runs')::int, 0) as code_runs,
+           coalesce((e->>'ai_queries')::int, 0) as ai_queries,
+           coalesce((e->>'credits')::int, 0) as credits
+    from jsonb_array_elements(entries) as e
+  ),
+  daily as (
+    insert into public.daily_stats (user_id, date, code_runs, ai_queries)
+    select u.user_id, u.date, sum(u.code_runs), sum(u.ai_queries)
+    from usage u
+    where exists (select 1 from public.users where users.id = u.user_id)
+    group by u.user_id, u.date
+    on conflict (user_id, date) do update
+      set code_runs = coalesce(daily_stats.code_runs, 0) + excluded.code_runs,
+          ai_queries = coalesce(daily_stats.ai_queries, 0) + excluded.ai_queries
+  )
+  update public.users
+  set credits = coalesce(users.credits, 0) - least(totals.credits, greatest(coalesce(users.credits, 0), 0)),
+      code_runs = coalesce(users.code_runs, 0) + totals.code_runs,
+      ai_queries = coalesce(users.ai_queries, 0) + totals.ai_queries,
+      last_active = timezone('utc'::text, now())
+  from (
+    select user_id, sum(code_runs)::int as code_runs, sum(ai_queries)::int as ai_queries, sum(credits)::int as credits
+    from usage
+    group by user_id
+  ) as totals
+  where users.id = totals.user_id
+  returning users.id, users.credits, users.code_runs, users.ai_queries;
+end;
+$$;
+
+-- Only the server (service role) may record usage
+revoke execute on function public.record_usage(jsonb) from public, anon, authenticated;
+
+-- Admin users list: keyset pagination, search and change sync.
+-- updated_at moves on every change so the dashboard can fetch only the rows
+-- changed since its last sync.
+alter table public.users
+  add column if not exists updated_at timestamp with time zone default timezone('utc'::text, now()) not null;
+
+create or replace function public.touch_updated_at()
+returns trigger as $$
+begin
+  new.updated_at = timezone('utc'::text, now());
+  return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists users_touch_updated_at on public.users;
+create trigger users_touch_updated_at
+  before update on public.users
+  for each row execute procedure public.touch_updated_at();
+
+create index if not exists idx_users_created_at on public.users (created_at, id);
+create index if not exists idx_users_last_active on public.users (last_active, id);
+create index if not exists idx_users_updated_at on public.users (updated_at, id);
+create index if not exists idx_users_credits on public.users (credits, id);
+create index if not exists idx_users_code_runs on public.users (code_runs, id);
+
+create extension if not exists pg_trgm;
+create index if not exists idx_users_email_trgm on public.users using gin (email gin_trgm_ops);
+create index if not exists idx_users_name_trgm on public.users using gin (name gin_trgm_ops);
+
+-- Materialized counters for the admin dashboard, kept current by
+-- statement-level triggers instead of aggregating the users table per request.
+-- The totals are spread over 16 shard rows (id 0-15) that readers sum: each
+-- trigger adds to the row of its backend (pg_backend_pid() % 16), so
+-- concurrent writes to users rarely wait on the same row lock.
+create table if not exists public.admin_counters (
+  id int primary key check (id >= 0 and id < 16),
+  total_users bigint not null default 0,
+  premium_users bigint not null default 0,
+  total_code_runs bigint not null default 0,
+  total_ai_queries bigint not null default 0,
+  total_projects bigint not null default 0
+);
+
+-- Databases created with the former single row (id = 1 only)
+alter table public.admin_counters alter column id drop default;
+alter table public.admin_counters drop constraint if exists admin_counters_id_check;
+alter table public.admin_counters add constraint admin_counters_id_check check (id >= 0 and id < 16);
+
+alter table public.admin_counters enable row level security;
+
+create or replace function public.count_user_changes()
+returns trigger as $$
+declare
+  d_users bigint := 0;
+  d_premium bigint := 0;
+  d_code_runs bigint := 0;
+  d_ai_queries bigint := 0;
+begin
+  if TG_OP in ('INSERT', 'UPDATE') then
+    select count(*), count(*) filter (where subscription <> 'free'),
+           coalesce(sum(code_runs), 0), coalesce(sum(ai_queries), 0)
+      into d_users, d_premium, d_code_runs, d_ai_queries
+      from new_rows;
+  end if;
+  if TG_OP in ('UPDATE', 'DELETE') then
+    select d_users - count(*), d_premium - count(*) filter (where subscription <> 'free'),
+           d_code_runs - coalesce(sum(code_runs), 0), d_ai_queries - coalesce(sum(ai_queries), 0)
+      into d_users, d_premium, d_code_runs, d_ai_queries
+      from old_rows;
+  end if;
+
+  -- Most updates (last_active, profile edits) change no total; they take no lock
+  if d_users = 0 and d_premium = 0 and d_code_runs = 0 and d_ai_queries = 0 then
+    return null;
+  end if;
+
+  update public.admin_counters
+  set total_users = total_users + d_users,
+      premium_users = premium_users + d_premium,
+      total_code_runs = total_code_runs + d_code_runs,
+      total_ai_queries = total_ai_queries + d_ai_queries
+  where id = pg_backend_pid() % 16;
+  return null;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+create or replace function public.count_project_changes()
+returns trigger as $$
+begin
+  update public.admin_counters
+  set total_projects = total_projects + case when TG_OP = 'INSERT'
+    then (select count(*) from new_rows)
+    else -(select count(*) from old_rows)
+  end
+  where id = pg_backend_pid() % 16;
+  return null;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+drop trigger if exists users_count_insert on public.users;
+create trigger users_count_insert
+  after insert on public.users referencing new table as new_rows
+  for each statement execute procedure public.count_user_changes();
+
+drop trigger if exists users_count_update on public.users;
+create trigger users_count_update
+  after update on public.users referencing old table as old_rows new table as new_rows
+  for each statement execute procedure public.count_user_changes();
+
+drop trigger if exists users_count_delete on public.users;
+create trigger users_count_delete
+  after delete on public.users referencing old table as old_rows
+  for each statement execute procedure public.count_user_changes();
+
+drop trigger if exists projects_count_insert on public.projects;
+create trigger projects_count_insert
+  after insert on public.projects referencing new table as new_rows
+  for each statement execute procedure public.count_project_changes();
+
+drop trigger if exists projects_count_delete on public.projects;
+create trigger projects_count_delete
+  after delete on public.projects referencing old table as old_rows
+  for each statement execute procedure public.count_project_changes();
+
+-- (Re)compute the counters from scratch into shard 0 and zero the other
+-- shards; safe to run at any time
+with totals as (
+  select (select count(*) from public.users) as total_users,
+         (select count(*) from public.users where subscription <> 'free') as premium_users,
+         (select coalesce(sum(code_runs), 0) from public.users) as total_code_runs,
+         (select coalesce(sum(ai_queries), 0) from public.users) as total_ai_queries,
+         (select count(*) from public.projects) as total_projects
+)
+insert into public.admin_counters (id, total_users, premium_users, total_code_runs, total_ai_queries, total_projects)
+select shard.id,
+       case when shard.id = 0 then t.total_users else 0 end,
+       case when shard.id = 0 then t.premium_users else 0 end,
+       case when shard.id = 0 then t.total_code_runs else 0 end,
+       case when shard.id = 0 then t.total_ai_queries else 0 end,
+       case when shard.id = 0 then t.total_projects else 0 end
+from generate_series(0, 15) as shard(id), totals t
+on conflict (id) do update
+  set total_users = excluded.total_users,
+      premium_users = excluded.premium_users,
+      total_code_runs = excluded.total_code_runs,
+      total_ai_queries = excluded.total_ai_queries,
+      total_projects = excluded.total_projects;
+
+-- Content-addressed file bodies. projects.file_tree is the manifest (folder
+-- structure plus each file's contentHash), and identical files across
+-- projects share one row here. A user can read a body only when one of their
+-- projects refers to it. Rows no project refers to any more are removed by
+-- collect_file_contents() below; run it periodically, e.g. daily with pg_cron:
+--   select cron.schedule('collect-file-contents', '0 4 * * *', 'select public.collect_file_contents()');
+create table if not exists public.file_contents (
+  hash text primary key, -- sha256 of content, hex
+  content text not null,
+  size integer not null,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+-- Set by touch_file_contents() whenever a save reuses a stored body
+alter table public.file_contents add column if not exists last_referenced_at timestamp with time zone;
+
+alter table public.file_contents enable row level security;
+
+drop policy if exists "Authenticated users can read file contents" on public.file_contents;
+create policy "Users can read contents of their projects" on public.file_contents
+  for select to authenticated using (
+    exists (
+      select 1 from public.projects p
+      where p.user_id = auth.uid()
+        and jsonb_path_exists(p.file_tree, '$.**.contentHash ? (@ == $hash)', jsonb_build_object('hash', hash))
+    )
+  );
+
+-- A row can only be written under its own hash
+create policy "Authenticated users can add file contents" on public.file_contents
+  for insert to authenticated
+  with check (hash = encode(sha256(convert_to(content, 'UTF8')), 'hex'));
+
+-- Bodies among p_hashes that a project of p_user_id refers to (GET
+-- /api/projects/contents with the service-role client)
+create or replace function public.owned_file_contents(p_user_id uuid, p_hashes text[])
+returns table (hash text, content text)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+  select fc.hash, fc.content
+  from public.file_contents fc
+  where fc.hash = any(p_hashes)
+    and exists (
+      select 1 from public.projects p
+      where p.user_id = p_user_id
+        and jsonb_path_exists(p.file_tree, '$.**.contentHash ? (@ == $hash)', jsonb_build_object('hash', fc.hash))
+    );
+$$;
+
+revoke execute on function public.owned_file_contents(uuid, text[]) from public, anon, authenticated;
+
+-- Mark the bodies among p_hashes as just referenced and return the ones that
+-- exist. A save calls this instead of only checking which bodies are stored:
+-- a row it touched is no longer old enough for collect_file_contents(), and
+-- one collected before the touch is not returned, so the save stores it again.
+create or replace function public.touch_file_contents(p_hashes text[])
+returns table (hash text)
+language sql
+volatile
+security definer
+set search_path = public
+as $$
+  update public.file_contents fc
+  set last_referenced_at = timezone('utc'::text, now())
+  where fc.hash = any(p_hashes)
+  returning fc.hash;
+$$;
+
+revoke execute on function public.touch_file_contents(text[]) from public, anon;
+
+-- Delete bodies no project refers to. Rows written or reused by a save less
+-- than p_min_age ago are kept: a save writes (or touches) its bodies before
+-- the manifest that refers to them. Returns the number of rows deleted.
+create or replace function public.collect_file_contents(p_min_age interval default interval '1 day')
+returns bigint
+language sql
+security definer
+set search_path = public
+as $$
+  with referenced as (
+    select distinct hash.value #>> '{}' as hash
+    from public.projects p,
+         jsonb_path_query(p.file_tree, '$.**.contentHash') as hash(value)
+  ),
+  deleted as (
+    delete from public.file_contents fc
+    where coalesce(fc.last_referenced_at, fc.created_at) < timezone('utc'::text, now()) - p_min_age
+      and not exists (select 1 from referenced r where r.hash = fc.hash)
+    returning 1
+  )
+  select count(*) from deleted;
+$$;
+
+revoke execute on function public.collect_file_contents(interval) from public, anon, authenticated;
+
+-- Project list entries (GET /api/projects?view=summary) read these instead
+-- of file_tree. The app sets them whenever it writes a tree; last_run_at is
+-- batched from runs (src/lib/runner/project-activity.ts).
+alter table public.projects add column if not exists file_count integer not null default 0;
+alter table public.projects add column if not exists total_size bigint not null default 0;
+alter table public.projects add column if not exists main_language text;
+alter table public.projects add column if not exists last_run_at timestamp with time zone;
+
+create index if not exists projects_user_updated_idx
+  on public.projects (user_id, updated_at desc, id desc);
+
+-- Backfill counts for trees written before; main_language follows on their next save
+update public.projects p
+set file_count = stats.file_count,
+    total_size = stats.total_size
+from (
+  select pr.id,
+         count(f.node) as file_count,
+         coalesce(sum(coalesce((f.node->>'size')::bigint, octet_length(f.node->>'content'), 0)), 0) as total_size
+  from public.projects pr
+  left join lateral jsonb_path_query(pr.file_tree, 'strict $.**?(@.type == "file")') as f(node) on true
+  where pr.file_tree is not null and jsonb_typeof(pr.file_tree) = 'object'
+  group by pr.id
+) stats
+where p.id = stats.id and p.file_count = 0;
+
+-- Project search (GET /api/projects/search, src/lib/project-search.ts).
+-- Names and descriptions are indexed by a generated column; files get one
+-- row each, re-tokenized only when their content hash changes.
+alter table public.projects add column if not exists search_vector tsvector
+  generated always as (
+    setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+  ) stored;
+
+create index if not exists projects_search_idx on public.projects using gin (search_vector);
+create index if not exists projects_name_trgm_idx on public.projects using gin (name gin_trgm_ops);
+
+create table if not exists public.project_file_index (
+  project_id uuid references public.projects(id) on delete cascade not null,
+  path text not null,
+  content_hash text not null,
+  document tsvector not null,
+  primary key (project_id, path)
+);
+
+create index if not exists project_file_index_document_idx on public.project_file_index using gin (document);
+
+alter table public.project_file_index enable row level security;
+
+-- p_files: the project's current files, [{path, hash}]
+create or replace function public.index_project_files(p_project_id uuid, p_files jsonb)
+returns void
+language sql
+security definer
+set search_path = public
+as $$
+  delete from public.project_file_index i
+  where i.project_id = p_project_id
+    and not exists (
+      select 1 from jsonb_to_recordset(p_files) as f(path text, hash text)
+      where f.path = i.path
+    );
+
+  insert into public.project_file_index (project_id, path, content_hash, document)
+  select p_project_id,
+         f.path,
+         f.hash,
+         -- Path words rank above body words; bodies are capped below the tsvector size limit
+         setweight(to_tsvector('simple', regexp_replace(f.path, '[/._-]+', ' ', 'g')), 'C') ||
+         setweight(to_tsvector('simple', left(fc.content, 262144)), 'D')
+  from jsonb_to_recordset(p_files) as f(path text, hash text)
+  join public.file_contents fc on fc.hash = f.hash
+  left join public.project_file_index i on i.project_id = p_project_id and i.path = f.path
+  where i.content_hash is distinct from f.hash
+  on conflict (project_id, path) do update
+    set content_hash = excluded.content_hash,
+        document = excluded.document;
+$$;
+
+-- Ranked projects of one user with a highlighted snippet (matches between
+-- chr(2) and chr(3)) from the best matching file, or from the description
+create or replace function public.search_projects(p_user_id uuid, p_query text, p_limit integer default 20)
+returns table (
+  project_id uuid,
+  name text,
+  description text,
+  updated_at timestamp with time zone,
+  rank real,
+  path text,
+  snippet text
+)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+  with q as (
+    select websearch_to_tsquery('simple', p_query) as query
+  ),
+  file_hits as (
+    select distinct on (i.project_id)
+           i.project_id, i.path, i.content_hash, ts_rank(i.document, q.query) as rank
+    from public.project_file_index i
+    join public.projects p on p.id = i.project_id and p.user_id = p_user_id
+    cross join q
+    where i.document @@ q.query
+    order by i.project_id, rank desc
+  ),
+  candidates as (
+    select p.id, p.name, p.description, p.updated_at,
+           ts_rank(p.search_vector, q.query) + coalesce(f.rank, 0) * 0.5 + word_similarity(p_query, p.name) as rank,
+           f.path, f.content_hash
+    from public.projects p
+    cross join q
+    left join file_hits f on f.project_id = p.id
+    where p.user_id = p_user_id
+      and (p.search_vector @@ q.query or f.project_id is not null or p_query <% p.name)
+    order by rank desc, p.updated_at desc
+    limit least(greatest(p_limit, 1), 100)
+  )
+  select c.id, c.name, c.description, c.updated_at, c.rank::real, c.path,
+         ts_headline('simple', coalesce(fc.content, c.description, ''), q.query,
+                     'StartSel=' || chr(2) || ', StopSel=' || chr(3) || ', MaxWords=20, MinWords=8, MaxFragments=2')
+  from candidates c
+  cross join q
+  left join public.file_contents fc on fc.hash = c.content_hash
+  order by c.rank desc, c.updated_at desc;
+$$;
+
+revoke execute on function public.index_project_files(uuid, jsonb) from public, anon, authenticated;
+revoke execute on function public.search_projects(uuid, text, integer) from public, anon, authenticated;
+
+-- Index the files of existing projects; safe to run again. Trees that still
+-- have inline content are indexed on their next save.
+with recursive nodes (project_id, node, path) as (
+  select p.id, c, c->>'name'
+  from public.projects p, jsonb_array_elements(p.file_tree->'children') as c
+  where jsonb_typeof(p.file_tree->'children') = 'array'
+  union all
+  select n.project_id, c, n.path || '/' || (c->>'name')
+  from nodes n, jsonb_array_elements(n.node->'children') as c
+  where n.node->>'type' = 'folder' and jsonb_typeof(n.node->'children') = 'array'
+)
+select public.index_project_files(p.id, coalesce(files.list, '[]'::jsonb))
+from public.projects p
+left join (
+  select project_id, jsonb_agg(jsonb_build_object('path', path, 'hash', node->>'contentHash')) as list
+  from nodes
+  where node->>'type' = 'file' and node ? 'contentHash'
+  group by project_id
+) files on files.project_id = p.id;
+
+-- Shared state of the runner job broker (src/lib/runner/supabase-job-broker.ts),
+-- so that every web instance sees the same runner nodes, queue and results.
+-- Only the server (service role) uses these tables.
+create table if not exists public.runner_nodes (
+  id uuid primary key,
+  name text,
+  capacity int not null,
+  labels jsonb,
+  running int not null default 0,
+  completed int not null default 0,
+  registered_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  last_heartbeat timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+create table if not exists public.runner_jobs (
+  id uuid primary key,
+  payload jsonb not null,
+  status text not null check (status in ('queued', 'assigned', 'completed', 'failed')),
+  node_id uuid, -- node running the job; nodes are removed when they go offline
+  pinned_node_id uuid,
+  started boolean not null default false,
+  cancel_requested boolean not null default false,
+  result jsonb,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  assigned_at timestamp with time zone,
+  finished_at timestamp with time zone,
+  expires_at timestamp with time zone not null
+);
+
+create index if not exists runner_jobs_queue_idx on public.runner_jobs (status, created_at);
+create index if not exists runner_jobs_node_idx on public.runner_jobs (node_id) where node_id is not null;
+
+create table if not exists public.runner_job_events (
+  id bigint generated by default as identity primary key,
+  job_id uuid references public.runner_jobs(id) on delete cascade not null,
+  event jsonb not null
+);
+
+create index if not exists runner_job_events_job_idx on public.runner_job_events (job_id, id);
+
+alter table public.runner_nodes enable row level security;
+alter table public.runner_jobs enable row level security;
+alter table public.runner_job_events enable row level security;